@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+
+from flask import request, current_app
+
+try:
+    import brotli # (선택 의존성: 설치되어 있으면 Accept-Encoding: br 지원)
+except ImportError:
+    brotli = None
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 조회 응답 HTTP 캐싱 (ETag / 304) 및 응답 압축 ---
+# - ETag는 리포트 version(services/report_versioning)에서 만들므로 본문을 만들지 않고도 계산 가능
+#   -> If-None-Match가 일치하면 무거운 JSON 컬럼을 읽거나 파싱하기 전에 304 반환
+# - 응답 압축: COMPRESS_MIN_SIZE 이상인 JSON/텍스트 응답을 br(가능 시) 또는 gzip으로 압축
+#   (SSE 같은 스트리밍 응답과 이미 압축된 이미지는 건너뜀)
+# --------------------------------------------------------------------------------------
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/html", "text/plain", "text/csv", "image/svg+xml")
+
+# 압축 시 ETag 뒤에 붙이는 접미사 (표현이 다르므로 강한 ETag도 달라야 함)
+_ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def report_etag(kind, report_id, version, variant=b""):
+    """리포트 version + 요청 변형(쿼리 문자열 등)으로 만드는 강한 ETag 값 (따옴표 제외)"""
+    if isinstance(variant, str):
+        variant = variant.encode("utf-8")
+    digest = hashlib.sha1(f"{kind}:{report_id}:{version}:".encode("utf-8") + variant).hexdigest()[:16]
+    return f"{kind}-{version}-{digest}"
+
+
+def not_modified_response(etag):
+    """If-None-Match가 etag(또는 그 압축 표현)와 일치하면 304 응답, 아니면 None"""
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return None
+    if not any(if_none_match.contains(etag + suffix) for suffix in ("",) + _ENCODING_SUFFIXES):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def with_etag(rv, etag):
+    """뷰 반환값을 응답 객체로 만들고, 200 응답에만 ETag를 붙입니다. (오류/처리 중 응답은 캐시하지 않음)"""
+    response = current_app.make_response(rv)
+    if response.status_code == 200:
+        response.set_etag(etag)
+        # (브라우저는 저장하되 매번 재검증 -> 변경 없으면 304)
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _choose_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept["br"]:
+        return "br"
+    if accept["gzip"]:
+        return "gzip"
+    return None
+
+
+def init_http_compression(app):
+    """응답 압축 after_request 훅 등록"""
+
+    @app.after_request
+    def _compress_response(response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+
+        encoding = _choose_encoding()
+        response.vary.add("Accept-Encoding")
+        if encoding is None:
+            return response
+
+        level = app.config.get('COMPRESS_LEVEL', 6)
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=min(level, 11))
+        else:
+            compressed = gzip.compress(data, compresslevel=min(level, 9))
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
@@ -3,9 +3,12 @@ import uuid
 import json
 from flask import Blueprint, request, jsonify, Response, send_file
 from werkzeug.utils import secure_filename
+from itsdangerous import URLSafeTimedSerializer, BadData
 from flask import current_app
 import traceback
 import io
+import queue
+from time import time
 import plotly.io as pio
 # --- [유지] services 폴더의 로직 임포트 ---
 from services.parsing_service import extract_text
@@ -13,8 +16,27 @@ from services.qa_service import generate_deep_dive_question
 from services.advancement_service import generate_advancement_ideas
 from services.course_management_service import CourseManagementService
 from services.flow_graph_services import _create_flow_graph_figure, check_system_fonts_debug
-from services.deep_analysis_service import perform_deep_analysis_async
-from sqlalchemy.orm import scoped_session, sessionmaker
+from services.deep_analysis_service import perform_deep_analysis_async, deep_analysis_key
+from services.job_queue_service import enqueue_job
+from services.admission_service import check_admission, get_queue_position
+from services.dedup_service import compute_content_hash, find_duplicate, copy_analysis, reuse_analysis
+from services.revision_service import (
+    compute_paragraph_hashes, build_revision_diff, build_revision_context, revision_basis
+)
+from services.report_events import queue_event, subscribe, unsubscribe, format_sse
+from services.report_versioning import SECTION_COLUMNS, load_section_versions, bump_report_sections
+from services.question_pool_service import count_pool, pop_question, try_acquire_refill_lock
+from services.qa_history_service import load_history, append_turn, save_answer, conversation_chain
+from services.report_view_cache import get_report_view, put_report_view
+from services.conversation_context_service import build_conversation_context
+from services.speculative_deep_dive_service import (
+    begin_speculation, adopt_in_flight, finish_speculation, abandon_speculation, promote_speculative_turn,
+    has_published_deep_dive
+)
+from .http_cache import report_etag, not_modified_response, with_etag
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import scoped_session, sessionmaker, load_only
 
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
@@ -26,10 +48,11 @@ student_bp = Blueprint('student_api', __name__)
 
 
 # --- [수정] 헬퍼 함수: get_report_or_404 ---
-def get_report_or_404(report_id, user_id_from_token):
+def get_report_or_404(report_id, user_id_from_token, columns=None):
     """
     DB에서 리포트를 조회하고, 소유권 또는 TA/Admin 권한을 확인합니다.
     없거나 권한이 없으면 (None, 404/403_response)를 반환합니다.
+    [신규] columns를 주면 해당 컬럼만 읽습니다. (나머지는 접근 시 지연 로드)
     """
     
     # 1. 토큰의 user_id로 현재 사용자 정보 조회
@@ -44,7 +67,15 @@ def get_report_or_404(report_id, user_id_from_token):
         return None, (jsonify({"error": "User not found"}), 401)
 
     # 2. 리포트 조회
-    report = db.session.get(AnalysisReport, report_id)
+    if columns:
+        report = (
+            db.session.query(AnalysisReport)
+            .options(load_only(*[getattr(AnalysisReport, column) for column in columns]))
+            .filter_by(id=report_id)
+            .first()
+        )
+    else:
+        report = db.session.get(AnalysisReport, report_id)
     
     # 3. 리포트가 없는 경우
     if not report:
@@ -61,6 +92,10 @@ def get_report_or_404(report_id, user_id_from_token):
     # 5. 성공 (소유자 또는 TA/Admin)
     return report, None
 
+def _is_provisional(similarity_details_list):
+    """[신규] similarity_details가 아직 빠른 미리보기(잠정) 결과인지 확인합니다."""
+    return any(item.get("provisional") for item in similarity_details_list or [])
+
 # --- 2. [이동] API 엔드포인트 ---
 @student_bp.route("/analyze", methods=["POST"])
 @jwt_required()
@@ -69,8 +104,6 @@ def analyze_report():
     POST /api/student/analyze
     프론트엔드에서 파일과 폼 데이터를 받아 분석을 '시작'시킴
     """
-    # [핵심 수정] app.py에 정의된 새 함수 이름을 임포트합니다.
-    from app import background_analysis_step1_analysis
     print("\n--- [Debug] /api/student/analyze ---")
     try:
         print(f"Request Headers: {request.headers}")
@@ -93,6 +126,9 @@ def analyze_report():
     is_test_str = request.form.get("is_test", "false").lower()
     is_test = is_test_str == 'true'
     print(f"[Debug] is_test 플래그: {is_test} (원본: '{is_test_str}')")
+    # [신규] is_test 제출은 빠른 미리보기 단계에서 종료하도록 선택 가능 (LLM 정밀 비교 생략)
+    preview_only = request.form.get("preview_only", "false").lower() == 'true'
+    analysis_tier = "preview" if (is_test and preview_only) else "full"
 
     if not text and file:
         original_filename = secure_filename(file.filename)
@@ -104,7 +140,6 @@ def analyze_report():
     
     if not text or len(text) < 50:
         return jsonify({"error": "Text is too short for analysis"}), 400
-    print(f"[Debug] 비동기 제출 모드 (is_test={is_test}) 실행...")
 
     # 1. JWT 토큰에서 identity (user_id)를 문자열로 가져옴
     token_identity = get_jwt_identity() 
@@ -115,210 +150,486 @@ def analyze_report():
     except ValueError:
         # 토큰의 identity가 숫자가 아닌 경우 오류 처리
         return jsonify({"error": "Invalid user identity in token (not a number)"}), 401
-    
-    
+
+    # [신규] 수정본 제출: revision_of로 원본 리포트 지정 (본인 리포트만)
+    revision_parent = None
+    revision_of = request.form.get("revision_of")
+    if revision_of:
+        revision_parent = db.session.get(AnalysisReport, revision_of)
+        if not revision_parent or revision_parent.user_id != user_id:
+            return jsonify({"error": "revision_of must reference one of your own reports"}), 400
+
+    # [신규] 동일 제출 중복 제거 (force=true면 항상 새로 분석)
+    text_snippet = text[:10000]
+    content_hash = compute_content_hash(text_snippet)
+    force = request.form.get("force", "false").lower() == 'true'
+    dedup_mode, source_report = (None, None)
+    if not force:
+        dedup_mode, source_report = find_duplicate(
+            user_id, content_hash, analysis_tier, current_app.config.get('DEDUP_SCOPE', 'user')
+        )
+
+    if dedup_mode == "in_progress":
+        # 같은 제출이 이미 분석 중 (재시도/중복 클릭): 기존 리포트를 그대로 반환
+        print(f"[Dedup] 진행 중인 동일 제출 반환: {source_report.id}")
+        return jsonify({
+            "reportId": source_report.id,
+            "deduplicated": True,
+            "duplicate_of": source_report.id,
+            "status": source_report.status
+        }), 200
+
+    # [신규] 승인 제어: 대기열이 한도에 도달하면 429 + Retry-After (완료 결과 복사는 큐를 쓰지 않으므로 제외)
+    if dedup_mode != "copy":
+        admitted, retry_after = check_admission(current_app.config)
+        if not admitted:
+            response = jsonify({
+                "error": "Analysis queue is full. Please retry later.",
+                "retry_after": retry_after
+            })
+            response.headers["Retry-After"] = str(retry_after)
+            return response, 429
+    print(f"[Debug] 비동기 제출 모드 (is_test={is_test}, dedup={dedup_mode}) 실행...")
+
+    job = None
     try:
         new_report = AnalysisReport(
             user_id=user_id,
             status="processing", # 초기 상태
             original_filename=original_filename,
-            text_snippet=text[:10000],
+            text_snippet=text_snippet,
+            content_hash=content_hash,
+            paragraph_hashes=json.dumps(compute_paragraph_hashes(text_snippet)),
             is_test=is_test,
+            analysis_tier=analysis_tier,
             
             # --- [신규] 새 임베딩 필드 초기화 ---
             embedding_keyconcepts_corethesis=None,
             embedding_keyconcepts_claim=None
             # --- [신규] ---
         )
+        if revision_parent:
+            new_report.revision_of = revision_parent.id
+            new_report.revision_diff = json.dumps(build_revision_diff(revision_parent, text_snippet))
         db.session.add(new_report)
-        db.session.commit()
+        db.session.flush()
         report_id = new_report.id # DB가 생성한 UUID
+
+        if dedup_mode == "copy":
+            # 완료된 동일 제출의 결과를 복사 (LLM 호출 없음)
+            copy_analysis(source_report, new_report)
+        else:
+            if dedup_mode == "reuse_analysis":
+                # 요약/임베딩만 재사용, 비교/질문은 이 리포트 기준으로 새로 실행
+                reuse_analysis(source_report, new_report)
+            # [수정] 분석 파이프라인 작업을 리포트와 같은 커밋으로 등록 (작업 큐 워커가 실행)
+            job = enqueue_job(report_id, "pipeline")
+        db.session.commit()
     except Exception as e:
         db.session.rollback()
         print(f"Failed to create initial report entry: {e}")
         return jsonify({"error": "Failed to initialize report in database"}), 500
-    
-    thread = threading.Thread(
-        # [핵심 수정] 새 백그라운드 함수 이름을 타겟으로 지정합니다.
-        target=background_analysis_step1_analysis,
-        args=(
-            report_id, 
-            text, 
-            doc_type, 
-            original_filename,
-            JSON_SYSTEM_PROMPT,       # [신규] 5번째 인자
-            COMPARISON_SYSTEM_PROMPT  # [신규] 6번째 인자
-        )
-    )
-    thread.start()
-    
-    return jsonify({"reportId": report_id}), 202
 
+    response_body = {"reportId": report_id}
+    if dedup_mode:
+        print(f"[Dedup] {report_id} <- {source_report.id} ({dedup_mode})")
+        response_body.update({"deduplicated": True, "duplicate_of": source_report.id})
+    if job is None:
+        response_body["status"] = "completed"
+        return jsonify(response_body), 200
 
-@student_bp.route("/report/<report_id>", methods=["GET"])
-@jwt_required()
-def get_report(report_id):
-    user_id = get_jwt_identity()
-    report, error_response = get_report_or_404(report_id, user_id)
-    if error_response:
-        return error_response
+    # [신규] 대기열 순번과 예상 시작 시각 (워커가 모두 사용 중이면 queued=True)
+    try:
+        response_body.update(get_queue_position(job, current_app.config))
+    except Exception as e:
+        print(f"[{report_id}] Queue position lookup failed: {e}")
+    return jsonify(response_body), 202
+
+
+# --- [신규] GET /report 응답 섹션 (이름은 services/report_versioning.SECTION_COLUMNS와 동일) ---
+# 각 섹션은 자신이 쓰는 컬럼만 파싱하므로, ?fields= / ?since= 요청은 필요한 JSON 컬럼만 읽습니다.
+
+def _get_initial_questions_from_history(qa_hist_list):
+    """qa_history에서 초기 질문(parent_id=None, 미답변)만 추출"""
+    client_list = []
+    if not qa_hist_list: return []
+    for item in qa_hist_list: 
+        if item.get("parent_question_id") is None and item.get("answer") is None:
+            client_list.append({
+                "question_id": item.get("question_id"),
+                "question": item.get("question"),
+                "type": item.get("type")
+            })
+    return client_list
+
+
+def _section_similarity(report):
+    similarity_details_data = json.loads(report.similarity_details) if report.similarity_details else []
+    return {
+        "similarity_details": similarity_details_data,
+        # [신규] 빠른 미리보기(임베딩 Top-K) 결과인지 여부 - LLM 정밀 비교 완료 시 False
+        "similarity_provisional": _is_provisional(similarity_details_data)
+    }
+
+
+def _section_questions(report):
+    qa_history_list = load_history(report.id)
+    return {
+        "initialQuestions": _get_initial_questions_from_history(qa_history_list),
+        "questions_pool_count": count_pool(report.id),
+        "qa_history": qa_history_list,
+        "is_refilling": report.is_refilling
+    }
+
+
+REPORT_SECTIONS = {
+    "meta": lambda report: {
+        "report_title": report.report_title,
+        "assignment_id": report.assignment_id,
+        "user_rating": report.user_rating,
+        "is_test": report.is_test,
+        "analysis_tier": report.analysis_tier
+    },
+    "summary": lambda report: {"summary": json.loads(report.summary) if report.summary else {}},
+    "logicFlow": lambda report: {"logicFlow": json.loads(report.logic_flow) if report.logic_flow else {}},
+    "similarity": _section_similarity,
+    "text": lambda report: {"text_snippet": report.text_snippet},
+    "questions": _section_questions,
+    "advancement": lambda report: {"advancement_ideas": report.advancement_ideas},
+    # 채점 및 피드백 정보
+    "grading": lambda report: {
+        "ta_score_details": json.loads(report.ta_score_details) if report.ta_score_details else None,
+        "auto_score_details": json.loads(report.auto_score_details) if report.auto_score_details else None,
+        "ta_feedback": report.ta_feedback
+    },
+    # 수정본 정보 (원본 리포트 ID + 문단 변경 요약)
+    "revision": lambda report: {
+        "revision_of": report.revision_of,
+        "revision_diff": json.loads(report.revision_diff) if report.revision_diff else None
+    },
+}
+
+# 목록/폴링 요청 시 먼저 읽는 가벼운 컬럼 (무거운 JSON/본문 컬럼 제외)
+_REPORT_LIGHT_COLUMNS = ("id", "user_id", "status", "error_message", "version", "section_versions")
+
+
+def _build_report_sections(report, sections):
+    data = {}
+    for section in sections:
+        data.update(REPORT_SECTIONS[section](report))
+    return data
+
+
+def _get_report_sparse(report, fields, since):
+    """
+    [신규] ?fields=summary,questions : 지정한 섹션만 반환
+           ?since=<version>         : 해당 버전 이후 바뀐 섹션만 반환 (바뀐 것이 없으면 data={})
+    가벼운 컬럼으로 권한/버전을 먼저 확인하고, 반환할 섹션의 컬럼만 추가로 읽습니다.
+    """
+    requested = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(REPORT_SECTIONS)
+    unknown = [name for name in requested if name not in REPORT_SECTIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}", "available": list(REPORT_SECTIONS)}), 400
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({"error": "'since' must be an integer version"}), 400
+
+    sections = requested
+    if since is not None:
+        section_versions = load_section_versions(report)
+        sections = [] if report.version <= since else [
+            name for name in requested if section_versions.get(name, 0) > since
+        ]
+
+    columns = [column for name in sections for column in SECTION_COLUMNS[name] if column not in _REPORT_LIGHT_COLUMNS]
+    try:
+        if columns:
+            db.session.refresh(report, attribute_names=columns)
+        data = _build_report_sections(report, sections)
+    except json.JSONDecodeError as e:
+        print(f"[get_report:{report.id}] CRITICAL: JSONDecodeError: {e}")
+        return jsonify({"status": "error", "data": {"error": f"Failed to parse report data: {e}"}}), 500
 
+    body = {"status": report.status, "version": report.version, "changed": sections, "data": data}
+    if report.status == "error":
+        body["error"] = report.error_message
+    return jsonify(body)
+
+
+def _get_report_full(report):
     status = report.status
 
     if status in ["processing", "processing_analysis"]:
-        return jsonify({"status": status, "data": None})
+        return jsonify({"status": status, "version": report.version, "data": None})
         
     if status == "error":
-        return jsonify({"status": "error", "data": {"error": report.error_message}}), 500
+        return jsonify({"status": "error", "version": report.version, "data": {"error": report.error_message}}), 500
+
+    # [신규] 같은 버전의 조립된 응답이 캐시에 있으면 JSON 컬럼을 읽지 않고 그대로 반환
+    cached_body = get_report_view(report.id, report.version)
+    if cached_body is not None:
+        return current_app.response_class(cached_body, mimetype=current_app.json.mimetype)
+
+    # [신규] ETag 확인용으로 가벼운 컬럼만 읽었으므로, 나머지 컬럼을 한 번에 로드
+    # (그 사이 다른 쓰기가 커밋되었을 수 있으므로 캐시 키도 다시 읽은 version을 사용)
+    db.session.refresh(report)
+    status = report.status
         
     # 'completed' 또는 'processing_comparison', 'processing_questions'
-    
-    # --- [유지] ---
-    # DB의 JSON '문자열' 필드들을 파이썬 '객체'로 변환합니다.
-    # (주의: 필드가 비어있을 경우(None)를 대비해 기본값( {} 또는 [] )을 설정합니다.)
+    # [수정] DB의 JSON '문자열' 필드들을 섹션별로 파싱하여 응답 데이터를 조립합니다.
     try:
-        summary_data = json.loads(report.summary) if report.summary else {}
-        evaluation_data = json.loads(report.evaluation) if report.evaluation else {}
-        logic_flow_data = json.loads(report.logic_flow) if report.logic_flow else {}
-        # [수정] similarity_details_data는 이제 리스트입니다.
-        similarity_details_data = json.loads(report.similarity_details) if report.similarity_details else []
-        qa_history_list = json.loads(report.qa_history) if report.qa_history else []
-        questions_pool_list = json.loads(report.questions_pool) if report.questions_pool else []
-        ta_score_details_data = json.loads(report.ta_score_details) if report.ta_score_details else None
-        auto_score_details_data = json.loads(report.auto_score_details) if report.auto_score_details else None
-        high_similarity_candidates_data = json.loads(report.high_similarity_candidates) if report.high_similarity_candidates else []
-    
-    
+        # [수정] processing_comparison 상태일 때 summary와 빠른 미리보기(잠정 유사도)만 반환
+        if status == "processing_comparison":
+            data = _build_report_sections(report, ["summary", "text", "similarity", "revision"])
+            data.update({"is_test": report.is_test, "analysis_tier": report.analysis_tier})
+        else:
+            data = _build_report_sections(report, REPORT_SECTIONS)
     except json.JSONDecodeError as e:
         # JSON 파싱에 실패하면(데이터가 깨졌을 경우) 에러를 반환합니다.
-        print(f"[get_report:{report_id}] CRITICAL: JSONDecodeError: {e}")
+        print(f"[get_report:{report.id}] CRITICAL: JSONDecodeError: {e}")
         return jsonify({"status": "error", "data": {"error": f"Failed to parse report data: {e}"}}), 500
-    # --- [유지 완료] ---
-
-
-    # 헬퍼: qa_history에서 초기 질문(parent_id=None)만 추출
-    def _get_initial_questions_from_history(qa_hist_list): # <-- 인자 이름 변경 (리스트임을 명시)
-        client_list = []
-        if not qa_hist_list: return []
-        # 이제 qa_hist_list는 실제 '리스트'이므로 'item'은 '딕셔너리'입니다.
-        for item in qa_hist_list: 
-            if item.get("parent_question_id") is None and item.get("answer") is None:
-                client_list.append({
-                    "question_id": item.get("question_id"),
-                    "question": item.get("question"),
-                    "type": item.get("type")
-                })
-        return client_list
-
-    # 
-    # 클라이언트에게 전달할 'data' 페이로드를 조립합니다.
-    # report.* (문자열) 대신 파싱된 객체 변수(summary_data 등)를 사용합니다.
-    data = {
-        "report_title": report.report_title,
-        "assignment_id": report.assignment_id,
-        "user_rating": report.user_rating,
 
-        "summary": summary_data,
-        "logicFlow": logic_flow_data,
-        "similarity_details": similarity_details_data, # (이제 리스트)
-        "text_snippet": report.text_snippet, 
-        "is_test": report.is_test, # [신규] is_test 상태도 전달
-        
-        "initialQuestions": _get_initial_questions_from_history(qa_history_list), # <-- 파싱된 리스트 전달
-        "questions_pool_count": len(questions_pool_list), # <-- 파싱된 리스트의 길이
-        "qa_history": qa_history_list, # <-- 파싱된 리스트 전달
-        
-        "is_refilling": report.is_refilling,
-        "advancement_ideas" : report.advancement_ideas,
+    # status와 함께 최종 데이터를 반환합니다. (completed, processing_questions, processing_comparison)
+    body = current_app.json.dumps({"status": status, "version": report.version, "data": data}) + "\n"
+    put_report_view(report.id, report.version, body)
+    return current_app.response_class(body, mimetype=current_app.json.mimetype)
 
-        # [신규] 채점 및 피드백 정보
-        "ta_score_details": ta_score_details_data,
-        "auto_score_details": auto_score_details_data,
-        "ta_feedback": report.ta_feedback
 
+@student_bp.route("/report/<report_id>", methods=["GET"])
+@jwt_required()
+def get_report(report_id):
+    user_id = get_jwt_identity()
+
+    # [신규] 가벼운 컬럼(권한/버전)만 먼저 읽고, If-None-Match가 일치하면 JSON 컬럼을 읽기 전에 304 반환
+    report, error_response = get_report_or_404(report_id, user_id, columns=_REPORT_LIGHT_COLUMNS)
+    if error_response:
+        return error_response
+    etag = report_etag("report", report.id, report.version, request.query_string)
+    not_modified = not_modified_response(etag)
+    if not_modified:
+        return not_modified
+
+    # [신규] 부분 조회 / 델타 조회
+    fields, since = request.args.get("fields"), request.args.get("since")
+    if fields is not None or since is not None:
+        return with_etag(_get_report_sparse(report, fields, since), etag)
+    response = _get_report_full(report)
+    # (전체 컬럼을 다시 읽는 사이 새 버전이 커밋되었을 수 있으므로, 본문과 같은 version으로 ETag 생성)
+    return with_etag(response, report_etag("report", report.id, report.version, request.query_string))
+
+
+def _stream_token_serializer():
+    """[수정] SSE 스트림 전용 토큰 (리포트 1개 + 사용자, SSE_TOKEN_SECONDS 동안 유효, 다른 API에는 사용 불가)"""
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt="report-events")
+
+
+@student_bp.route("/report/<report_id>/events/token", methods=["POST"])
+@jwt_required()
+def issue_report_events_token(report_id):
+    """
+    [수정] POST /api/student/report/<report_id>/events/token
+    EventSource는 헤더를 보낼 수 없으므로, 접근 토큰 대신 이 리포트의 스트림에만 쓸 수 있는 짧은 토큰을 발급합니다.
+    (스트림 연결이 토큰 만료 후 401로 끊기면 새 토큰으로 다시 연결)
+    """
+    if not current_app.config.get('SSE_ENABLED', False):
+        return "", 204
+    user_id = get_jwt_identity()
+    report, error_response = get_report_or_404(report_id, user_id, columns=_REPORT_LIGHT_COLUMNS)
+    if error_response:
+        return error_response
+    token = _stream_token_serializer().dumps({"report_id": report.id, "user_id": str(user_id)})
+    return jsonify({"token": token, "expires_in": current_app.config.get('SSE_TOKEN_SECONDS', 300)}), 200
 
-    }
-    
-    # [수정] processing_comparison 상태일 때 summary만 반환
-    if status == "processing_comparison":
-        return jsonify({
-            "status": status,
-            "data": {
-                "summary": summary_data,
-                "is_test": report.is_test,
-                "text_snippet": report.text_snippet
-            }
-        })
 
-    # status와 함께 최종 데이터를 반환합니다. (completed, processing_questions)
-    return jsonify({"status": status, "data": data})
+@student_bp.route("/report/<report_id>/events", methods=["GET"])
+def stream_report_events(report_id):
+    """
+    [신규] GET /api/student/report/<report_id>/events?token=<스트림 토큰> (Server-Sent Events)
+    상태 변경과 부분 결과(summary, candidates, comparisons, questions, deep_analysis)를 커밋되는 즉시 전달합니다.
+    - [수정] SSE_ENABLED가 꺼져 있으면 204 (비동기 워커로 서비스할 때만 사용, config 참고)
+    - [수정] 인증은 POST .../events/token으로 받은 스트림 토큰으로만 (접근 토큰을 쿼리 문자열로 받지 않음)
+    - [수정] 이벤트 id = 리포트 version. 스트림은 SSE_STREAM_SECONDS 후 종료되며, 브라우저가 Last-Event-ID로 재연결하면
+      이 프로세스가 보관한 이후 이벤트를 재전송하고, 그래도 DB version보다 뒤처졌으면 'sync' 이벤트로 알림
+      (클라이언트는 GET /report?since=<since>로 바뀐 섹션만 조회)
+    - 다른 프로세스의 워커가 처리 중인 경우를 대비해, 유휴 시에는 status/version 컬럼만 재조회
+    """
+    if not current_app.config.get('SSE_ENABLED', False):
+        return "", 204
+
+    try:
+        claims = _stream_token_serializer().loads(
+            request.args.get("token", ""), max_age=current_app.config.get('SSE_TOKEN_SECONDS', 300)
+        )
+    except BadData:
+        return jsonify({"error": "Invalid or expired stream token"}), 401
+    if claims.get("report_id") != report_id:
+        return jsonify({"error": "Stream token is not valid for this report"}), 403
+    report, error_response = get_report_or_404(report_id, claims.get("user_id"), columns=_REPORT_LIGHT_COLUMNS)
+    if error_response:
+        return error_response
+
+    try:
+        last_event_id = int(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    except (TypeError, ValueError):
+        last_event_id = None
+
+    app = current_app._get_current_object()
+    stream_seconds = app.config.get('SSE_STREAM_SECONDS', 25)
+    heartbeat_seconds = app.config.get('SSE_HEARTBEAT_SECONDS', 10)
+    # (스냅샷 전에 구독하여 그 사이 발행된 이벤트를 놓치지 않음)
+    subscriber, backlog = subscribe(report_id, last_event_id)
+    db.session.expire(report)
+    last_status, current_version = report.status, report.version or 0
+
+    def generate():
+        nonlocal last_status
+        # sent_version: 클라이언트에 전달된 마지막 이벤트 version
+        # covered_version: 기준점/sync로 알린 version (이 version 이하 이벤트는 클라이언트가 GET /report로 반영)
+        # (한 트랜잭션의 이벤트 여러 개는 같은 id를 가지므로, 개별 이벤트는 sent_version과 같아도 전달)
+        sent_version = covered_version = last_event_id
+
+        def sync_if_behind(version, status):
+            nonlocal sent_version, covered_version
+            if sent_version is not None and version > sent_version:
+                event = format_sse("sync", {"version": version, "since": sent_version, "status": status}, version)
+                sent_version = covered_version = version
+                return event
+            return None
+
+        try:
+            yield "retry: 1000\n\n"
+            if last_event_id is None:
+                # 첫 연결: 현재 version을 기준점으로 (클라이언트 스냅샷이 이보다 오래되었으면 GET /report로 갱신)
+                yield format_sse("status", {"status": last_status, "version": current_version}, current_version)
+                sent_version = covered_version = current_version
+            else:
+                yield format_sse("status", {"status": last_status})
+                for event_id, event_name, data in backlog:
+                    if event_id > current_version:
+                        break
+                    sent_version = covered_version = max(sent_version, event_id)
+                    yield format_sse(event_name, data, event_id)
+                # 다른 프로세스에서 커밋되었거나 보관 기간이 지난 변경은 sync로 보충
+                event = sync_if_behind(current_version, last_status)
+                if event:
+                    yield event
+
+            deadline = time() + stream_seconds
+            while True:
+                remaining = deadline - time()
+                if remaining <= 0:
+                    break
+                try:
+                    event_id, event_name, data = subscriber.get(timeout=min(heartbeat_seconds, remaining))
+                except queue.Empty:
+                    with app.app_context():
+                        row = (
+                            db.session.query(AnalysisReport.status, AnalysisReport.version)
+                            .filter_by(id=report_id)
+                            .first()
+                        )
+                    if row is None:
+                        break
+                    current_status, version = row
+                    event = sync_if_behind(version or 0, current_status)
+                    if event:
+                        last_status = current_status
+                        yield event
+                    elif current_status and current_status != last_status:
+                        last_status = current_status
+                        yield format_sse("status", {"status": current_status})
+                    else:
+                        yield ": keep-alive\n\n"
+                    continue
+                if event_id is not None:
+                    if covered_version is not None and event_id <= covered_version:
+                        continue # (기준점/sync 또는 재전송으로 이미 반영된 version)
+                    sent_version = max(sent_version or 0, event_id)
+                if event_name == "status":
+                    last_status = data.get("status")
+                yield format_sse(event_name, data, event_id)
+        finally:
+            unsubscribe(report_id, subscriber)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no" # (프록시 버퍼링 방지)
+    })
+
+
+@student_bp.route("/report/<report_id>/resume", methods=["POST"])
+@jwt_required()
+def resume_report(report_id):
+    """
+    [신규] POST /api/student/report/<report_id>/resume
+    실패('error')하거나 중단된 리포트를 저장된 단계 결과 기준으로 첫 누락 단계부터 재개합니다.
+    (요약/임베딩이 이미 있으면 1단계 LLM 분석을 다시 하지 않음)
+    """
+    from app import resume_analysis_report
+    user_id = get_jwt_identity()
+    report, error_response = get_report_or_404(report_id, user_id)
+    if error_response:
+        return error_response
+
+    resumed, detail = resume_analysis_report(report_id)
+    if not resumed:
+        messages = {
+            "already_running": "Analysis is already in progress.",
+            "already_completed": "Report is already completed.",
+        }
+        return jsonify({"error": messages.get(detail, detail), "reason": detail}), 409
+
+    return jsonify({"reportId": report_id, "resume_from": detail}), 202
+
 
 @student_bp.route("/report/<report_id>/question/next", methods=["POST"])
 @jwt_required()
 def get_next_question(report_id):
     """
     POST /api/student/report/<report_id>/question/next
-    [DB]의 questions_pool에서 질문을 하나 꺼내고, qa_history에 추가합니다.
+    [DB]의 질문 풀(question_pool_items)에서 질문을 하나 꺼내고, 질문/답변 기록(qa_turns)에 추가합니다.
     """
-    from app import background_refill
     user_id = get_jwt_identity()
     report, error_response = get_report_or_404(report_id, user_id)
     if error_response:
         return error_response
 
-    # --- [수정] JSON 파싱 추가 ---
-    try:
-        pool = json.loads(report.questions_pool) if report.questions_pool else []
-        current_history = json.loads(report.qa_history) if report.qa_history else []
-    except json.JSONDecodeError:
-        return jsonify({"error": "Corrupted questions_pool or qa_history data in database"}), 500
-    # --- [수정 완료] ---
-    
-    is_refilling = report.is_refilling
+    # 1. [수정] 풀에서 질문 뽑기 (DELETE ... RETURNING - 여러 탭이 동시에 요청해도 같은 질문을 두 번 꺼내지 않음)
+    next_question = pop_question(report_id)
 
-    if not pool:
-        if is_refilling:
+    if next_question is None:
+        # [수정] 리필 잠금은 원자적 UPDATE로 획득한 요청만 리필 작업을 등록
+        if not try_acquire_refill_lock(report_id):
+            db.session.rollback()
             return jsonify({"error": "No questions available, refill in progress. Please wait."}), 503
-        else:
-            print(f"[{report_id}] Pool is empty. Triggering emergency refill.")
-            report.is_refilling = True
-            db.session.commit() # 잠금 상태 즉시 저장
-            
-            refill_thread = threading.Thread(target=background_refill, args=(report_id,))
-            refill_thread.start()
-            return jsonify({"error": "No questions available, starting refill. Please wait."}), 503
-
-    # 1. 풀에서 질문 뽑기
-    next_question = pool.pop(0)
-    report.questions_pool = json.dumps(pool) # [DB UPDATE] 변경된 풀을 JSON 문자열로 저장
+        print(f"[{report_id}] Pool is empty. Triggering emergency refill.")
+        # [수정] 리필 작업 등록 (잠금 상태와 같은 커밋, 재시도 없음)
+        enqueue_job(report_id, "refill", max_attempts=1)
+        db.session.commit() # 잠금 상태 즉시 저장
+        return jsonify({"error": "No questions available, starting refill. Please wait."}), 503
     
-    # 2. 리필 트리거 확인
-    if len(pool) <= 2 and not is_refilling:
-        print(f"[{report_id}] Pool size ({len(pool)}) <= 2. Triggering background refill.")
-        report.is_refilling = True # [DB UPDATE] 잠금
-        refill_thread = threading.Thread(target=background_refill, args=(report_id,))
-        refill_thread.start()
-
-    # 3. qa_history에 새 질문 추가
-    # current_history는 이미 리스트(JSON 파싱됨)
-    question_id = str(uuid.uuid4())
-    
-    history_entry = {
-        "question_id": question_id, 
-        "question": next_question.get("question", "Failed to parse question"),
-        "type": next_question.get("type", "unknown"),
-        "answer": None, 
-        "parent_question_id": None
-    }
-    current_history.append(history_entry)
-    report.qa_history = json.dumps(current_history) # [DB UPDATE] 변경된 히스토리를 JSON 문자열로 저장
+    # 2. 리필 트리거 확인 ([수정] LOW watermark 미만이면 미리 리필 - 주기 점검과 같은 기준)
+    remaining = count_pool(report_id)
+    low_watermark = current_app.config.get('QUESTION_POOL_LOW_WATERMARK', 4)
+    if remaining < low_watermark and try_acquire_refill_lock(report_id):
+        print(f"[{report_id}] Pool size ({remaining}) < {low_watermark}. Triggering background refill.")
+        enqueue_job(report_id, "refill", max_attempts=1) # (아래 4단계 커밋과 함께 등록)
+
+    # 3. [수정] 질문/답변 기록(qa_turns)에 새 질문 행 추가
+    history_entry = append_turn(
+        report_id,
+        next_question.get("question", "Failed to parse question"),
+        next_question.get("type", "unknown")
+    )
 
     # 4. DB 커밋
     db.session.commit()
 
     # 5. 클라이언트 응답
     client_response = {
-        "question_id": question_id, 
+        "question_id": history_entry["question_id"], 
         "question": history_entry["question"],
         "type": history_entry["type"]
     }
@@ -330,7 +641,7 @@ def get_next_question(report_id):
 def submit_answer(report_id):
     """
     POST /api/student/report/<report_id>/answer
-    [DB]의 qa_history에서 해당 question_id를 찾아 'answer'를 업데이트합니다.
+    [DB]의 질문/답변 기록(qa_turns)에서 해당 question_id 행의 'answer'를 업데이트합니다.
     """
     user_id = get_jwt_identity()
     report, error_response = get_report_or_404(report_id, user_id)
@@ -344,76 +655,105 @@ def submit_answer(report_id):
     if not question_id or user_answer is None: 
         return jsonify({"error": "Missing question_id or user_answer"}), 400
 
-    # --- [수정] JSON 파싱 추가 (오류 해결) ---
-    current_history_str = report.qa_history if report.qa_history else "[]"
-    try:
-        current_history = json.loads(current_history_str)
-    except json.JSONDecodeError:
-        return jsonify({"error": "Corrupted qa_history data in database"}), 500
-    # --- [수정 완료] ---
-    
-    history_updated = False
-    
-    # (주의) JSON 객체 내부를 수정하려면, 리스트 전체를 다시 할당해야 할 수 있음
-    for item in reversed(current_history): 
-        # item은 이제 딕셔너리이므로 .get() 사용 가능 (오류 해결)
-        if item.get("question_id") == question_id and item.get("answer") is None:
-            item["answer"] = user_answer 
-            history_updated = True
-            break
-    
-    if not history_updated:
+    # [수정] 해당 질문 행만 갱신 (미답변인 경우에만 - 동시 요청/심화 질문 스레드와 충돌 없음)
+    if not save_answer(report_id, question_id, user_answer):
+        db.session.rollback()
         print(f"[{report_id}] CRITICAL: submit_answer couldn't find matching question_id: {question_id}")
         return jsonify({"error": f"Failed to save answer. Question ID {question_id} not found or already answered."}), 404
         
-    report.qa_history = json.dumps(current_history) # [DB UPDATE] 변경된 히스토리 전체를 JSON 문자열로 다시 할당
     db.session.commit()
             
     print(f"[{report_id}] Answer saved successfully for {question_id}.")
+
+    # [신규] 추측 생성 모드: 학생이 요청하기 전에 이 질문의 심화 질문을 미리 생성
+    if current_app.config.get('SPECULATIVE_DEEP_DIVE') and begin_speculation(report_id, question_id):
+        thread = threading.Thread(
+            target=_background_speculative_deep_dive,
+            args=(current_app._get_current_object(), report_id, question_id)
+        )
+        thread.daemon = True
+        thread.start()
+
     return jsonify({"status": "success", "message": "Answer saved successfully"})
 
-def _background_generate_deep_dive(app_context, report_id, parent_question_id):
-    """[수정] 백그라운드에서 심화 질문을 생성하고 (동시성 문제 해결) DB에 저장"""
-    
+def _commit_conversation_summary(report_id):
+    """[신규] build_conversation_context가 세션에 추가한 누적 요약 캐시를 저장 (느린 AI 호출 전)"""
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 다른 스레드가 먼저 같은 맥락의 요약 행을 만든 경우: 이번 요약은 이 호출에서만 사용
+        db.session.rollback()
+        print(f"[{report_id}] Conversation summary not cached (concurrent update).")
+
+def _background_speculative_deep_dive(app_context, report_id, parent_question_id):
+    """
+    [신규] 답변 직후 심화 질문 추측 생성 (실패/중단 시에도 생성 중 표시를 해제)
+    [수정] 생성 중에 학생이 요청(채택)했는데 공개된 질문이 없으면(LLM 실패 등) 일반 경로로 생성
+    (채택 시 요청은 202로 끝났으므로, 여기서 다시 생성하지 않으면 클라이언트가 끝없이 폴링)
+    """
+    try:
+        _background_generate_deep_dive(app_context, report_id, parent_question_id, speculative=True)
+    finally:
+        if abandon_speculation(report_id, parent_question_id):
+            with app_context.app_context():
+                published = has_published_deep_dive(report_id, parent_question_id)
+                db.session.rollback()
+            if not published:
+                print(f"[{report_id}] Adopted speculative deep-dive produced no question. Falling back to normal generation.")
+                _background_generate_deep_dive(app_context, report_id, parent_question_id)
+
+def _background_generate_deep_dive(app_context, report_id, parent_question_id, speculative=False):
+    """
+    [수정] 백그라운드에서 심화 질문을 생성하고 (동시성 문제 해결) DB에 저장
+    - [신규] speculative=True: 기록에 보이지 않는 추측 질문으로 저장 (생성 중 요청이 들어왔으면 바로 공개)
+    - [수정] 일반 경로(추측 생성 모드 켜짐)는 LLM 호출 전과 저장 직전에 추측 질문을 다시 공개 시도
+      (요청 처리 중 추측 생성이 끝났거나 다른 프로세스에서 생성된 경우, 중복 호출/중복 질문 없이 그 질문을 사용)
+    """
+    speculation_enabled = not speculative and app_context.config.get('SPECULATIVE_DEEP_DIVE')
+    speculative_ttl = app_context.config.get('SPECULATIVE_DEEP_DIVE_TTL', 1800)
+
+    def promote_if_ready():
+        if not speculation_enabled:
+            return None
+        promoted = promote_speculative_turn(report_id, parent_question_id, speculative_ttl)
+        if promoted:
+            db.session.commit()
+            print(f"[{report_id}] Speculative deep-dive HIT (late). Question {promoted['question_id']} published.")
+        else:
+            db.session.rollback()
+        return promoted
+
     # --- [1. Read Phase] ---
     # AI 호출에 필요한 데이터를 DB에서 미리 읽습니다.
     conversation_history_list = []
+    earlier_summary = ""
     summary_data_dict = {}
 
     with app_context.app_context():
         print(f"[{report_id}] Deep-dive generation task starting for parent: {parent_question_id}")
+        if promote_if_ready():
+            return
         report = db.session.get(AnalysisReport, report_id)
         if not report:
             print(f"[{report_id}] Deep-dive task ABORT: Report not found.")
             return
         
         try:
-            qa_history_str = report.qa_history if report.qa_history else "[]"
-            qa_history = json.loads(qa_history_str)
             summary_data_dict = json.loads(report.summary) if report.summary else {}
         except json.JSONDecodeError as e:
             print(f"[{report_id}] Deep-dive task ABORT: Failed to parse initial JSON data: {e}")
             return
 
-        history_map = {item['question_id']: item for item in qa_history}
-        current_id = parent_question_id
-
-        while current_id is not None:
-            if current_id not in history_map:
-                print(f"[{report_id}] CRITICAL: History chain broken. ID {current_id} not found.")
-                break
-            
-            parent_qa = history_map[current_id]
-            
-            if parent_qa.get("answer") is None:
-                print(f"[{report_id}] Deep-dive task WARN: Parent answer not found (yet?).")
-                break # (안전하게 중단)
-
-            conversation_history_list.insert(0, {
-                "question": parent_qa.get("question"),
-                "answer": parent_qa.get("answer")
-            })
-            current_id = parent_qa.get("parent_question_id")
+        # [수정] 부모 질문을 인덱스로 따라 올라가며 대화 맥락 구성 (기록 전체를 읽지 않음)
+        conversation_history_list = conversation_chain(report_id, parent_question_id)
+        # [신규] 최근 대화만 원문, 오래된 대화는 누적 요약으로 (토큰 예산 유지)
+        # [수정] 요약 캐시는 이 체인(첫 질문 ID) 기준 - 다른 질문 체인의 대화를 섞지 않음
+        if conversation_history_list:
+            earlier_summary, conversation_history_list = build_conversation_context(
+                report_id, conversation_history_list, app_context.config,
+                context_key=conversation_history_list[0]["question_id"]
+            )
+            _commit_conversation_summary(report_id)
     
     if not conversation_history_list:
             print(f"[{report_id}] Deep-dive task ABORT: Could not reconstruct history or parent not answered.")
@@ -424,7 +764,8 @@ def _background_generate_deep_dive(app_context, report_id, parent_question_id):
     try:
         deep_dive_question_text = generate_deep_dive_question(
             conversation_history_list,
-            summary_data_dict
+            summary_data_dict,
+            earlier_summary
         )
     except Exception as e_ai:
         print(f"[{report_id}] Deep-dive AI call FAILED: {e_ai}")
@@ -435,36 +776,27 @@ def _background_generate_deep_dive(app_context, report_id, parent_question_id):
         return
 
     # --- [3. Write Phase] ---
-    # (새 앱 컨텍스트를 열고, DB에서 최신 데이터를 다시 읽어서 쓰기)
+    # (새 앱 컨텍스트를 열고 새 질문 행만 추가 - 그 사이 저장된 답변을 덮어쓰지 않음)
     with app_context.app_context():
         try:
-            # 1. [RE-READ] DB에서 최신 리포트 정보를 다시 가져옵니다.
-            # (다른 스레드가 qa_history를 변경했을 수 있으므로)
             report_fresh = db.session.get(AnalysisReport, report_id)
             if not report_fresh:
                 print(f"[{report_id}] Deep-dive task FAILED: Report gone after AI call.")
                 return
 
-            # 2. 최신 qa_history를 파싱합니다.
-            latest_qa_history_str = report_fresh.qa_history if report_fresh.qa_history else "[]"
-            latest_qa_history = json.loads(latest_qa_history_str)
-
-            # 3. [MODIFY] 생성된 새 질문을 *최신* 히스토리에 추가합니다.
-            new_question_id = str(uuid.uuid4())
-            history_entry = {
-                "question_id": new_question_id,
-                "question": deep_dive_question_text,
-                "type": "deep_dive",
-                "answer": None,
-                "parent_question_id": parent_question_id
-            }
-            latest_qa_history.append(history_entry)
-
-            # 4. [WRITE] DB에 저장합니다.
-            report_fresh.qa_history = json.dumps(latest_qa_history)
+            if speculative:
+                history_entry = finish_speculation(report_id, parent_question_id, deep_dive_question_text)
+                if history_entry is None:
+                    print(f"[{report_id}] Speculative deep-dive discarded: parent {parent_question_id} already has one.")
+                    return
+            else:
+                if promote_if_ready():
+                    print(f"[{report_id}] Deep-dive result discarded: speculative question was published instead.")
+                    return
+                history_entry = append_turn(report_id, deep_dive_question_text, "deep_dive", parent_question_id)
             db.session.commit()
             
-            print(f"[{report_id}] Deep-dive task SUCCESS. New question {new_question_id} saved.")
+            print(f"[{report_id}] Deep-dive task SUCCESS. New question {history_entry['question_id']} saved.")
 
         except Exception as e_write:
             print(f"[Deep-dive Task] CRITICAL: Report {report_id} 최종 쓰기 중 오류: {e_write}")
@@ -488,8 +820,24 @@ def post_deep_dive_question(report_id):
     if not parent_question_id:
         return jsonify({"error": "Missing parent_question_id to deep-dive from"}), 400
 
-    # (선택적: 이미 생성 중인지 확인하는 플래그를 DB에 추가할 수 있음)
-    # (예: if report.is_generating_deep_dive: return 409)
+    # [신규] 추측 생성 모드: 미리 생성된 질문이 있으면 공개 후 즉시 반환, 생성 중이면 그 결과를 채택
+    if current_app.config.get('SPECULATIVE_DEEP_DIVE'):
+        promoted = promote_speculative_turn(
+            report_id, parent_question_id, current_app.config.get('SPECULATIVE_DEEP_DIVE_TTL', 1800)
+        )
+        if promoted:
+            db.session.commit()
+            print(f"[{report_id}] Speculative deep-dive HIT. Question {promoted['question_id']} published.")
+            return jsonify({
+                "message": "Deep-dive question ready.",
+                "question": promoted
+            }), 200
+        db.session.rollback()
+        if adopt_in_flight(report_id, parent_question_id):
+            print(f"[{report_id}] Speculative deep-dive in flight for {parent_question_id}. Adopted.")
+            return jsonify({
+                "message": "Deep-dive question generation started. Please poll the report status."
+            }), 202
 
     # --- [수정] ---
     # 1. 백그라운드 작업 시작
@@ -527,13 +875,18 @@ def _background_generate_advancement(app_context, report_id):
 
             # --- [느린 작업] ---
             summary_dict = json.loads(report.summary)
-            qa_history_list = json.loads(report.qa_history)
             snippet = report.text_snippet
+            # [수정] 최근 대화만 원문, 오래된 대화는 누적 요약으로 (토큰 예산 유지)
+            earlier_summary, qa_history_list = build_conversation_context(
+                report_id, load_history(report_id), app_context.config
+            )
+            _commit_conversation_summary(report_id)
 
             ideas_json = generate_advancement_ideas(
                 summary_dict,
                 snippet,
-                qa_history_list
+                qa_history_list,
+                earlier_summary
             )
             # --------------------
 
@@ -727,9 +1080,19 @@ def get_flow_graph(report_id):
     Plotly 그래프 PNG 이미지로 반환합니다.
     """
     user_id = get_jwt_identity()
-    report, error_response = get_report_or_404(report_id, user_id)
+    # [신규] 그래프는 summary가 바뀔 때만 달라지므로 version 기반 ETag로 재생성 생략 (304)
+    report, error_response = get_report_or_404(report_id, user_id, columns=_REPORT_LIGHT_COLUMNS)
     if error_response:
         return error_response
+    etag = report_etag("flow-graph", report.id, report.version)
+    not_modified = not_modified_response(etag)
+    if not_modified:
+        return not_modified
+    return with_etag(_render_flow_graph(report), etag)
+
+
+def _render_flow_graph(report):
+    report_id = report.id
 
     # 1. 완료/에러 상태 확인 ( ...이전 코드 동일... )
     completed_states = ["processing_comparison", "processing_questions", "processing_advancement", "completed"]
@@ -830,10 +1193,12 @@ def debug_font():
 # [내부 함수] 백그라운드에서 실행될 실제 분석 로직
 # ----------------------------------------------------------------
 
-def _background_deep_analysis(app, report_id):
+def _background_deep_analysis(app, report_id, run_id=None):
     """
     별도 스레드에서 실행.
     독립적인 DB 세션을 사용하여 충돌을 방지함.
+    [신규] run_id: 이 실행의 ID. 그 사이 새 실행(force 등)이 시작되어 deep_analysis_data의 run_id가 바뀌었으면
+    이 실행의 결과는 저장하지 않음
     """
     # Thread-local DB Session 생성 (가장 중요!)
     # 기존 db.session 대신 이 세션을 사용해야 스레드 간 간섭이 없음
@@ -854,13 +1219,36 @@ def _background_deep_analysis(app, report_id):
             local_session.remove()
             return
 
+        # [신규] 요청 시 기록한 실행 정보(content_hash, run_id, started_at) 유지
+        run_info = {}
+        if run_id:
+            current = _load_deep_analysis_data(report.deep_analysis_data)
+            if current.get("run_id") != run_id:
+                print(f"⏭️ [Background] Report #{report_id} 실행 {run_id}는 새 실행으로 대체됨. 중단.")
+                local_session.remove()
+                return
+            run_info = {key: current.get(key) for key in ("content_hash", "run_id", "started_at")}
+
+        # [신규] 수정본이면 원본의 심층 분석 결과를 기준으로 바뀐 문단만 재분석
+        revision = None
+        if report.revision_of:
+            revision = build_revision_context(report, local_session.get(AnalysisReport, report.revision_of))
+
         initial_data = {
             "status": "processing",
             "neuron_map": None,
             "integrity_issues": None,
-            "flow_disconnects": None
+            "flow_disconnects": None,
+            **run_info
         }
+        if revision:
+            initial_data["revision"] = {
+                "parent_id": revision["parent_id"],
+                "changed_paragraphs": len(revision["changed_paragraphs"]),
+                "unchanged_paragraphs": len(revision["unchanged_paragraphs"])
+            }
         report.deep_analysis_data = json.dumps(initial_data)
+        queue_event(report_id, "deep_analysis_status", {"status": "processing"}, session=local_session)
         local_session.commit()
 
         # 2. 데이터 준비 (객체가 Detach 되는 것을 방지하기 위해 데이터 미리 추출)
@@ -889,8 +1277,12 @@ def _background_deep_analysis(app, report_id):
                         return
                     
                     current_json = json.loads(repo.deep_analysis_data)
+                    if run_id and current_json.get("run_id") != run_id:
+                        return # (새 실행으로 대체됨)
                     current_json[key] = data
                     repo.deep_analysis_data = json.dumps(current_json, ensure_ascii=False)
+                    # [신규] SSE 구독자에게 심층 분석 부분 결과 전달 (커밋 후 발행)
+                    queue_event(report_id, "deep_analysis", {"part": key, "data": data}, session=callback_session)
                     
                     callback_session.commit()
                     print(f"💾 [DB] Report #{report_id} - '{key}' 부분 저장 완료.")
@@ -902,17 +1294,18 @@ def _background_deep_analysis(app, report_id):
 
         # 3. 병렬 서비스 호출 (콜백 전달)
         # 이 함수는 DB와 무관하게 CPU/API 작업만 수행해야 함
-        perform_deep_analysis_async(summary_json, raw_text, on_task_complete=save_partial_result)
+        perform_deep_analysis_async(summary_json, raw_text, on_task_complete=save_partial_result, revision=revision)
 
         # 4. 최종 완료 상태 업데이트
         final_session = scoped_session(Session)
         try:
             with db_lock:
                 repo = final_session.get(AnalysisReport, report_id)
-                if repo:
-                    current_json = json.loads(repo.deep_analysis_data)
+                current_json = _load_deep_analysis_data(repo.deep_analysis_data) if repo else {}
+                if repo and (not run_id or current_json.get("run_id") == run_id):
                     current_json["status"] = "completed"
                     repo.deep_analysis_data = json.dumps(current_json, ensure_ascii=False)
+                    queue_event(report_id, "deep_analysis_status", {"status": "completed"}, session=final_session)
                     final_session.commit()
                     print(f"✅ [Background] Report #{report_id} 모든 작업 완료.")
         finally:
@@ -926,8 +1319,9 @@ def _background_deep_analysis(app, report_id):
         error_session = scoped_session(Session)
         try:
             repo = error_session.get(AnalysisReport, report_id)
-            if repo:
-                repo.deep_analysis_data = json.dumps({"status": "error", "message": str(e)})
+            if repo and (not run_id or _load_deep_analysis_data(repo.deep_analysis_data).get("run_id") == run_id):
+                repo.deep_analysis_data = json.dumps({"status": "error", "message": str(e), "run_id": run_id})
+                queue_event(report_id, "deep_analysis_status", {"status": "error", "message": str(e)}, session=error_session)
                 error_session.commit()
         finally:
             error_session.remove()
@@ -936,14 +1330,62 @@ def _background_deep_analysis(app, report_id):
 # ----------------------------------------------------------------
 @student_bp.route('/reports/<report_id>/deep-analysis', methods=['POST'])
 def run_deep_analysis(report_id):
+    """
+    [수정] 심층 분석은 hash(요약, 본문, 프롬프트 버전, 수정본이면 원본 분석 기준)로 식별
+    - 같은 키의 완료 결과가 있으면 다시 분석하지 않고 바로 반환 (force=true면 새로 분석)
+    - 같은 키로 진행 중인 실행이 있으면 새 스레드를 띄우지 않고 그 실행에 연결 (202, GET/SSE로 결과 확인)
+    """
     try:
         report = AnalysisReport.query.get_or_404(report_id)
         if not report.summary:
             return jsonify({"status": "error", "message": "1단계 분석 필요"}), 400
 
+        body = request.get_json(silent=True) or {}
+        force = str(request.args.get("force", body.get("force", "false"))).lower() == 'true'
+
+        try:
+            summary_json = json.loads(report.summary) if isinstance(report.summary, str) else report.summary
+        except:
+            summary_json = report.summary
+        # [수정] 수정본이면 원본 심층 분석 기준도 키에 포함 (원본 분석이 바뀌면 다시 분석)
+        parent = db.session.get(AnalysisReport, report.revision_of) if report.revision_of else None
+        content_hash = deep_analysis_key(summary_json, str(report.text_snippet), revision_basis(parent))
+
+        current_text = report.deep_analysis_data
+        current = _load_deep_analysis_data(current_text)
+        if current.get("content_hash") == content_hash:
+            if current.get("status") == "completed" and not force and _deep_analysis_reusable(current):
+                print(f"♻️ [Deep Analysis] Report #{report_id} 완료된 결과 재사용.")
+                return jsonify({"status": "completed", "cached": True, "data": current, "report_id": report_id}), 200
+            if current.get("status") == "processing" and not _deep_analysis_stale(current):
+                return _deep_analysis_attached(report_id)
+
+        # 실행 선점: 읽은 상태 그대로일 때만 '진행 중'으로 바꿈 (동시 요청 중 1개만 스레드 시작)
+        run_id = str(uuid.uuid4())
+        claimed = db.session.execute(
+            update(AnalysisReport)
+            .where(
+                AnalysisReport.id == report_id,
+                AnalysisReport.deep_analysis_data.is_(None) if current_text is None
+                else AnalysisReport.deep_analysis_data == current_text
+            )
+            .values(deep_analysis_data=json.dumps({
+                "status": "processing",
+                "content_hash": content_hash,
+                "run_id": run_id,
+                "started_at": time()
+            }))
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        if not claimed:
+            db.session.rollback()
+            return _deep_analysis_attached(report_id)
+        bump_report_sections(db.session, report_id, ("deep_analysis",))
+        db.session.commit()
+
         # 비동기 스레드 실행
         app = current_app._get_current_object()
-        thread = threading.Thread(target=_background_deep_analysis, args=(app, report_id))
+        thread = threading.Thread(target=_background_deep_analysis, args=(app, report_id, run_id))
         thread.daemon = True
         thread.start()
 
@@ -957,26 +1399,69 @@ def run_deep_analysis(report_id):
         print(f"❌ [API Error] {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+
+def _load_deep_analysis_data(deep_analysis_data):
+    try:
+        data = json.loads(deep_analysis_data) if deep_analysis_data else {}
+    except (TypeError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _deep_analysis_reusable(data):
+    """[신규] 세 분석이 모두 오류 없이 끝난 결과만 재사용"""
+    return all(
+        data.get(part) is not None and not (isinstance(data.get(part), dict) and "error" in data[part])
+        for part in ("neuron_map", "integrity_issues", "flow_disconnects")
+    )
+
+
+def _deep_analysis_stale(data):
+    """[신규] 프로세스 재시작 등으로 끝나지 못한 '진행 중' 상태는 DEEP_ANALYSIS_STALE_SECONDS 후 새로 실행"""
+    started_at = data.get("started_at")
+    if not isinstance(started_at, (int, float)):
+        return True
+    return time() - started_at > current_app.config.get('DEEP_ANALYSIS_STALE_SECONDS', 1800)
+
+
+def _deep_analysis_attached(report_id):
+    print(f"🔗 [Deep Analysis] Report #{report_id} 진행 중인 실행에 연결.")
+    return jsonify({
+        "status": "processing",
+        "attached": True,
+        "message": "이미 진행 중인 심층 분석에 연결되었습니다.",
+        "report_id": report_id
+    }), 202
+
 # ----------------------------------------------------------------
 # [API] 결과 조회 (GET) - 폴링용
 # ----------------------------------------------------------------
 @student_bp.route('/reports/<report_id>/deep-analysis', methods=['GET'])
 def get_deep_analysis(report_id):
+    # [신규] version만 먼저 읽어 ETag가 일치하면 deep_analysis_data를 읽고 파싱하기 전에 304 반환
+    version = db.session.query(AnalysisReport.version).filter_by(id=report_id).scalar()
+    if version is None:
+        return jsonify({"status": "error", "message": "Report not found"}), 404
+    etag = report_etag("deep-analysis", report_id, version)
+    not_modified = not_modified_response(etag)
+    if not_modified:
+        return not_modified
+
     try:
-        report = AnalysisReport.query.get_or_404(report_id)
+        deep_analysis_data = db.session.query(AnalysisReport.deep_analysis_data).filter_by(id=report_id).scalar()
         
-        if not report.deep_analysis_data:
-            return jsonify({"status": "pending", "data": None}), 200 # 200 OK지만 데이터 없음
+        if not deep_analysis_data:
+            return with_etag((jsonify({"status": "pending", "data": None}), 200), etag) # 200 OK지만 데이터 없음
 
-        data = json.loads(report.deep_analysis_data)
+        data = json.loads(deep_analysis_data)
         
         # status 필드가 있으면 그것을 사용, 없으면 success 간주
         status = data.get("status", "success")
         
-        return jsonify({
+        return with_etag((jsonify({
             "status": status,
             "data": data
-        }), 200
+        }), 200), etag)
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
\ No newline at end of file
@@ -7,6 +7,11 @@ from .auth_api import ta_required
 #  g.user의 타입을 명확히 하기 위해 남겨둘 수 있습니다.)
 from models import AnalysisReport, Course, Assignment, User 
 from extensions import db
+from services.job_queue_service import enqueue_job, has_active_job, get_queue_metrics
+from services.report_view_cache import report_view_cache_stats
+from services.embedding_cache import embedding_cache_stats
+from services.speculative_deep_dive_service import get_speculation_metrics
+from .http_cache import report_etag, not_modified_response, with_etag
 
 # 3. 설정값 (프롬프트 템플릿)
 try:
@@ -49,13 +54,21 @@ def get_detailed_report(report_id):
     """ 3.2. TA 리포트 상세 조회 """
     if not current_app.analysis_ta_service:
         return jsonify({"error": "서비스가 초기화되지 않았습니다."}), 503
+    # [신규] version 기반 ETag가 일치하면 JSON 컬럼을 읽고 파싱하기 전에 304 반환
+    version = db.session.query(AnalysisReport.version).filter_by(id=report_id).scalar()
+    if version is None:
+        return jsonify({"error": "리포트를 찾을 수 없거나 조회 권한이 없습니다."}), 404
+    etag = report_etag("ta-report", report_id, version)
+    not_modified = not_modified_response(etag)
+    if not_modified:
+        return not_modified
     try:
         # [수정] TA 권한 확인을 위해 ta_user_id 전달
         ta_user_id = g.user.id
         report_details = current_app.analysis_ta_service.get_detailed_report_analysis(report_id, ta_user_id)
         if not report_details:
             return jsonify({"error": "리포트를 찾을 수 없거나 조회 권한이 없습니다."}), 404
-        return jsonify(report_details), 200
+        return with_etag((jsonify(report_details), 200), etag)
     except Exception as e:
         print(f"[TA API /report/{report_id}] Error: {e}")
         traceback.print_exc()
@@ -73,36 +86,56 @@ def trigger_batch_analysis():
     if not report_ids or not isinstance(report_ids, list):
         return jsonify({"error": "'report_ids' (list)가 필요합니다."}), 400
     
-    app = current_app._get_current_object()
     ta_user_id = g.user.id # [수정] 권한 확인용 ID
 
-    def background_batch_task(app_context, ids_to_process, ta_id):
-        with app_context.app_context():
-            try:
-                print(f"[TA Batch] 백그라운드 분석 시작 (TA: {ta_id}, 총 {len(ids_to_process)}개)...")
-                service = current_app.analysis_ta_service
-                if not service:
-                    print(f"[TA Batch] FAILED: 스레드 내에서 서비스를 찾을 수 없습니다.")
-                    return
-                
-                # [수정] 서비스가 TA ID를 받아 권한 확인 후 실행
-                service.run_batch_analysis_for_ta(ids_to_process, ta_id)
-                print(f"[TA Batch] 백그라운드 분석 완료.")
-            except Exception as e:
-                print(f"[TA Batch] CRITICAL ERROR: 백그라운드 작업 실패: {e}")
-                traceback.print_exc()
-
-    thread = threading.Thread(
-        target=background_batch_task,
-        args=(app, report_ids, ta_user_id) # [수정] ta_user_id 전달
-    )
-    thread.daemon = True
-    thread.start()
+    # [수정] 스레드 대신 작업 큐의 'batch' 클래스로 등록
+    # (리포트 1건 = 작업 1개, 공정 분배로 학생 제출과 다른 TA의 작업이 밀리지 않음)
+    queued_ids, skipped_ids = [], []
+    try:
+        for report_id in dict.fromkeys(report_ids):
+            if not db.session.get(AnalysisReport, report_id) or has_active_job(report_id, "ta_batch"):
+                skipped_ids.append(report_id)
+                continue
+            enqueue_job(report_id, "ta_batch", max_attempts=1, priority_class="batch", user_id=ta_user_id)
+            queued_ids.append(report_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"[TA API /analyze-batch] Error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "일괄 분석 작업 등록 중 서버 오류가 발생했습니다."}), 500
 
+    print(f"[TA Batch] 큐 등록 (TA: {ta_user_id}, 등록 {len(queued_ids)}개, 건너뜀 {len(skipped_ids)}개)")
     return jsonify({
-        "message": f"총 {len(report_ids)}개의 리포트에 대한 일괄 분석 작업을 백그라운드에서 시작했습니다."
+        "message": f"총 {len(queued_ids)}개의 리포트에 대한 일괄 분석 작업을 대기열에 등록했습니다.",
+        "queued_report_ids": queued_ids,
+        "skipped_report_ids": skipped_ids
     }), 202
 
+
+@ta_bp.route('/queue/metrics', methods=['GET'])
+@ta_required()
+def get_queue_metrics_api():
+    """ [신규] 사용자별 분석 큐 사용량 (대기/실행/완료 수, 워커 점유 시간) """
+    try:
+        hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 7)
+        return jsonify(get_queue_metrics(window_hours=hours)), 200
+    except Exception as e:
+        print(f"[TA API /queue/metrics] Error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "큐 사용량 조회 중 서버 오류가 발생했습니다."}), 500
+
+
+@ta_bp.route('/cache/metrics', methods=['GET'])
+@ta_required()
+def get_cache_metrics_api():
+    """ [신규] 프로세스 내 캐시 적중률 (요청을 처리한 워커 프로세스 기준) + 심화 질문 추측 생성 적중률 (DB 기준) """
+    return jsonify({
+        "report_view": report_view_cache_stats(),
+        "embedding": embedding_cache_stats(),
+        "speculative_deep_dive": get_speculation_metrics()
+    }), 200
+
 # ----------------------------------------------------
 # --- (신규) 과목 및 과제 관리 API ---
 # ----------------------------------------------------
@@ -1,6 +1,6 @@
 import os
-import threading
 import uuid
+import click
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -14,6 +14,8 @@ import json
 from services.analysis_service import (
     perform_step1_analysis_and_embedding, 
     perform_step2_comparison, 
+    find_similar_documents,
+    build_fast_preview,
     _parse_comparison_scores, 
     _filter_high_similarity_reports
 )
@@ -22,10 +24,22 @@ from services.analysis_ta_service import AnalysisTAService
 from services.grading_service import GradingService
 from services.course_management_service import CourseManagementService
 from services.deep_analysis_service import perform_deep_analysis_async
-
-
-from config import Config, JSON_SYSTEM_PROMPT, COMPARISON_SYSTEM_PROMPT
+from services.job_queue_service import register_stage, register_startup_hook, register_periodic_task, enqueue_job, has_active_job, start_worker_pool, current_job_guard
+from services.pipeline import Stage, StageGraph, PipelineContext
+from services.report_events import queue_event
+from services.question_pool_service import replace_pool, load_pool, append_pool, count_pool
+from services.pool_maintenance_service import maintain_question_pools
+from services.qa_history_service import replace_history, load_history
+from services.question_dedup_service import existing_questions, filter_duplicate_questions
+from services.speculative_deep_dive_service import expire_speculative_turns
+import services.report_versioning # (리포트 version 자동 갱신 리스너 등록)
+from services.report_versioning import bump_report_sections
+from api.http_cache import init_http_compression
+
+
+from config import Config, JSON_SYSTEM_PROMPT, COMPARISON_SYSTEM_PROMPT, BATCH_COMPARISON_SYSTEM_PROMPT
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import update, exists
 
 
 # --- 1. Flask 앱 설정 ---
@@ -53,7 +67,10 @@ db.init_app(app)
 mail.init_app(app)
 jwt.init_app(app) # ⬅️ CORS보다 늦게 초기화
 migrate = Migrate(app, db)
-from models import User, AnalysisReport
+# [신규] 한글 응답을 \uXXXX 이스케이프 없이 UTF-8로 직렬화 (본문 크기 약 1/2) + 큰 응답 압축
+app.json.ensure_ascii = False
+init_http_compression(app)
+from models import User, AnalysisReport, AnalysisJob
 
 # --- 5. [신규] 중앙 서비스 초기화 ---
 # app.py에서 한번만 생성하여 앱 컨텍스트(app 객체)에 바인딩합니다.
@@ -61,7 +78,8 @@ try:
     # app 객체에 서비스 인스턴스를 속성으로 추가합니다.
     app.analysis_ta_service = AnalysisTAService(
         json_prompt_template=JSON_SYSTEM_PROMPT,
-        comparison_prompt_template=COMPARISON_SYSTEM_PROMPT
+        comparison_prompt_template=COMPARISON_SYSTEM_PROMPT,
+        batch_comparison_prompt_template=BATCH_COMPARISON_SYSTEM_PROMPT
     )
     app.course_service = CourseManagementService()
     app.grading_service = GradingService()
@@ -73,224 +91,270 @@ except Exception as e:
     app.course_service = None
     app.grading_service = None
 
-# --- 5. 백그라운드 함수 정의 (순서 중요) ---
-def background_analysis_step1_analysis(report_id, text, doc_type, original_filename, json_prompt_template, comparison_prompt_template):
+# --- 5. [수정] 분석 파이프라인 (단계 그래프) ---
+# 각 단계는 입력/출력 아티팩트를 선언하고(services/pipeline.py), 입력이 준비된 단계부터 병렬로 실행됩니다.
+#   analyze ─┬─ candidates ── comparisons ─┬─ finalize
+#            └──────────── questions ──────┘
+# - 중간 결과는 PipelineContext로 전달하고, 각 단계는 화면 폴링/재개를 위해 자신의 결과만 DB에 저장합니다.
+# - 작업 큐(services/job_queue_service.py)는 리포트당 'pipeline' 작업 1개를 실행하며,
+#   재시도 시 이미 저장된 단계(restore)는 건너뜁니다.
+def _load_report(ctx):
+    report = db.session.get(AnalysisReport, ctx.report_id)
+    if not report:
+        raise LookupError(f"Report {ctx.report_id} not found")
+    return report
+
+
+def _stage_analyze(ctx):
     """
     [1단계] 분석 및 임베딩 생성 (빠른 완료)
     - analysis_service.perform_step1_analysis_and_embedding 호출
-    - 'summary'와 'embedding' 필드를 DB에 저장
-    - 상태를 'processing_comparison'으로 변경
-    - 2단계(비교) 스레드 시작
+    - 'summary'와 'embedding' 필드를 DB에 저장, 상태를 'processing_comparison'으로 변경
     """
-    analysis_data = None
-    summary_dict = {}
-    
-    with app.app_context():
-        report = None
-        try:
-            report = db.session.get(AnalysisReport, report_id)
-            if not report: 
-                print(f"[{report_id}] Step 1 ABORT: Report not found.")
-                return
-
-            report.status = "processing_analysis"
-            db.session.commit()
-            
-            # 1. [신규] 1단계 서비스 호출 (분석 + 임베딩)
-            analysis_data = perform_step1_analysis_and_embedding(
-                report_id, text, json_prompt_template
-            )
-            
-            if not analysis_data: 
-                raise Exception("perform_step1_analysis_and_embedding returned None")
-
-            summary_dict = analysis_data.get('summary_json', {})
-            embedding_thesis_list = analysis_data.get('embedding_thesis', [])
-            embedding_claim_list = analysis_data.get('embedding_claim', [])
-
-            # 2. [신규] 1단계 결과(요약, 임베딩)를 DB에 즉시 저장
-            report.summary = json.dumps(summary_dict)
-            report.embedding_keyconcepts_corethesis = json.dumps(embedding_thesis_list)
-            report.embedding_keyconcepts_claim = json.dumps(embedding_claim_list)
-            
-            # 3. [신규] 2단계(비교)를 위한 상태 업데이트
-            report.status = "processing_comparison" 
-            
-            # (QA 필드는 3단계(QA) 스레드에서 채워지므로 여기서 초기화)
-            report.qa_history = json.dumps([])
-            report.questions_pool = json.dumps([])
-            report.is_refilling = False
-
-            db.session.commit()
-            
-            print(f"[{report_id}] Step 1 (Analysis & Embedding) SUCCESS. DB saved.")
+    report = _load_report(ctx)
+    report.status = "processing_analysis"
+    db.session.commit()
 
-        except Exception as e:
-            print(f"[{report_id}] Step 1 (Analysis) FAILED: {e}")
-            traceback.print_exc()
-            db.session.rollback()
-            try:
-                if report: # report 객체가 유효할 때만
-                    report.status = "error"
-                    report.error_message = f"Step 1 FAILED: {str(e)}"
-                    db.session.commit()
-            except Exception as e_inner:
-                print(f"[{report_id}] CRITICAL: Failed to write error state to DB: {e_inner}")
-            return # 실패 시 2단계 스레드를 시작하지 않음
-
-    # 4. [신규] 2단계(비교) 스레드 시작
-    # (analysis_data에는 1단계 결과가, comparison_prompt_template는 2단계에 필요)
-    comparison_thread = threading.Thread(
-        target=background_analysis_step2_comparison, 
-        args=(report_id, analysis_data, comparison_prompt_template)
+    analysis_data = perform_step1_analysis_and_embedding(
+        ctx.report_id, ctx.get("text"), JSON_SYSTEM_PROMPT
+    )
+    if not analysis_data: 
+        raise Exception("perform_step1_analysis_and_embedding returned None")
+
+    summary_dict = analysis_data.get('summary_json', {})
+    embeddings = {
+        "thesis": analysis_data.get('embedding_thesis', []),
+        "claim": analysis_data.get('embedding_claim', [])
+    }
+
+    report.summary = json.dumps(summary_dict)
+    report.embedding_keyconcepts_corethesis = json.dumps(embeddings["thesis"])
+    report.embedding_keyconcepts_claim = json.dumps(embeddings["claim"])
+    report.status = "processing_comparison"
+
+    # (QA 필드는 questions 단계에서 채워지므로 여기서 초기화)
+    replace_history(ctx.report_id, [])
+    replace_pool(ctx.report_id, [])
+    report.is_refilling = False
+    report.qa_context = None
+    report.high_similarity_candidates = None # (None = 비교 미완료)
+    # [신규] SSE 구독자에게 요약 완료 알림 (커밋 후 발행)
+    queue_event(ctx.report_id, "summary", {"summary": summary_dict})
+    db.session.commit()
+
+    print(f"[{ctx.report_id}] Step 1 (Analysis & Embedding) SUCCESS. DB saved.")
+    return {"summary": summary_dict, "embeddings": embeddings}
+
+
+def _restore_analyze(ctx):
+    report = _load_report(ctx)
+    if not (report.summary and report.embedding_keyconcepts_corethesis and report.embedding_keyconcepts_claim):
+        return None
+    return {
+        "summary": json.loads(report.summary),
+        "embeddings": {
+            "thesis": json.loads(report.embedding_keyconcepts_corethesis),
+            "claim": json.loads(report.embedding_keyconcepts_claim)
+        }
+    }
+
+
+def _stage_candidates(ctx):
+    """
+    [2단계-1] 유사 문서 후보 검색 + 빠른 미리보기(provisional) 저장 (LLM 호출 없음)
+    1단계 완료 직후 잠정 결과를 먼저 저장하여 학생이 바로 볼 수 있게 합니다.
+    """
+    embeddings = ctx.get("embeddings")
+    candidate_docs = find_similar_documents(
+        ctx.report_id, embeddings["thesis"], embeddings["claim"], top_n=3
     )
-    comparison_thread.start()
+    report = _load_report(ctx)
+    preview = build_fast_preview(candidate_docs, json.dumps(ctx.get("summary")))
+    report.similarity_details = json.dumps(preview)
+    queue_event(ctx.report_id, "candidates", {"similarity_details": preview, "similarity_provisional": True})
+    db.session.commit()
+    print(f"[{ctx.report_id}] Step 2 Fast Preview saved ({len(candidate_docs)} provisional candidates).")
+    return {"candidates": candidate_docs}
 
 
-# [핵심 수정 2/3]
-# 2단계(비교)를 수행하는 새로운 백그라운드 함수
-def background_analysis_step2_comparison(report_id, analysis_data, comparison_prompt_template):
+def _stage_comparisons(ctx):
     """
-    [2단계] 유사도 비교 (중간 시간 소요)
-    - 1단계에서 받은 임베딩으로 analysis_service.perform_step2_comparison 호출
+    [2단계-2] LLM 정밀 비교 (analysis_tier='preview'면 생략하고 잠정 결과 유지)
     - 'similarity_details', 'high_similarity_candidates' 필드를 DB에 저장
-    - 상태를 'processing_questions'로 변경
-    - 3단계(QA) 스레드 시작
     """
-    summary_dict = {}
-    similarity_details_list = []
-    snippet = "" # 3단계(QA)에 전달하기 위해 DB에서 로드
+    report = _load_report(ctx)
+    comparison_results = []
+    candidates_for_storage = []
+
+    if report.analysis_tier != "preview":
+        embeddings = ctx.get("embeddings")
+        comparison_results = perform_step2_comparison(
+            ctx.report_id,
+            embeddings["thesis"],
+            embeddings["claim"],
+            json.dumps(ctx.get("summary")),
+            COMPARISON_SYSTEM_PROMPT,
+            candidate_docs=ctx.get("candidates")
+        )
+
+        # 20점 이상 후보군 필터링 (비교 시점에 저장된 구조화 점수 사용)
+        for item in _filter_high_similarity_reports(comparison_results):
+            candidates_for_storage.append({
+                "candidate_id": item.get("candidate_id"),
+                "filename": item.get("candidate_filename"),
+                "total_score": item.get("plagiarism_score"),
+                "itemized_scores": item.get("scores_detail")
+            })
+
+        # 최종 비교 결과로 미리보기를 같은 필드에서 덮어씀 (in-place 갱신)
+        report.similarity_details = json.dumps(comparison_results)
+
+    report.high_similarity_candidates = json.dumps(candidates_for_storage)
+    report.status = "processing_questions"
+    if report.analysis_tier != "preview":
+        queue_event(ctx.report_id, "comparisons", {
+            "similarity_details": comparison_results,
+            "similarity_provisional": False,
+            "high_similarity_candidates": candidates_for_storage
+        })
+    db.session.commit()
+
+    print(f"[{ctx.report_id}] Step 2 (Comparison) SUCCESS. Found {len(candidates_for_storage)} high-similarity candidates.")
+    return {"comparisons": comparison_results}
+
+
+def _restore_comparisons(ctx):
+    report = _load_report(ctx)
+    if report.high_similarity_candidates is None:
+        return None
+    # 잠정(provisional) 미리보기 항목은 LLM 비교 결과가 아니므로 제외
+    details = json.loads(report.similarity_details) if report.similarity_details else []
+    return {"comparisons": [item for item in details if not item.get("provisional")]}
+
+
+def _generate_questions(ctx, high_similarity_reports):
+    """초기 질문 9개 생성 + 3개 배분 (실패 시 더미 질문)"""
+    questions_pool = generate_initial_questions(
+        ctx.get("summary"), high_similarity_reports, ctx.get("text")
+    )
+    if not questions_pool:
+        print(f"[{ctx.report_id}] WARNING: QA service failed. Using dummy questions.")
+        questions_pool = [
+            {"type": "critical", "question": "[Dummy] ..."},
+        ]
+
+    current_qa_history = []
+    for q_data in _distribute_questions(questions_pool, 3):
+        current_qa_history.append({
+            "question_id": str(uuid.uuid4()), "question": q_data.get("question", "Failed to parse"),
+            "type": q_data.get("type", "unknown"), "answer": None,
+            "parent_question_id": None
+        })
+    return questions_pool, current_qa_history
+
+
+def _save_questions(ctx, questions_pool, qa_history, qa_context):
+    report = _load_report(ctx)
+    replace_pool(ctx.report_id, questions_pool)
+    replace_history(ctx.report_id, qa_history)
+    report.qa_context = qa_context
+    queue_event(ctx.report_id, "questions", {
+        "initialQuestions": [
+            {"question_id": item["question_id"], "question": item["question"], "type": item["type"]}
+            for item in qa_history
+        ],
+        "questions_pool_count": len(questions_pool),
+        "qa_context": qa_context
+    })
+    db.session.commit()
+    return {"pool": questions_pool, "history": qa_history, "context": qa_context}
+
+
+def _stage_questions(ctx):
+    """
+    [3단계] QA 생성 - 비교와 동시에 실행
+    비교 결과가 이미 있으면(재개 시) 사용하고, 없으면 요약/스니펫만으로 생성합니다.
+    """
+    comparisons = ctx.get("comparisons", None)
+    high_similarity_reports = _filter_high_similarity_reports(comparisons) if comparisons is not None else []
+    questions_pool, qa_history = _generate_questions(ctx, high_similarity_reports)
+    qa_context = "with_similarity" if comparisons is not None else "summary_only"
 
-    with app.app_context():
-        report = None
-        try:
-            report = db.session.get(AnalysisReport, report_id)
-            if not report: 
-                print(f"[{report_id}] Step 2 ABORT: Report not found.")
-                return
-
-            # 1. 1단계 결과물 추출
-            summary_dict = analysis_data.get('summary_json', {})
-            embedding_thesis_list = analysis_data.get('embedding_thesis', [])
-            embedding_claim_list = analysis_data.get('embedding_claim', [])
-            submission_json_str = json.dumps(summary_dict) # 비교를 위해 JSON 문자열로
-            snippet = report.text_snippet # 3단계(QA)에 전달할 스니펫 로드
-
-            # 2. [신규] 2단계 서비스 호출 (비교)
-            similarity_details_list = perform_step2_comparison(
-                report_id,
-                embedding_thesis_list,
-                embedding_claim_list,
-                submission_json_str,
-                comparison_prompt_template
-            )
-
-
-            # 3. 20점 이상 후보군 필터링 (기존 로직)
-            high_similarity_list = _filter_high_similarity_reports(similarity_details_list)
-            
-            candidates_for_storage = []
-            for item in high_similarity_list:
-                candidate = {
-                    "candidate_id": item.get("candidate_id"), 
-                    "filename": item.get("candidate_filename"),
-                    "total_score": item.get("plagiarism_score"), 
-                    "itemized_scores": item.get("scores_detail") 
-                }
-                candidates_for_storage.append(candidate)
-            
-            # 4. [신규] 2단계 결과(비교 결과)를 DB에 저장
-            report.similarity_details = json.dumps(similarity_details_list)
-            report.high_similarity_candidates = json.dumps(candidates_for_storage)
-            
-            # 5. [신규] 3단계(QA)를 위한 상태 업데이트
-            report.status = "processing_questions"
-            db.session.commit()
+    print(f"[{ctx.report_id}] Step 3 (QA) SUCCESS ({qa_context}).")
+    return {"questions": _save_questions(ctx, questions_pool, qa_history, qa_context)}
 
-            print(f"[{report_id}] Step 2 (Comparison) SUCCESS. Found {len(candidates_for_storage)} high-similarity candidates.")
 
-        except Exception as e:
-            print(f"[{report_id}] Step 2 (Comparison) FAILED: {e}")
-            traceback.print_exc()
-            db.session.rollback()
-            try:
-                if report:
-                    report.status = "error"
-                    report.error_message = f"Step 2 FAILED: {str(e)}"
-                    db.session.commit()
-            except Exception as e_inner:
-                print(f"[{report_id}] CRITICAL: Failed to write error state (Step 2) to DB: {e_inner}")
-            return # 실패 시 3단계(QA) 스레드를 시작하지 않음
-
-    # 6. [신규] 3단계(QA) 스레드 시작 (기존 로직과 동일한 인자 전달)
-    qa_thread = threading.Thread(
-        target=background_analysis_step3_qa, 
-        args=(report_id, summary_dict, similarity_details_list, snippet)
-    )
-    qa_thread.start()
+def _restore_questions(ctx):
+    report = _load_report(ctx)
+    if report.qa_context in (None, "failed"):
+        return None
+    return {"questions": {
+        "pool": load_pool(report.id),
+        "history": load_history(report.id),
+        "context": report.qa_context
+    }}
 
 
-# [핵심 수정 3/3]
-# 'background_analysis_step2_qa' -> 'background_analysis_step3_qa'로 이름 변경
-def background_analysis_step3_qa(report_id, summary_dict, similarity_details_list, snippet):
+def _stage_finalize(ctx):
     """
-    [3단계] QA 생성 (중간 시간 소요)
-    - 2단계에서 받은 요약/비교 결과로 generate_initial_questions 호출
-    - 'qa_history', 'questions_pool' 필드를 DB에 저장
-    - 상태를 'completed'로 변경 (최종 완료)
+    [합류] 비교와 QA가 모두 끝난 뒤 'completed'로 전환
+    질문이 비교 완료 전에 생성되었고(summary_only) 고유사도 후보가 나왔으면 유사도 맥락으로 1회 재생성합니다.
     """
+    high_similarity_reports = _filter_high_similarity_reports(ctx.get("comparisons"))
+    if high_similarity_reports and ctx.get("questions")["context"] == "summary_only":
+        print(f"[{ctx.report_id}] High-similarity candidates found after QA. Regenerating questions.")
+        questions_pool, qa_history = _generate_questions(ctx, high_similarity_reports)
+        _save_questions(ctx, questions_pool, qa_history, "with_similarity")
+
+    report = _load_report(ctx)
+    report.status = "completed"
+    db.session.commit()
+    print(f"[{ctx.report_id}] Pipeline complete.")
+    return {}
+
+
+ANALYSIS_PIPELINE = StageGraph("analysis", [
+    Stage("analyze", _stage_analyze, inputs=["text"], outputs=["summary", "embeddings"], restore=_restore_analyze),
+    Stage("candidates", _stage_candidates, inputs=["summary", "embeddings"], outputs=["candidates"], on_demand=True),
+    Stage("comparisons", _stage_comparisons, inputs=["summary", "embeddings", "candidates"], outputs=["comparisons"], restore=_restore_comparisons),
+    Stage("questions", _stage_questions, inputs=["summary", "text"], outputs=["questions"], restore=_restore_questions),
+    Stage("finalize", _stage_finalize, inputs=["comparisons", "questions"]),
+], initial_inputs=["text"])
+
+
+def run_analysis_pipeline(report_id):
+    """[신규] 작업 큐 핸들러: 리포트 1건의 분석 파이프라인 실행 (원문은 text_snippet에서 로드)"""
     with app.app_context():
-        report = None
-        try:
-            report = db.session.get(AnalysisReport, report_id)
-            if not report: 
-                print(f"[{report_id}] Step 3 ABORT: Report not found.")
-                return
-            
-            if not summary_dict: raise Exception("Step 3 received empty summary_dict")
-            
-            current_qa_history = []
-            high_similarity_reports = _filter_high_similarity_reports(similarity_details_list)
-            
-            questions_pool = generate_initial_questions(
-                summary_dict, high_similarity_reports, snippet
-            )
-            
-            if not questions_pool:
-                print(f"[{report_id}] WARNING: QA service failed. Using dummy questions.")
-                questions_pool = [
-                    {"type": "critical", "question": "[Dummy] ..."},
-                ]
-                
-            initial_questions = _distribute_questions(questions_pool, 3)
-            
-            for q_data in initial_questions:
-                q_id = str(uuid.uuid4())
-                history_entry = {
-                    "question_id": q_id, "question": q_data.get("question", "Failed to parse"),
-                    "type": q_data.get("type", "unknown"), "answer": None,
-                    "parent_question_id": None
-                }
-                current_qa_history.append(history_entry)
-
-            # 3단계(QA) 결과 저장 및 최종 'completed' 상태 업데이트
-            report.questions_pool = json.dumps(questions_pool)
-            report.qa_history = json.dumps(current_qa_history)
-            report.status = "completed"
-            db.session.commit()
-            print(f"[{report_id}] Step 3 (QA) SUCCESS. Process complete.")
+        report = db.session.get(AnalysisReport, report_id)
+        if not report: 
+            print(f"[{report_id}] Pipeline ABORT: Report not found.")
+            return
+        if report.status in ("completed", "error"):
+            return
+        text = report.text_snippet or ""
+
+    # [수정] 작업 큐의 선점을 잃으면(다른 워커가 회수) 다음 단계부터 실행하지 않음
+    ANALYSIS_PIPELINE.run(PipelineContext(report_id=report_id, app=app, guard=current_job_guard(), text=text))
+
+
+def _fail_analysis_pipeline(report_id, error_message):
+    """
+    [신규] 작업 큐의 최종 실패 핸들러
+    - 비교까지 저장되었으면 QA 실패로 보고 일단 완료 처리 (분석/비교는 성공)
+    - 그 전 단계에서 실패했으면 'error'
+    """
+    report = db.session.get(AnalysisReport, report_id)
+    if not report: return
+    if report.high_similarity_candidates is not None:
+        report.status = "completed"
+        report.qa_context = report.qa_context or "failed"
+        report.error_message = f"Step 3 QA FAILED: {error_message}"
+    else:
+        report.status = "error"
+        report.error_message = error_message
+    db.session.commit()
+
 
-        except Exception as e:
-            print(f"[{report_id}] Step 3 (QA) FAILED: {e}")
-            traceback.print_exc()
-            db.session.rollback()
-            try:
-                if report:
-                    report.status = "completed" # QA가 실패해도 일단 '완료' 처리 (분석/비교는 성공)
-                    report.error_message = f"Step 3 QA FAILED: {e}"
-                    db.session.commit()
-            except Exception as e_inner:
-                print(f"[{report_id}] CRITICAL: Failed to write error state (Step 3) to DB: {e_inner}")
 # app.py (예시)
 
 
@@ -313,6 +377,10 @@ def analyze_report_workflow(report_id, text):
     
     return deep_result
 
+# 리필 작업 1회당 최대 LLM 호출 수
+REFILL_MAX_ROUNDS = 3
+
+
 def background_refill(report_id):
     # ... (이하 모든 background_... 함수 내용은 제공해주신 원본과 동일) ...
     with app.app_context():
@@ -323,19 +391,177 @@ def background_refill(report_id):
             similarity_details = json.loads(report.similarity_details) if report.similarity_details else []
             similar = _filter_high_similarity_reports(similarity_details) 
             text_snippet = report.text_snippet
-            new_questions = generate_refill_questions(summary, similar, text_snippet)
-            current_pool = json.loads(report.questions_pool) if report.questions_pool else []
-            if new_questions:
-                current_pool.extend(new_questions)
-                report.questions_pool = json.dumps(current_pool)
-            else:
-                print(f"[{report_id}] Refill FAILED: ...")
+            # [수정] 풀이 HIGH watermark 이상이 될 때까지 채움 (LLM 1회당 6개, 최대 REFILL_MAX_ROUNDS회)
+            # [신규] 기존 질문과 의미가 겹치는 질문은 버리고, 남은 질문이 모자랄 때만 다음 라운드에서 더 요청
+            high_watermark = app.config.get('QUESTION_POOL_HIGH_WATERMARK', 9)
+            dedup_threshold = app.config.get('QUESTION_DEDUP_THRESHOLD', 0.88)
+            pool_count = count_pool(report_id)
+            for _ in range(REFILL_MAX_ROUNDS):
+                if pool_count >= high_watermark:
+                    break
+                previous_questions = existing_questions(report_id)
+                new_questions = generate_refill_questions(summary, similar, text_snippet, previous_questions)
+                if not new_questions:
+                    print(f"[{report_id}] Refill FAILED: ...")
+                    break
+                new_questions = filter_duplicate_questions(report_id, new_questions, dedup_threshold, previous_questions)
+                if not new_questions:
+                    continue
+                # [수정] 풀 테이블 끝에 추가 (그 사이 학생이 꺼낸 질문과 충돌하지 않음)
+                pool_count = append_pool(report_id, new_questions)
+                queue_event(report_id, "questions_refilled", {"questions_pool_count": pool_count})
+                db.session.commit() # (라운드마다 커밋하여 학생이 바로 꺼낼 수 있게 함)
         except Exception as e:
             print(f"[{report_id}] Refill thread error: {e}")
         finally:
             report.is_refilling = False
             db.session.commit()
 
+
+def _release_refill_lock(report_id, error_message):
+    """[신규] 리필 작업이 유실/실패한 경우 잠금(is_refilling)을 해제합니다."""
+    report = db.session.get(AnalysisReport, report_id)
+    if not report: return
+    report.is_refilling = False
+    db.session.commit()
+
+
+def run_ta_batch_job(report_id):
+    """[신규] TA 일괄 분석 1건 (큐의 'batch' 클래스로 실행되어 학생 제출을 밀어내지 않음)"""
+    service = app.analysis_ta_service
+    if not service:
+        raise RuntimeError("AnalysisTAService is not initialized")
+    service.run_batch_analysis_for_ta([report_id])
+
+
+def _fail_ta_batch_job(report_id, error_message):
+    report = db.session.get(AnalysisReport, report_id)
+    if not report: return
+    report.status = "error"
+    report.error_message = f"TA batch analysis FAILED: {error_message}"[:1000]
+    db.session.commit()
+
+
+# --- 5-1. [신규] 체크포인트 기반 재개 (Resume) ---
+# 단계별 저장 결과(summary/임베딩 -> 비교 -> 질문)를 보고 첫 번째 누락 단계부터 다시 실행합니다.
+# (완료된 단계는 파이프라인 실행 시 restore로 건너뛰므로, 재제출 없이 남은 LLM 호출만 수행)
+PROCESSING_STATUSES = ["processing", "processing_analysis", "processing_comparison", "processing_questions"]
+
+# 첫 누락 단계 -> 재개 시 표시할 상태
+RESUME_STATUS_BY_STAGE = {
+    "analyze": "processing",
+    "comparisons": "processing_comparison",
+    "questions": "processing_questions",
+    "finalize": "processing_questions",
+}
+
+
+def _first_missing_stage(report):
+    if not (report.summary and report.embedding_keyconcepts_corethesis and report.embedding_keyconcepts_claim):
+        return "analyze"
+    if report.high_similarity_candidates is None:
+        return "comparisons"
+    if report.qa_context in (None, "failed"):
+        return "questions"
+    return "finalize"
+
+
+def resume_analysis_report(report_id, max_attempts=3):
+    """
+    [신규] 실패/중단된 리포트를 첫 번째 누락 단계부터 재개합니다.
+    반환: (재개 여부, 재개 단계 또는 사유)
+    [수정] 확인 후 등록(check-then-enqueue) 대신, 읽은 version 그대로이고 대기/실행 중 작업이 없을 때만
+    상태를 바꾸는 조건부 UPDATE로 재개권을 얻습니다. (작업 선점과 같은 방식: 여러 프로세스의 시작 스윕이
+    동시에 실행되어도 1곳만 1행을 갱신하여 작업을 등록. SQLite처럼 FOR UPDATE가 없는 DB에서도 동일)
+    """
+    for _ in range(max_attempts):
+        report = db.session.get(AnalysisReport, report_id)
+        if not report:
+            db.session.rollback()
+            return False, "not_found"
+        # (파이프라인뿐 아니라 TA 일괄 분석 등 어떤 단계든 대기/실행 중이면 같은 행을 동시에 쓰지 않도록 거절)
+        if has_active_job(report_id):
+            db.session.rollback()
+            return False, "already_running"
+        if report.status == "completed" and report.qa_context != "failed":
+            db.session.rollback()
+            return False, "already_completed"
+
+        resume_from = _first_missing_stage(report)
+        active_job = exists().where(
+            AnalysisJob.report_id == report_id,
+            AnalysisJob.status.in_(['queued', 'running'])
+        )
+        result = db.session.execute(
+            update(AnalysisReport)
+            .where(AnalysisReport.id == report_id, AnalysisReport.version == report.version, ~active_job)
+            .values(status=RESUME_STATUS_BY_STAGE[resume_from], error_message=None)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            # 그 사이 다른 프로세스가 재개했거나 리포트가 바뀜: 다시 읽어서 판단
+            db.session.rollback()
+            continue
+        bump_report_sections(db.session, report_id, ("status",))
+        enqueue_job(report_id, "pipeline")
+        db.session.commit()
+        print(f"[{report_id}] Resume: '{resume_from}' 단계부터 재개.")
+        return True, resume_from
+
+    return False, "already_running"
+
+
+def sweep_interrupted_reports(include_errors=False):
+    """
+    [신규] 작업 없이 'processing_*' 상태에 멈춘 리포트(크래시/재시작으로 유실)를 재개합니다.
+    include_errors=True면 'error' 상태 리포트도 재개합니다.
+    (모든 워커 프로세스가 시작 시 실행하며, 중복 등록 방지는 resume_analysis_report의 조건부 UPDATE가 담당)
+    """
+    statuses = list(PROCESSING_STATUSES) + (["error"] if include_errors else [])
+    report_ids = [
+        report_id for (report_id,) in
+        db.session.query(AnalysisReport.id).filter(AnalysisReport.status.in_(statuses)).all()
+    ]
+    resumed = []
+    for report_id in report_ids:
+        try:
+            ok, _ = resume_analysis_report(report_id)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Resume Sweep] {report_id} 재개 실패: {e}")
+            continue
+        if ok:
+            resumed.append(report_id)
+    print(f"[Resume Sweep] 대상 {len(report_ids)}건 중 {len(resumed)}건 재개.")
+    return resumed
+
+
+# --- 5-2. [신규] 작업 큐 단계 등록 ---
+register_stage("pipeline", run_analysis_pipeline, on_failure=_fail_analysis_pipeline)
+register_stage("refill", background_refill, on_failure=_release_refill_lock)
+register_stage("ta_batch", run_ta_batch_job, on_failure=_fail_ta_batch_job)
+# 워커 풀 시작 시(웹 프로세스/`flask worker`) 크래시로 멈춘 리포트를 1회 재개
+register_startup_hook(sweep_interrupted_reports)
+
+
+def prefetch_question_pools():
+    """[신규] 주기 작업: 활동 중인 리포트의 질문 풀이 LOW watermark 미만이면 미리 리필"""
+    maintain_question_pools(app.config)
+
+
+register_periodic_task(prefetch_question_pools, app.config.get('QUESTION_POOL_MAINTENANCE_INTERVAL', 20))
+
+
+def expire_speculative_deep_dives():
+    """[신규] 주기 작업: TTL 안에 요청되지 않은 추측 생성 심화 질문 만료"""
+    expired = expire_speculative_turns(app.config.get('SPECULATIVE_DEEP_DIVE_TTL', 1800))
+    if expired:
+        print(f"[Speculative Deep-dive] Expired {expired} unused question(s).")
+
+
+if app.config.get('SPECULATIVE_DEEP_DIVE'):
+    register_periodic_task(expire_speculative_deep_dives, 60)
+
 # --- 6. [핵심 수정!] "모든 정의가 끝난 후" Blueprint 임포트 ---
 from api.student_api import student_bp
 from api.auth_api import auth_bp
@@ -346,18 +572,50 @@ app.register_blueprint(student_bp, url_prefix='/api/student')
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(ta_bp, url_prefix='/api/ta')
 
-# --- 8. DB 초기화 헬퍼 ---
+# --- 8. [신규] 작업 큐 워커 실행 ---
+# 웹 프로세스 모드: 첫 요청 시 프로세스당 1회 워커 풀 시작 (flask db upgrade 등 CLI 실행 시에는 시작하지 않음)
+@app.before_request
+def _ensure_job_workers():
+    if app.config.get('JOB_WORKERS_IN_WEB'):
+        start_worker_pool(app)
+
+
+# 별도 프로세스 모드: `flask worker --concurrency 4`
+@app.cli.command("worker")
+@click.option("--concurrency", type=int, default=None, help="워커 스레드 수 (기본값: JOB_WORKERS)")
+def run_job_worker(concurrency):
+    """분석 작업 큐 워커를 실행합니다."""
+    pool = start_worker_pool(app, concurrency)
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        print("[JobQueue] 워커 종료 중...")
+        pool.stop(timeout=30)
+
+# 실패/중단된 리포트 재개: `flask resume-reports [--include-errors] [--report-id ID]`
+@app.cli.command("resume-reports")
+@click.option("--include-errors", is_flag=True, help="'error' 상태 리포트도 재개")
+@click.option("--report-id", default=None, help="특정 리포트 1건만 재개")
+def resume_reports_command(include_errors, report_id):
+    """저장된 단계 결과를 기준으로 리포트를 첫 누락 단계부터 재개합니다. (워커가 실행)"""
+    if report_id:
+        ok, detail = resume_analysis_report(report_id)
+        print(f"[Resume] {report_id}: {'재개 (' + detail + ')' if ok else '건너뜀 (' + detail + ')'}")
+    else:
+        sweep_interrupted_reports(include_errors=include_errors)
+
+# --- 9. DB 초기화 헬퍼 ---
 @app.shell_context_processor
 def make_shell_context():
     from models import User
     return {'db': db, 'User': User}
 
-# --- 9. 루트 확인용 ---
+# --- 10. 루트 확인용 ---
 @app.route("/")
 def hello_world():
     return jsonify({"message": "AITA Backend is running!"})
 
-# --- 10. [핵심 수정!] 메인 실행 ---
+# --- 11. [핵심 수정!] 메인 실행 ---
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
@@ -60,6 +60,92 @@ class Config:
     # (기본값: MAIL_USERNAME과 동일하게 설정)
     MAIL_DEFAULT_SENDER = os.environ.get('SNUAITA301@gmail.com', os.environ.get('MAIL_USERNAME'))
 
+    # --- 4. [신규] 분석 작업 큐(Job Queue) 설정 ---
+    # 고정 크기 워커 풀: 동시에 실행되는 파이프라인 단계 수의 상한
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 3))
+    # 웹 프로세스 안에서 워커 실행 여부 (False면 별도 `flask worker` 프로세스로 실행)
+    JOB_WORKERS_IN_WEB = os.environ.get('JOB_WORKERS_IN_WEB', 'True').lower() in ['true', '1', 't']
+    # 대기 작업이 없을 때 폴링 간격 (초)
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+    # 가시성 타임아웃 (초): 선점 후 이 시간 안에 끝나지 않으면 다른 워커가 회수
+    JOB_VISIBILITY_TIMEOUT = int(os.environ.get('JOB_VISIBILITY_TIMEOUT', 900))
+    # [신규] 실행 중인 작업의 선점 연장 간격 (초, 0이면 가시성 타임아웃의 1/3)
+    JOB_HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 0))
+    # 재시도: 최대 시도 횟수 및 지수 백오프 기본 지연 (초)
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    JOB_RETRY_BASE_DELAY = int(os.environ.get('JOB_RETRY_BASE_DELAY', 10))
+    # [신규] 공정 분배(Fair-share): 우선순위 클래스별 가중치 (예: "interactive:3,batch:1")
+    # - interactive: 학생 제출/재개/질문 리필, batch: TA 일괄 분석
+    # - 최근 JOB_FAIR_WINDOW초 동안 시작된 작업 수 / 가중치가 가장 작은 클래스부터 선점
+    JOB_CLASS_WEIGHTS = os.environ.get('JOB_CLASS_WEIGHTS', 'interactive:3,batch:1')
+    JOB_FAIR_WINDOW = int(os.environ.get('JOB_FAIR_WINDOW', 300))
+
+    # --- 5. [신규] 분석 요청 승인 제어 (Admission Control) ---
+    # [수정] 대기 중인 파이프라인 작업 + 진행 중인 LLM 작업이 두 한도의 합 이상이면 새 제출을 429 + Retry-After로 거절
+    ANALYZE_MAX_QUEUE_DEPTH = int(os.environ.get('ANALYZE_MAX_QUEUE_DEPTH', 100))
+    # 전체 프로세스에서 동시에 LLM을 호출하는 작업(실행 중인 파이프라인/리필/TA 일괄 분석)의 한도
+    # (이 이상이 실행 중이면 새 제출은 'queued'로 안내)
+    ANALYZE_MAX_IN_FLIGHT = int(os.environ.get('ANALYZE_MAX_IN_FLIGHT', 8))
+    ANALYZE_MIN_RETRY_AFTER = int(os.environ.get('ANALYZE_MIN_RETRY_AFTER', 10))
+
+    # --- 6. [신규] 동일 제출 중복 제거 ---
+    # 'user': 같은 사용자의 동일 제출만 재사용 / 'global': 다른 사용자 제출의 요약·임베딩도 재사용 / 'off': 사용 안 함
+    # (제출 시 force=true면 항상 새로 분석)
+    DEDUP_SCOPE = os.environ.get('DEDUP_SCOPE', 'user').lower()
+
+    # --- 7. [신규] 리포트 진행 이벤트 스트림 (SSE) ---
+    # [수정] 스트림 사용 여부 (기본 꺼짐)
+    # - 열린 스트림 하나가 워커 하나를 스트림 시간 내내 점유하므로, gunicorn 동기(sync) 워커에서는 켜지 말 것
+    # - gevent 등 비동기 워커(`gunicorn -k gevent`)나 스트림 전용 프로세스로 서비스할 때만 True
+    # - 꺼져 있으면 /events는 204를 반환하고(EventSource 재연결 중단), 클라이언트는 ETag 조회(GET /report)로 폴링
+    SSE_ENABLED = os.environ.get('SSE_ENABLED', 'False').lower() in ['true', '1', 't']
+    # [수정] 스트림 전용 토큰 유효 시간 (초): 리포트 1개에만 쓸 수 있는 토큰을 발급하여 ?token=으로 전달
+    # (접근 토큰(JWT)을 쿼리 문자열에 넣지 않음 -> 액세스/프록시 로그에 남지 않음)
+    SSE_TOKEN_SECONDS = int(os.environ.get('SSE_TOKEN_SECONDS', 300))
+    # 스트림 1회 유지 시간 (gunicorn 동기 워커의 기본 timeout 30초보다 짧게, 이후 브라우저가 자동 재연결)
+    SSE_STREAM_SECONDS = int(os.environ.get('SSE_STREAM_SECONDS', 25))
+    # 이벤트가 없을 때 keep-alive 및 상태 재확인 간격 (초)
+    SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 10))
+
+    # --- 8. [신규] 응답 압축 (api/http_cache.py) ---
+    # 이 크기(바이트) 이상인 JSON/텍스트 응답만 압축 (brotli 패키지가 있으면 br, 없으면 gzip)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+    # --- 9. [신규] 질문 풀 선제 리필 (services/pool_maintenance_service.py) ---
+    # 풀이 LOW 미만이면 리필을 시작하고, 리필은 HIGH 이상이 될 때까지 채움
+    QUESTION_POOL_LOW_WATERMARK = int(os.environ.get('QUESTION_POOL_LOW_WATERMARK', 4))
+    QUESTION_POOL_HIGH_WATERMARK = int(os.environ.get('QUESTION_POOL_HIGH_WATERMARK', 9))
+    # 최근 이 시간(초) 안에 질문/답변 활동이 있는 리포트만 주기 점검 대상 (최근 활동 순으로 우선)
+    QUESTION_POOL_ACTIVE_WINDOW = int(os.environ.get('QUESTION_POOL_ACTIVE_WINDOW', 900))
+    # 주기 점검 간격 (초, 0이면 끔) 및 1회 점검당 최대 리필 등록 수
+    QUESTION_POOL_MAINTENANCE_INTERVAL = int(os.environ.get('QUESTION_POOL_MAINTENANCE_INTERVAL', 20))
+    QUESTION_POOL_MAINTENANCE_BATCH = int(os.environ.get('QUESTION_POOL_MAINTENANCE_BATCH', 20))
+
+    # --- 10. [신규] 심화 질문 추측 생성 (services/speculative_deep_dive_service.py) ---
+    # 답변 저장 직후 심화 질문을 미리 생성해 두고 /question/deep-dive 요청 시 즉시 반환 (LLM 호출이 늘어나므로 기본 꺼짐)
+    SPECULATIVE_DEEP_DIVE = os.environ.get('SPECULATIVE_DEEP_DIVE', 'False').lower() in ['true', '1', 't']
+    # 미리 생성된 질문이 이 시간(초) 안에 요청되지 않으면 만료
+    SPECULATIVE_DEEP_DIVE_TTL = int(os.environ.get('SPECULATIVE_DEEP_DIVE_TTL', 1800))
+
+    # --- 11. [신규] 대화 맥락 크기 제한 (services/conversation_context_service.py) ---
+    # 심화 질문/발전 아이디어 프롬프트에 넣는 대화 기록의 토큰 예산 (최근 질문은 원문, 오래된 질문은 누적 요약)
+    CONVERSATION_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONVERSATION_CONTEXT_TOKEN_BUDGET', 1500))
+    # 원문으로 유지할 최근 질문/답변 수 (예산을 넘으면 더 적게)
+    CONVERSATION_RECENT_TURNS = int(os.environ.get('CONVERSATION_RECENT_TURNS', 4))
+    # 누적 요약의 토큰 상한
+    CONVERSATION_SUMMARY_TOKEN_BUDGET = int(os.environ.get('CONVERSATION_SUMMARY_TOKEN_BUDGET', 400))
+    # 요약에 반영되지 않은 오래된 질문이 이 수 이상 쌓이면 LLM으로 요약 갱신 (그 전에는 짧은 발췌로 대체)
+    CONVERSATION_SUMMARY_BATCH = int(os.environ.get('CONVERSATION_SUMMARY_BATCH', 4))
+
+    # --- 12. [신규] 리필 질문 의미 중복 제거 (services/question_dedup_service.py) ---
+    # 기존 질문(기록 + 풀)과 임베딩 코사인 유사도가 이 값 이상인 새 질문은 버림 (0이면 문자열 일치만 검사)
+    QUESTION_DEDUP_THRESHOLD = float(os.environ.get('QUESTION_DEDUP_THRESHOLD', 0.88))
+
+    # --- 13. [신규] 심층 분석 결과 재사용 ---
+    # '진행 중' 상태가 이 시간(초)보다 오래되면 끝나지 못한 실행으로 보고 다음 요청에서 새로 실행
+    DEEP_ANALYSIS_STALE_SECONDS = int(os.environ.get('DEEP_ANALYSIS_STALE_SECONDS', 1800))
+
  
 JSON_SYSTEM_PROMPT = (
     "당신은 최상위 학술 텍스트 분석 전문가입니다. 당신의 임무는 텍스트를 '현미경처럼 정밀하게' 분석하여 "
@@ -151,7 +237,59 @@ COMPARISON_SYSTEM_PROMPT = (
     "  5. Flow Pattern Similarity: [점수 0-10] – [트리 구조 일치 여부 분석]\n"
     "  6. Conclusion Framing Similarity: [점수 0-10] – [이유]\n"
 )
- 
+
+# --- [신규] 배치 비교 프롬프트 (제출본 1개 vs 후보본 K개를 단 1회 호출로 채점) ---
+# 제출본 JSON을 한 번만 전송하고, 후보별 항목 점수를 구조화된 JSON으로 받습니다.
+BATCH_COMPARISON_SYSTEM_PROMPT = (
+    "당신은 구조적 표절을 탐지하는 전문 **포렌식 논리 분석가(Forensic Logic Analyst)**입니다. "
+    "하나의 제출본 분석 보고서를 여러 개의 후보본 분석 보고서와 **각각 독립적으로** 비교하여 "
+    "'구조적 및 논리적 유사도 점수'를 계산하십시오. 후보본끼리는 비교하지 마십시오.\n"
+    "최종 목표는 **'우연한 주제 중복'**(주제는 같으나 논리가 다름)을 걸러내고, **'구조적 복제'**(논리와 근거 흐름이 동일함)를 식별하는 것입니다.\n\n"
+
+    "--- (제출본 JSON) ---\n{submission_json_str}\n\n"
+    "{candidates_block}\n"
+
+    "** 채점 기준 (엄격한 기준점):**\n"
+    "- **0~3 (별개):** 주제는 같지만 주장과 근거가 완전히 다름.\n"
+    "- **4~6 (일반적):** 주제와 일반적인 주장은 공유하지만, 구체적인 예시나 구조가 다름.\n"
+    "- **7~8 (의심):** 논리 흐름과 주장이 동일하지만, 표현이나 예시가 약간 다름.\n"
+    "- **9~10 (복제):** **동일한 논리 아키텍처**를 가지며 **구체적 증거가 일치함** ('Specific_Evidence'의 고유명사, 통계, 특정 은유 등).\n\n"
+
+    "** 평가 항목 (각 0-10):**\n"
+    "1. Core Thesis Similarity: *정확히 동일한 구체적 해결책*을 주장하는가?\n"
+    "2. Problem Framing Similarity: 문제를 바라보는 렌즈(경제적 vs 윤리적 vs 사회적)가 동일한가?\n"
+    "3. Claim Similarity: 최종 결론/주장의 뉘앙스와 강도가 동일한가?\n"
+    "4. Reasoning Similarity: **[매우 중요]** 'Reasoning_Logic'과 'Specific_Evidence'를 비교하라. 인용한 연구/사례가 다르면 반드시 5점 미만.\n"
+    "5. Flow Pattern Similarity: 'Flow_Pattern'의 트리 구조(분기점, 말단 노드의 부모)가 일치하는가?\n"
+    "6. Conclusion Framing Similarity: 수사적 결론 전략이 동일한가?\n\n"
+
+    "**[출력 포맷]**\n"
+    "반드시 아래 형식의 JSON 리스트로만 출력하십시오. 후보본마다 정확히 1개의 항목을 출력하고, "
+    "'candidate_index'는 입력된 후보본 번호와 일치해야 합니다. (설명, 마크다운 금지)\n"
+    "[\n"
+    "  {{\n"
+    "    \"candidate_index\": 0,\n"
+    "    \"overall_comment\": \"표절인지 단순 주제 공유인지 요약하는 날카로운 비평 (한국어)\",\n"
+    "    \"scores\": {{\n"
+    "      \"Core Thesis Similarity\": 0,\n"
+    "      \"Problem Framing Similarity\": 0,\n"
+    "      \"Claim Similarity\": 0,\n"
+    "      \"Reasoning Similarity\": 0,\n"
+    "      \"Flow Pattern Similarity\": 0,\n"
+    "      \"Conclusion Framing Similarity\": 0\n"
+    "    }},\n"
+    "    \"reasons\": {{\n"
+    "      \"Core Thesis Similarity\": \"이유\",\n"
+    "      \"Problem Framing Similarity\": \"이유\",\n"
+    "      \"Claim Similarity\": \"이유\",\n"
+    "      \"Reasoning Similarity\": \"구체적인 증거/논리 명시적 비교\",\n"
+    "      \"Flow Pattern Similarity\": \"트리 구조 일치 여부 분석\",\n"
+    "      \"Conclusion Framing Similarity\": \"이유\"\n"
+    "    }}\n"
+    "  }}\n"
+    "]\n"
+)
+
 IDEA_GENERATION_PROMPT = """당신은 학술 대화 분석 전문가이자 창의적 사고 촉진자입니다.
 학생의 원문 요약, 발췌문, 그리고 포맷팅된 '대화 흐름'이 주어집니다.
 당신의 임무는 전체 흐름을 분석하여 **3가지의 새롭거나 발전된 관점 및 아이디어**를 생성하는 것입니다.
@@ -276,6 +414,29 @@ deep_dive_prompt = """
 }}
 """
 
+# --- [신규] 이전 대화 누적 요약 (services/conversation_context_service.py) ---
+conversation_summary_prompt = """
+당신은 학생과 멘토의 질의응답 기록을 정리하는 조교입니다.
+[기존 요약]에 [새 대화]의 내용을 합쳐, 이후 질문 생성에 필요한 핵심만 남긴 새 요약을 작성하십시오.
+
+**[요약 원칙]**
+1. 학생이 답변에서 내세운 입장, 근거, 인정한 한계와 아직 해소되지 않은 쟁점을 우선 보존하십시오.
+2. 이미 충분히 다뤄진 내용은 한 문장으로 압축하고, 질문 문장을 그대로 옮기지 마십시오.
+3. 전체 분량은 {max_chars}자 이내로 작성하십시오.
+
+[기존 요약]
+{previous_summary}
+
+[새 대화]
+{new_turns}
+
+**[출력 포맷]**
+반드시 아래와 같은 JSON 형식으로만 출력하십시오.
+{{
+    "summary": "합쳐진 새 요약"
+}}
+"""
+
 # --- 2. [수정] 논리 정합성 스캐너 (한국어 최적화) ---
 # config_prompts.py
 
@@ -127,8 +127,6 @@ def import_csv_to_db():
                     # (기타 필드는 기본값 또는 None으로 둠)
                     evaluation=json.dumps({"info": "Imported from CSV"}),
                     logic_flow=json.dumps({}),
-                    qa_history=json.dumps([]),
-                    questions_pool=json.dumps([]),
                     is_refilling=False,
                     advancement_ideas=json.dumps([]),
                     high_similarity_candidates = json.dumps([])
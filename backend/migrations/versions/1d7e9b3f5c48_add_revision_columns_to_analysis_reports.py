@@ -0,0 +1,35 @@
+"""Add revision_of, paragraph_hashes and revision_diff columns to analysis_reports
+
+Revision ID: 1d7e9b3f5c48
+Revises: c81f4d2a6e57
+Create Date: 2026-10-19 18:24:12.639051
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d7e9b3f5c48'
+down_revision = 'c81f4d2a6e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (기존 리포트의 paragraph_hashes는 수정본 비교 시 text_snippet에서 계산하므로 채우지 않음)
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision_of', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('paragraph_hashes', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('revision_diff', sa.Text(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_analysis_reports_revision_of'), ['revision_of'], unique=False)
+        batch_op.create_foreign_key('fk_analysis_reports_revision_of', 'analysis_reports', ['revision_of'], ['id'], ondelete='SET NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_analysis_reports_revision_of', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_analysis_reports_revision_of'))
+        batch_op.drop_column('revision_diff')
+        batch_op.drop_column('paragraph_hashes')
+        batch_op.drop_column('revision_of')
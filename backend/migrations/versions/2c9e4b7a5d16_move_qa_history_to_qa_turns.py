@@ -0,0 +1,147 @@
+"""Move analysis_reports.qa_history into qa_turns table
+
+Revision ID: 2c9e4b7a5d16
+Revises: f3a8c5d1b7e2
+Create Date: 2026-10-19 20:47:33.905128
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime, timezone
+import json
+import uuid
+
+
+# revision identifiers, used by Alembic.
+revision = '2c9e4b7a5d16'
+down_revision = 'f3a8c5d1b7e2'
+branch_labels = None
+depends_on = None
+
+
+analysis_reports = sa.table(
+    'analysis_reports',
+    sa.column('id', sa.String),
+    sa.column('created_at', sa.DateTime),
+    sa.column('qa_history', sa.Text),
+)
+
+qa_turns = sa.table(
+    'qa_turns',
+    sa.column('question_id', sa.String),
+    sa.column('report_id', sa.String),
+    sa.column('parent_question_id', sa.String),
+    sa.column('position', sa.Integer),
+    sa.column('type', sa.String),
+    sa.column('question', sa.Text),
+    sa.column('answer', sa.Text),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def upgrade():
+    op.create_table('qa_turns',
+    sa.Column('question_id', sa.String(length=36), nullable=False),
+    sa.Column('report_id', sa.String(length=36), nullable=False),
+    sa.Column('parent_question_id', sa.String(length=36), nullable=True),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=30), nullable=True),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('answered_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['report_id'], ['analysis_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('question_id')
+    )
+    with op.batch_alter_table('qa_turns', schema=None) as batch_op:
+        batch_op.create_index('ix_qa_turns_report_position', ['report_id', 'position'], unique=False)
+        batch_op.create_index(batch_op.f('ix_qa_turns_parent_question_id'), ['parent_question_id'], unique=False)
+
+    # 기존 JSON 기록을 행으로 옮기기 (question_id가 없거나 이미 사용된 항목은 새 ID 부여)
+    # 새 ID를 받은 질문의 심화 질문은 parent_question_id도 리포트별 (기존 ID -> 새 ID) 매핑으로 바꿔 연결 유지
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(analysis_reports.c.id, analysis_reports.c.created_at, analysis_reports.c.qa_history)
+        .where(analysis_reports.c.qa_history.isnot(None))
+    ).fetchall()
+    used_ids = set()
+    for report_id, created_at, qa_history in rows:
+        try:
+            history = json.loads(qa_history)
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(history, list):
+            continue
+        turns, original_ids = [], []
+        id_map = {} # 기존 ID -> 이 리포트에서 부여한 ID (같은 ID가 반복되면 가장 최근 항목)
+        for position, item in enumerate(history):
+            if not isinstance(item, dict):
+                continue
+            original_id = item.get("question_id")
+            question_id = original_id
+            if not question_id or question_id in used_ids or len(str(question_id)) > 36:
+                question_id = str(uuid.uuid4())
+            used_ids.add(question_id)
+            if original_id:
+                id_map[original_id] = question_id
+            original_ids.append(original_id)
+            turns.append({
+                "question_id": question_id,
+                "report_id": report_id,
+                "parent_question_id": item.get("parent_question_id"),
+                "position": position,
+                "type": item.get("type"),
+                "question": item.get("question") or "",
+                "answer": item.get("answer"),
+                "created_at": created_at or datetime.now(timezone.utc).replace(tzinfo=None),
+            })
+        # 부모는 보통 자식보다 앞에 있으므로, 자식 위치까지의 매핑을 우선 사용 (뒤에 나온 부모는 최종 매핑)
+        final_map = dict(id_map)
+        id_map = {}
+        for turn, original_id in zip(turns, original_ids):
+            parent_id = turn["parent_question_id"]
+            if parent_id:
+                parent_id = id_map.get(parent_id) or final_map.get(parent_id) or parent_id
+                turn["parent_question_id"] = parent_id if len(str(parent_id)) <= 36 else None
+            if original_id:
+                id_map[original_id] = turn["question_id"]
+        if turns:
+            conn.execute(qa_turns.insert(), turns)
+
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.drop_column('qa_history')
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('qa_history', sa.Text(), nullable=True))
+
+    # 행을 다시 JSON 리스트로 합치기
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(
+            qa_turns.c.report_id, qa_turns.c.question_id, qa_turns.c.question, qa_turns.c.type,
+            qa_turns.c.answer, qa_turns.c.parent_question_id
+        ).order_by(qa_turns.c.report_id, qa_turns.c.position, qa_turns.c.created_at)
+    ).fetchall()
+    histories = {}
+    for report_id, question_id, question, question_type, answer, parent_question_id in rows:
+        histories.setdefault(report_id, []).append({
+            "question_id": question_id,
+            "question": question,
+            "type": question_type,
+            "answer": answer,
+            "parent_question_id": parent_question_id
+        })
+    for report_id, history in histories.items():
+        conn.execute(
+            analysis_reports.update()
+            .where(analysis_reports.c.id == report_id)
+            .values(qa_history=json.dumps(history))
+        )
+
+    with op.batch_alter_table('qa_turns', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_qa_turns_parent_question_id'))
+        batch_op.drop_index('ix_qa_turns_report_position')
+
+    op.drop_table('qa_turns')
@@ -0,0 +1,26 @@
+"""Add analysis_tier column
+
+Revision ID: 3a61c2e8f4b7
+Revises: d9cfa71f101e
+Create Date: 2026-10-19 10:12:41.203114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a61c2e8f4b7'
+down_revision = 'd9cfa71f101e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('analysis_tier', sa.String(length=20), nullable=False, server_default='full'))
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.drop_column('analysis_tier')
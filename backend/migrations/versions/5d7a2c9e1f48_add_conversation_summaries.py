@@ -0,0 +1,31 @@
+"""Add conversation_summaries table (rolling summary of older QA turns)
+
+Revision ID: 5d7a2c9e1f48
+Revises: 8e1b6d3f9c24
+Create Date: 2026-10-19 22:04:51.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7a2c9e1f48'
+down_revision = '8e1b6d3f9c24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('conversation_summaries',
+    sa.Column('report_id', sa.String(length=36), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('covered_position', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['report_id'], ['analysis_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('report_id')
+    )
+
+
+def downgrade():
+    op.drop_table('conversation_summaries')
@@ -0,0 +1,26 @@
+"""Add started_at column to analysis_jobs
+
+Revision ID: 5f8d2b6e0a93
+Revises: e4a7c31b9d20
+Create Date: 2026-10-19 15:48:33.106274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f8d2b6e0a93'
+down_revision = 'e4a7c31b9d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('started_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.drop_column('started_at')
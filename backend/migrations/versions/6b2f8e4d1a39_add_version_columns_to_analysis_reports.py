@@ -0,0 +1,29 @@
+"""Add version and section_versions columns to analysis_reports
+
+Revision ID: 6b2f8e4d1a39
+Revises: 1d7e9b3f5c48
+Create Date: 2026-10-19 19:10:37.852406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2f8e4d1a39'
+down_revision = '1d7e9b3f5c48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (기존 리포트는 version 0, section_versions 없음 -> 다음 변경부터 기록)
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('section_versions', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.drop_column('section_versions')
+        batch_op.drop_column('version')
@@ -0,0 +1,108 @@
+"""Backfill structured comparison scores in similarity_details
+
+Revision ID: 7c0e5d92a1f3
+Revises: 3a61c2e8f4b7
+Create Date: 2026-10-19 11:40:27.518930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+import re
+
+
+# revision identifiers, used by Alembic.
+revision = '7c0e5d92a1f3'
+down_revision = '3a61c2e8f4b7'
+branch_labels = None
+depends_on = None
+
+
+# 마이그레이션 시점의 규칙을 고정하기 위해 서비스 모듈을 import하지 않고 복사해 둡니다.
+SCORE_KEYS = [
+    "Core Thesis Similarity",
+    "Problem Framing Similarity",
+    "Claim Similarity",
+    "Reasoning Similarity",
+    "Flow Pattern Similarity",
+    "Conclusion Framing Similarity",
+]
+HIGH_SIMILARITY_THRESHOLD = 50
+STRUCTURED_KEYS = ("plagiarism_score", "scores_detail", "is_high_similarity")
+
+analysis_reports = sa.table(
+    'analysis_reports',
+    sa.column('id', sa.String),
+    sa.column('similarity_details', sa.Text),
+)
+
+
+def _parse_scores(report_text):
+    scores = {key_name: 0 for key_name in SCORE_KEYS}
+    for key_name in SCORE_KEYS:
+        match = re.search(rf"{re.escape(key_name)}.*?:\s*[\s\*]*(\d+)", report_text or "", re.IGNORECASE)
+        if match:
+            scores[key_name] = int(match.group(1))
+    return sum(scores.values()) + scores["Reasoning Similarity"], scores
+
+
+def upgrade():
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(analysis_reports.c.id, analysis_reports.c.similarity_details)
+        .where(analysis_reports.c.similarity_details.isnot(None))
+    ).fetchall()
+
+    for report_id, similarity_details in rows:
+        try:
+            details = json.loads(similarity_details)
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(details, list):
+            continue
+
+        changed = False
+        for item in details:
+            # 빠른 미리보기(잠정) 항목과 이미 정규화된 항목은 건너뜀
+            if not isinstance(item, dict) or item.get("provisional") or "is_high_similarity" in item:
+                continue
+            if "llm_comparison_report" not in item:
+                continue
+            total_score, scores = _parse_scores(item.get("llm_comparison_report"))
+            item["plagiarism_score"] = total_score
+            item["scores_detail"] = scores
+            item["is_high_similarity"] = total_score >= HIGH_SIMILARITY_THRESHOLD
+            changed = True
+
+        if changed:
+            conn.execute(
+                analysis_reports.update()
+                .where(analysis_reports.c.id == report_id)
+                .values(similarity_details=json.dumps(details))
+            )
+
+
+def downgrade():
+    # 구조화 필드만 제거 (원문 llm_comparison_report는 그대로 남아 있음)
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(analysis_reports.c.id, analysis_reports.c.similarity_details)
+        .where(analysis_reports.c.similarity_details.isnot(None))
+    ).fetchall()
+
+    for report_id, similarity_details in rows:
+        try:
+            details = json.loads(similarity_details)
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(details, list):
+            continue
+        for item in details:
+            if isinstance(item, dict):
+                for key in STRUCTURED_KEYS:
+                    item.pop(key, None)
+        conn.execute(
+            analysis_reports.update()
+            .where(analysis_reports.c.id == report_id)
+            .values(similarity_details=json.dumps(details))
+        )
@@ -0,0 +1,33 @@
+"""Add state and speculative_at to qa_turns (speculative deep-dive)
+
+Revision ID: 8e1b6d3f9c24
+Revises: 2c9e4b7a5d16
+Create Date: 2026-10-19 21:31:08.264719
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e1b6d3f9c24'
+down_revision = '2c9e4b7a5d16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('qa_turns', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('state', sa.String(length=20), server_default='active', nullable=False))
+        batch_op.add_column(sa.Column('speculative_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_qa_turns_state_speculative_at', ['state', 'speculative_at'], unique=False)
+
+
+def downgrade():
+    # 공개되지 않은 추측 질문은 기존 스키마에서 구분할 수 없으므로 삭제
+    op.execute("DELETE FROM qa_turns WHERE state <> 'active'")
+
+    with op.batch_alter_table('qa_turns', schema=None) as batch_op:
+        batch_op.drop_index('ix_qa_turns_state_speculative_at')
+        batch_op.drop_column('speculative_at')
+        batch_op.drop_column('state')
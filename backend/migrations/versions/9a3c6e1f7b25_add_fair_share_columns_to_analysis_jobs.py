@@ -0,0 +1,48 @@
+"""Add fair-share scheduling columns to analysis_jobs
+
+Revision ID: 9a3c6e1f7b25
+Revises: 5f8d2b6e0a93
+Create Date: 2026-10-19 16:52:08.413907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3c6e1f7b25'
+down_revision = '5f8d2b6e0a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('course_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('priority_class', sa.String(length=20), server_default='interactive', nullable=False))
+        batch_op.create_index(batch_op.f('ix_analysis_jobs_user_id'), ['user_id'], unique=False)
+        batch_op.create_foreign_key('fk_analysis_jobs_user_id_users', 'users', ['user_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_foreign_key('fk_analysis_jobs_course_id_courses', 'courses', ['course_id'], ['id'], ondelete='SET NULL')
+
+    # 기존 작업은 리포트 작성자/과목으로 채움
+    op.execute(
+        "UPDATE analysis_jobs SET user_id = "
+        "(SELECT analysis_reports.user_id FROM analysis_reports WHERE analysis_reports.id = analysis_jobs.report_id)"
+    )
+    op.execute(
+        "UPDATE analysis_jobs SET course_id = "
+        "(SELECT assignments.course_id FROM analysis_reports "
+        "JOIN assignments ON assignments.id = analysis_reports.assignment_id "
+        "WHERE analysis_reports.id = analysis_jobs.report_id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_analysis_jobs_course_id_courses', type_='foreignkey')
+        batch_op.drop_constraint('fk_analysis_jobs_user_id_users', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_analysis_jobs_user_id'))
+        batch_op.drop_column('priority_class')
+        batch_op.drop_column('course_id')
+        batch_op.drop_column('user_id')
@@ -0,0 +1,42 @@
+"""Key conversation_summaries by conversation context (report + root question)
+
+Revision ID: a4e8c2f6b913
+Revises: 5d7a2c9e1f48
+Create Date: 2026-10-19 23:41:07.205613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e8c2f6b913'
+down_revision = '5d7a2c9e1f48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 요약 캐시이므로 기존 행은 버리고 다시 만듦 (다음 심화 질문/발전 아이디어 요청 시 재생성)
+    op.drop_table('conversation_summaries')
+    op.create_table('conversation_summaries',
+    sa.Column('report_id', sa.String(length=36), nullable=False),
+    sa.Column('context_key', sa.String(length=36), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('covered_question_ids', sa.Text(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['report_id'], ['analysis_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('report_id', 'context_key')
+    )
+
+
+def downgrade():
+    op.drop_table('conversation_summaries')
+    op.create_table('conversation_summaries',
+    sa.Column('report_id', sa.String(length=36), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('covered_position', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['report_id'], ['analysis_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('report_id')
+    )
@@ -0,0 +1,48 @@
+"""Add analysis_jobs table
+
+Revision ID: b52e9f0c7d14
+Revises: 7c0e5d92a1f3
+Create Date: 2026-10-19 13:05:52.771406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52e9f0c7d14'
+down_revision = '7c0e5d92a1f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analysis_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('report_id', sa.String(length=36), nullable=False),
+    sa.Column('stage', sa.String(length=30), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('locked_by', sa.String(length=64), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['report_id'], ['analysis_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_analysis_jobs_report_id'), ['report_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_analysis_jobs_status'), ['status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_analysis_jobs_run_after'), ['run_after'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_analysis_jobs_run_after'))
+        batch_op.drop_index(batch_op.f('ix_analysis_jobs_status'))
+        batch_op.drop_index(batch_op.f('ix_analysis_jobs_report_id'))
+
+    op.drop_table('analysis_jobs')
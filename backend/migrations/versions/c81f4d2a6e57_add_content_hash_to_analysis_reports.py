@@ -0,0 +1,62 @@
+"""Add content_hash and duplicate_of columns to analysis_reports
+
+Revision ID: c81f4d2a6e57
+Revises: 9a3c6e1f7b25
+Create Date: 2026-10-19 17:31:45.208114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+import re
+import unicodedata
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4d2a6e57'
+down_revision = '9a3c6e1f7b25'
+branch_labels = None
+depends_on = None
+
+
+# 마이그레이션 시점의 규칙을 고정하기 위해 서비스 모듈을 import하지 않고 복사해 둡니다.
+def _content_hash(text):
+    text = re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+analysis_reports = sa.table(
+    'analysis_reports',
+    sa.column('id', sa.String),
+    sa.column('text_snippet', sa.Text),
+    sa.column('content_hash', sa.String),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('duplicate_of', sa.String(length=36), nullable=True))
+        batch_op.create_index(batch_op.f('ix_analysis_reports_content_hash'), ['content_hash'], unique=False)
+        batch_op.create_foreign_key('fk_analysis_reports_duplicate_of', 'analysis_reports', ['duplicate_of'], ['id'], ondelete='SET NULL')
+
+    # 기존 리포트 해시 채우기
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(analysis_reports.c.id, analysis_reports.c.text_snippet)
+        .where(analysis_reports.c.text_snippet.isnot(None))
+    ).fetchall()
+    for report_id, text_snippet in rows:
+        conn.execute(
+            analysis_reports.update()
+            .where(analysis_reports.c.id == report_id)
+            .values(content_hash=_content_hash(text_snippet))
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_analysis_reports_duplicate_of', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_analysis_reports_content_hash'))
+        batch_op.drop_column('duplicate_of')
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,26 @@
+"""Add qa_context column
+
+Revision ID: e4a7c31b9d20
+Revises: b52e9f0c7d14
+Create Date: 2026-10-19 14:21:09.384517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c31b9d20'
+down_revision = 'b52e9f0c7d14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('qa_context', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.drop_column('qa_context')
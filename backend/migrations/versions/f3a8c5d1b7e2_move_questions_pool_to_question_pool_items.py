@@ -0,0 +1,97 @@
+"""Move analysis_reports.questions_pool into question_pool_items table
+
+Revision ID: f3a8c5d1b7e2
+Revises: 6b2f8e4d1a39
+Create Date: 2026-10-19 20:02:14.536871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c5d1b7e2'
+down_revision = '6b2f8e4d1a39'
+branch_labels = None
+depends_on = None
+
+
+analysis_reports = sa.table(
+    'analysis_reports',
+    sa.column('id', sa.String),
+    sa.column('questions_pool', sa.Text),
+)
+
+question_pool_items = sa.table(
+    'question_pool_items',
+    sa.column('report_id', sa.String),
+    sa.column('position', sa.Integer),
+    sa.column('type', sa.String),
+    sa.column('question', sa.Text),
+)
+
+
+def upgrade():
+    op.create_table('question_pool_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('report_id', sa.String(length=36), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=30), nullable=True),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['report_id'], ['analysis_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('question_pool_items', schema=None) as batch_op:
+        batch_op.create_index('ix_question_pool_items_report_position', ['report_id', 'position'], unique=False)
+
+    # 기존 JSON 풀을 행으로 옮기기
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(analysis_reports.c.id, analysis_reports.c.questions_pool)
+        .where(analysis_reports.c.questions_pool.isnot(None))
+    ).fetchall()
+    for report_id, questions_pool in rows:
+        try:
+            pool = json.loads(questions_pool)
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(pool, list):
+            continue
+        items = [
+            {"report_id": report_id, "position": position, "type": item.get("type"), "question": item["question"]}
+            for position, item in enumerate(pool)
+            if isinstance(item, dict) and item.get("question")
+        ]
+        if items:
+            conn.execute(question_pool_items.insert(), items)
+
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.drop_column('questions_pool')
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('questions_pool', sa.Text(), nullable=True))
+
+    # 행을 다시 JSON 리스트로 합치기
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(
+            question_pool_items.c.report_id, question_pool_items.c.type, question_pool_items.c.question
+        ).order_by(question_pool_items.c.report_id, question_pool_items.c.position)
+    ).fetchall()
+    pools = {}
+    for report_id, question_type, question in rows:
+        pools.setdefault(report_id, []).append({"type": question_type, "question": question})
+    for report_id, pool in pools.items():
+        conn.execute(
+            analysis_reports.update()
+            .where(analysis_reports.c.id == report_id)
+            .values(questions_pool=json.dumps(pool))
+        )
+
+    with op.batch_alter_table('question_pool_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_question_pool_items_report_position')
+
+    op.drop_table('question_pool_items')
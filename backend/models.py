@@ -102,6 +102,13 @@ class AnalysisReport(db.Model):
     status = db.Column(db.String(50), nullable=False, default='processing')
     error_message = db.Column(db.Text, nullable=True)
     is_test = db.Column(db.Boolean, nullable=False, default=False)
+    # [신규] 분석 단계: 'full' (LLM 정밀 비교까지) / 'preview' (임베딩 미리보기에서 종료, is_test 전용)
+    analysis_tier = db.Column(db.String(20), nullable=False, default='full', server_default='full')
+
+    # [신규] 응답 섹션이 바뀔 때마다 1씩 증가하는 버전 + 섹션별 마지막 변경 버전(JSON)
+    # (GET /report?since=<version> 델타 응답용, services/report_versioning.py에서 자동 갱신)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    section_versions = db.Column(db.Text, nullable=True)
 
     # --- 사용자 피드백 ---
     # [추가 4] 사용자 평점
@@ -109,15 +116,25 @@ class AnalysisReport(db.Model):
 
     # --- 원본 및 분석 데이터 (JSON 문자열로 저장) ---
     text_snippet = db.Column(db.Text)
+    # [신규] 정규화한 text_snippet의 SHA-256 (동일 제출 중복 제거용)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    # [신규] 분석 결과를 재사용한 원본 리포트 ID (중복 제출인 경우)
+    duplicate_of = db.Column(db.String(36), db.ForeignKey('analysis_reports.id', ondelete='SET NULL'), nullable=True)
+    # [신규] 수정본 관계: 이 리포트가 수정한 원본 리포트 ID + 문단별 정규화 해시(JSON 리스트) + 원본 대비 변경 요약(JSON)
+    revision_of = db.Column(db.String(36), db.ForeignKey('analysis_reports.id', ondelete='SET NULL'), nullable=True, index=True)
+    paragraph_hashes = db.Column(db.Text, nullable=True)
+    revision_diff = db.Column(db.Text, nullable=True)
     summary = db.Column(db.Text, nullable=True)
     similarity_details = db.Column(db.Text, nullable=True) 
     evaluation = db.Column(db.Text, nullable=True)
     logic_flow = db.Column(db.Text, nullable=True)
 
     # --- QA 및 상호작용 데이터 (JSON 문자열로 저장) ---
-    qa_history = db.Column(db.Text, nullable=True)
-    questions_pool = db.Column(db.Text, nullable=True)
+    # [수정] 질문/답변 기록은 qa_turns 테이블로 분리 (QATurn)
+    # [수정] 질문 풀은 question_pool_items 테이블로 분리 (QuestionPoolItem)
     is_refilling = db.Column(db.Boolean, default=False)
+    # [신규] 초기 질문 생성 시 사용한 맥락: 'summary_only'(비교 완료 전) / 'with_similarity'(비교 완료 후) / 'failed' (None이면 미생성)
+    qa_context = db.Column(db.String(20), nullable=True)
     advancement_ideas = db.Column(db.Text, nullable=True)
 
     # {"scores": [{"criteria_id": "A", "score": 10}, ...], "total": 90}
@@ -144,6 +161,148 @@ class AnalysisReport(db.Model):
         return f'<AnalysisReport {self.id} (User {self.user_id}) - {self.status}>'
 
 
+# --- 3. [신규] AnalysisJob 모델 (내구성 있는 작업 큐) ---
+
+class AnalysisJob(db.Model):
+    """
+    분석 파이프라인의 단계별 작업(job)을 저장하는 영속 큐 테이블
+    - 워커가 UPDATE로 원자적으로 선점(claim)하고, locked_until(가시성 타임아웃)이 지나면 다른 워커가 회수
+    - 실패 시 run_after를 지수 백오프로 미뤄 재시도, max_attempts 초과 시 'failed'
+    """
+    __tablename__ = 'analysis_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.String(36), db.ForeignKey('analysis_reports.id', ondelete='CASCADE'), nullable=False, index=True)
+    # 단계: 'pipeline' / 'refill' / 'ta_batch'
+    stage = db.Column(db.String(30), nullable=False)
+    # 상태: 'queued' / 'running' / 'done' / 'failed'
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), index=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(64), nullable=True)
+    # [신규] 마지막 선점 시각 (평균 실행 시간 -> 대기 예상 시간 계산용)
+    started_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    # [신규] 공정 분배(Fair-share) 스케줄링 키
+    # - user_id: 작업을 발생시킨 사용자 (학생 제출은 학생, TA 일괄 분석은 TA)
+    # - course_id: 리포트가 속한 과목 (과제 미지정 리포트는 NULL)
+    # - priority_class: 'interactive' (학생 요청) / 'batch' (TA 일괄 분석)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True, index=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='SET NULL'), nullable=True)
+    priority_class = db.Column(db.String(20), nullable=False, default='interactive', server_default='interactive')
+
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    report = db.relationship('AnalysisReport', backref=db.backref('jobs', lazy=True, cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f'<AnalysisJob {self.id} {self.stage} (Report {self.report_id}) - {self.status}>'
+
+
+# --- 4. [신규] QuestionPoolItem 모델 (리포트별 대기 질문 풀) ---
+
+class QuestionPoolItem(db.Model):
+    """
+    리포트의 대기 질문 1개 (기존 analysis_reports.questions_pool JSON 리스트를 행 단위로 분리)
+    - 다음 질문 꺼내기는 position이 가장 작은 행을 DELETE ... RETURNING으로 원자적으로 제거
+      (여러 탭/워커가 동시에 꺼내도 같은 질문이 두 번 나가지 않음)
+    """
+    __tablename__ = 'question_pool_items'
+    __table_args__ = (
+        db.Index('ix_question_pool_items_report_position', 'report_id', 'position'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.String(36), db.ForeignKey('analysis_reports.id', ondelete='CASCADE'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    # 'critical' / 'perspective' / 'innovative'
+    type = db.Column(db.String(30), nullable=True)
+    question = db.Column(db.Text, nullable=False)
+
+    report = db.relationship('AnalysisReport', backref=db.backref('pool_items', lazy=True, cascade="all, delete-orphan"))
+
+    def to_dict(self):
+        return {"type": self.type, "question": self.question}
+
+    def __repr__(self):
+        return f'<QuestionPoolItem {self.id} (Report {self.report_id}) #{self.position}>'
+
+
+# --- 5. [신규] QATurn 모델 (리포트별 질문/답변 기록) ---
+
+class QATurn(db.Model):
+    """
+    질문 1개와 그 답변 (기존 analysis_reports.qa_history JSON 리스트를 행 단위로 분리)
+    - 답변 저장은 해당 행만 UPDATE (심화 질문 생성 스레드가 방금 저장된 답변을 덮어쓰지 않음)
+    - 심화 질문의 대화 맥락은 parent_question_id 인덱스로 부모를 따라 올라가며 조회
+    """
+    __tablename__ = 'qa_turns'
+    __table_args__ = (
+        db.Index('ix_qa_turns_report_position', 'report_id', 'position'),
+        db.Index('ix_qa_turns_state_speculative_at', 'state', 'speculative_at'),
+    )
+
+    question_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    report_id = db.Column(db.String(36), db.ForeignKey('analysis_reports.id', ondelete='CASCADE'), nullable=False)
+    # 심화 질문이면 부모 질문 ID (초기/풀 질문은 NULL)
+    parent_question_id = db.Column(db.String(36), nullable=True, index=True)
+    # 리포트 내 표시 순서
+    position = db.Column(db.Integer, nullable=False, default=0)
+    # 'critical' / 'perspective' / 'innovative' / 'deep_dive'
+    type = db.Column(db.String(30), nullable=True)
+    question = db.Column(db.Text, nullable=False)
+    answer = db.Column(db.Text, nullable=True)
+    # [신규] 'active' (기록에 표시) / 'speculative' (답변 직후 미리 생성해 둔 심화 질문, 요청 시 공개) / 'expired' (미사용 만료)
+    state = db.Column(db.String(20), nullable=False, default='active', server_default='active')
+    # [신규] 미리 생성된 시각 (추측 생성이 아닌 질문은 NULL) - 만료 판단 및 적중률 집계용
+    speculative_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    answered_at = db.Column(db.DateTime, nullable=True)
+
+    report = db.relationship('AnalysisReport', backref=db.backref('qa_turns', lazy=True, cascade="all, delete-orphan"))
+
+    def to_dict(self):
+        """기존 qa_history 항목과 같은 형태"""
+        return {
+            "question_id": self.question_id,
+            "question": self.question,
+            "type": self.type,
+            "answer": self.answer,
+            "parent_question_id": self.parent_question_id
+        }
+
+    def __repr__(self):
+        return f'<QATurn {self.question_id} (Report {self.report_id}) #{self.position}>'
+
+
+# --- 6. [신규] ConversationSummary 모델 (리포트별 이전 대화 누적 요약) ---
+
+class ConversationSummary(db.Model):
+    """
+    심화 질문/발전 아이디어 프롬프트에 넣는 '오래된 대화'의 누적 요약 (services/conversation_context_service.py)
+    - [수정] 대화 맥락별로 1개: context_key = 'report' (발전 아이디어, 기록 전체) 또는 심화 질문 체인의 첫 질문 ID
+    - covered_question_ids(JSON 리스트)의 질문은 이미 요약에 반영됨 (이후 새로 밀려난 질문만 증분 반영)
+    """
+    __tablename__ = 'conversation_summaries'
+
+    report_id = db.Column(db.String(36), db.ForeignKey('analysis_reports.id', ondelete='CASCADE'), primary_key=True)
+    context_key = db.Column(db.String(36), primary_key=True, default='report')
+    summary = db.Column(db.Text, nullable=False, default='')
+    covered_question_ids = db.Column(db.Text, nullable=False, default='[]')
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+
+    report = db.relationship('AnalysisReport', backref=db.backref('conversation_summaries', lazy=True, cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f'<ConversationSummary (Report {self.report_id}, {self.context_key})>'
+
+
 
 
 class Course(db.Model):
@@ -0,0 +1,348 @@
+import os
+import uuid
+import json
+import time
+import hashlib
+import tempfile
+import traceback
+import contextlib
+
+import numpy as np
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트 공용 헬퍼] backend/test_*.py 스크립트가 함께 사용
+# - check(): 결과를 ✅/❌로 출력하고 실패하면 AssertionError (pytest로 실행해도 같은 판정)
+# - run_tests(): `python test_xxx.py`로 직접 실행할 때 테스트 함수들을 차례로 실행하고 종료 코드 반환
+# - create_test_app(): 모델만 올린 작은 Flask 앱 (임시 SQLite 파일 DB)
+# - create_migration_app(): 빈 임시 SQLite에 Alembic 마이그레이션을 지정 revision까지 적용한 앱
+# - load_backend_app(): 실제 app.py(라우트/작업 큐/파이프라인)를 임시 SQLite + 가짜 LLM/임베딩으로 로드
+#   (네트워크/모델 다운로드 없이 실행, 작업 큐 워커는 띄우지 않고 drain_jobs()로 직접 실행)
+# - 주의: config.py는 임포트 시점에 환경 변수를 읽으므로, 테스트 스크립트는 이 모듈을 가장 먼저 임포트해야 함
+# --------------------------------------------------------------------------------------
+
+_TMP_DIR = tempfile.mkdtemp(prefix="aita-test-")
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{os.path.join(_TMP_DIR, 'backend.db')}")
+os.environ.setdefault('JWT_SECRET_KEY', 'test-jwt-secret-key-0123456789abcdef')
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-0123456789abcdef')
+os.environ.setdefault('JOB_WORKERS_IN_WEB', 'false')
+os.environ.setdefault('JOB_RETRY_BASE_DELAY', '0')
+os.environ.setdefault('NAVER_API_KEY', 'test-key')
+os.environ.setdefault('NAVER_CLOVA_URL2', 'http://127.0.0.1:9/unused')
+# (실제 임베딩 모델은 쓰지 않으므로 모델 다운로드를 시도하지 않음)
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+
+
+def check(name, condition):
+    print(f"{'✅' if condition else '❌'} {name}")
+    if not condition:
+        raise AssertionError(name)
+
+
+def run_tests(title, tests):
+    """테스트 함수들을 차례로 실행하고 실패 건수를 출력합니다. (반환: 종료 코드)"""
+    print(f"=== [{title} 회귀 테스트 시작] ===")
+    failures = []
+    for test in tests:
+        print(f"\n--- {test.__name__} ---")
+        try:
+            test()
+        except AssertionError:
+            failures.append(test.__name__)
+        except Exception:
+            traceback.print_exc()
+            failures.append(test.__name__)
+    print(f"\n=== 결과: 실패 {len(failures)}건 {failures if failures else ''}===")
+    return 1 if failures else 0
+
+
+def temp_path(name):
+    """테스트 실행 동안 유지되는 임시 파일 경로"""
+    return os.path.join(_TMP_DIR, f"{uuid.uuid4().hex[:8]}-{name}")
+
+
+def create_test_app(db_path=None):
+    """모델 테이블만 만든 작은 Flask 앱 (서비스 함수 단위 테스트용)"""
+    from flask import Flask
+    from extensions import db
+    import models  # (테이블 등록)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path or temp_path('service.db')}"
+    # (동시 쓰기 테스트: 잠금 대기 시간을 넉넉히)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {"connect_args": {"timeout": 30, "check_same_thread": False}}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def create_migration_app(revision):
+    """빈 임시 SQLite에 Alembic 마이그레이션을 revision까지 적용한 작은 Flask 앱 (데이터 마이그레이션 테스트용)"""
+    from flask import Flask
+    from flask_migrate import Migrate, upgrade
+    from extensions import db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{temp_path('migration.db')}"
+    db.init_app(app)
+    Migrate(app, db, directory=MIGRATIONS_DIR)
+    with app.app_context():
+        upgrade(revision=revision)
+    return app
+
+
+# --- 가짜 임베딩 / LLM ---
+class HashEmbeddingModel:
+    """텍스트 해시로 고정된 무작위 벡터 (같은 텍스트 -> 같은 벡터). vectors에 지정한 텍스트는 그 벡터를 사용"""
+
+    def __init__(self, dim=32):
+        self.dim = dim
+        self.vectors = {}
+        self.encoded = []
+
+    def vector(self, text):
+        if text in self.vectors:
+            return np.asarray(self.vectors[text], dtype=np.float32)
+        seed = int.from_bytes(hashlib.sha256(str(text).encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+
+    def encode(self, texts, **kwargs):
+        if isinstance(texts, str):
+            self.encoded.append(texts)
+            return self.vector(texts)
+        self.encoded.extend(texts)
+        return np.array([self.vector(text) for text in texts], dtype=np.float32).reshape(len(texts), self.dim)
+
+
+SUMMARY = {
+    "Core_Thesis": "전공 선택 유연화가 필요하다",
+    "Problem_Framing": "조기 전공 확정의 문제",
+    "Claim": "정보 비대칭이 선택 후회를 낳는다",
+    "Reasoning": "설문 결과와 사례",
+    "Flow_Pattern": {"nodes": {"P1": "[문제]\n조기 확정", "T1": "[주장]\n유연화"}, "edges": [["P1", "T1"]]},
+    "Conclusion_Framing": "제도 개선 제안",
+    "key_concepts": "전공 선택, 정보 비대칭, 선택 후회",
+}
+
+QUESTION_TYPES = ["critical", "perspective", "innovative"]
+
+
+def prompt_kind(prompt_text):
+    """qa_service 프롬프트 종류 (config.py 템플릿의 고정 문구로 구분)"""
+    if "추가 질문 6개" in prompt_text:
+        return "refill"
+    if "[새 대화]" in prompt_text:
+        return "summary"
+    if "소크라테스식 멘토" in prompt_text:
+        return "deep_dive"
+    return "initial"
+
+
+class FakeLLM:
+    """
+    qa_service._call_llm_json 대체
+    - 종류별 기본 응답: initial(질문 9개) / refill(6개) / deep_dive({"question"}) / summary({"summary"})
+    - overrides[kind] = callable(prompt_text)로 응답을 바꾸고, calls / prompts로 호출 기록 확인
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = []
+        self.prompts = []
+        self.overrides = {}
+
+    def count(self, kind):
+        return self.calls.count(kind)
+
+    def __call__(self, prompt_text, temperature=0.5):
+        kind = prompt_kind(prompt_text)
+        self.calls.append(kind)
+        self.prompts.append((kind, prompt_text))
+        number = len(self.calls)
+        if kind in self.overrides:
+            return self.overrides[kind](prompt_text)
+        if kind == "initial":
+            return [{"question": f"초기 질문 {number}-{i}", "type": QUESTION_TYPES[i % 3]} for i in range(9)]
+        if kind == "refill":
+            return [{"question": f"리필 질문 {number}-{i}", "type": QUESTION_TYPES[i // 2]} for i in range(6)]
+        if kind == "deep_dive":
+            return {"question": f"심화 질문 {number}"}
+        return {"summary": f"요약 {number}"}
+
+
+def fake_batch_comparison(scores=9):
+    """analysis_service._llm_call_batch_comparison 대체: 후보마다 같은 점수의 유효한 JSON 항목"""
+    from services.analysis_service import COMPARISON_SCORE_KEYS
+
+    def call(submission_json_str, candidate_json_strs, system_prompt_template):
+        return json.dumps([
+            {
+                "candidate_index": index,
+                "overall_comment": f"후보 {index} 비교",
+                "scores": {key_name: scores for key_name in COMPARISON_SCORE_KEYS},
+                "reasons": {key_name: "근거" for key_name in COMPARISON_SCORE_KEYS},
+            }
+            for index in range(len(candidate_json_strs))
+        ], ensure_ascii=False)
+    return call
+
+
+def fake_comparison_text(scores=9):
+    """analysis_service._llm_call_comparison 대체: 1:1 비교 리포트 텍스트"""
+    from services.analysis_service import COMPARISON_SCORE_KEYS
+
+    def call(submission_json_str, candidate_json_str, system_prompt_template):
+        lines = ["- **Overall Comment:** 비교", "- **Detailed Scoring:**"]
+        lines += [f"  {n}. {key_name}: {scores} – 근거" for n, key_name in enumerate(COMPARISON_SCORE_KEYS, start=1)]
+        return "\n".join(lines)
+    return call
+
+
+class OfflineGeminiModel:
+    """TA 서비스 초기화용 자리 표시 (호출하면 실패 -> 서비스의 재시도/폴백 경로)"""
+
+    def generate_content(self, *args, **kwargs):
+        raise RuntimeError("Gemini is not available in tests")
+
+
+FAKE_LLM = FakeLLM()
+FAKE_EMBEDDING = HashEmbeddingModel()
+
+_backend = None
+
+
+def load_backend_app():
+    """실제 app 모듈을 임시 SQLite + 가짜 LLM/임베딩으로 로드합니다. (프로세스당 1회, 이후 같은 모듈 반환)"""
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    from services import analysis_service, qa_service, deep_analysis_service, analysis_ta_service
+    analysis_ta_service.embedding_model = FAKE_EMBEDDING
+    analysis_ta_service.llm_client_analysis = analysis_ta_service.llm_client_analysis or OfflineGeminiModel()
+    analysis_ta_service.llm_client_comparison = analysis_ta_service.llm_client_comparison or OfflineGeminiModel()
+    analysis_service.NAVER_API_KEY = analysis_service.NAVER_API_KEY or "test-key"
+    analysis_service.embedding_model = FAKE_EMBEDDING
+    deep_analysis_service.embedding_model = FAKE_EMBEDDING
+    analysis_service._llm_call_analysis = lambda raw_text, system_prompt: json.loads(json.dumps(SUMMARY))
+    analysis_service._llm_call_batch_comparison = fake_batch_comparison()
+    analysis_service._llm_call_comparison = fake_comparison_text()
+    qa_service._call_llm_json = FAKE_LLM
+
+    import app as backend
+    from extensions import db
+    with backend.app.app_context():
+        db.create_all()
+    _backend = backend
+    return backend
+
+
+def create_user(email=None, role="student"):
+    """검증된 사용자 1명과 Authorization 헤더 (load_backend_app() 이후 사용)"""
+    from flask_jwt_extended import create_access_token
+    from extensions import db
+    from models import User
+
+    backend = load_backend_app()
+    with backend.app.app_context():
+        user = User(email or f"{uuid.uuid4().hex[:10]}@snu.ac.kr", role=role)
+        user.set_password("password")
+        user.is_verified = True
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id), additional_claims={"role": role, "email": user.email})
+        return user.id, {"Authorization": f"Bearer {token}"}
+
+
+def create_report(user_id, **fields):
+    """리포트 1건 생성 (기본값: 본문/요약이 있는 완료 리포트). 반환: report_id"""
+    from extensions import db
+    from models import AnalysisReport
+
+    backend = load_backend_app()
+    values = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "status": "completed",
+        "text_snippet": "조기 전공 확정 시스템은 학생들의 진로 탐색을 방해합니다.\n정보 비대칭성은 선택 후회를 낳습니다.",
+        "summary": json.dumps(SUMMARY, ensure_ascii=False),
+    }
+    values.update(fields)
+    with backend.app.app_context():
+        db.session.add(AnalysisReport(**values))
+        db.session.commit()
+    return values["id"]
+
+
+def drain_jobs(max_jobs=50, worker_id="test-worker"):
+    """대기 중인 작업을 워커 없이 현재 스레드에서 차례로 실행합니다. (반환: 실행한 작업 수)"""
+    from services.job_queue_service import claim_next_job, run_job
+
+    backend = load_backend_app()
+    executed = 0
+    while executed < max_jobs:
+        with backend.app.app_context():
+            job = claim_next_job(worker_id, 60)
+            if job is None:
+                break
+            run_job(job, worker_id, retry_base_delay=0)
+        executed += 1
+    return executed
+
+
+def delete_jobs(report_ids=None):
+    """테스트가 등록한 작업 삭제 (report_ids=None이면 전체). 다른 테스트의 drain_jobs()가 실행하지 않도록 정리"""
+    from extensions import db
+    from models import AnalysisJob
+
+    backend = load_backend_app()
+    with backend.app.app_context():
+        query = AnalysisJob.query
+        if report_ids is not None:
+            query = query.filter(AnalysisJob.report_id.in_(report_ids))
+        query.delete(synchronize_session=False)
+        db.session.commit()
+
+
+@contextlib.contextmanager
+def config_override(app, **values):
+    """테스트 동안 app.config 값을 바꾸고 끝나면 원래 값으로 복원"""
+    missing = object()
+    previous = {key: app.config.get(key, missing) for key in values}
+    app.config.update(values)
+    try:
+        yield app.config
+    finally:
+        for key, value in previous.items():
+            if value is missing:
+                app.config.pop(key, None)
+            else:
+                app.config[key] = value
+
+
+@contextlib.contextmanager
+def override_attributes(target, **values):
+    """테스트 동안 모듈/객체 속성(가짜 LLM 함수, 모듈 상수 등)을 바꾸고 끝나면 원래 값으로 복원"""
+    previous = {name: getattr(target, name) for name in values}
+    for name, value in values.items():
+        setattr(target, name, value)
+    try:
+        yield target
+    finally:
+        for name, value in previous.items():
+            setattr(target, name, value)
+
+
+def wait_until(predicate, timeout=10.0, interval=0.05):
+    """predicate()가 참이 될 때까지 대기 (백그라운드 스레드 결과 확인용)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return bool(predicate())
+
@@ -397,7 +397,6 @@ def seed_database():
                             
                             "is_test": False, 
                             "high_similarity_candidates": json.dumps([]),
-                            "qa_history": json.dumps([]),
                             "created_at": datetime.now()
                         }
                         
@@ -0,0 +1,137 @@
+import os
+import math
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+
+from extensions import db
+from models import AnalysisJob
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 제출 승인 제어(Admission Control) 및 LLM 동시 호출 제한 ---
+# - 분석 요청은 큐 깊이(대기 중인 파이프라인 작업 수)와 진행 중인 LLM 작업 수를 보고 승인/대기/거절(429)을 결정
+# - [수정] 진행 중인 LLM 작업 수는 analysis_jobs의 실행 중(선점 유효) 작업으로 계산 (모든 웹/워커 프로세스 공통)
+#   (`flask worker`로 분리 실행해도 웹 프로세스가 같은 값을 봄)
+# - LLM 호출은 프로세스 단위 세마포어로 동시 호출 수를 제한 (공급자 rate limit 보호)
+# --------------------------------------------------------------------------------------
+
+# 프로세스당 동시에 진행 가능한 LLM 호출 수 (초과 시 슬롯이 빌 때까지 대기)
+LLM_MAX_IN_FLIGHT = int(os.environ.get('LLM_MAX_IN_FLIGHT', 8))
+
+_llm_semaphore = threading.BoundedSemaphore(LLM_MAX_IN_FLIGHT)
+
+# 최근 작업 소요 시간 통계가 없을 때 사용하는 파이프라인 1건 예상 시간 (초)
+DEFAULT_PIPELINE_SECONDS = 60
+
+
+@contextmanager
+def llm_slot():
+    """LLM API 호출을 감싸 동시 호출 수를 제한합니다."""
+    _llm_semaphore.acquire()
+    try:
+        yield
+    finally:
+        _llm_semaphore.release()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def llm_jobs_in_flight():
+    """
+    [수정] 진행 중인 LLM 작업 수: 실행 중이고 선점(locked_until)이 유효한 작업 (모든 단계, 모든 프로세스 합계)
+    (파이프라인/리필/TA 일괄 분석 작업은 실행 시간 대부분을 LLM 호출에 씀. 선점이 만료된 작업은 유실로 보고 제외)
+    """
+    return (
+        AnalysisJob.query
+        .filter(AnalysisJob.status == 'running', AnalysisJob.locked_until >= _utcnow())
+        .count()
+    )
+
+
+def get_queue_snapshot(stage="pipeline"):
+    """대기(queued) / 실행 중(running) 작업 수"""
+    counts = dict(
+        db.session.query(AnalysisJob.status, db.func.count(AnalysisJob.id))
+        .filter(AnalysisJob.stage == stage, AnalysisJob.status.in_(['queued', 'running']))
+        .group_by(AnalysisJob.status)
+        .all()
+    )
+    return {"queued": counts.get('queued', 0), "running": counts.get('running', 0)}
+
+
+def estimate_job_seconds(stage="pipeline", sample_size=20):
+    """최근 완료된 작업의 평균 실행 시간 (초)"""
+    rows = (
+        db.session.query(AnalysisJob.started_at, AnalysisJob.finished_at)
+        .filter(
+            AnalysisJob.stage == stage,
+            AnalysisJob.status == 'done',
+            AnalysisJob.started_at.isnot(None),
+            AnalysisJob.finished_at.isnot(None)
+        )
+        .order_by(AnalysisJob.finished_at.desc())
+        .limit(sample_size)
+        .all()
+    )
+    durations = [(finished - started).total_seconds() for started, finished in rows if finished >= started]
+    if not durations:
+        return DEFAULT_PIPELINE_SECONDS
+    return sum(durations) / len(durations)
+
+
+def _estimate_wait_seconds(jobs_ahead, workers, job_seconds):
+    """앞선 작업 수 기준 시작까지의 예상 대기 시간 (워커 수만큼 병렬 처리 가정)"""
+    if jobs_ahead <= 0:
+        return 0
+    return int(math.ceil(math.ceil(jobs_ahead / max(workers, 1)) * job_seconds))
+
+
+def check_admission(config):
+    """
+    새 분석 요청 승인 여부를 판단합니다.
+    반환: (승인 여부, Retry-After 초)
+    - [수정] 대기 작업 수 + 진행 중인 LLM 작업 수가 ANALYZE_MAX_QUEUE_DEPTH + ANALYZE_MAX_IN_FLIGHT 이상이면 거절
+      (LLM 작업이 한도보다 적으면 남는 만큼 더 받고, 한도를 넘게 실행 중이면 그만큼 대기열 여유를 줄임)
+    """
+    snapshot = get_queue_snapshot()
+    in_flight = llm_jobs_in_flight()
+    max_depth = config.get('ANALYZE_MAX_QUEUE_DEPTH', 100)
+    max_in_flight = config.get('ANALYZE_MAX_IN_FLIGHT', LLM_MAX_IN_FLIGHT)
+    outstanding = snapshot["queued"] + in_flight
+    if outstanding < max_depth + max_in_flight:
+        return True, 0
+
+    # 초과분이 빠질 때까지의 예상 시간을 Retry-After로 안내 (동시 처리 수는 워커 수와 LLM 한도 중 작은 값)
+    excess = outstanding - (max_depth + max_in_flight) + 1
+    parallelism = min(config.get('JOB_WORKERS', 3), max_in_flight)
+    retry_after = _estimate_wait_seconds(excess, parallelism, estimate_job_seconds())
+    return False, max(retry_after, config.get('ANALYZE_MIN_RETRY_AFTER', 10))
+
+
+def get_queue_position(job, config):
+    """
+    등록된 작업의 대기 정보: 대기열 순번(1부터, 0이면 즉시 시작 가능)과 예상 시작 시각
+    - 앞선 대기 작업 + 실행 중인 작업이 워커 수 이상이거나, 진행 중인 LLM 작업이 한도 이상이면 'queued'로 안내
+    """
+    workers = config.get('JOB_WORKERS', 3)
+    in_flight = llm_jobs_in_flight()
+    snapshot = get_queue_snapshot(job.stage)
+    queued_ahead = (
+        AnalysisJob.query
+        .filter(AnalysisJob.stage == job.stage, AnalysisJob.status == 'queued', AnalysisJob.id < job.id)
+        .count()
+    )
+    busy = snapshot["running"] + queued_ahead
+    jobs_ahead = busy - workers + 1 # (내 앞에서 빈 워커를 기다려야 하는 작업 수)
+    queued = jobs_ahead > 0 or in_flight >= config.get('ANALYZE_MAX_IN_FLIGHT', LLM_MAX_IN_FLIGHT)
+
+    wait_seconds = _estimate_wait_seconds(jobs_ahead, workers, estimate_job_seconds(job.stage))
+    return {
+        "queued": queued,
+        "queue_position": queued_ahead + 1 if queued else 0,
+        "estimated_start_seconds": wait_seconds,
+        "estimated_start_at": (_utcnow() + timedelta(seconds=wait_seconds)).isoformat() + "Z",
+        "llm_jobs_in_flight": in_flight
+    }
@@ -5,6 +5,7 @@ import re
 import ast
 from time import sleep
 from config import IDEA_GENERATION_PROMPT
+from .admission_service import llm_slot
 
 # --------------------------------------------------------------------------------------
 # --- 1. 전역 설정 (Naver HyperCLOVA X) ---
@@ -63,7 +64,9 @@ def _call_llm_json(prompt_text):
 
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.post(NAVER_CLOVA_URL, headers=headers, json=data, stream=False)
+            # [수정] 프로세스 단위 LLM 동시 호출 제한 (services/admission_service.py)
+            with llm_slot():
+                response = requests.post(NAVER_CLOVA_URL, headers=headers, json=data, stream=False)
             response.raise_for_status()
             
             res_json = response.json()
@@ -142,6 +145,18 @@ def _format_conversation_history(qa_history_list):
 
     formatted_text_parts = []
     flow_counter = 1
+
+    # [신규] 부모 질문이 목록에 없는 심화 질문(부모가 이전 대화 요약으로 밀려난 경우)은 독립된 흐름으로 표시
+    main_qa_ids = {main_qa.get('question_id') for main_qa in main_qas}
+    for parent_id, children in deep_dive_qas.items():
+        if parent_id in main_qa_ids:
+            continue
+        for child_qa in children:
+            formatted_text_parts.append(f"--- 대화 흐름 {flow_counter} (이전 질문에 대한 심화) ---")
+            formatted_text_parts.append(f"  └─ (심화 질문) Q: {child_qa.get('question', '')}")
+            formatted_text_parts.append(f"  └─ (심화 답변) A: {child_qa.get('answer', '')}")
+            formatted_text_parts.append("\n")
+            flow_counter += 1
     
     for main_qa in main_qas:
         main_qa_id = main_qa.get('question_id')
@@ -166,16 +181,19 @@ def _format_conversation_history(qa_history_list):
 # --- 3. 메인 서비스 함수 (JSON 반환) ---
 # --------------------------------------------------------------------------------------
 
-def generate_advancement_ideas(summary_dict, snippet, qa_history_list):
+def generate_advancement_ideas(summary_dict, snippet, qa_history_list, earlier_summary=None):
     """
     [수정] 전체 대화 기록과 요약을 바탕으로 3가지 발전 아이디어를 생성합니다.
     (Python List/Dict 객체를 반환)
+    - [신규] earlier_summary: 예산 밖으로 밀려난 이전 대화의 요약 (qa_history_list는 최근 대화만)
     """
     print("[Service ADV] Generating advancement ideas (JSON)...")
 
     # 1. 입력 데이터 포맷팅
     try:
         formatted_history = _format_conversation_history(qa_history_list)
+        if earlier_summary:
+            formatted_history = f"[이전 대화 요약]\n{earlier_summary}\n\n[최근 대화]\n{formatted_history}"
         summary_text = f"""
 - 핵심 주장(Claim): {summary_dict.get('Claim', 'N/A')}
 - 사용된 근거(Reasoning_Logic): {summary_dict.get('Reasoning_Logic', 'N/A')}
@@ -12,6 +12,9 @@ from extensions import db
 from models import AnalysisReport
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tenacity import retry, stop_after_attempt, wait_exponential
+from config import BATCH_COMPARISON_SYSTEM_PROMPT
+from .admission_service import llm_slot
+from .embedding_cache import encode_cached
 
 # --------------------------------------------------------------------------------------
 # --- 1. 전역 설정 및 모델 로드 (Flask 앱 시작 시 1회 실행) ---
@@ -23,6 +26,22 @@ NAVER_API_KEY = os.environ.get('NAVER_API_KEY')     # 예: nv-... (Bearer Token)
 
 MAX_RETRIES = 3
 
+# [신규] 배치 비교 모드: 후보 K개를 1회의 구조화(JSON) 호출로 채점 (검증 실패 시 후보별 호출로 자동 폴백)
+COMPARISON_BATCH_MODE = os.environ.get('COMPARISON_BATCH_MODE', 'true').lower() in ['true', '1', 't']
+
+# 비교 리포트의 6개 항목 점수 키 (Reasoning은 총점 계산 시 가중치 2배)
+COMPARISON_SCORE_KEYS = [
+    "Core Thesis Similarity",
+    "Problem Framing Similarity",
+    "Claim Similarity",
+    "Reasoning Similarity",
+    "Flow Pattern Similarity",
+    "Conclusion Framing Similarity",
+]
+
+# [신규] 고유사도 판정 기준 (가중 총점, 만점 70)
+HIGH_SIMILARITY_THRESHOLD = 50
+
 # [모델 설정] - S-BERT (로컬 임베딩 모델 유지)
 EMBEDDING_MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
 
@@ -69,7 +88,9 @@ def _call_naver_api(messages, max_tokens=4096, temperature=0.5):
     }
 
     try:
-        response = requests.post(NAVER_CLOVA_URL, headers=headers, json=data, stream=False)
+        # [수정] 프로세스 단위 LLM 동시 호출 제한 (services/admission_service.py)
+        with llm_slot():
+            response = requests.post(NAVER_CLOVA_URL, headers=headers, json=data, stream=False)
         response.raise_for_status()
         
         res_json = response.json()
@@ -81,6 +102,35 @@ def _call_naver_api(messages, max_tokens=4096, temperature=0.5):
         raise e # Tenacity가 잡을 수 있게 예외를 다시 던짐
 
 
+def _extract_json(content_text):
+    """
+    LLM 응답 텍스트에서 JSON(dict/list)을 추출합니다. (3단계 방어)
+    실패 시 None을 반환합니다.
+    """
+    json_str = ""
+    match = re.search(r"```json\s*([\s\S]+?)\s*```", content_text)
+    if match:
+        json_str = match.group(1)
+    else:
+        json_match = re.search(r"(\{[\s\S]*\}|\[[\s\S]*\])", content_text.strip())
+        json_str = json_match.group(1) if json_match else content_text.strip()
+
+    try:
+        return json.loads(json_str, strict=False)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return ast.literal_eval(json_str)
+    except:
+        pass
+    try:
+        json_str_clean = json_str.replace('\n', '\\n').replace('\r', '')
+        return json.loads(json_str_clean, strict=False)
+    except:
+        pass
+    return None
+
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2, max=10),
@@ -109,32 +159,11 @@ def _llm_call_analysis(raw_text, system_prompt):
         if not content_text:
             raise Exception("Empty response from Naver API")
 
-        # --- [JSON 파싱 로직 강화] ---
-        json_str = ""
-        match = re.search(r"```json\s*([\s\S]+?)\s*```", content_text)
-        if match:
-            json_str = match.group(1)
-        else:
-            json_match = re.search(r"(\{[\s\S]*\}|\[[\s\S]*\])", content_text.strip())
-            json_str = json_match.group(1) if json_match else content_text.strip()
-
-        # 3단계 파싱 시도
-        try:
-            return json.loads(json_str, strict=False)
-        except json.JSONDecodeError:
-            pass
-        try:
-            return ast.literal_eval(json_str)
-        except:
-            pass
-        try:
-            json_str_clean = json_str.replace('\n', '\\n').replace('\r', '')
-            return json.loads(json_str_clean, strict=False)
-        except:
-            pass
-            
-        print(f"[Service Analysis] LLM_ANALYSIS_FAILED: JSON 파싱 실패. Raw: {content_text[:200]}...")
-        raise Exception("JSON parsing failed.")
+        parsed = _extract_json(content_text)
+        if parsed is None:
+            print(f"[Service Analysis] LLM_ANALYSIS_FAILED: JSON 파싱 실패. Raw: {content_text[:200]}...")
+            raise Exception("JSON parsing failed.")
+        return parsed
 
     except Exception as e:
         print(f"[Service Analysis] LLM Call Error: {e}")
@@ -179,13 +208,134 @@ def _llm_call_comparison(submission_json_str, candidate_json_str, system_prompt_
         print(f"[Service Analysis] Comparison Call Error: {e}")
         raise e
 
+
+def _build_candidates_block(candidate_json_strs):
+    """[신규] 배치 비교 프롬프트용 후보본 블록 (후보 번호 = candidate_index)"""
+    return "".join(
+        f"--- (후보본 #{index} JSON) ---\n{candidate_json_str}\n"
+        for index, candidate_json_str in enumerate(candidate_json_strs)
+    )
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=2, max=10),
+    reraise=True
+)
+def _llm_call_batch_comparison(submission_json_str, candidate_json_strs, system_prompt_template):
+    """
+    [신규] (배치 비교용) 제출본 1개와 후보본 K개를 단 1회 호출로 비교합니다.
+    제출본 JSON은 한 번만 전송되며, 응답은 후보별 항목 점수 JSON 텍스트입니다.
+    (검증은 _parse_batch_comparison에서 수행 - 네트워크 오류만 재시도)
+    """
+    full_user_prompt = system_prompt_template.format(
+        submission_json_str=submission_json_str,
+        candidates_block=_build_candidates_block(candidate_json_strs)
+    )
+
+    messages = [
+        {
+            "role": "system",
+            "content": "너는 공정한 평가자야. 제출본을 각 후보본과 독립적으로 비교하고, 결과는 반드시 유효한 JSON 리스트로만 출력해."
+        },
+        {
+            "role": "user",
+            "content": full_user_prompt
+        }
+    ]
+
+    try:
+        content_text = _call_naver_api(messages, max_tokens=4096, temperature=0.3)
+
+        if not content_text:
+            raise Exception("Empty response from Naver API (Batch Comparison)")
+
+        return content_text
+
+    except Exception as e:
+        print(f"[Service Analysis] Batch Comparison Call Error: {e}")
+        raise e
+
+
+def _validate_batch_comparison(batch_result, candidate_count):
+    """
+    [신규] 배치 비교 결과(JSON 리스트)를 검증합니다.
+    - 항목마다 candidate_index(0 ~ K-1)와 6개 항목 점수(0~10 정수)가 모두 있어야 유효
+    - 유효한 항목만 {candidate_index: entry} 형태로 반환 (누락/무효 항목은 후보별 호출로 폴백)
+    """
+    valid_entries = {}
+    if not isinstance(batch_result, list):
+        return valid_entries
+
+    for entry in batch_result:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(entry.get("candidate_index"))
+        except (TypeError, ValueError):
+            continue
+        if index < 0 or index >= candidate_count or index in valid_entries:
+            continue
+
+        raw_scores = entry.get("scores")
+        if not isinstance(raw_scores, dict):
+            continue
+        scores = {}
+        for key_name in COMPARISON_SCORE_KEYS:
+            try:
+                score = int(raw_scores.get(key_name))
+            except (TypeError, ValueError):
+                break
+            if score < 0 or score > 10:
+                break
+            scores[key_name] = score
+        if len(scores) != len(COMPARISON_SCORE_KEYS):
+            continue
+
+        reasons = entry.get("reasons") if isinstance(entry.get("reasons"), dict) else {}
+        valid_entries[index] = {
+            "overall_comment": str(entry.get("overall_comment", "")).strip(),
+            "scores": scores,
+            "reasons": reasons,
+        }
+    return valid_entries
+
+
+def _render_comparison_report(entry):
+    """
+    [신규] 배치 비교 항목을 1:1 비교(COMPARISON_SYSTEM_PROMPT)와 같은 텍스트 포맷으로 변환합니다.
+    (llm_comparison_report 필드를 그대로 사용하는 화면/QA 프롬프트와 호환)
+    """
+    lines = [
+        f"- **Overall Comment:** {entry.get('overall_comment', '')}",
+        "- **Detailed Scoring:**",
+    ]
+    for number, key_name in enumerate(COMPARISON_SCORE_KEYS, start=1):
+        reason = entry.get("reasons", {}).get(key_name, "")
+        lines.append(f"  {number}. {key_name}: {entry['scores'][key_name]} – {reason}")
+    return "\n".join(lines)
+
+
+def _parse_batch_comparison(content_text, candidate_count):
+    """
+    [신규] 배치 비교 응답 텍스트 -> {candidate_index: {"report": 비교 리포트 텍스트, "scores": 항목 점수}}
+    (scores는 검증된 구조화 점수이므로 normalize_comparison_result에서 정규식 파싱 없이 사용)
+    """
+    batch_result = _extract_json(content_text) if content_text else None
+    valid_entries = _validate_batch_comparison(batch_result, candidate_count)
+    return {
+        index: {"report": _render_comparison_report(entry), "scores": entry["scores"]}
+        for index, entry in valid_entries.items()
+    }
+
+
 def get_embedding_vector(text):
     """[신규] 텍스트를 받아 임베딩 벡터(list)를 반환합니다. (S-BERT 사용)"""
     if not embedding_model:
         print("[get_embedding_vector] ERROR: 임베딩 모델이 로드되지 않았습니다.")
         return None
     try:
-        vector = embedding_model.encode(text)
+        vector = encode_cached(embedding_model, text) # [수정] 같은 텍스트는 캐시 재사용
         return vector.tolist() # DB 저장을 위해 list로 변환
     except Exception as e:
         print(f"[get_embedding_vector] ERROR: 임베딩 생성 실패: {e}")
@@ -292,6 +442,64 @@ def find_similar_documents(submission_id, sub_thesis_vec, sub_claim_vec, top_n=3
     print(f"[find_similar_documents] 상위 {len(top_candidates)}개 후보 반환 완료.")
     return top_candidates
 
+
+def _collect_json_text(value):
+    """[신규] 요약 JSON(dict/list/str)의 모든 문자열 값을 하나의 텍스트로 이어 붙입니다."""
+    if isinstance(value, dict):
+        return " ".join(_collect_json_text(v) for v in value.values())
+    if isinstance(value, list):
+        return " ".join(_collect_json_text(v) for v in value)
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _char_bigrams(text):
+    """[신규] 공백을 제거한 문자 bigram 집합 (한국어 어절 변형에 강건)"""
+    compact = re.sub(r"\s+", "", text)
+    return {compact[i:i + 2] for i in range(len(compact) - 1)}
+
+
+def compute_lexical_overlap(submission_json_str, candidate_json_str):
+    """
+    [신규] 두 요약 JSON 간의 로컬 어휘 중복도(문자 bigram Jaccard, 0~1)를 계산합니다.
+    LLM 호출 없이 즉시 계산되므로 빠른 미리보기(Fast Preview) 점수로 사용합니다.
+    """
+    def _to_text(json_str):
+        if not json_str:
+            return ""
+        try:
+            return _collect_json_text(json.loads(json_str))
+        except (json.JSONDecodeError, TypeError):
+            return str(json_str)
+
+    sub_grams = _char_bigrams(_to_text(submission_json_str))
+    cand_grams = _char_bigrams(_to_text(candidate_json_str))
+    if not sub_grams or not cand_grams:
+        return 0.0
+    return round(len(sub_grams & cand_grams) / len(sub_grams | cand_grams), 4)
+
+
+def build_fast_preview(candidate_docs, submission_json_str):
+    """
+    [신규] 임베딩 Top-K 후보로 '잠정(provisional)' 유사도 미리보기 리스트를 만듭니다.
+    - weighted_similarity: 임베딩 가중합 (0.6:0.4)
+    - lexical_overlap: 로컬 어휘 중복도
+    LLM 정밀 비교가 끝나면 같은 필드(similarity_details)가 최종 결과로 덮어써집니다.
+    """
+    preview = []
+    for candidate in candidate_docs:
+        preview.append({
+            "candidate_id": candidate["candidate_id"],
+            "candidate_filename": candidate.get("candidate_filename"),
+            "weighted_similarity": round(float(candidate["weighted_similarity"]), 4),
+            "lexical_overlap": compute_lexical_overlap(
+                submission_json_str, candidate.get("candidate_summary_json_str")
+            ),
+            "provisional": True
+        })
+    return preview
+
 # ----------------------------------------------------
 # --- 3. 메인 서비스 함수 (app.py에서 호출) ---
 # ----------------------------------------------------
@@ -350,9 +558,10 @@ def perform_step1_analysis_and_embedding(report_id, text, json_prompt_template):
     return analysis_data
 
 
-def perform_step2_comparison(report_id, embedding_thesis, embedding_claim, submission_json_str, comparison_prompt_template):
+def perform_step2_comparison(report_id, embedding_thesis, embedding_claim, submission_json_str, comparison_prompt_template, candidate_docs=None):
     """
     [신규] 2단계: 유사 문서 검색 및 Naver LLM 정밀 비교
+    - candidate_docs가 주어지면 (빠른 미리보기에서 이미 찾은 후보) DB 검색을 생략합니다.
     """
 
     if not NAVER_API_KEY:
@@ -362,13 +571,14 @@ def perform_step2_comparison(report_id, embedding_thesis, embedding_claim, submi
     print(f"[{report_id}] Starting Step 2: Comparison...")
 
     # --- 3단계: 유사 문서 검색 (DB 쿼리) ---
-    print(f"[{report_id}] 3. 유사 문서 검색 (가중합 0.6:0.4) 시작...")
-    candidate_docs = find_similar_documents(
-        report_id, 
-        embedding_thesis, 
-        embedding_claim, 
-        top_n=3
-    )
+    if candidate_docs is None:
+        print(f"[{report_id}] 3. 유사 문서 검색 (가중합 0.6:0.4) 시작...")
+        candidate_docs = find_similar_documents(
+            report_id,
+            embedding_thesis,
+            embedding_claim,
+            top_n=3
+        )
 
     # --- 4단계: 후보 문서와 LLM 정밀 비교 (병렬 처리) ---
     print(f"[{report_id}] 4. Naver LLM 정밀 비교 (후보 {len(candidate_docs)}개) 시작...")
@@ -389,12 +599,13 @@ def perform_step2_comparison(report_id, embedding_thesis, embedding_claim, submi
             )
 
             if comparison_report_text:
-                return {
+                # [수정] 저장 시점에 점수를 1회만 파싱하여 구조화 (이후 단계는 저장된 값을 사용)
+                return normalize_comparison_result({
                     "candidate_id": candidate_id,
                     "candidate_filename": candidate_filename,
                     "weighted_similarity": candidate['weighted_similarity'],
                     "llm_comparison_report": comparison_report_text 
-                }
+                })
             else:
                 print(f"  -> WARNING: LLM (Comparison) failed for {candidate_id}.")
                 return None
@@ -403,9 +614,36 @@ def perform_step2_comparison(report_id, embedding_thesis, embedding_claim, submi
             print(f"[{report_id}] 4. 후보 {candidate['candidate_id']} 비교 중 오류: {e}")
             return None
 
-    # 병렬 처리 실행 (Requests 모듈은 Thread-safe)
+    # [신규] 배치 모드: 후보 K개를 1회 호출로 채점하고, 검증 통과 항목만 채택
+    remaining_candidates = candidate_docs
+    if COMPARISON_BATCH_MODE and len(candidate_docs) > 1:
+        batch_reports = {}
+        try:
+            batch_text = _llm_call_batch_comparison(
+                submission_json_str,
+                [candidate["candidate_summary_json_str"] for candidate in candidate_docs],
+                BATCH_COMPARISON_SYSTEM_PROMPT
+            )
+            batch_reports = _parse_batch_comparison(batch_text, len(candidate_docs))
+        except Exception as e:
+            print(f"[{report_id}] 4. 배치 비교 실패, 후보별 비교로 폴백: {e}")
+
+        remaining_candidates = []
+        for index, candidate in enumerate(candidate_docs):
+            if index in batch_reports:
+                comparison_results_list.append(normalize_comparison_result({
+                    "candidate_id": candidate["candidate_id"],
+                    "candidate_filename": candidate["candidate_filename"],
+                    "weighted_similarity": candidate['weighted_similarity'],
+                    "llm_comparison_report": batch_reports[index]["report"]
+                }, scores=batch_reports[index]["scores"]))
+            else:
+                remaining_candidates.append(candidate)
+        print(f"[{report_id}] 4. 배치 비교 {len(batch_reports)}/{len(candidate_docs)}건 채택. 폴백 {len(remaining_candidates)}건.")
+
+    # 병렬 처리 실행 (Requests 모듈은 Thread-safe) - 배치 비활성 또는 검증 실패 후보만
     with ThreadPoolExecutor(max_workers=3) as executor:
-        future_to_candidate = {executor.submit(compare_with_candidate, candidate): candidate for candidate in candidate_docs}
+        future_to_candidate = {executor.submit(compare_with_candidate, candidate): candidate for candidate in remaining_candidates}
         for future in as_completed(future_to_candidate):
             result = future.result()
             if result:
@@ -417,14 +655,7 @@ def perform_step2_comparison(report_id, embedding_thesis, embedding_claim, submi
 
 def _parse_comparison_scores(report_text):
     # 1. 점수 컨테이너 초기화
-    scores = {
-        "Core Thesis Similarity": 0, 
-        "Problem Framing Similarity": 0, 
-        "Claim Similarity": 0,
-        "Reasoning Similarity": 0, 
-        "Flow Pattern Similarity": 0, 
-        "Conclusion Framing Similarity": 0,
-    }
+    scores = {key_name: 0 for key_name in COMPARISON_SCORE_KEYS}
     
     parsed_count = 0
     
@@ -442,7 +673,7 @@ def _parse_comparison_scores(report_text):
                 pass
 
         # 3. 가중치 적용하여 총점 계산 (Reasoning * 2)
-        final_score = sum(scores.values()) + scores["Reasoning Similarity"]
+        final_score = _compute_plagiarism_score(scores)
 
     except Exception as e:
         print(f"[_parse_comparison_scores] Parsing Error: {e}")
@@ -451,14 +682,38 @@ def _parse_comparison_scores(report_text):
     return final_score, scores
 
 
+def _compute_plagiarism_score(scores):
+    """[신규] 6개 항목 점수 -> 가중 총점 (Reasoning * 2)"""
+    return sum(scores.values()) + scores["Reasoning Similarity"]
+
+
+def normalize_comparison_result(result, scores=None):
+    """
+    [신규] 비교 결과 1건에 구조화된 점수 레코드를 기록합니다. (저장 시점 1회)
+    - scores_detail: 6개 항목 점수 / plagiarism_score: 가중 총점 / is_high_similarity: 기준 충족 여부
+    - scores가 주어지면(배치 비교) 그대로 사용하고, 없으면 리포트 텍스트를 정규식으로 1회 파싱합니다.
+    - 이미 정규화된 결과는 다시 파싱하지 않습니다.
+    """
+    if scores is None and "scores_detail" in result and "plagiarism_score" in result:
+        scores = result["scores_detail"]
+        total_score = result["plagiarism_score"]
+    elif scores is None:
+        total_score, scores = _parse_comparison_scores(result.get("llm_comparison_report", ""))
+    else:
+        total_score = _compute_plagiarism_score(scores)
+
+    result['plagiarism_score'] = total_score
+    result['scores_detail'] = scores
+    result['is_high_similarity'] = total_score >= HIGH_SIMILARITY_THRESHOLD
+    return result
+
+
 def _filter_high_similarity_reports(comparison_results_list):
+    """[수정] 저장된 구조화 점수로 필터링 (정규화되지 않은 과거 데이터만 파싱)"""
     high_similarity_reports = []
-    threshold = 50
     for result in comparison_results_list:
-        report_text = result.get("llm_comparison_report", "")
-        total_score, scores_dict,  = _parse_comparison_scores(report_text)
-        if total_score >= threshold:
-            result['plagiarism_score'] = total_score
-            result['scores_detail'] = scores_dict
+        if "is_high_similarity" not in result:
+            normalize_comparison_result(result)
+        if result["is_high_similarity"]:
             high_similarity_reports.append(result)
     return high_similarity_reports
\ No newline at end of file
@@ -15,7 +15,14 @@ from time import sleep
 # [중요] Flask 앱 컨텍스트(db)가 필요합니다.
 from extensions import db
 from models import AnalysisReport, User
-from .analysis_service import _parse_comparison_scores, _filter_high_similarity_reports
+from .analysis_service import (
+    _parse_comparison_scores,
+    _filter_high_similarity_reports,
+    _build_candidates_block,
+    _parse_batch_comparison,
+    normalize_comparison_result,
+    COMPARISON_BATCH_MODE
+)
 # --------------------------------------------------------------------------------------
 # --- 1. 전역 설정 및 모델 로드 (Flask 앱 시작 시 1회 실행) ---
 # --------------------------------------------------------------------------------------
@@ -61,13 +68,15 @@ class AnalysisTAService:
     모든 모델(LLM, Embedding)이 로드되었다고 가정합니다.
     """
 
-    def __init__(self, json_prompt_template, comparison_prompt_template):
+    def __init__(self, json_prompt_template, comparison_prompt_template, batch_comparison_prompt_template=None):
         if not llm_client_analysis or not embedding_model or not llm_client_comparison:
             raise EnvironmentError("[AnalysisTAService] 서비스 모델이 정상적으로 로드되지 않았습니다.")
         
         # API 레이어(app.py 등)로부터 프롬프트 템플릿을 주입받습니다.
         self.json_prompt = json_prompt_template
         self.comparison_prompt = comparison_prompt_template
+        # [신규] 배치 비교 프롬프트 (None이면 항상 후보별 1:1 비교)
+        self.batch_comparison_prompt = batch_comparison_prompt_template
         print("[AnalysisTAService] Initialized with prompts.")
 
     
@@ -247,6 +256,37 @@ class AnalysisTAService:
                 else: print(f"[TA Service] Final Error (Comparison): {e}")
         return None
 
+    # --- [신규] 기능 4-B: 후보 K개 일괄 비교 (LLM 1회 호출) ---
+    def compare_suspicious_content_batch(self, submission_json_str: str, candidate_summary_strs: list) -> dict:
+        """
+        [TA 기능] 제출본을 후보 K개와 단 1회의 JSON 모드 호출로 비교합니다.
+        검증을 통과한 후보만 {candidate_index: {"report": 비교 리포트 텍스트, "scores": 항목 점수}}로 반환합니다.
+        (누락된 후보는 호출 측에서 compare_suspicious_content로 폴백)
+        """
+        if not llm_client_comparison or not self.batch_comparison_prompt: return {}
+
+        user_prompt = self.batch_comparison_prompt.format(
+            submission_json_str=submission_json_str,
+            candidates_block=_build_candidates_block(candidate_summary_strs)
+        )
+        config = genai.GenerationConfig(response_mime_type="application/json")
+
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = llm_client_comparison.generate_content(
+                    contents=[user_prompt],
+                    generation_config=config
+                )
+                if not response.text: raise Exception("Empty response (Batch Comparison)")
+                # 검증 실패는 재시도하지 않고 후보별 비교로 폴백
+                return _parse_batch_comparison(response.text, len(candidate_summary_strs))
+
+            except Exception as e:
+                print(f"[TA Service] LLM Batch Compare Error (Attempt {attempt + 1}): {e}")
+                if attempt < MAX_RETRIES - 1: sleep(2**attempt)
+                else: print(f"[TA Service] Final Error (Batch Comparison): {e}")
+        return {}
+
 # --- [핵심 수정] TA용 통합 기능: 일괄 분석 실행 (Batch Processing) ---
     def run_batch_analysis_for_ta(self, report_ids: list[str], ta_user_id: str | None = None):
         """
@@ -298,26 +338,39 @@ class AnalysisTAService:
                 comparison_results_list = []
                 submission_json_str = json.dumps(summary_dict, ensure_ascii=False)
 
-                for candidate in candidate_docs:
-                    print(f"  [{report_id}] -> Comparing with {candidate['candidate_id']}...")
-                    
+                # [신규] 배치 모드: 후보 K개를 1회 호출로 비교 (제출본 JSON 1회 전송)
+                batch_reports = {}
+                if COMPARISON_BATCH_MODE and len(candidate_docs) > 1:
+                    batch_reports = self.compare_suspicious_content_batch(
+                        submission_json_str,
+                        [candidate['candidate_summary_json_str'] for candidate in candidate_docs]
+                    )
+                    print(f"  [{report_id}] -> Batch comparison accepted {len(batch_reports)}/{len(candidate_docs)} candidates.")
+
+                for index, candidate in enumerate(candidate_docs):
                     # 5. 비교 대상의 파일명(original_filename) 가져오기
                     candidate_report = db.session.get(AnalysisReport, candidate['candidate_id'])
                     candidate_filename = candidate_report.original_filename if candidate_report else "Unknown Filename"
 
-                    comparison_text = self.compare_suspicious_content(
-                        submission_json_str,
-                        candidate['candidate_summary_json_str']
-                    )
+                    batch_entry = batch_reports.get(index)
+                    comparison_text = batch_entry["report"] if batch_entry else None
+                    if comparison_text is None:
+                        # 배치 결과가 없거나 검증 실패한 후보만 1:1 비교로 폴백
+                        print(f"  [{report_id}] -> Comparing with {candidate['candidate_id']}...")
+                        comparison_text = self.compare_suspicious_content(
+                            submission_json_str,
+                            candidate['candidate_summary_json_str']
+                        )
+                        sleep(1)
                     
                     if comparison_text:
-                        comparison_results_list.append({
+                        # [수정] 저장 시점에 구조화 점수 기록 (배치 결과는 검증된 점수를 그대로 사용)
+                        comparison_results_list.append(normalize_comparison_result({
                             "report_id": candidate['candidate_id'], # 6. 'candidate_id' 대신 'report_id'로 통일
                             "original_filename": candidate_filename, # 7. 파일명 추가
                             "weighted_similarity": candidate['weighted_similarity'],
                             "llm_comparison_report": comparison_text
-                        })
-                    sleep(1) 
+                        }, scores=batch_entry["scores"] if batch_entry else None))
 
                 # --- [핵심 수정] 5. DB에 모든 결과 저장 (app.py 로직과 동일하게) ---
                 
@@ -0,0 +1,178 @@
+import re
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+
+try:
+    import ahocorasick # (선택 의존성: pyahocorasick이 설치되어 있으면 C 구현으로 탐색)
+except ImportError:
+    ahocorasick = None
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 다중 패턴 개념 매처 (Aho-Corasick) ---
+# - 리포트의 key_concepts로 오토마톤을 1회 구성하고, 본문을 한 번만 훑어 모든 개념의 등장 위치를 찾음
+#   (개념 수 x 문단 수만큼 `in` 검사를 반복하지 않음)
+# - 문단/문장별 등장 개념 집합을 반환하여 뉴런 맵(동시 등장), 하이라이트, 근거 탐색 등에서 공용으로 사용
+# - 결과는 `concept in segment`와 같음 (겹치는 등장도 모두 찾고, 구간 경계를 넘는 등장은 제외)
+# --------------------------------------------------------------------------------------
+
+# 문장 분리 규칙 (deep_analysis_service의 논리 흐름 검증과 동일)
+SENTENCE_SPLIT_RE = re.compile(r'[.?!]\s+')
+
+
+def parse_key_concepts(key_concepts_str):
+    """'개념1, 개념2, ...' 문자열 -> 개념 리스트 (공백 제거, 빈 항목 제외)"""
+    return [c.strip() for c in (key_concepts_str or "").split(',') if c.strip()]
+
+
+class ConceptMatcher:
+    """
+    개념 목록으로 만든 Aho-Corasick 오토마톤.
+    개념 인덱스는 생성 시 넘긴 목록의 순서를 따릅니다. (같은 개념이 여러 번 있으면 모든 인덱스가 함께 매칭)
+    """
+
+    def __init__(self, concepts):
+        self.concepts = list(concepts)
+        self._goto = [{}]          # 상태별 전이
+        self._fail = [0]           # 실패 링크
+        self._outputs = [[]]       # 이 상태에서 끝나는 패턴 ID
+        self._output_link = [-1]   # 실패 링크를 따라가며 처음 만나는 '출력이 있는' 상태
+        self._patterns = []        # 패턴 ID -> (문자열, 개념 인덱스 목록)
+
+        self._automaton = None     # pyahocorasick 오토마톤 (설치된 경우)
+
+        pattern_ids = {}
+        for index, concept in enumerate(self.concepts):
+            if not concept:
+                continue
+            if concept in pattern_ids:
+                self._patterns[pattern_ids[concept]][1].append(index)
+                continue
+            pattern_ids[concept] = len(self._patterns)
+            self._patterns.append((concept, [index]))
+
+        if ahocorasick is not None and self._patterns:
+            self._automaton = ahocorasick.Automaton()
+            for pattern_id, (pattern, _) in enumerate(self._patterns):
+                self._automaton.add_word(pattern, pattern_id)
+            self._automaton.make_automaton()
+            return
+        for pattern_id, (pattern, _) in enumerate(self._patterns):
+            self._insert(pattern, pattern_id)
+        self._build_links()
+
+    def _insert(self, pattern, pattern_id):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._output_link.append(-1)
+            state = next_state
+        self._outputs[state].append(pattern_id)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                link = self._fail[next_state]
+                self._output_link[next_state] = link if self._outputs[link] else self._output_link[link]
+
+    def finditer(self, text):
+        """본문을 한 번 훑으며 (시작, 끝, 개념 인덱스)를 등장 순서대로 생성 (끝 위치 기준, 겹침 포함)"""
+        if self._automaton is not None:
+            for last, pattern_id in self._automaton.iter(text or ""):
+                pattern, indices = self._patterns[pattern_id]
+                for index in indices:
+                    yield last + 1 - len(pattern), last + 1, index
+            return
+        goto, fail, outputs, output_link = self._goto, self._fail, self._outputs, self._output_link
+        state = 0
+        for position, char in enumerate(text or ""):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            match_state = state if outputs[state] else output_link[state]
+            while match_state > 0:
+                for pattern_id in outputs[match_state]:
+                    pattern, indices = self._patterns[pattern_id]
+                    start = position + 1 - len(pattern)
+                    for index in indices:
+                        yield start, position + 1, index
+                match_state = output_link[match_state]
+
+    def find_all(self, text):
+        """모든 등장 위치 [(시작, 끝, 개념 인덱스)]"""
+        return list(self.finditer(text))
+
+    def hits(self, text):
+        """본문에 등장하는 개념 인덱스 집합"""
+        return {index for _, _, index in self.finditer(text)}
+
+    def segment_hits(self, text, spans):
+        """
+        spans([(시작, 끝)], 시작 위치 순, 서로 겹치지 않음) 구간별 등장 개념 인덱스 집합.
+        본문은 1회만 훑고, 구간 경계를 넘는 등장은 어느 구간에도 넣지 않습니다.
+        """
+        hits = [set() for _ in spans]
+        if not spans:
+            return hits
+        starts = [start for start, _ in spans]
+        for match_start, match_end, index in self.finditer(text):
+            # (매치는 끝 위치 순이므로 시작 위치는 앞뒤로 흔들릴 수 있음 -> 이분 탐색)
+            cursor = bisect_right(starts, match_start) - 1
+            if cursor >= 0 and match_end <= spans[cursor][1]:
+                hits[cursor].add(index)
+        return hits
+
+    def paragraph_hits(self, text, min_length=0):
+        """줄바꿈 기준 문단 중 길이가 min_length 이상인 문단 목록과 문단별 등장 개념 집합"""
+        spans = _split_spans(text, re.compile(r'\n'), min_length)
+        return [text[start:end] for start, end in spans], self.segment_hits(text, spans)
+
+    def sentence_hits(self, text, min_length=0):
+        """문장([.?!] + 공백 기준, 앞뒤 공백 제거) 목록과 문장별 등장 개념 집합"""
+        spans = _split_spans(text, SENTENCE_SPLIT_RE, min_length, strip=True)
+        return [text[start:end] for start, end in spans], self.segment_hits(text, spans)
+
+
+def _split_spans(text, separator_re, min_length, strip=False):
+    """separator_re로 나눈 구간의 (시작, 끝) 목록 (strip=True면 앞뒤 공백 제외한 위치)"""
+    text = text or ""
+    spans, start = [], 0
+    for match in list(separator_re.finditer(text)) + [None]:
+        end = match.start() if match else len(text)
+        segment_start, segment_end = start, end
+        if strip:
+            while segment_start < segment_end and text[segment_start].isspace():
+                segment_start += 1
+            while segment_end > segment_start and text[segment_end - 1].isspace():
+                segment_end -= 1
+        if segment_end - segment_start >= min_length:
+            spans.append((segment_start, segment_end))
+        if match:
+            start = match.end()
+    return spans
+
+
+@lru_cache(maxsize=256)
+def _cached_matcher(concepts):
+    return ConceptMatcher(concepts)
+
+
+def get_concept_matcher(concepts):
+    """개념 목록(또는 key_concepts 문자열)의 매처 (같은 개념 목록이면 오토마톤 재사용)"""
+    if isinstance(concepts, str):
+        concepts = parse_key_concepts(concepts)
+    return _cached_matcher(tuple(concepts))
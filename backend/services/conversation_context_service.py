@@ -0,0 +1,157 @@
+import re
+import json
+from datetime import datetime, timezone
+
+from extensions import db
+from models import ConversationSummary
+from services.qa_service import summarize_conversation
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 대화 맥락 크기 제한 (심화 질문 / 발전 아이디어 프롬프트) ---
+# - 최근 질문/답변은 원문 그대로, 예산 밖으로 밀려난 오래된 질문은 누적 요약 1개로 압축
+# - 누적 요약은 대화 맥락별(기록 전체 / 심화 질문 체인)로 conversation_summaries 테이블에 캐시하고,
+#   새로 밀려난 질문만 증분 반영 (캐시 갱신분의 커밋은 호출 측)
+#   (CONVERSATION_SUMMARY_BATCH개 이상 쌓였을 때만 LLM 호출, 그 전에는 짧은 발췌로 대체)
+# - 프롬프트의 대화 부분이 CONVERSATION_CONTEXT_TOKEN_BUDGET을 넘지 않으므로 대화가 길어져도 호출 지연이 일정
+# --------------------------------------------------------------------------------------
+
+_HANGUL_RE = re.compile(r"[가-힣ㄱ-ㆎ]")
+
+# 발췌 1줄에 남길 질문/답변 글자 수
+DIGEST_QUESTION_CHARS = 60
+DIGEST_ANSWER_CHARS = 120
+
+# 기록 전체를 맥락으로 쓰는 경우(발전 아이디어)의 캐시 키 (심화 질문은 체인의 첫 질문 ID)
+REPORT_CONTEXT = 'report'
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def estimate_tokens(text):
+    """
+    토큰 수 근사치 (HyperCLOVA X 토크나이저를 쓸 수 없으므로 보수적으로 계산)
+    한글 1자 = 1토큰, 그 외 문자 4자 = 1토큰
+    """
+    if not text:
+        return 0
+    hangul = len(_HANGUL_RE.findall(text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+def _trim_to_tokens(text, budget, keep_end=False):
+    """토큰 예산에 맞게 자릅니다. keep_end=True면 뒤쪽(최근 내용)을 남김"""
+    if budget <= 0 or not text:
+        return ""
+    if estimate_tokens(text) <= budget:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        part = text[-mid:] if keep_end else text[:mid]
+        if estimate_tokens(part) + 1 <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return ("…" + text[-low:]) if keep_end else (text[:low] + "…")
+
+
+def _is_answered(turn):
+    return turn.get('answer') is not None and str(turn.get('answer')).strip() != ""
+
+
+def _turn_text(turn):
+    return f"Q: {turn.get('question', '')}\nA: {turn.get('answer', '')}"
+
+
+def _digest(turn):
+    """오래된 질문/답변 1개를 한 줄 발췌로 압축"""
+    question = " ".join(str(turn.get('question', '')).split())[:DIGEST_QUESTION_CHARS]
+    answer = " ".join(str(turn.get('answer', '')).split())[:DIGEST_ANSWER_CHARS]
+    return f"- Q: {question} / A: {answer}"
+
+
+def _fit_turn(turn, budget):
+    """가장 최근 질문 1개가 혼자서도 예산을 넘으면 답변을 잘라서라도 포함"""
+    question = _trim_to_tokens(str(turn.get('question', '')), budget // 3)
+    answer = _trim_to_tokens(str(turn.get('answer', '')), budget - estimate_tokens(question) - 4)
+    return dict(turn, question=question, answer=answer)
+
+
+def build_conversation_context(report_id, turns, config, context_key=REPORT_CONTEXT):
+    """
+    turns(표시 순서, qa_history 항목 형태)를 토큰 예산 안의 (이전 대화 요약, 최근 질문 목록)으로 줄입니다.
+    - 답변된 질문만 포함. 모두 예산 안에 들어가면 요약은 ""
+    - [수정] context_key: 누적 요약 캐시 구분 (기록 전체 = REPORT_CONTEXT, 심화 질문 체인 = 체인의 첫 질문 ID)
+    - [수정] 누적 요약 캐시 갱신분은 세션에만 추가합니다. (커밋은 호출 측)
+    """
+    total_budget = config.get('CONVERSATION_CONTEXT_TOKEN_BUDGET', 1500)
+    recent_limit = max(1, config.get('CONVERSATION_RECENT_TURNS', 4))
+    summary_budget = min(config.get('CONVERSATION_SUMMARY_TOKEN_BUDGET', 400), total_budget // 2)
+
+    answered = [turn for turn in turns if _is_answered(turn)]
+    if not answered:
+        return "", []
+
+    # 1. 최근 질문부터 원문으로 채우기 (오래된 질문이 남으면 요약 자리를 비워둠)
+    def select_recent(budget):
+        recent, used = [], 0
+        for turn in reversed(answered):
+            cost = estimate_tokens(_turn_text(turn))
+            if len(recent) >= recent_limit or (recent and used + cost > budget):
+                break
+            if not recent and cost > budget:
+                turn = _fit_turn(turn, budget)
+                cost = estimate_tokens(_turn_text(turn))
+            recent.insert(0, turn)
+            used += cost
+        return recent, used
+
+    recent, used = select_recent(total_budget)
+    if len(recent) == len(answered):
+        return "", recent
+    recent, used = select_recent(total_budget - summary_budget)
+
+    # 2. 밀려난 질문(전달받은 turns 중 recent 앞부분)은 누적 요약으로
+    older = answered[:len(answered) - len(recent)]
+    summary = _rolling_summary(report_id, context_key, older, config, summary_budget)
+    return _trim_to_tokens(summary, min(summary_budget, total_budget - used), keep_end=True), recent
+
+
+def _rolling_summary(report_id, context_key, older, config, summary_budget):
+    """older(밀려난 답변된 질문, 오래된 순) 전체를 덮는 누적 요약 (맥락별 캐시 증분 갱신, 커밋은 호출 측)"""
+    cached = db.session.get(ConversationSummary, (report_id, context_key))
+    previous = cached.summary if cached else ""
+    covered = set(json.loads(cached.covered_question_ids or "[]")) if cached else set()
+
+    # 아직 요약에 반영되지 않은 질문: 새로 밀려났거나, 요약 이후에 늦게 답변된 질문
+    pending = [turn for turn in older if turn.get('question_id') not in covered]
+    if not pending:
+        return previous
+
+    digests = "\n".join(_digest(turn) for turn in pending)
+    if len(pending) < config.get('CONVERSATION_SUMMARY_BATCH', 4):
+        # LLM 호출 없이 발췌로 대체 (요약 캐시는 그대로)
+        return f"{previous}\n{digests}".strip()
+
+    # LLM 요약 입력도 예산 안으로 제한 (원문이 길면 발췌, 그래도 길면 최근 발췌만)
+    new_turns_text = "\n\n".join(_turn_text(turn) for turn in pending)
+    fold_budget = config.get('CONVERSATION_CONTEXT_TOKEN_BUDGET', 1500)
+    if estimate_tokens(new_turns_text) > fold_budget:
+        new_turns_text = _trim_to_tokens(digests, fold_budget, keep_end=True)
+
+    # (요약 목표 분량: 한글 위주이므로 토큰 예산 ≈ 글자 수)
+    summary = summarize_conversation(previous, new_turns_text, summary_budget)
+    if not summary:
+        summary = f"{previous}\n{digests}".strip()
+    summary = _trim_to_tokens(summary, summary_budget, keep_end=True)
+
+    if cached is None:
+        cached = ConversationSummary(report_id=report_id, context_key=context_key)
+        db.session.add(cached)
+    cached.summary = summary
+    cached.covered_question_ids = json.dumps(sorted(covered | {turn.get('question_id') for turn in pending if turn.get('question_id')}))
+    cached.updated_at = _utcnow()
+    print(f"[{report_id}] Conversation summary updated ({context_key}, {len(pending)} turns folded).")
+    return summary
@@ -0,0 +1,132 @@
+import re
+import json
+import uuid
+import hashlib
+import unicodedata
+
+from extensions import db
+from models import AnalysisReport
+from services.question_pool_service import load_pool, replace_pool
+from services.qa_history_service import load_history, replace_history
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 동일 제출물 중복 제거 (Content-hash 기반 멱등 제출) ---
+# - 분석 대상 텍스트(text_snippet)를 정규화한 SHA-256 해시를 리포트에 저장
+# - 같은 사용자의 동일 제출: 진행 중이면 기존 리포트를 그대로 반환, 완료되었으면 결과를 복사 (LLM 호출 없음)
+# - 다른 사용자의 동일 제출(DEDUP_SCOPE='global'): 요약/임베딩만 재사용하고 비교/질문은 새로 실행
+#   (비교 결과는 제출자 기준이므로 복사하면 원본과의 표절 여부가 누락됨)
+# --------------------------------------------------------------------------------------
+
+DEDUP_SCOPES = ("off", "user", "global")
+
+# 완료된 동일 제출을 복사할 때 가져오는 필드 (질문/답변 기록과 질문 풀은 테이블에서 따로 복사)
+_COPIED_FIELDS = (
+    "summary", "evaluation", "logic_flow",
+    "embedding_keyconcepts_corethesis", "embedding_keyconcepts_claim",
+    "similarity_details", "high_similarity_candidates",
+    "qa_context",
+)
+
+
+def normalize_text(text):
+    """유니코드 정규화(NFC) + 연속 공백/줄바꿈을 공백 1개로 통일"""
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def compute_content_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _tier_covers(source_tier, requested_tier):
+    """원본 분석 단계가 요청한 단계 이상인지 ('full'은 'preview'를 포함)"""
+    return source_tier == requested_tier or source_tier == "full"
+
+
+def find_duplicate(user_id, content_hash, analysis_tier, scope="user"):
+    """
+    재사용할 기존 리포트를 찾습니다.
+    반환: (모드, 리포트) - 모드는 'in_progress' / 'copy' / 'reuse_analysis', 없으면 (None, None)
+    """
+    if scope not in DEDUP_SCOPES or scope == "off" or not content_hash:
+        return None, None
+
+    base = AnalysisReport.query.filter(AnalysisReport.content_hash == content_hash)
+    own = base.filter(AnalysisReport.user_id == user_id).order_by(AnalysisReport.created_at.desc()).all()
+
+    for report in own:
+        if not _tier_covers(report.analysis_tier, analysis_tier):
+            continue
+        # 프론트엔드 재시도 등으로 같은 제출이 진행 중이면 새 리포트를 만들지 않음
+        if report.status not in ("completed", "error"):
+            return "in_progress", report
+        if report.status == "completed" and report.qa_context not in (None, "failed"):
+            return "copy", report
+
+    # 1단계(요약/임베딩)가 끝난 리포트가 있으면 그 결과만 재사용
+    candidates = own if scope == "user" else base.order_by(AnalysisReport.created_at.desc()).all()
+    for report in candidates:
+        if report.summary and report.embedding_keyconcepts_corethesis and report.embedding_keyconcepts_claim:
+            return "reuse_analysis", report
+    return None, None
+
+
+# 복사본의 초기 질문 수 (나머지 최상위 질문은 질문 풀로)
+INITIAL_QUESTION_COUNT = 3
+
+
+def _top_level_questions(history):
+    return [item for item in history if not item.get("parent_question_id")]
+
+
+def _fresh_initial_history(source, history=None):
+    """원본의 초기 질문(최상위 질문 최대 3개)을 답변 없이 새 question_id로 복사합니다."""
+    history = load_history(source.id) if history is None else history
+    initial = _top_level_questions(history)[:INITIAL_QUESTION_COUNT]
+    return [{
+        "question_id": str(uuid.uuid4()),
+        "question": item.get("question"),
+        "type": item.get("type", "unknown"),
+        "answer": None,
+        "parent_question_id": None
+    } for item in initial]
+
+
+def _rebuilt_pool(source, history):
+    """
+    [수정] 복사본의 질문 풀: 원본 학생이 풀에서 이미 꺼낸 질문(초기 3개 이후의 최상위 질문) + 원본에 남은 풀
+    (남은 풀만 복사하면 복사본이 짧거나 빈 풀로 시작하여 바로 리필 LLM 호출이 발생)
+    """
+    popped = [
+        {"type": item.get("type", "unknown"), "question": item.get("question")}
+        for item in _top_level_questions(history)[INITIAL_QUESTION_COUNT:]
+        if item.get("question")
+    ]
+    pool, seen = [], set()
+    for item in popped + load_pool(source.id):
+        if item["question"] in seen:
+            continue
+        seen.add(item["question"])
+        pool.append(item)
+    return pool
+
+
+def copy_analysis(source, target):
+    """완료된 리포트의 분석 결과를 새 리포트에 복사하고 'completed'로 표시합니다. (커밋은 호출 측)"""
+    for field in _COPIED_FIELDS:
+        setattr(target, field, getattr(source, field))
+    history = load_history(source.id)
+    replace_history(target.id, _fresh_initial_history(source, history))
+    replace_pool(target.id, _rebuilt_pool(source, history))
+    target.duplicate_of = source.id
+    target.status = "completed"
+    target.error_message = None
+
+
+def reuse_analysis(source, target):
+    """요약/임베딩만 복사합니다. 파이프라인은 analyze 단계를 복원하고 비교부터 실행합니다. (커밋은 호출 측)"""
+    target.summary = source.summary
+    target.embedding_keyconcepts_corethesis = source.embedding_keyconcepts_corethesis
+    target.embedding_keyconcepts_claim = source.embedding_keyconcepts_claim
+    target.duplicate_of = source.id
+    target.status = "processing_comparison"
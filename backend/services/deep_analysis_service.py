@@ -1,13 +1,18 @@
 import os
 import json
 import re
+import hashlib
 import requests # 📦 네이버 API 호출을 위해 추가
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 from time import time, sleep
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+from .pipeline import Stage, StageGraph, PipelineContext
+from .admission_service import llm_slot
+from .embedding_cache import encode_cached
+from .concept_matcher import get_concept_matcher, parse_key_concepts
+from .revision_service import in_unchanged_region
 # 프롬프트 설정 로드
 from config import INTEGRITY_SCANNER_PROMPT, BRIDGE_CONCEPT_BATCH_PROMPT, LOGIC_FLOW_CHECK_PROMPT, CREATIVE_CONNECTION_BATCH_PROMPT
 
@@ -73,7 +78,9 @@ def _call_llm_json(prompt_text):
 
     
     try:
-        response = requests.post(NAVER_CLOVA_URL, headers=headers, json=data, stream=False)
+        # [수정] 프로세스 단위 LLM 동시 호출 제한 (services/admission_service.py)
+        with llm_slot():
+            response = requests.post(NAVER_CLOVA_URL, headers=headers, json=data, stream=False)
         response.raise_for_status()
         
         res_json = response.json()
@@ -130,7 +137,7 @@ def _call_llm_json(prompt_text):
 
 def _get_embedding(text):
     if not embedding_model: return None
-    return embedding_model.encode(text)
+    return encode_cached(embedding_model, text)
 
 def _calculate_similarity(text_a, text_b):
     vec_a = _get_embedding(text_a)
@@ -140,19 +147,58 @@ def _calculate_similarity(text_a, text_b):
 
 def extract_representative_sentences(text_sentences, query_summary, top_k=1):
     if not text_sentences or not embedding_model: return ""
-    sentence_embeddings = embedding_model.encode(text_sentences)
-    query_embedding = embedding_model.encode(query_summary)
+    sentence_embeddings = encode_cached(embedding_model, text_sentences)
+    query_embedding = encode_cached(embedding_model, query_summary)
     similarities = cosine_similarity([query_embedding], sentence_embeddings)[0]
     top_indices = np.argsort(similarities)[-top_k:][::-1]
     return text_sentences[top_indices[0]] if len(top_indices) > 0 else ""
 
+def _concept_paragraph_incidence(concepts, paragraph_hits):
+    """[신규] 개념 x 문단 포함 여부 (bool 행렬, 문단별 등장 개념 집합에서 구성)"""
+    incidence = np.zeros((len(concepts), len(paragraph_hits)), dtype=bool)
+    for p_idx, hits in enumerate(paragraph_hits):
+        incidence[list(hits), p_idx] = True
+    return incidence
+
+def _unit_rows(vectors):
+    """[신규] 행별 L2 정규화 (영벡터는 그대로 0)"""
+    vectors = np.asarray(vectors)
+    norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    norms[norms == 0.0] = 1.0
+    return vectors / norms[:, np.newaxis]
+
+def _cosine_matrix(vectors):
+    """[신규] N x N 코사인 유사도 (정규화 후 행렬곱 1회, 영벡터는 0)"""
+    unit = _unit_rows(vectors)
+    return unit @ unit.T
+
 # --------------------------------------------------------------------------------------
 # --- 3. 핵심 기능 구현 (로직은 유지하되, 순차 처리는 API 제한에 따라 조정) ---
 # --------------------------------------------------------------------------------------
-def analyze_logic_neuron_map(text, key_concepts_str, core_thesis):
+def _previous_neuron_feedback(revision, core_thesis):
+    """
+    [신규] 수정본: 원본 뉴런 맵의 LLM 결과 중 재사용 가능한 것
+    - Zone C 판정: 같은 개념 쌍 + 문맥 문단이 바뀌지 않은 경우
+    - Bridge 제안: 같은 (외딴 개념, 짝) + 핵심 주제(Core_Thesis)가 같은 경우
+    """
+    previous = (revision or {}).get("previous", {}).get("neuron_map") or {}
+    if not isinstance(previous, dict):
+        return {}, {}
+    creative = {
+        tuple(item.get("concepts", [])): item
+        for item in previous.get("creative_feedbacks", []) if len(item.get("concepts", [])) == 2
+    }
+    bridges = {}
+    if revision.get("previous_core_thesis") == core_thesis:
+        bridges = {(item.get("target_node"), item.get("partner_node")): item for item in previous.get("suggestions", [])}
+    return creative, bridges
+
+
+def analyze_logic_neuron_map(text, key_concepts_str, core_thesis, revision=None):
     """
     [Zone 기반 고도화] 논리 뉴런 맵 생성 (Full Batch Optimization)
     - LLM 호출을 단 2회(Zone C 1회 + Bridge 1회)로 최소화하여 속도 최적화
+    - [신규] revision이 있으면 바뀌지 않은 문단에 대한 원본 LLM 판정을 재사용하고 나머지만 호출
     """
     start_time = time()
     print("🚀 [Neuron Map] (Naver/Batch) 분석 시작.")
@@ -161,7 +207,7 @@ def analyze_logic_neuron_map(text, key_concepts_str, core_thesis):
     if not key_concepts_str: 
         return {"nodes": [], "edges": [], "suggestions": [], "creative_feedbacks": []}
     
-    concepts = [c.strip() for c in key_concepts_str.split(',') if c.strip()]
+    concepts = parse_key_concepts(key_concepts_str)
     if not concepts: 
         return {"nodes": [], "edges": [], "suggestions": [], "creative_feedbacks": []}
 
@@ -176,109 +222,99 @@ def analyze_logic_neuron_map(text, key_concepts_str, core_thesis):
     zone_c_candidates = [] # [{'id': 0, 'source': 'A', 'target': 'B', 'context': '...'}, ...]
     bridge_candidates = [] # [{'id': 0, 'iso': 'A', 'partner': 'B'}, ...]
     
-    paragraphs = [p for p in text.split('\n') if len(p) > 20]
+    # [수정] 20자 초과 문단과 문단별 등장 개념을 본문 1회 탐색으로 계산 (services/concept_matcher.py)
+    paragraphs, paragraph_hits = get_concept_matcher(concepts).paragraph_hits(text, min_length=21)
 
     # 1. S-BERT Batch Encoding
     if embedding_model:
-        concept_vectors = embedding_model.encode(concepts) 
+        concept_vectors = encode_cached(embedding_model, concepts)
     else:
-        concept_vectors = [None] * len(concepts) 
+        concept_vectors = None
 
-    # 2. Pairwise 분석 (N x N)
+    # 2. [수정] Pairwise 분석 (N x N) - 쌍마다 반복하지 않고 행렬로 한 번에 계산
     print("   [Neuron Map] Pairwise 계산 및 Zone 분류...")
-    zone_c_idx = 0 # Zone C 배치 ID 카운터
+    n = len(concepts)
 
-    for i in range(len(concepts)):
-        for j in range(i + 1, len(concepts)):
-            c1 = concepts[i]
-            c2 = concepts[j]
-            
-            # (A) 물리적 거리 계산
-            physical_score = 0.0
-            context_sent = ""
-            for p in paragraphs:
-                if c1 in p and c2 in p:
-                    physical_score += 1.0
-                    if not context_sent: context_sent = p # 첫 발견 문장 저장
-            physical_score = min(physical_score / 2.0, 1.0)
-
-            # (B) 의미적 거리 계산
-            if concept_vectors[i] is not None:
-                semantic_score = float(cosine_similarity([concept_vectors[i]], [concept_vectors[j]])[0][0])
-            else:
-                semantic_score = 0.0
-            
-            # --- Zone 판별 및 엣지 생성 ---
-            
-            # Case 1: Zone C (창의적/억지 연결 의심) -> 배치 리스트에 추가
-            if semantic_score < 0.4 and physical_score >= 0.5:
-                edges.append({
-                    "source": c1, "target": c2, 
-                    "weight": round(semantic_score, 2),
-                    "type": "questionable" # 프론트엔드에서 점선/물결선 표시
-                })
-                connected_status[c1] = True
-                connected_status[c2] = True
-                
-                if context_sent:
-                    zone_c_candidates.append({
-                        "id": zone_c_idx,
-                        "source": c1,
-                        "target": c2,
-                        "context": context_sent[:200] # 너무 길면 자름
-                    })
-                    zone_c_idx += 1
+    # (A) 물리적 거리: 개념 x 문단 포함 행렬 -> 두 개념이 함께 등장한 문단 수
+    incidence = _concept_paragraph_incidence(concepts, paragraph_hits)
+    co_occurrence = incidence.astype(np.int64) @ incidence.T.astype(np.int64)
+    physical = np.minimum(co_occurrence / 2.0, 1.0)
 
-            # Case 2: Zone B (잠재적 연결) -> 나중에 Bridge 후보로 사용
-            elif semantic_score > 0.55 and physical_score < 0.2:
-                potential_bridges[(c1, c2)] = semantic_score
+    # (B) 의미적 거리: 정규화 벡터의 행렬곱 1회 (임베딩 모델이 없으면 0)
+    if concept_vectors is not None:
+        semantic = _cosine_matrix(concept_vectors).astype(np.float64)
+    else:
+        semantic = np.zeros((n, n))
+
+    # --- Zone 판별 (배열 마스크, i < j 쌍만) ---
+    upper = np.triu(np.ones((n, n), dtype=bool), k=1)
+    total = (physical * 0.3) + (semantic * 0.7)
+    # Zone C (창의적/억지 연결 의심)
+    zone_c = upper & (semantic < 0.4) & (physical >= 0.5)
+    # Zone B (잠재적 연결) -> 나중에 Bridge 후보로 사용
+    zone_b = upper & ~zone_c & (semantic > 0.55) & (physical < 0.2)
+    # Zone A (일반적 강한 연결)
+    zone_a = upper & ~zone_c & ~zone_b & (total >= 0.3)
+
+    # 엣지는 기존과 같은 (i, j) 순서로 생성
+    zone_c_idx = 0 # Zone C 배치 ID 카운터
+    for i, j in zip(*np.nonzero(zone_c | zone_a)):
+        c1, c2 = concepts[i], concepts[j]
+        connected_status[c1] = True
+        connected_status[c2] = True
+
+        if zone_c[i, j]:
+            edges.append({
+                "source": c1, "target": c2, 
+                "weight": round(float(semantic[i, j]), 2),
+                "type": "questionable" # 프론트엔드에서 점선/물결선 표시
+            })
+            # 첫 발견 문단을 문맥으로 배치 리스트에 추가
+            context_sent = paragraphs[int(np.argmax(incidence[i] & incidence[j]))]
+            zone_c_candidates.append({
+                "id": zone_c_idx,
+                "source": c1,
+                "target": c2,
+                "context": context_sent[:200], # 너무 길면 자름
+                "context_full": context_sent
+            })
+            zone_c_idx += 1
+        else:
+            total_weight = float(total[i, j])
+            edges.append({
+                "source": c1, "target": c2, 
+                "weight": round(total_weight, 2),
+                "type": "strong" if total_weight > 0.55 else "normal"
+            })
 
-            # Case 3: Zone A (일반적 강한 연결)
-            else:
-                total_weight = (physical_score * 0.3) + (semantic_score * 0.7)
-                if total_weight >= 0.3:
-                    edges.append({
-                        "source": c1, "target": c2, 
-                        "weight": round(total_weight, 2),
-                        "type": "strong" if total_weight > 0.55 else "normal"
-                    })
-                    connected_status[c1] = True
-                    connected_status[c2] = True
+    for i, j in zip(*np.nonzero(zone_b)):
+        potential_bridges[(concepts[i], concepts[j])] = float(semantic[i, j])
 
     # 3. 외딴 섬(Isolated Node) Bridge 후보 선정
     isolated_nodes = [node for node, connected in connected_status.items() if not connected]
-    processed_iso_nodes = set()
     bridge_idx = 0 # Bridge 배치 ID 카운터
 
+    # 전략 1: Zone B (잠재적 연결) 활용 - 개념별 최고 점수 짝을 한 번에 계산 (동점이면 먼저 나온 쌍)
+    best_bridge = {}
+    for (p1, p2), score in potential_bridges.items():
+        for node, partner in ((p1, p2), (p2, p1)):
+            if node not in best_bridge or score > best_bridge[node][0]:
+                best_bridge[node] = (score, partner)
+            if p1 == p2:
+                break
+
+    concept_array = np.array(concepts, dtype=object)
     for iso_node in isolated_nodes:
-        if iso_node in processed_iso_nodes: continue
-        
-        best_partner = None
-        best_score = -1.0
-        
-        # 전략 1: Zone B (잠재적 연결) 활용
-        for (p1, p2), score in potential_bridges.items():
-            partner = None
-            if p1 == iso_node: partner = p2
-            elif p2 == iso_node: partner = p1
-            
-            if partner and score > best_score:
-                best_score = score
-                best_partner = partner
-
-        # 전략 2: Fallback (S-BERT 유사도 전체 검색)
-        if not best_partner:
-            try: iso_idx = concepts.index(iso_node)
-            except: continue
-            
-            best_sim = -1.0
-            for k, other in enumerate(concepts):
-                if iso_node == other: continue
-                if concept_vectors[iso_idx] is None: continue
-                sim = float(cosine_similarity([concept_vectors[iso_idx]], [concept_vectors[k]])[0][0])
-                if sim > best_sim:
-                    best_sim = sim
-                    best_partner = other
+        best_partner = best_bridge[iso_node][1] if iso_node in best_bridge else None
+
+        # 전략 2: Fallback (S-BERT 유사도 행에서 자기 자신을 제외한 최댓값)
+        if not best_partner and concept_vectors is not None:
+            row = semantic[concepts.index(iso_node)]
+            others = concept_array != iso_node
+            if others.any():
+                k = int(np.argmax(np.where(others, row, -np.inf)))
+                if row[k] > -1.0:
+                    best_partner = concepts[k]
 
         # 후보 등록
         if best_partner:
@@ -288,14 +324,26 @@ def analyze_logic_neuron_map(text, key_concepts_str, core_thesis):
                 "partner_node": best_partner
             })
             bridge_idx += 1
-            processed_iso_nodes.add(iso_node)
 
 
     # ----------------------------------------------------------------
     # [배치 처리 1] Zone C 창의성 검증 (LLM 1회 호출)
     # ----------------------------------------------------------------
     creative_feedbacks = []
-    
+    previous_creative, previous_bridges = _previous_neuron_feedback(revision, core_thesis) if revision else ({}, {})
+
+    # [신규] 수정본: 문맥 문단이 그대로인 쌍은 원본 판정 재사용
+    if previous_creative:
+        pending = []
+        for item in zone_c_candidates:
+            reused = previous_creative.get((item['source'], item['target'])) or previous_creative.get((item['target'], item['source']))
+            if reused and in_unchanged_region(item['context_full'], revision):
+                creative_feedbacks.append(reused)
+            else:
+                pending.append(item)
+        print(f"   [Neuron Map] Zone C 원본 판정 재사용 {len(zone_c_candidates) - len(pending)}건.")
+        zone_c_candidates = pending
+
     if zone_c_candidates:
         print(f"   [Neuron Map] Zone C 검증 {len(zone_c_candidates)}건 일괄 처리 중...")
         
@@ -329,7 +377,19 @@ def analyze_logic_neuron_map(text, key_concepts_str, core_thesis):
     # [배치 처리 2] Bridge 제안 생성 (LLM 1회 호출)
     # ----------------------------------------------------------------
     suggestions = []
-    
+
+    # [신규] 수정본: 같은 개념 쌍 + 같은 핵심 주제면 원본 제안 재사용
+    if previous_bridges:
+        pending = []
+        for item in bridge_candidates:
+            reused = previous_bridges.get((item['iso_node'], item['partner_node']))
+            if reused:
+                suggestions.append(reused)
+            else:
+                pending.append(item)
+        print(f"   [Neuron Map] Bridge 원본 제안 재사용 {len(bridge_candidates) - len(pending)}건.")
+        bridge_candidates = pending
+
     if bridge_candidates:
         print(f"   [Neuron Map] Bridge 제안 {len(bridge_candidates)}건 일괄 처리 중...")
         
@@ -372,14 +432,29 @@ def analyze_logic_neuron_map(text, key_concepts_str, core_thesis):
         "creative_feedbacks": creative_feedbacks
     }
 
-def scan_logical_integrity(text):
-    """[기능 2] 논리 정합성 스캐너 (Naver)"""
+def scan_logical_integrity(text, revision=None):
+    """
+    [기능 2] 논리 정합성 스캐너 (Naver)
+    - [신규] revision이 있으면 바뀐 문단만 스캔하고, 바뀌지 않은 문단에서 나온 원본 지적은 그대로 유지
+    """
     start_time = time()
     print("🔎 [Integrity] (Naver) 시작.")
+    kept_issues = []
+    previous_issues = (revision or {}).get("previous", {}).get("integrity_issues")
+    if revision and isinstance(previous_issues, list):
+        kept_issues = [
+            issue for issue in previous_issues
+            if isinstance(issue, dict) and in_unchanged_region(issue.get("quote", ""), revision)
+        ]
+        text = "\n".join(revision["changed_paragraphs"])
+        print(f"   [Integrity] 수정본: 원본 지적 {len(kept_issues)}건 유지, 바뀐 문단 {len(revision['changed_paragraphs'])}개 스캔.")
+        if not text:
+            return kept_issues
+
     prompt = INTEGRITY_SCANNER_PROMPT.format(text=text[:4000]) # 네이버 토큰 제한 고려
     issues = _call_llm_json(prompt)
     print(f"✅ [Integrity] (Naver) 완료. 시간: {time() - start_time:.3f}초")
-    return issues or []
+    return kept_issues + (issues if isinstance(issues, list) else [])
 
 def check_flow_disconnects_with_llm(flow_pattern_json, raw_text):
     """[기능 3] 흐름 단절 검사 (최적화 + 가독성 향상 적용)"""
@@ -402,19 +477,21 @@ def check_flow_disconnects_with_llm(flow_pattern_json, raw_text):
     node_label_map = {}
 
     # ------------------------------------------------------------------
-    # [최적화] 본문 임베딩 Pre-calculation
+    # [최적화] 본문 임베딩 Pre-calculation (정규화까지 1회)
     # ------------------------------------------------------------------
     embed_start = time()
     if embedding_model and raw_sentences:
-        doc_embeddings = embedding_model.encode(raw_sentences)
+        doc_unit = _unit_rows(encode_cached(embedding_model, raw_sentences))
         print(f"   [Debug] 본문 전체 임베딩 완료. 소요: {time() - embed_start:.3f}초")
     else:
-        doc_embeddings = None
+        doc_unit = None
         print("   [Debug] 임베딩 모델 없음. 스킵.")
 
     # 2. 증거 문장 추출 (Retrieval)
     retrieval_start = time()
-    
+
+    # (1) 엣지별 라벨/요약 정리
+    edge_items = []
     for idx, edge in enumerate(edges):
         parent_id, child_id = edge
         
@@ -439,24 +516,23 @@ def check_flow_disconnects_with_llm(flow_pattern_json, raw_text):
         child_summary = child_full_text.split('\n')[-1].strip()
         
         if not parent_summary or not child_summary: continue
+        edge_items.append((parent_id, child_id, p_label_text, c_label_text, parent_summary, child_summary))
+
+    # (2) [수정] 노드 요약을 중복 제거 후 1회 배치 임베딩 -> 정규화 문장 행렬과 행렬곱 1회 + 행별 argmax
+    #     (여러 엣지에 나오는 노드를 엣지마다 다시 인코딩/비교하지 않음)
+    best_sentence = {}
+    if doc_unit is not None and edge_items:
+        unique_summaries = list(dict.fromkeys(
+            summary for item in edge_items for summary in (item[4], item[5])
+        ))
+        query_unit = _unit_rows(encode_cached(embedding_model, unique_summaries))
+        best_indices = np.argmax(query_unit @ doc_unit.T, axis=1)
+        best_sentence = {
+            summary: raw_sentences[int(best_idx)] for summary, best_idx in zip(unique_summaries, best_indices)
+        }
 
-        # [최적화된 추출 로직]
-        p_rep = ""
-        c_rep = ""
-        
-        if embedding_model and doc_embeddings is not None:
-            # Parent 쿼리
-            p_query_vec = embedding_model.encode(parent_summary)
-            p_sims = cosine_similarity([p_query_vec], doc_embeddings)[0]
-            p_idx = np.argmax(p_sims)
-            p_rep = raw_sentences[p_idx]
-
-            # Child 쿼리
-            c_query_vec = embedding_model.encode(child_summary)
-            c_sims = cosine_similarity([c_query_vec], doc_embeddings)[0]
-            c_idx = np.argmax(c_sims)
-            c_rep = raw_sentences[c_idx]
-        
+    # (3) 엣지 문맥 구성 (조회만)
+    for parent_id, child_id, p_label_text, c_label_text, parent_summary, child_summary in edge_items:
         # [핵심 수정] Edge Key를 가독성 있게 변경
         # 예: "[문제 제기] P1 -> [핵심 주장] T1"
         edge_key = f"{p_label_text} ({parent_id}) -> {c_label_text} ({child_id})"
@@ -465,8 +541,8 @@ def check_flow_disconnects_with_llm(flow_pattern_json, raw_text):
         snippets_context[edge_key] = {
             "parent_summary": parent_summary,
             "child_summary": child_summary,
-            "parent_snippet": p_rep,
-            "child_snippet": c_rep
+            "parent_snippet": best_sentence.get(parent_summary, ""),
+            "child_snippet": best_sentence.get(child_summary, "")
         }
 
     print(f"   [Debug] 스니펫 추출 완료. 엣지 {len(edges)}개 처리 소요: {time() - retrieval_start:.3f}초")
@@ -512,62 +588,88 @@ def check_flow_disconnects_with_llm(flow_pattern_json, raw_text):
 # --------------------------------------------------------------------------------------
 # --- 4. 메인 진입 ---
 # --------------------------------------------------------------------------------------
-def perform_deep_analysis_async(summary_json, raw_text, on_task_complete):
+# [신규] 심층 분석 단계 그래프: 세 분석은 서로 독립이므로 모두 병렬 실행
+DEEP_ANALYSIS_PIPELINE = StageGraph("deep_analysis", [
+    Stage(
+        "neuron_map",
+        lambda ctx: {"neuron_map": analyze_logic_neuron_map(
+            ctx.get("text"), ctx.get("summary").get('key_concepts', ''), ctx.get("summary").get('Core_Thesis', ''),
+            revision=ctx.get("revision", None)
+        )},
+        inputs=["text", "summary"], outputs=["neuron_map"]
+    ),
+    Stage(
+        "integrity_issues",
+        lambda ctx: {"integrity_issues": scan_logical_integrity(ctx.get("text"), revision=ctx.get("revision", None))},
+        inputs=["text"], outputs=["integrity_issues"]
+    ),
+    Stage(
+        "flow_disconnects",
+        lambda ctx: {"flow_disconnects": check_flow_disconnects_with_llm(
+            ctx.get("summary").get('Flow_Pattern', {}), ctx.get("text")
+        )},
+        inputs=["text", "summary"], outputs=["flow_disconnects"]
+    ),
+], initial_inputs=["text", "summary"])
+
+
+# [신규] 분석 로직(프롬프트 외)이 결과를 바꾸도록 수정되면 올림 -> 기존 캐시 결과 무효화
+DEEP_ANALYSIS_LOGIC_VERSION = 1
+
+
+def deep_analysis_key(summary_json, raw_text, revision_basis=None):
+    """
+    [신규] 심층 분석 결과 캐시 키: hash(요약, 본문, 프롬프트 버전)
+    (프롬프트 버전은 사용하는 프롬프트 원문의 해시이므로 config.py의 프롬프트를 고치면 자동으로 바뀜)
+    [수정] revision_basis(revision_service.revision_basis): 수정본이면 원본 ID와 원본 분석 해시도 포함
+    (원본 분석 결과를 재사용하므로, 원본이 바뀌면 같은 본문이어도 다른 결과)
+    """
+    prompts = (INTEGRITY_SCANNER_PROMPT, BRIDGE_CONCEPT_BATCH_PROMPT, LOGIC_FLOW_CHECK_PROMPT, CREATIVE_CONNECTION_BATCH_PROMPT)
+    digest = hashlib.sha256()
+    digest.update(f"v{DEEP_ANALYSIS_LOGIC_VERSION}\0".encode("utf-8"))
+    for prompt in prompts:
+        digest.update(hashlib.sha256(prompt.encode("utf-8")).digest())
+    digest.update(json.dumps(summary_json or {}, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((raw_text or "").encode("utf-8"))
+    if revision_basis:
+        digest.update(b"\0")
+        digest.update(json.dumps(revision_basis, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def perform_deep_analysis_async(summary_json, raw_text, on_task_complete, revision=None):
     """
     [비동기 병렬 처리]
     3개의 분석 작업을 동시에 시작하고, 끝나는 대로 on_task_complete 콜백을 호출합니다.
+    [수정] 단계 그래프 실행기(services/pipeline.py)로 실행 (단계별 소요 시간 기록)
+    [신규] revision(revision_service.build_revision_context): 수정본이면 바뀐 문단만 재분석
     """
     start_time = time()
     print("\n--- 🧠 [DEEP ANALYSIS] 병렬 처리 시작 ---")
-    
-    key_concepts = summary_json.get('key_concepts', '')
-    core_thesis = summary_json.get('Core_Thesis', '')
-    flow_pattern = summary_json.get('Flow_Pattern', {})
-
-    # 작업 정의 (함수명, 인자 리스트, 결과 키 이름)
-    tasks = [
-        {
-            "func": analyze_logic_neuron_map,
-            "args": (raw_text, key_concepts, core_thesis),
-            "key": "neuron_map"
-        },
-        {
-            "func": scan_logical_integrity,
-            "args": (raw_text,),
-            "key": "integrity_issues"
-        },
-        {
-            "func": check_flow_disconnects_with_llm,
-            "args": (flow_pattern, raw_text),
-            "key": "flow_disconnects"
-        }
-    ]
 
     results = {}
-    
-    # ThreadPool로 3개 함수 동시 실행
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        future_to_key = {
-            executor.submit(task["func"], *task["args"]): task["key"] 
-            for task in tasks
-        }
 
-        for future in as_completed(future_to_key):
-            key = future_to_key[future]
-            try:
-                data = future.result()
-                results[key] = data
-                print(f"⚡ [Async] '{key}' 완료. DB 업데이트 요청.")
-                
-                # [핵심] 작업 하나 끝날 때마다 콜백 호출 -> DB 저장
-                if on_task_complete:
-                    on_task_complete(key, data)
-                    
-            except Exception as e:
-                print(f"❌ [Async Error] '{key}' 실패: {e}")
-                if on_task_complete:
-                    on_task_complete(key, {"error": str(e)})
+    def on_stage_complete(stage_name, outputs, error):
+        if error is not None:
+            print(f"❌ [Async Error] '{stage_name}' 실패: {error}")
+            if on_task_complete:
+                on_task_complete(stage_name, {"error": str(error)})
+            return
+
+        data = outputs[stage_name]
+        results[stage_name] = data
+        print(f"⚡ [Async] '{stage_name}' 완료. DB 업데이트 요청.")
+
+        # [핵심] 작업 하나 끝날 때마다 콜백 호출 -> DB 저장
+        if on_task_complete:
+            on_task_complete(stage_name, data)
+
+    ctx = PipelineContext(summary=summary_json or {}, text=raw_text or "")
+    if revision:
+        ctx.set("revision", revision)
+    DEEP_ANALYSIS_PIPELINE.run(ctx, max_workers=3, on_stage_complete=on_stage_complete, raise_on_error=False)
 
     total_time = time() - start_time
     print(f"--- ✅ [DEEP ANALYSIS] 전체 병렬 처리 완료. 시간: {total_time:.3f}초 ---\n")
-    return results
\ No newline at end of file
+    return results
@@ -0,0 +1,65 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 문장 임베딩 캐시 (프로세스 내 LRU) ---
+# - 같은 문장/문단은 다시 인코딩하지 않음 (수정본 재분석 시 바뀐 문장만 새로 임베딩)
+# - 키: 모델 객체 + 문장 SHA-1 (모델별로 분리)
+# --------------------------------------------------------------------------------------
+
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', 5000))
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _key(model, text):
+    return (id(model), hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+def encode_cached(model, texts):
+    """
+    model.encode와 같은 형태로 반환합니다. (str -> 벡터 1개, list -> 2차원 배열)
+    캐시에 없는 문장만 한 번에 배치 인코딩합니다.
+    """
+    single = isinstance(texts, str)
+    items = [texts] if single else list(texts)
+    keys = [_key(model, text) for text in items]
+
+    vectors = [None] * len(items)
+    missing = []
+    with _lock:
+        for index, key in enumerate(keys):
+            vector = _cache.get(key)
+            if vector is None:
+                missing.append(index)
+            else:
+                _cache.move_to_end(key)
+                vectors[index] = vector
+        _stats["hits"] += len(items) - len(missing)
+        _stats["misses"] += len(missing)
+
+    if missing:
+        # (같은 배치 안의 중복 문장은 1회만 인코딩)
+        unique_texts = list(dict.fromkeys(items[index] for index in missing))
+        encoded = dict(zip(unique_texts, model.encode(unique_texts)))
+        with _lock:
+            for index in missing:
+                vectors[index] = encoded[items[index]]
+                _cache[keys[index]] = vectors[index]
+            while len(_cache) > EMBEDDING_CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    if single:
+        return vectors[0]
+    return np.array(vectors)
+
+
+def embedding_cache_stats():
+    with _lock:
+        return {"size": len(_cache), **_stats}
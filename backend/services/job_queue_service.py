@@ -0,0 +1,547 @@
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import and_, or_, update, event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import AnalysisJob, AnalysisReport, Assignment, User
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 내구성 있는 작업 큐 (DB 테이블 기반, SQLite/Postgres 공통) ---
+# - 파이프라인 단계마다 analysis_jobs 행을 1개 등록하고, 고정 크기 워커 풀이 선점(claim)하여 실행
+# - 선점은 조건부 UPDATE 1회로 원자적으로 수행 (여러 프로세스/워커가 동시에 폴링해도 중복 실행 없음)
+# - locked_until(가시성 타임아웃)이 지난 'running' 작업은 재시작/크래시로 유실된 것으로 보고 회수
+# - 실패 시 지수 백오프로 run_after를 미뤄 재시도, max_attempts 초과 시 단계별 실패 핸들러 호출
+# - [수정] 실행 중에는 하트비트 스레드가 locked_until을 주기적으로 연장 (긴 파이프라인 작업이 회수되지 않음)
+#   연장 UPDATE가 0행이면(이미 다른 워커가 회수) 선점을 잃은 것으로 보고, 핸들러는 다음 단계 경계에서 중단
+# - [신규] 공정 분배: 제출 순서(FIFO)가 아니라 클래스 가중치 -> 과목 -> 사용자 순으로 가장 덜 쓴 쪽을 먼저 선점
+# --------------------------------------------------------------------------------------
+
+PRIORITY_CLASSES = ("interactive", "batch")
+DEFAULT_CLASS_WEIGHTS = {"interactive": 3, "batch": 1}
+
+# 단계 이름 -> (실행 핸들러(report_id), 최종 실패 핸들러(report_id, error_message))
+_STAGE_HANDLERS = {}
+
+# 같은 프로세스의 워커를 즉시 깨우기 위한 이벤트 (별도 프로세스 워커는 폴링으로 감지)
+_wakeup = threading.Event()
+
+# 워커 풀 시작 시 1회 실행할 훅 (예: 중단된 리포트 재개 스윕)
+_STARTUP_HOOKS = []
+
+# [신규] 워커 풀이 실행 중인 동안 주기적으로 실행할 작업 [(함수, 간격(초))] (예: 질문 풀 선제 리필)
+_PERIODIC_TASKS = []
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# [신규] 현재 스레드가 실행 중인 작업의 하트비트 (current_job_guard 참고)
+_local = threading.local()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def register_stage(stage, handler, on_failure=None):
+    """단계 핸들러를 등록합니다. (app.py에서 파이프라인 함수 정의 후 호출)"""
+    _STAGE_HANDLERS[stage] = (handler, on_failure)
+
+
+def register_startup_hook(hook):
+    """워커 풀이 프로세스에서 처음 시작될 때 앱 컨텍스트 안에서 실행할 함수를 등록합니다."""
+    _STARTUP_HOOKS.append(hook)
+
+
+def register_periodic_task(task, interval_seconds):
+    """[신규] 워커 풀이 실행 중인 동안 interval_seconds마다 앱 컨텍스트 안에서 실행할 함수를 등록합니다. (0 이하면 등록 안 함)"""
+    if interval_seconds and interval_seconds > 0:
+        _PERIODIC_TASKS.append((task, interval_seconds))
+
+
+def has_active_job(report_id, stage=None):
+    """리포트에 대기/실행 중인 작업이 있는지 확인합니다."""
+    query = AnalysisJob.query.filter(
+        AnalysisJob.report_id == report_id,
+        AnalysisJob.status.in_(['queued', 'running'])
+    )
+    if stage:
+        query = query.filter(AnalysisJob.stage == stage)
+    return db.session.query(query.exists()).scalar()
+
+
+def enqueue_job(report_id, stage, max_attempts=None, delay_seconds=0, priority_class="interactive", user_id=None):
+    """
+    작업을 현재 세션에 추가합니다. 커밋은 호출 측에서 수행합니다.
+    (리포트 상태 변경과 다음 단계 등록이 같은 트랜잭션으로 저장되어, 중간에 유실되지 않음)
+    - [신규] user_id를 생략하면 리포트 작성자로, course_id는 리포트의 과제 -> 과목으로 채웁니다.
+    """
+    from flask import current_app
+
+    if priority_class not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class '{priority_class}'")
+
+    course_id = None
+    report = db.session.get(AnalysisReport, report_id)
+    if report:
+        if user_id is None:
+            user_id = report.user_id
+        if report.assignment_id:
+            course_id = db.session.query(Assignment.course_id).filter_by(id=report.assignment_id).scalar()
+
+    job = AnalysisJob(
+        report_id=report_id,
+        stage=stage,
+        max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 3),
+        run_after=_utcnow() + timedelta(seconds=delay_seconds),
+        user_id=user_id,
+        course_id=course_id,
+        priority_class=priority_class
+    )
+    db.session.add(job)
+    # 커밋 직후 같은 프로세스의 대기 워커를 깨움 (_wake_workers_after_commit)
+    db.session.info['job_enqueued'] = True
+    return job
+
+
+def parse_class_weights(value):
+    """'interactive:3,batch:1' 형식의 설정값을 {클래스: 가중치}로 변환합니다. (잘못된 항목은 기본값 유지)"""
+    if isinstance(value, dict):
+        return {**DEFAULT_CLASS_WEIGHTS, **value}
+    weights = dict(DEFAULT_CLASS_WEIGHTS)
+    for item in (value or "").split(","):
+        name, _, weight = item.partition(":")
+        name = name.strip()
+        try:
+            weight = float(weight)
+        except ValueError:
+            continue
+        if name in PRIORITY_CLASSES and weight > 0:
+            weights[name] = weight
+    return weights
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers_after_commit(session):
+    if session.info.pop('job_enqueued', False):
+        _wakeup.set()
+
+
+def _claimable_filter(now):
+    return or_(
+        and_(AnalysisJob.status == 'queued', AnalysisJob.run_after <= now),
+        # 가시성 타임아웃 만료: 실행 중이던 워커가 사라진 작업
+        and_(AnalysisJob.status == 'running', AnalysisJob.locked_until < now)
+    )
+
+
+def _recent_usage(now, fair_window):
+    """
+    최근 사용량 집계: (클래스, 과목, 사용자) -> {"running", "recent", "last_started"}
+    - running: 현재 실행 중(임대 유효)인 작업 수
+    - recent: fair_window초 안에 시작된 작업 수 (워커가 1개여도 가중치 비율이 유지되도록)
+    """
+    since = now - timedelta(seconds=fair_window)
+    running = db.case((and_(AnalysisJob.status == 'running', AnalysisJob.locked_until >= now), 1), else_=0)
+    rows = (
+        db.session.query(
+            AnalysisJob.priority_class, AnalysisJob.course_id, AnalysisJob.user_id,
+            db.func.sum(running), db.func.count(AnalysisJob.id), db.func.max(AnalysisJob.started_at)
+        )
+        .filter(AnalysisJob.started_at >= since)
+        .group_by(AnalysisJob.priority_class, AnalysisJob.course_id, AnalysisJob.user_id)
+        .all()
+    )
+    return [
+        {"class": cls, "course_id": course_id, "user_id": user_id,
+         "running": int(running_count or 0), "recent": recent, "last_started": last_started}
+        for cls, course_id, user_id, running_count, recent, last_started in rows
+    ]
+
+
+def _pick_fair_job(now, class_weights, fair_window):
+    """
+    공정 분배 규칙으로 다음에 선점할 작업 id를 고릅니다.
+    1) 클래스: (실행 중 + 최근 시작 수) / 가중치가 가장 작은 클래스 (가중 공정 분배)
+    2) 과목 -> 사용자: 실행 중 작업 수, 최근 시작 수가 적은 쪽, 같으면 가장 오래전에 처리된 쪽 (라운드 로빈)
+    3) 같은 사용자 안에서는 먼저 등록된 작업
+    """
+    # 선점 가능한 작업의 (클래스, 과목, 사용자)별 선두 작업
+    heads = (
+        db.session.query(
+            AnalysisJob.priority_class, AnalysisJob.course_id, AnalysisJob.user_id,
+            db.func.min(AnalysisJob.id)
+        )
+        .filter(_claimable_filter(now))
+        .group_by(AnalysisJob.priority_class, AnalysisJob.course_id, AnalysisJob.user_id)
+        .all()
+    )
+    if not heads:
+        return None
+    if len(heads) == 1:
+        return heads[0][3]
+
+    usage = _recent_usage(now, fair_window)
+
+    def load(match):
+        rows = [row for row in usage if match(row)]
+        last_started = max((row["last_started"] for row in rows if row["last_started"]), default=datetime.min)
+        return (sum(row["running"] for row in rows), sum(row["recent"] for row in rows), last_started)
+
+    def class_share(cls):
+        running, recent, _ = load(lambda row: row["class"] == cls)
+        return (running + recent) / class_weights.get(cls, 1), -class_weights.get(cls, 1)
+
+    chosen_class = min({cls for cls, _, _, _ in heads}, key=class_share)
+
+    def owner_key(head):
+        _, course_id, user_id, job_id = head
+        same_class = lambda row: row["class"] == chosen_class
+        course_load = load(lambda row: same_class(row) and row["course_id"] == course_id) if course_id else (0, 0, datetime.min)
+        user_load = load(lambda row: same_class(row) and row["user_id"] == user_id)
+        return (course_load[:2], user_load[:2], user_load[2], job_id)
+
+    return min((head for head in heads if head[0] == chosen_class), key=owner_key)[3]
+
+
+def claim_next_job(worker_id, visibility_timeout, class_weights=None, fair_window=300):
+    """
+    실행 가능한 작업 1개를 원자적으로 선점합니다. 없으면 None.
+    후보 id를 공정 분배 규칙으로 고른 뒤 '아직 선점 가능한 경우에만' UPDATE하며, 다른 워커에게 뺏기면 다음 후보로 재시도합니다.
+    """
+    class_weights = class_weights or DEFAULT_CLASS_WEIGHTS
+    for _ in range(5):
+        now = _utcnow()
+        job_id = _pick_fair_job(now, class_weights, fair_window)
+        if job_id is None:
+            db.session.rollback()
+            return None
+
+        result = db.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, _claimable_filter(now))
+            .values(
+                status='running',
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=visibility_timeout),
+                started_at=now,
+                attempts=AnalysisJob.attempts + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return db.session.get(AnalysisJob, job_id)
+    return None
+
+
+class JobLeaseLost(Exception):
+    """[신규] 실행 중인 작업의 선점(lease)을 잃음 (가시성 타임아웃으로 다른 워커가 회수)"""
+
+
+def renew_lease(job_id, worker_id, visibility_timeout):
+    """[신규] 선점을 아직 보유한 경우에만 locked_until을 연장합니다. 0행이면 False (선점을 잃음)"""
+    result = db.session.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id, AnalysisJob.locked_by == worker_id, AnalysisJob.status == 'running')
+        .values(locked_until=_utcnow() + timedelta(seconds=visibility_timeout))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+class _LeaseHeartbeat:
+    """[신규] 작업 실행 동안 interval초마다 선점을 연장하는 스레드"""
+
+    def __init__(self, app, job_id, worker_id, visibility_timeout, interval):
+        self.app = app
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.visibility_timeout = visibility_timeout
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    renewed = renew_lease(self.job_id, self.worker_id, self.visibility_timeout)
+                except Exception as e:
+                    # 일시적인 DB 오류: 다음 주기에 다시 시도 (그 사이 만료되면 다음 연장에서 0행)
+                    db.session.rollback()
+                    print(f"[JobQueue] Job {self.job_id} 하트비트 오류: {e}")
+                    continue
+            if not renewed:
+                self.lost.set()
+                print(f"[JobQueue] Job {self.job_id} 선점 상실 ({self.worker_id}): 다른 워커가 회수함. 다음 단계에서 중단.")
+                return
+
+    def check(self):
+        if self.lost.is_set():
+            raise JobLeaseLost(f"Job {self.job_id} lease lost by {self.worker_id}")
+
+
+def current_job_guard():
+    """
+    [신규] 현재 스레드가 실행 중인 작업의 선점 확인 함수 (선점을 잃었으면 JobLeaseLost 발생). 작업 밖이면 None
+    단계를 다른 스레드에서 실행하는 핸들러(파이프라인)는 이 함수를 받아 단계 경계마다 호출합니다.
+    """
+    heartbeat = getattr(_local, "heartbeat", None)
+    return heartbeat.check if heartbeat else None
+
+
+def _finish_job(job_id, worker_id, **values):
+    """선점(lease)을 아직 보유한 경우에만 작업 상태를 갱신합니다. (회수된 작업은 건드리지 않음)"""
+    result = db.session.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id, AnalysisJob.locked_by == worker_id, AnalysisJob.status == 'running')
+        .values(locked_until=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _record_failure(job, worker_id, error_message, retry_base_delay):
+    job_id, report_id, stage = job.id, job.report_id, job.stage
+
+    if job.attempts < job.max_attempts:
+        delay = retry_base_delay * (2 ** (job.attempts - 1))
+        if _finish_job(job_id, worker_id, status='queued', last_error=error_message,
+                       run_after=_utcnow() + timedelta(seconds=delay)):
+            print(f"[JobQueue] Job {job_id} ({stage}, {report_id}) 재시도 예약: {delay}s 후 (시도 {job.attempts}/{job.max_attempts})")
+        return
+
+    if _finish_job(job_id, worker_id, status='failed', last_error=error_message, finished_at=_utcnow()):
+        print(f"[JobQueue] Job {job_id} ({stage}, {report_id}) 최종 실패: {error_message}")
+        _, on_failure = _STAGE_HANDLERS.get(stage, (None, None))
+        if on_failure:
+            try:
+                on_failure(report_id, error_message)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[JobQueue] CRITICAL: 실패 핸들러 오류 (Job {job_id}): {e}")
+
+
+def run_job(job, worker_id, retry_base_delay=10, visibility_timeout=None, heartbeat_interval=None):
+    """
+    선점한 작업 1개를 실행하고 결과(완료/재시도/실패)를 기록합니다.
+    [수정] 실행 동안 heartbeat_interval초마다 선점을 visibility_timeout초로 연장합니다. (생략하면 설정값)
+    """
+    from flask import current_app
+
+    job_id, report_id, stage = job.id, job.report_id, job.stage
+
+    if job.attempts > job.max_attempts:
+        # 가시성 타임아웃으로 회수되었지만 이미 시도 횟수를 모두 사용한 작업
+        _record_failure(job, worker_id, job.last_error or "Visibility timeout exceeded", retry_base_delay)
+        return
+
+    app = current_app._get_current_object()
+    visibility_timeout = visibility_timeout or app.config.get('JOB_VISIBILITY_TIMEOUT', 900)
+    heartbeat_interval = heartbeat_interval or app.config.get('JOB_HEARTBEAT_INTERVAL') or max(visibility_timeout / 3, 1)
+    heartbeat = _LeaseHeartbeat(app, job_id, worker_id, visibility_timeout, heartbeat_interval).start()
+    _local.heartbeat = heartbeat
+
+    handler, _ = _STAGE_HANDLERS.get(stage, (None, None))
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for stage '{stage}'")
+        print(f"[JobQueue] {worker_id} -> Job {job_id} ({stage}, {report_id}) 시작 (시도 {job.attempts}/{job.max_attempts})")
+        handler(report_id)
+        heartbeat.check()
+    except Exception as e:
+        db.session.rollback()
+        if heartbeat.lost.is_set():
+            # 회수한 워커가 작업을 이어서 실행하므로 실패/재시도를 기록하지 않음
+            print(f"[JobQueue] {worker_id} -> Job {job_id} ({stage}, {report_id}) 중단: 선점 상실 ({e})")
+            return
+        traceback.print_exc()
+        _record_failure(job, worker_id, str(e), retry_base_delay)
+        return
+    finally:
+        _local.heartbeat = None
+        heartbeat.stop()
+
+    _finish_job(job_id, worker_id, status='done', last_error=None, finished_at=_utcnow())
+
+
+def get_queue_metrics(window_hours=24):
+    """
+    [신규] 사용자별 큐 사용량 (누가 처리 용량을 쓰고 있는지 확인용)
+    - 대기/실행 중 작업 수 + 최근 window_hours 동안 완료/실패한 작업 수
+    - busy_seconds: 워커 점유 시간 합계 (실행 중 작업은 현재까지 경과 시간)
+    """
+    now = _utcnow()
+    since = now - timedelta(hours=window_hours)
+    rows = (
+        db.session.query(
+            AnalysisJob.user_id, AnalysisJob.course_id, AnalysisJob.priority_class, AnalysisJob.stage,
+            AnalysisJob.status, AnalysisJob.started_at, AnalysisJob.finished_at
+        )
+        .filter(or_(
+            AnalysisJob.status.in_(['queued', 'running']),
+            AnalysisJob.finished_at >= since
+        ))
+        .all()
+    )
+
+    users = {}
+    classes = {cls: {"queued": 0, "running": 0, "busy_seconds": 0.0} for cls in PRIORITY_CLASSES}
+    for user_id, course_id, priority_class, stage, status, started_at, finished_at in rows:
+        entry = users.setdefault(user_id, {
+            "user_id": user_id, "queued": 0, "running": 0, "done": 0, "failed": 0,
+            "busy_seconds": 0.0, "by_class": {}, "by_stage": {}, "course_ids": set()
+        })
+        entry[status] = entry.get(status, 0) + 1
+        entry["by_class"][priority_class] = entry["by_class"].get(priority_class, 0) + 1
+        entry["by_stage"][stage] = entry["by_stage"].get(stage, 0) + 1
+        if course_id:
+            entry["course_ids"].add(course_id)
+
+        busy = 0.0
+        if started_at and status == 'running':
+            busy = (now - started_at).total_seconds()
+        elif started_at and finished_at and finished_at >= started_at:
+            busy = (finished_at - started_at).total_seconds()
+        entry["busy_seconds"] += busy
+
+        class_entry = classes.setdefault(priority_class, {"queued": 0, "running": 0, "busy_seconds": 0.0})
+        class_entry["busy_seconds"] += busy
+        if status in ('queued', 'running'):
+            class_entry[status] += 1
+
+    total_busy = sum(entry["busy_seconds"] for entry in users.values()) or 1.0
+    user_rows = {
+        user_id: (email, username, role)
+        for user_id, email, username, role in
+        db.session.query(User.id, User.email, User.username, User.role)
+        .filter(User.id.in_([user_id for user_id in users if user_id is not None]))
+        .all()
+    }
+    result = []
+    for user_id, entry in users.items():
+        email, username, role = user_rows.get(user_id, (None, None, None))
+        entry.update({
+            "email": email,
+            "username": username,
+            "role": role,
+            "course_ids": sorted(entry["course_ids"]),
+            "busy_seconds": round(entry["busy_seconds"], 1),
+            "busy_share": round(entry["busy_seconds"] / total_busy, 3)
+        })
+        result.append(entry)
+    result.sort(key=lambda entry: (entry["busy_seconds"], entry["queued"] + entry["running"]), reverse=True)
+
+    for class_entry in classes.values():
+        class_entry["busy_seconds"] = round(class_entry["busy_seconds"], 1)
+    return {"window_hours": window_hours, "generated_at": now.isoformat() + "Z", "classes": classes, "users": result}
+
+
+class JobWorkerPool:
+    """
+    고정 크기 워커 풀. 각 워커 스레드가 작업을 선점 -> 실행을 반복합니다.
+    웹 프로세스 안(JOB_WORKERS_IN_WEB) 또는 `flask worker` CLI에서 실행됩니다.
+    """
+
+    def __init__(self, app, size=None):
+        self.app = app
+        self.size = size or app.config.get('JOB_WORKERS', 3)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', 2)
+        self.visibility_timeout = app.config.get('JOB_VISIBILITY_TIMEOUT', 900)
+        self.heartbeat_interval = app.config.get('JOB_HEARTBEAT_INTERVAL') or max(self.visibility_timeout / 3, 1)
+        self.retry_base_delay = app.config.get('JOB_RETRY_BASE_DELAY', 10)
+        self.class_weights = parse_class_weights(app.config.get('JOB_CLASS_WEIGHTS'))
+        self.fair_window = app.config.get('JOB_FAIR_WINDOW', 300)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for index in range(self.size):
+            worker_id = f"{prefix}:{index}"
+            thread = threading.Thread(target=self._loop, args=(worker_id,), name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if _PERIODIC_TASKS:
+            thread = threading.Thread(target=self._scheduler_loop, name="job-scheduler", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[JobQueue] 워커 {self.size}개 시작 ({prefix})")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _loop(self, worker_id):
+        while not self._stop.is_set():
+            job = None
+            with self.app.app_context():
+                try:
+                    job = claim_next_job(worker_id, self.visibility_timeout, self.class_weights, self.fair_window)
+                    if job:
+                        run_job(job, worker_id, self.retry_base_delay, self.visibility_timeout, self.heartbeat_interval)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[JobQueue] {worker_id} 루프 오류: {e}")
+            if job is None:
+                # 대기 작업이 없으면 새 작업 등록(같은 프로세스) 또는 폴링 간격까지 대기
+                _wakeup.wait(self.poll_interval)
+                _wakeup.clear()
+
+
+    def _scheduler_loop(self):
+        """[신규] 주기 작업 실행 (여러 프로세스에서 동시에 실행될 수 있으므로 작업 자체가 중복에 안전해야 함)"""
+        next_run = [0.0] * len(_PERIODIC_TASKS)
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for index, (task, interval_seconds) in enumerate(_PERIODIC_TASKS):
+                if now < next_run[index]:
+                    continue
+                next_run[index] = now + interval_seconds
+                with self.app.app_context():
+                    try:
+                        task()
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"[JobQueue] 주기 작업 오류 ({getattr(task, '__name__', task)}): {e}")
+            self._stop.wait(max(min(next_run) - time.monotonic(), 0.1))
+
+
+def start_worker_pool(app, size=None):
+    """프로세스당 1회만 워커 풀을 시작합니다."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = JobWorkerPool(app, size)
+            for hook in _STARTUP_HOOKS:
+                with app.app_context():
+                    try:
+                        hook()
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"[JobQueue] 시작 훅 오류 ({getattr(hook, '__name__', hook)}): {e}")
+            _pool.start()
+    return _pool
@@ -0,0 +1,242 @@
+import threading
+import traceback
+from time import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 선언형 단계 그래프(DAG) 실행기 ---
+# - 각 단계는 입력/출력 아티팩트 이름을 선언하고, 실행기는 입력이 준비된 단계부터 병렬 실행
+# - 중간 결과는 PipelineContext(타입 검사)를 통해 전달 (단계 사이 DB 재조회/스레드 인자 전달 불필요)
+# - restore: 이미 DB에 저장된 단계는 결과만 불러오고 건너뜀 (재시도/재개 시 완료된 LLM 호출 생략)
+# - 단계별 소요 시간을 기록
+# - [수정] guard: 단계 시작 전마다 호출하는 확인 함수 (예: 작업 큐 선점 확인). 예외를 내면 새 단계를 시작하지 않고 중단
+# --------------------------------------------------------------------------------------
+
+# 아티팩트 이름 -> 타입 (PipelineContext.set에서 검사)
+ARTIFACT_TYPES = {
+    "text": str,
+    "summary": dict,
+    "embeddings": dict,        # {"thesis": [...], "claim": [...]}
+    "candidates": list,        # find_similar_documents 결과
+    "comparisons": list,       # LLM 정밀 비교 결과 (정규화된 similarity_details)
+    "questions": dict,         # {"pool": [...], "history": [...], "context": "summary_only" | ...}
+    "neuron_map": (dict, list),
+    "integrity_issues": (dict, list),
+    "flow_disconnects": (dict, list),
+    "revision": dict,          # [신규] 수정본 맥락 (revision_service.build_revision_context)
+}
+
+
+class PipelineError(Exception):
+    """단계 실행 실패 (실패한 단계 이름 포함)"""
+
+    def __init__(self, stage_name, error):
+        self.stage_name = stage_name
+        self.error = error
+        super().__init__(f"Stage '{stage_name}' FAILED: {error}")
+
+
+class PipelineContext:
+    """
+    단계 사이에 전달되는 아티팩트 저장소. 스레드 안전하며, 선언된 타입만 허용합니다.
+    app이 주어지면 각 단계는 해당 앱 컨텍스트 안에서 실행됩니다.
+    [수정] guard가 주어지면 각 단계를 시작하기 전에 호출합니다. (예외를 내면 실행 중단)
+    """
+
+    def __init__(self, report_id=None, app=None, guard=None, **artifacts):
+        self.report_id = report_id
+        self.app = app
+        self.guard = guard
+        self.timings = {}
+        self.errors = {}
+        self.skipped = []
+        self._artifacts = {}
+        self._lock = threading.Lock()
+        for name, value in artifacts.items():
+            self.set(name, value)
+
+    def set(self, name, value):
+        expected = ARTIFACT_TYPES.get(name)
+        if expected is None:
+            raise KeyError(f"Unknown artifact '{name}'")
+        if not isinstance(value, expected):
+            raise TypeError(f"Artifact '{name}' must be {expected}, got {type(value).__name__}")
+        with self._lock:
+            self._artifacts[name] = value
+
+    def get(self, name, default=KeyError):
+        with self._lock:
+            if name in self._artifacts:
+                return self._artifacts[name]
+        if default is KeyError:
+            raise KeyError(f"Artifact '{name}' is not available")
+        return default
+
+    def has(self, name):
+        with self._lock:
+            return name in self._artifacts
+
+
+class Stage:
+    """
+    파이프라인 단계 선언
+    - func(ctx) -> {출력 이름: 값} : 선언한 outputs를 모두 반환해야 함 (출력이 없는 단계는 None 가능)
+    - restore(ctx) -> {출력 이름: 값} | None : DB에 이미 저장된 결과가 있으면 반환 (단계 생략)
+    - on_demand=True : 자체 저장 결과가 없는 중간 단계. 다른 단계가 출력을 필요로 할 때만 실행
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), restore=None, on_demand=False):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.restore = restore
+        self.on_demand = on_demand
+
+    def __repr__(self):
+        return f"<Stage {self.name} {list(self.inputs)} -> {list(self.outputs)}>"
+
+
+class StageGraph:
+    """단계 목록으로 의존성 그래프를 구성하고 검증합니다. (출력 중복/미충족 입력/순환 검사)"""
+
+    def __init__(self, name, stages, initial_inputs=()):
+        self.name = name
+        self.stages = {stage.name: stage for stage in stages}
+        self.initial_inputs = set(initial_inputs)
+        self.producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"[{name}] Artifact '{output}' is produced by both '{self.producers[output]}' and '{stage.name}'")
+                self.producers[output] = stage.name
+        for stage in stages:
+            for artifact in stage.inputs:
+                if artifact not in self.producers and artifact not in self.initial_inputs:
+                    raise ValueError(f"[{name}] Stage '{stage.name}' needs '{artifact}', which no stage produces")
+        self._check_acyclic()
+
+    def _dependencies(self, stage):
+        return {self.producers[artifact] for artifact in stage.inputs if artifact in self.producers}
+
+    def _check_acyclic(self):
+        visiting, visited = set(), set()
+
+        def visit(stage_name):
+            if stage_name in visited: return
+            if stage_name in visiting:
+                raise ValueError(f"[{self.name}] Cycle detected at stage '{stage_name}'")
+            visiting.add(stage_name)
+            for dependency in self._dependencies(self.stages[stage_name]):
+                visit(dependency)
+            visiting.discard(stage_name)
+            visited.add(stage_name)
+
+        for stage_name in self.stages:
+            visit(stage_name)
+
+    def _call(self, ctx, func):
+        if ctx.app is not None:
+            with ctx.app.app_context():
+                return func(ctx)
+        return func(ctx)
+
+    def _restore(self, ctx):
+        """저장된 결과가 있는 단계를 복원하고, 복원된 단계 이름 집합을 반환합니다."""
+        restored = set()
+        for stage in self.stages.values():
+            if not stage.restore: continue
+            outputs = self._call(ctx, stage.restore)
+            if outputs is None: continue
+            for name in stage.outputs:
+                ctx.set(name, outputs[name])
+            restored.add(stage.name)
+        return restored
+
+    def _required_stages(self, ctx, restored):
+        """실행해야 하는 단계: 복원되지 않은 일반 단계 + 그 단계들이 필요로 하는 (아직 없는) 입력의 생산 단계"""
+        required = set()
+        pending = [name for name, stage in self.stages.items() if name not in restored and not stage.on_demand]
+        while pending:
+            stage_name = pending.pop()
+            if stage_name in required: continue
+            required.add(stage_name)
+            for artifact in self.stages[stage_name].inputs:
+                producer = self.producers.get(artifact)
+                if producer and producer not in restored and not ctx.has(artifact):
+                    pending.append(producer)
+        return required
+
+    def run(self, ctx, max_workers=3, on_stage_complete=None, raise_on_error=True):
+        """
+        그래프를 실행합니다.
+        - on_stage_complete(stage_name, outputs, error): 단계가 끝날 때마다 호출 (실패 시 outputs=None)
+        - 실패한 단계의 하위 단계는 실행하지 않고, 독립적인 단계는 계속 실행
+        - raise_on_error=True면 실패가 하나라도 있을 때 마지막에 PipelineError 발생
+        - [수정] ctx.guard가 예외를 내면 그 예외를 그대로 전파 (on_stage_complete/PipelineError 없이 중단)
+          guard는 단계를 제출하기 직전과 단계가 실패했을 때 확인합니다. (선점을 잃어 실패한 단계는 단계 실패로 기록하지 않음)
+        """
+        run_start = time()
+        restored = self._restore(ctx)
+        ctx.skipped.extend(sorted(restored))
+        remaining = self._required_stages(ctx, restored)
+        blocked = set()
+        running = {}
+
+        def execute(stage):
+            stage_start = time()
+            try:
+                outputs = self._call(ctx, stage.func) or {}
+                for name in stage.outputs:
+                    if name not in outputs:
+                        raise KeyError(f"Stage '{stage.name}' did not return '{name}'")
+                    ctx.set(name, outputs[name])
+                return outputs
+            finally:
+                ctx.timings[stage.name] = round(time() - stage_start, 3)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while remaining or running:
+                # 입력이 모두 준비된 단계 제출
+                for stage_name in sorted(remaining):
+                    stage = self.stages[stage_name]
+                    if any(self.producers.get(artifact) in blocked for artifact in stage.inputs if not ctx.has(artifact)):
+                        remaining.discard(stage_name)
+                        blocked.add(stage_name)
+                        continue
+                    if all(ctx.has(artifact) for artifact in stage.inputs):
+                        if ctx.guard:
+                            # (예외가 나면 새 단계는 제출하지 않고, 이미 실행 중인 단계가 끝나길 기다린 뒤 전파)
+                            ctx.guard()
+                        remaining.discard(stage_name)
+                        running[executor.submit(execute, stage)] = stage
+
+                if not running:
+                    # 남은 단계는 실패한 단계에 의존하여 실행 불가
+                    blocked.update(remaining)
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        outputs = future.result()
+                        error = None
+                    except Exception as e:
+                        if ctx.guard:
+                            ctx.guard()  # (선점을 잃어 실패한 단계면 단계 실패 대신 guard 예외를 전파)
+                        traceback.print_exc()
+                        outputs, error = None, e
+                        ctx.errors[stage.name] = e
+                        blocked.add(stage.name)
+                    print(f"[{self.name}:{ctx.report_id}] Stage '{stage.name}' {'FAILED' if error else 'done'} ({ctx.timings.get(stage.name)}s)")
+                    if on_stage_complete:
+                        on_stage_complete(stage.name, outputs, error)
+
+        ctx.timings["_total"] = round(time() - run_start, 3)
+        print(f"[{self.name}:{ctx.report_id}] Timings: {ctx.timings} (restored: {sorted(restored) or '-'})")
+
+        if raise_on_error and ctx.errors:
+            stage_name, error = next(iter(ctx.errors.items()))
+            raise PipelineError(stage_name, error)
+        return ctx
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import func, or_
+
+from extensions import db
+from models import AnalysisReport, QATurn, QuestionPoolItem
+from services.job_queue_service import enqueue_job
+from services.question_pool_service import try_acquire_refill_lock
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 질문 풀 선제 리필 (Low/High watermark) ---
+# - 학생이 질문을 다 꺼내기 전에 미리 채워, '다음 질문' 요청이 리필 대기(503)를 거의 만나지 않도록 함
+# - 주기 점검: 최근 QUESTION_POOL_ACTIVE_WINDOW초 안에 질문/답변 활동이 있는 완료 리포트 중
+#   풀 크기가 LOW 미만인 리포트를 최근 활동 순으로 골라 리필 작업 등록
+# - 중복 방지는 원자적 리필 잠금(try_acquire_refill_lock)에 맡기므로 여러 프로세스에서 동시에 실행해도 안전
+# --------------------------------------------------------------------------------------
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def find_reports_needing_refill(low_watermark, active_window_seconds, limit=20):
+    """리필이 필요한 활성 리포트 [(report_id, 풀 크기, 마지막 활동 시각)] (최근 활동 순)"""
+    since = _utcnow() - timedelta(seconds=active_window_seconds)
+    last_activity = func.max(func.coalesce(QATurn.answered_at, QATurn.created_at))
+    recent = (
+        db.session.query(QATurn.report_id, last_activity.label("last_activity"))
+        .filter(or_(QATurn.answered_at >= since, QATurn.created_at >= since))
+        .group_by(QATurn.report_id)
+        .subquery()
+    )
+    pool = (
+        db.session.query(QuestionPoolItem.report_id, func.count(QuestionPoolItem.id).label("pool_size"))
+        .group_by(QuestionPoolItem.report_id)
+        .subquery()
+    )
+    pool_size = func.coalesce(pool.c.pool_size, 0)
+    return (
+        db.session.query(AnalysisReport.id, pool_size, recent.c.last_activity)
+        .join(recent, recent.c.report_id == AnalysisReport.id)
+        .outerjoin(pool, pool.c.report_id == AnalysisReport.id)
+        .filter(
+            AnalysisReport.status == "completed",
+            or_(AnalysisReport.is_refilling.is_(False), AnalysisReport.is_refilling.is_(None)),
+            pool_size < low_watermark
+        )
+        .order_by(recent.c.last_activity.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def maintain_question_pools(config):
+    """주기 점검 1회: 풀이 LOW 미만인 활성 리포트에 리필 작업을 등록합니다. 반환: 등록한 리포트 ID 목록"""
+    candidates = find_reports_needing_refill(
+        config.get('QUESTION_POOL_LOW_WATERMARK', 4),
+        config.get('QUESTION_POOL_ACTIVE_WINDOW', 900),
+        config.get('QUESTION_POOL_MAINTENANCE_BATCH', 20)
+    )
+    scheduled = []
+    for report_id, pool_size, _ in candidates:
+        if not try_acquire_refill_lock(report_id):
+            continue
+        enqueue_job(report_id, "refill", max_attempts=1)
+        db.session.commit()
+        scheduled.append(report_id)
+        print(f"[{report_id}] Pool size ({pool_size}) below low watermark. Prefetch refill scheduled.")
+    db.session.rollback()
+    return scheduled
@@ -0,0 +1,115 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, update, func
+
+from extensions import db
+from models import QATurn, ConversationSummary
+from services.report_versioning import bump_report_sections
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 리포트별 질문/답변 기록 (qa_turns 테이블) ---
+# - 반환 형태는 기존 qa_history JSON 항목과 동일 ({question_id, question, type, answer, parent_question_id})
+# - 답변 저장은 해당 질문 행 1개만 UPDATE (미답변인 경우에만) -> 다른 요청/스레드의 기록을 덮어쓰지 않음
+# - 쓰기 함수는 리포트의 'questions' 섹션 버전을 올림 (GET /report 캐시/델타 응답 갱신). 커밋은 호출 측
+# --------------------------------------------------------------------------------------
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def load_history(report_id):
+    """질문/답변 기록 전체 (표시 순서, 공개되지 않은 추측 생성 질문 제외)"""
+    turns = (
+        QATurn.query
+        .filter_by(report_id=report_id, state='active')
+        .order_by(QATurn.position, QATurn.created_at)
+        .all()
+    )
+    return [turn.to_dict() for turn in turns]
+
+
+def _next_position(report_id):
+    last_position = db.session.query(func.max(QATurn.position)).filter_by(report_id=report_id).scalar()
+    return 0 if last_position is None else last_position + 1
+
+
+def replace_history(report_id, entries):
+    """기록을 새 항목 목록으로 교체 (초기 질문 생성/재생성, 중복 제출 복사)"""
+    db.session.execute(
+        delete(QATurn)
+        .where(QATurn.report_id == report_id)
+        .execution_options(synchronize_session=False)
+    )
+    # (이전 대화 누적 요약도 무효화)
+    db.session.execute(
+        delete(ConversationSummary)
+        .where(ConversationSummary.report_id == report_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.add_all([
+        QATurn(
+            question_id=entry.get("question_id") or str(uuid.uuid4()),
+            report_id=report_id,
+            parent_question_id=entry.get("parent_question_id"),
+            position=position,
+            type=entry.get("type"),
+            question=entry.get("question") or "",
+            answer=entry.get("answer")
+        )
+        for position, entry in enumerate(entries)
+    ])
+    bump_report_sections(db.session, report_id, ("questions",))
+
+
+def append_turn(report_id, question, question_type, parent_question_id=None, speculative_at=None):
+    """새 질문을 기록 끝에 추가하고 항목(dict)을 반환합니다."""
+    turn = QATurn(
+        question_id=str(uuid.uuid4()),
+        report_id=report_id,
+        parent_question_id=parent_question_id,
+        position=_next_position(report_id),
+        type=question_type,
+        question=question,
+        speculative_at=speculative_at
+    )
+    db.session.add(turn)
+    db.session.flush()
+    bump_report_sections(db.session, report_id, ("questions",))
+    return turn.to_dict()
+
+
+def save_answer(report_id, question_id, answer):
+    """미답변 질문에 답변을 저장합니다. 반환: 저장 여부 (없거나 이미 답변된 질문이면 False)"""
+    result = db.session.execute(
+        update(QATurn)
+        .where(QATurn.question_id == question_id, QATurn.report_id == report_id, QATurn.answer.is_(None))
+        .values(answer=answer, answered_at=_utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    bump_report_sections(db.session, report_id, ("questions",))
+    return True
+
+
+def conversation_chain(report_id, question_id):
+    """
+    question_id에서 부모를 따라 올라가며 답변된 질문/답변 목록을 반환합니다. (오래된 순)
+    체인이 끊기거나 미답변 질문을 만나면 거기서 멈춥니다.
+    """
+    chain, seen = [], set()
+    current_id = question_id
+    while current_id is not None and current_id not in seen:
+        seen.add(current_id)
+        turn = db.session.get(QATurn, current_id)
+        if turn is None or turn.report_id != report_id:
+            print(f"[{report_id}] CRITICAL: History chain broken. ID {current_id} not found.")
+            break
+        if turn.answer is None:
+            print(f"[{report_id}] Deep-dive task WARN: Parent answer not found (yet?).")
+            break
+        chain.insert(0, {"question_id": turn.question_id, "question": turn.question, "answer": turn.answer})
+        current_id = turn.parent_question_id
+    return chain
@@ -6,7 +6,8 @@ import ast
 from time import sleep
 
 # config.py에서 프롬프트 템플릿 로드 (반드시 JSON 포맷을 요구하는 최신 프롬프트여야 함)
-from config import question_making_prompt, deep_dive_prompt
+from config import question_making_prompt, deep_dive_prompt, conversation_summary_prompt
+from .admission_service import llm_slot
 
 # --------------------------------------------------------------------------------------
 # --- 1. 전역 설정 (Naver HyperCLOVA X) ---
@@ -17,6 +18,8 @@ NAVER_CLOVA_URL = os.environ.get('NAVER_CLOVA_URL2') # 예: "https://clovastudio
 NAVER_API_KEY = os.environ.get('NAVER_API_KEY')     # 예: "nv-..." (Bearer Token)
 
 MAX_RETRIES = 3
+# [신규] 리필 프롬프트에 넣는 기존 질문 수 상한 (나머지 중복은 question_dedup_service에서 거름)
+REFILL_PROMPT_PREVIOUS_QUESTIONS = 12
 
 # API 키 확인
 if not (NAVER_CLOVA_URL and NAVER_API_KEY):
@@ -75,7 +78,9 @@ def _call_llm_json(prompt_text, temperature=0.5):
 
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.post(NAVER_CLOVA_URL, headers=headers, json=data, stream=False)
+            # [수정] 프로세스 단위 LLM 동시 호출 제한 (services/admission_service.py)
+            with llm_slot():
+                response = requests.post(NAVER_CLOVA_URL, headers=headers, json=data, stream=False)
             response.raise_for_status() # 4xx, 5xx 에러 시 예외 발생
             
             res_json = response.json()
@@ -173,14 +178,17 @@ def generate_initial_questions(summary_dict, high_similarity_reports_list, snipp
     return questions
 
 
-def generate_deep_dive_question(conversation_history_list, summary_dict):
+def generate_deep_dive_question(conversation_history_list, summary_dict, earlier_summary=None):
     """
     심화 질문 1개를 생성합니다. (JSON으로 받아서 텍스트 추출)
+    - [신규] earlier_summary: 예산 밖으로 밀려난 이전 대화의 요약 (conversation_context_service)
     """
     print(f"[Service QA] Generating deep-dive question (History: {len(conversation_history_list)})...")
 
     # 1. 대화 기록 포맷팅
     history_text = ""
+    if earlier_summary:
+        history_text += f"[이전 대화 요약]\n{earlier_summary}\n\n[최근 대화]\n"
     for qa in conversation_history_list:
         history_text += f"Q: {qa.get('question', 'N/A')}\nA: {qa.get('answer', 'N/A')}\n"
         
@@ -211,10 +219,28 @@ def generate_deep_dive_question(conversation_history_list, summary_dict):
     return question_text
 
 
-def generate_refill_questions(summary_dict, similar_reports_list, text_snippet):
+def summarize_conversation(previous_summary, new_turns_text, max_chars):
+    """
+    [신규] 기존 누적 요약에 새로 밀려난 대화를 합친 요약 문자열을 반환합니다. (실패 시 None)
+    """
+    print("[Service QA] Folding older turns into conversation summary...")
+    prompt = conversation_summary_prompt.format(
+        max_chars=max_chars,
+        previous_summary=previous_summary or "[없음]",
+        new_turns=new_turns_text
+    )
+    result_json = _call_llm_json(prompt, temperature=0.2)
+    if not result_json or not isinstance(result_json, dict) or not result_json.get('summary'):
+        print("[Service QA] FAILED: Conversation summary response is not valid.")
+        return None
+    return str(result_json['summary']).strip()
+
+
+def generate_refill_questions(summary_dict, similar_reports_list, text_snippet, previous_questions=None):
 
     """
     리필용 질문 6개 (2:2:2)를 생성합니다.
+    - [신규] previous_questions: 이미 나온 질문 문장 (최근 것만 프롬프트에 넣어 반복을 줄임)
     """
     print("[Service QA] Generating 6 refill questions...")
     
@@ -229,6 +255,8 @@ def generate_refill_questions(summary_dict, similar_reports_list, text_snippet):
     - 논리 흐름(Flow Pattern): {summary_dict.get('Flow_Pattern', 'N/A')}
     """
 
+    previous_text = "\n".join(f"- {q}" for q in (previous_questions or [])[-REFILL_PROMPT_PREVIOUS_QUESTIONS:])
+
     # 2. 프롬프트 생성 (리필용은 여기서 직접 정의 - JSON 강제)
     prompt = f"""
     학생 리포트 요약을 바탕으로 사고를 확장할 수 있는 추가 질문 6개(유형: critical, perspective, innovative 각 2개씩)를 생성하세요.
@@ -237,6 +265,9 @@ def generate_refill_questions(summary_dict, similar_reports_list, text_snippet):
     [분석 요약]
     {summary_text}
     (참고: {plagiarism_info})
+
+    [이미 제시된 질문 (같은 내용을 표현만 바꿔 다시 묻지 마십시오)]
+    {previous_text or "- (없음)"}
     
     **[출력 포맷]**
     반드시 아래 포맷의 JSON 리스트로만 출력하십시오. (설명 금지)
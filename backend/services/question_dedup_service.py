@@ -0,0 +1,83 @@
+import re
+
+import numpy as np
+
+from services import analysis_service
+from services.embedding_cache import encode_cached
+from services.qa_history_service import load_history
+from services.question_pool_service import load_pool
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 생성 질문 의미 중복 제거 (리필) ---
+# - 새로 생성된 질문을 임베딩하여 리포트의 기존 질문(기록 + 대기 풀)과 코사인 유사도 비교
+#   QUESTION_DEDUP_THRESHOLD 이상이면 표현만 바뀐 반복 질문으로 보고 버림 (같은 배치 안의 중복도 포함)
+# - 기존 질문 벡터는 embedding_cache(문장 단위 LRU)에 남아 있으므로 리필 때마다 다시 인코딩하지 않음
+# - 임베딩 모델이 없으면 공백/문장부호를 무시한 문자열 일치로만 거름
+# --------------------------------------------------------------------------------------
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def _normalize(text):
+    return _NON_WORD_RE.sub("", str(text or "")).lower()
+
+
+def existing_questions(report_id):
+    """리포트에 이미 나온 질문 문장 (질문 기록 + 대기 풀)"""
+    return [item["question"] for item in load_history(report_id) + load_pool(report_id) if item.get("question")]
+
+
+def _unit_vectors(texts):
+    vectors = np.asarray(encode_cached(analysis_service.embedding_model, texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def filter_duplicate_questions(report_id, candidates, threshold, existing=None):
+    """
+    candidates([{question, type}])에서 기존 질문/앞선 후보와 의미가 겹치는 질문을 뺀 목록을 반환합니다. (순서 유지)
+    - existing: 비교할 기존 질문 문장 목록 (생략하면 DB에서 읽음)
+    """
+    candidates = [item for item in candidates or [] if isinstance(item, dict) and item.get("question")]
+    if not candidates:
+        return []
+    if existing is None:
+        existing = existing_questions(report_id)
+
+    # 1. 문자열 일치 (정규화 후)
+    seen = {_normalize(text) for text in existing}
+    unique = []
+    for item in candidates:
+        key = _normalize(item["question"])
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(item)
+
+    if not unique or threshold <= 0 or analysis_service.embedding_model is None:
+        return unique
+
+    # 2. 의미 유사도 (기존 질문 + 이번 배치에서 먼저 통과한 후보와 비교)
+    try:
+        candidate_vectors = _unit_vectors([item["question"] for item in unique])
+        if existing:
+            existing_max = (_unit_vectors(existing) @ candidate_vectors.T).max(axis=0)
+        else:
+            existing_max = np.full(len(unique), -1.0)
+    except Exception as e:
+        print(f"[{report_id}] Question dedup WARN: embedding failed, using text match only: {e}")
+        return unique
+
+    survivors, kept_vectors = [], []
+    for item, vector, max_similarity in zip(unique, candidate_vectors, existing_max):
+        if max_similarity >= threshold:
+            continue
+        if kept_vectors and float(np.max(np.stack(kept_vectors) @ vector)) >= threshold:
+            continue
+        survivors.append(item)
+        kept_vectors.append(vector)
+
+    dropped = len(candidates) - len(survivors)
+    if dropped:
+        print(f"[{report_id}] Question dedup: dropped {dropped}/{len(candidates)} near-duplicate question(s).")
+    return survivors
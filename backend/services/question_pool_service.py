@@ -0,0 +1,112 @@
+from sqlalchemy import select, delete, update, func, or_
+
+from extensions import db
+from models import AnalysisReport, QuestionPoolItem
+from services.report_versioning import bump_report_sections
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 리포트별 대기 질문 풀 (question_pool_items 테이블) ---
+# - 꺼내기: position이 가장 작은 행 1개를 DELETE ... RETURNING으로 제거 (O(1), 동시 요청에도 중복 없음)
+#   PostgreSQL에서는 FOR UPDATE SKIP LOCKED로 다른 트랜잭션이 잡은 행을 건너뜀
+# - 리필 잠금: UPDATE ... WHERE is_refilling = false 의 영향 행 수로 판단 (리필 작업은 리포트당 1개)
+# - 모든 함수는 커밋하지 않음 (호출 측 트랜잭션에 포함)
+# - [수정] 풀을 바꾸는 함수는 같은 트랜잭션에서 리포트의 "questions" 섹션 버전을 올림
+#   (풀 개수가 questions 섹션 응답에 포함되므로, ?since= 델타 / ETag / 조회 캐시가 변경을 놓치지 않도록)
+# --------------------------------------------------------------------------------------
+
+
+def _pool_rows(questions, report_id, start_position):
+    rows = []
+    for offset, item in enumerate(questions or []):
+        if not isinstance(item, dict) or not item.get("question"):
+            continue
+        rows.append(QuestionPoolItem(
+            report_id=report_id,
+            position=start_position + offset,
+            type=item.get("type"),
+            question=item["question"]
+        ))
+    return rows
+
+
+def load_pool(report_id):
+    """풀 전체를 순서대로 반환 ([{"type", "question"}, ...])"""
+    items = (
+        QuestionPoolItem.query
+        .filter_by(report_id=report_id)
+        .order_by(QuestionPoolItem.position)
+        .all()
+    )
+    return [item.to_dict() for item in items]
+
+
+def count_pool(report_id):
+    return db.session.query(func.count(QuestionPoolItem.id)).filter_by(report_id=report_id).scalar() or 0
+
+
+def replace_pool(report_id, questions):
+    """풀을 새 질문 목록으로 교체 (초기 질문 생성/재생성)"""
+    db.session.execute(
+        delete(QuestionPoolItem)
+        .where(QuestionPoolItem.report_id == report_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.add_all(_pool_rows(questions, report_id, 0))
+    bump_report_sections(db.session, report_id, ("questions",))
+
+
+def append_pool(report_id, questions):
+    """풀 끝에 질문 추가 (리필). 반환: 추가 후 풀 크기"""
+    last_position = (
+        db.session.query(func.max(QuestionPoolItem.position))
+        .filter_by(report_id=report_id)
+        .scalar()
+    )
+    rows = _pool_rows(questions, report_id, 0 if last_position is None else last_position + 1)
+    db.session.add_all(rows)
+    db.session.flush()
+    if rows:
+        bump_report_sections(db.session, report_id, ("questions",))
+    return count_pool(report_id)
+
+
+def pop_question(report_id):
+    """풀의 첫 질문을 원자적으로 제거하고 반환합니다. 비어 있으면 None"""
+    head = (
+        select(QuestionPoolItem.id)
+        .where(QuestionPoolItem.report_id == report_id)
+        .order_by(QuestionPoolItem.position)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    row = db.session.execute(
+        delete(QuestionPoolItem)
+        .where(QuestionPoolItem.id == head)
+        .returning(QuestionPoolItem.type, QuestionPoolItem.question)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        return None
+    bump_report_sections(db.session, report_id, ("questions",))
+    return {"type": row.type, "question": row.question}
+
+
+def try_acquire_refill_lock(report_id):
+    """
+    리필 잠금을 원자적으로 획득합니다. (이미 리필 중이면 False)
+    획득한 쪽만 리필 작업을 등록하므로, 동시에 여러 요청이 와도 리필은 1번만 실행됩니다.
+    """
+    result = db.session.execute(
+        update(AnalysisReport)
+        .where(
+            AnalysisReport.id == report_id,
+            or_(AnalysisReport.is_refilling.is_(False), AnalysisReport.is_refilling.is_(None))
+        )
+        .values(is_refilling=True)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    bump_report_sections(db.session, report_id, ("questions",))
+    return True
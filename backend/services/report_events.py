@@ -0,0 +1,122 @@
+import json
+import queue
+import threading
+from collections import OrderedDict, deque
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import AnalysisReport
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 리포트 진행 이벤트 Pub/Sub (프로세스 내) ---
+# - 파이프라인/심층 분석이 결과를 커밋할 때 이벤트를 발행하고, SSE 엔드포인트가 구독하여 전달
+# - queue_event()는 세션에 이벤트를 모아 두었다가 커밋 성공 시에만 발행 (롤백되면 버림)
+# - 리포트 status 변경은 flush 시 자동으로 'status' 이벤트로 발행
+# - [수정] 이벤트 id는 같은 트랜잭션에서 커밋된 리포트 version (report_versioning 참고)
+#   프로세스별 카운터가 아니므로 재연결이 다른 워커로 가도 Last-Event-ID를 그대로 비교할 수 있음
+#   (version을 올리지 않은 트랜잭션의 이벤트는 id 없이 발행, 재전송 대상 아님)
+# - 리포트별 최근 이벤트를 보관하여 재연결(Last-Event-ID) 시 놓친 이벤트를 재전송
+#   (다른 프로세스에서 발행된 이벤트는 보관되지 않으므로, 스트림은 DB version과 비교하여 'sync'로 보충)
+# --------------------------------------------------------------------------------------
+
+HISTORY_SIZE = 50         # 리포트별 보관 이벤트 수
+MAX_CHANNELS = 1000       # 보관하는 리포트 채널 수 (구독자가 없는 오래된 채널부터 제거)
+
+
+class _Channel:
+    def __init__(self):
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.subscribers = set()
+
+
+_channels = OrderedDict()
+_lock = threading.Lock()
+
+
+def _channel(report_id):
+    channel = _channels.get(report_id)
+    if channel is None:
+        channel = _channels[report_id] = _Channel()
+        if len(_channels) > MAX_CHANNELS:
+            for old_id in list(_channels):
+                if len(_channels) <= MAX_CHANNELS: break
+                if not _channels[old_id].subscribers:
+                    del _channels[old_id]
+    _channels.move_to_end(report_id)
+    return channel
+
+
+def publish(report_id, event_name, data, version=None):
+    """이벤트를 즉시 발행합니다. version은 이벤트 id (DB 커밋과 묶으려면 queue_event 사용)"""
+    with _lock:
+        channel = _channel(report_id)
+        item = (version, event_name, data)
+        if version is not None:
+            channel.history.append(item)
+        for subscriber in channel.subscribers:
+            subscriber.put_nowait(item)
+
+
+def subscribe(report_id, last_event_id=None):
+    """
+    구독을 시작합니다. 반환: (이벤트 큐, 재전송할 이전 이벤트 목록)
+    last_event_id(version)가 없으면 보관 중인 이벤트를 모두, 있으면 그 이후 version의 이벤트만 재전송합니다.
+    """
+    subscriber = queue.Queue()
+    with _lock:
+        channel = _channel(report_id)
+        channel.subscribers.add(subscriber)
+        backlog = [item for item in channel.history if last_event_id is None or item[0] > last_event_id]
+    backlog.sort(key=lambda item: item[0])
+    return subscriber, backlog
+
+
+def unsubscribe(report_id, subscriber):
+    with _lock:
+        channel = _channels.get(report_id)
+        if channel:
+            channel.subscribers.discard(subscriber)
+
+
+def queue_event(report_id, event_name, data, session=None):
+    """현재 트랜잭션이 커밋되면 발행할 이벤트를 등록합니다."""
+    session = session if session is not None else db.session
+    session.info.setdefault('report_events', []).append((report_id, event_name, data))
+
+
+def format_sse(event_name, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_name}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@event.listens_for(Session, "after_flush")
+def _queue_status_changes(session, flush_context):
+    """AnalysisReport.status가 바뀌면 'status' 이벤트를 등록합니다."""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, AnalysisReport):
+            continue
+        history = inspect(obj).attrs.status.history
+        if history.has_changes() and obj.status:
+            payload = {"status": obj.status}
+            if obj.status == "error":
+                payload["error"] = obj.error_message
+            session.info.setdefault('report_events', []).append((obj.id, "status", payload))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    versions = session.info.pop('report_versions', {})
+    for report_id, event_name, data in session.info.pop('report_events', []):
+        publish(report_id, event_name, data, versions.get(report_id))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop('report_events', None)
+    session.info.pop('report_versions', None)
@@ -0,0 +1,120 @@
+import json
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session, attributes
+
+from models import AnalysisReport
+from services.report_view_cache import invalidate_report_view
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 리포트 버전 관리 (GET /report 의 ?since= 델타 응답용) ---
+# - 응답 섹션별로 관련 컬럼이 바뀌면 리포트 version을 1 올리고, 그 섹션의 버전을 section_versions에 기록
+# - version은 SQL 식(version + 1)으로 증가시켜 병렬 단계(비교/질문)가 동시에 커밋해도 누락 없음
+# - section_versions는 UPDATE로 행 잠금을 잡은 뒤 DB에서 다시 읽어 병합 (다른 트랜잭션의 기록을 덮어쓰지 않음)
+# --------------------------------------------------------------------------------------
+
+# 응답 섹션 -> DB 컬럼
+SECTION_COLUMNS = {
+    "status": ("status", "error_message"),
+    "meta": ("report_title", "assignment_id", "user_rating", "is_test", "analysis_tier"),
+    "summary": ("summary",),
+    "logicFlow": ("logic_flow",),
+    "similarity": ("similarity_details",),
+    "text": ("text_snippet",),
+    "questions": ("is_refilling",), # (질문/답변은 qa_turns, 질문 풀은 question_pool_items 테이블)
+    "advancement": ("advancement_ideas",),
+    "grading": ("ta_score_details", "auto_score_details", "ta_feedback"),
+    "revision": ("revision_of", "revision_diff"),
+    "deep_analysis": ("deep_analysis_data",), # (GET /report 섹션은 아니며, 심층 분석 조회 ETag용)
+}
+
+_COLUMN_SECTIONS = {
+    column: section for section, columns in SECTION_COLUMNS.items() for column in columns
+}
+
+
+def load_section_versions(report):
+    try:
+        return json.loads(report.section_versions) if report.section_versions else {}
+    except (TypeError, ValueError):
+        return {}
+
+
+def _changed_sections(report):
+    state = inspect(report)
+    return {
+        _COLUMN_SECTIONS[column] for column in _COLUMN_SECTIONS
+        if state.attrs[column].history.has_changes()
+    }
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_report_versions(session, flush_context, instances):
+    pending = session.info.setdefault('report_section_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, AnalysisReport):
+            continue
+        sections = set(SECTION_COLUMNS) if obj in session.new else _changed_sections(obj)
+        if not sections:
+            continue
+        if obj in session.new:
+            obj.version = 1
+        else:
+            obj.version = AnalysisReport.version + 1
+        pending.setdefault(id(obj), (obj, set()))[1].update(sections)
+
+
+def _merge_section_versions(connection, report_id, sections):
+    """DB의 현재 version으로 section_versions를 병합 기록하고 (version, 병합 JSON)을 반환합니다. 행이 없으면 None"""
+    table = AnalysisReport.__table__
+    row = connection.execute(
+        select(table.c.version, table.c.section_versions).where(table.c.id == report_id)
+    ).first()
+    if row is None:
+        return None
+    version, raw = row
+    try:
+        section_versions = json.loads(raw) if raw else {}
+    except (TypeError, ValueError):
+        section_versions = {}
+    for section in sections:
+        section_versions[section] = version
+    merged = json.dumps(section_versions)
+    connection.execute(update(table).where(table.c.id == report_id).values(section_versions=merged))
+    # [신규] 이 프로세스의 조회 응답 캐시에서 해당 리포트 제거
+    invalidate_report_view(report_id)
+    return version, merged
+
+
+def _remember_version(session, report_id, version):
+    """이 트랜잭션에서 기록한 리포트 version (커밋 후 발행하는 SSE 이벤트의 id로 사용, report_events 참고)"""
+    session.info.setdefault('report_versions', {})[report_id] = version
+
+
+@event.listens_for(Session, "after_flush")
+def _record_section_versions(session, flush_context):
+    pending = session.info.pop('report_section_changes', {})
+    if not pending:
+        return
+    connection = session.connection()
+    for obj, sections in pending.values():
+        recorded = _merge_section_versions(connection, obj.id, sections)
+        if recorded is None:
+            continue
+        version, merged = recorded
+        _remember_version(session, obj.id, version)
+        attributes.set_committed_value(obj, "version", version)
+        attributes.set_committed_value(obj, "section_versions", merged)
+
+
+def bump_report_sections(session, report_id, sections):
+    """
+    [신규] ORM flush를 거치지 않는 UPDATE(원자적 잠금 등)로 리포트를 바꾼 뒤 호출합니다.
+    version을 1 올리고 섹션 버전을 기록합니다. (커밋은 호출 측)
+    """
+    connection = session.connection()
+    table = AnalysisReport.__table__
+    connection.execute(update(table).where(table.c.id == report_id).values(version=table.c.version + 1))
+    recorded = _merge_section_versions(connection, report_id, sections)
+    if recorded is not None:
+        _remember_version(session, report_id, recorded[0])
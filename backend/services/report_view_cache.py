@@ -0,0 +1,63 @@
+import os
+import threading
+from collections import OrderedDict
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 리포트 조회 응답 캐시 (프로세스 내 LRU) ---
+# - GET /report 전체 응답을 직렬화된 JSON 문자열로 보관 -> 같은 버전을 다시 조회하면 JSON 파싱/직렬화 생략
+# - 키: (리포트 ID, version) - version은 모든 쓰기에서 증가하므로(report_versioning) 다른 프로세스의
+#   쓰기도 키 불일치로 자연히 무효화됨
+# - 같은 프로세스의 쓰기는 flush 시점에 해당 리포트 항목을 즉시 제거 (메모리 회수)
+# --------------------------------------------------------------------------------------
+
+REPORT_VIEW_CACHE_SIZE = int(os.environ.get('REPORT_VIEW_CACHE_SIZE', 200))
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def get_report_view(report_id, version):
+    """캐시된 응답 본문(str) 또는 None"""
+    key = (report_id, version)
+    with _lock:
+        body = _cache.get(key)
+        if body is None:
+            _stats["misses"] += 1
+            return None
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return body
+
+
+def put_report_view(report_id, version, body):
+    if REPORT_VIEW_CACHE_SIZE <= 0:
+        return
+    with _lock:
+        # (같은 리포트의 이전 버전 항목은 더 이상 조회되지 않으므로 제거)
+        for key in [key for key in _cache if key[0] == report_id and key[1] != version]:
+            del _cache[key]
+        _cache[(report_id, version)] = body
+        _cache.move_to_end((report_id, version))
+        while len(_cache) > REPORT_VIEW_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def invalidate_report_view(report_id):
+    with _lock:
+        keys = [key for key in _cache if key[0] == report_id]
+        for key in keys:
+            del _cache[key]
+        if keys:
+            _stats["invalidations"] += 1
+
+
+def report_view_cache_stats():
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "size": len(_cache),
+            "capacity": REPORT_VIEW_CACHE_SIZE,
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,121 @@
+import json
+import hashlib
+from difflib import SequenceMatcher
+
+from .dedup_service import normalize_text
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 수정본(Revision) 문단 단위 비교 ---
+# - 문단 = 줄바꿈으로 나눈 비어 있지 않은 줄 (뉴런 맵 동시 출현 계산과 같은 단위)
+# - 문단별 정규화 해시를 리포트에 저장하고, 원본(revision_of)과 비교하여 바뀐 문단만 재분석
+# --------------------------------------------------------------------------------------
+
+
+def split_paragraphs(text):
+    return [line.strip() for line in (text or "").split('\n') if line.strip()]
+
+
+def paragraph_hash(paragraph):
+    return hashlib.sha256(normalize_text(paragraph).encode("utf-8")).hexdigest()[:16]
+
+
+def compute_paragraph_hashes(text):
+    return [paragraph_hash(paragraph) for paragraph in split_paragraphs(text)]
+
+
+def diff_paragraphs(old_hashes, new_hashes):
+    """
+    문단 해시 목록을 비교하여 변경 요약을 반환합니다.
+    - changed_indices: 새 글에서 추가/수정된 문단 위치 (0부터)
+    - modified: 같은 위치에서 교체된 문단 수, added/removed: 순수 추가/삭제 수
+    """
+    matcher = SequenceMatcher(a=old_hashes, b=new_hashes, autojunk=False)
+    summary = {"unchanged": 0, "modified": 0, "added": 0, "removed": 0, "changed_indices": []}
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            summary["unchanged"] += i2 - i1
+            continue
+        old_count, new_count = i2 - i1, j2 - j1
+        paired = min(old_count, new_count) if tag == "replace" else 0
+        summary["modified"] += paired
+        summary["added"] += new_count - paired
+        summary["removed"] += old_count - paired
+        summary["changed_indices"].extend(range(j1, j2))
+    summary["total"] = len(new_hashes)
+    summary["change_ratio"] = round(len(summary["changed_indices"]) / len(new_hashes), 3) if new_hashes else 0.0
+    return summary
+
+
+def _load_hashes(report):
+    if report.paragraph_hashes:
+        return json.loads(report.paragraph_hashes)
+    return compute_paragraph_hashes(report.text_snippet)
+
+
+def build_revision_diff(parent, text):
+    """제출 시점: 원본 리포트 대비 새 글의 문단 변경 요약"""
+    diff = diff_paragraphs(_load_hashes(parent), compute_paragraph_hashes(text))
+    diff["parent_id"] = parent.id
+    return diff
+
+
+def _completed_parent_analysis(parent):
+    """원본의 (완료된 심층 분석 결과, 요약). 재사용할 수 없으면 None"""
+    if not parent or not parent.deep_analysis_data:
+        return None
+    try:
+        previous = json.loads(parent.deep_analysis_data)
+        previous_summary = json.loads(parent.summary) if parent.summary else {}
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(previous, dict) or previous.get("status") != "completed":
+        return None
+    return previous, previous_summary
+
+
+def revision_basis(parent):
+    """
+    [신규] 심층 분석 캐시 키(deep_analysis_service.deep_analysis_key)에 넣는 수정본 기준
+    build_revision_context가 맥락을 만들 때만 {"parent_id", "parent_hash": 원본 심층 분석/요약 해시}, 아니면 None
+    (원본이 나중에 분석되거나 다시 분석되면 키가 바뀌어 수정본도 다시 분석)
+    """
+    if _completed_parent_analysis(parent) is None:
+        return None
+    digest = hashlib.sha256(parent.deep_analysis_data.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((parent.summary or "").encode("utf-8"))
+    return {"parent_id": parent.id, "parent_hash": digest.hexdigest()}
+
+
+def build_revision_context(report, parent):
+    """
+    심층 분석용 수정본 맥락. 원본의 심층 분석이 완료된 경우에만 반환합니다. (없으면 None -> 전체 분석)
+    {"parent_id", "previous": 원본 심층 분석 결과, "previous_core_thesis",
+     "changed_paragraphs": [...], "unchanged_paragraphs": [...]}
+    """
+    completed = _completed_parent_analysis(parent)
+    if completed is None:
+        return None
+    previous, previous_summary = completed
+
+    paragraphs = split_paragraphs(report.text_snippet)
+    parent_hashes = set(_load_hashes(parent))
+    changed, unchanged = [], []
+    for paragraph in paragraphs:
+        (unchanged if paragraph_hash(paragraph) in parent_hashes else changed).append(paragraph)
+
+    return {
+        "parent_id": parent.id,
+        "previous": previous,
+        "previous_core_thesis": previous_summary.get("Core_Thesis", ""),
+        "changed_paragraphs": changed,
+        "unchanged_paragraphs": unchanged,
+    }
+
+
+def in_unchanged_region(snippet, revision):
+    """인용/문맥 문장이 바뀌지 않은 문단 안에 그대로 있는지 확인합니다."""
+    snippet = normalize_text(snippet).strip("'\" ")
+    if not snippet:
+        return False
+    return any(snippet in normalize_text(paragraph) for paragraph in revision["unchanged_paragraphs"])
@@ -0,0 +1,170 @@
+import threading
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import select, update, func
+
+from extensions import db
+from models import QATurn
+from services.qa_history_service import append_turn, _next_position
+from services.report_versioning import bump_report_sections
+
+# --------------------------------------------------------------------------------------
+# --- [신규] 심화 질문 추측 생성 (SPECULATIVE_DEEP_DIVE) ---
+# - 답변 저장 직후 해당 질문의 심화 질문을 백그라운드에서 미리 생성해 qa_turns에 'speculative' 상태로 보관
+#   (qa_history에는 보이지 않음)
+# - /question/deep-dive 요청 시 미리 생성된 질문이 있으면 'active'로 공개하고 즉시 반환 (LLM 대기 없음)
+#   아직 생성 중이면(같은 프로세스) 그 결과를 그대로 채택하여 LLM을 두 번 호출하지 않음
+# - SPECULATIVE_DEEP_DIVE_TTL초 안에 요청되지 않은 질문은 'expired' (적중률 집계를 위해 행은 남김)
+# --------------------------------------------------------------------------------------
+
+# 생성 중인 추측 작업 {(report_id, parent_question_id): {"adopted": bool}} (프로세스 내)
+_in_flight = {}
+_lock = threading.Lock()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def begin_speculation(report_id, parent_question_id):
+    """추측 생성을 시작합니다. 이미 같은 부모에 대해 생성 중이면 False"""
+    with _lock:
+        key = (report_id, parent_question_id)
+        if key in _in_flight:
+            return False
+        _in_flight[key] = {"adopted": False}
+        return True
+
+
+def adopt_in_flight(report_id, parent_question_id):
+    """생성 중인 추측 작업이 있으면 결과를 바로 공개하도록 표시합니다. 반환: 채택 여부"""
+    with _lock:
+        entry = _in_flight.get((report_id, parent_question_id))
+        if entry is None:
+            return False
+        entry["adopted"] = True
+        return True
+
+
+def finish_speculation(report_id, parent_question_id, question_text):
+    """
+    추측 생성 결과를 저장합니다. (커밋은 호출 측)
+    - 생성 중에 학생이 심화 질문을 요청했으면(adopt) 바로 'active'로 추가
+    - 이미 심화 질문이 있으면(일반 경로로 먼저 생성됨) 버림
+    - [수정] 생성 중 표시는 abandon_speculation이 해제 (저장 실패 시에도 채택 여부를 알 수 있도록)
+    반환: 저장한 항목(dict) 또는 None
+    """
+    with _lock:
+        adopted = (_in_flight.get((report_id, parent_question_id)) or {}).get("adopted", False)
+    if not question_text or _has_child(report_id, parent_question_id):
+        return None
+
+    now = _utcnow()
+    if adopted:
+        return append_turn(report_id, question_text, "deep_dive", parent_question_id, speculative_at=now)
+
+    turn = QATurn(
+        report_id=report_id,
+        parent_question_id=parent_question_id,
+        position=0, # (공개 시 기록 끝 위치로 변경)
+        type="deep_dive",
+        question=question_text,
+        state="speculative",
+        speculative_at=now
+    )
+    db.session.add(turn)
+    db.session.flush()
+    return turn.to_dict()
+
+
+def abandon_speculation(report_id, parent_question_id):
+    """
+    생성 중 표시를 해제합니다. (추측 생성 스레드가 성공/실패와 관계없이 마지막에 호출)
+    [수정] 반환: 생성 중에 학생이 채택(adopt)했는지 여부 - 채택했는데 공개된 질문이 없으면 호출 측이 일반 경로로 생성
+    """
+    with _lock:
+        entry = _in_flight.pop((report_id, parent_question_id), None)
+    return bool(entry and entry["adopted"])
+
+
+def has_published_deep_dive(report_id, parent_question_id):
+    """부모 질문의 심화 질문이 기록에 공개(active)되어 있는지 확인합니다."""
+    return _has_child(report_id, parent_question_id, states=("active",))
+
+
+def _has_child(report_id, parent_question_id, states=("active", "speculative")):
+    return db.session.query(
+        QATurn.query.filter(
+            QATurn.report_id == report_id,
+            QATurn.parent_question_id == parent_question_id,
+            QATurn.type == "deep_dive",
+            QATurn.state.in_(states)
+        ).exists()
+    ).scalar()
+
+
+def promote_speculative_turn(report_id, parent_question_id, ttl_seconds):
+    """
+    미리 생성된(만료 전) 심화 질문을 공개합니다. (커밋은 호출 측)
+    조건부 UPDATE로 상태를 바꾸므로 동시 요청에도 1번만 공개됩니다. 반환: 항목(dict) 또는 None
+    """
+    cutoff = _utcnow() - timedelta(seconds=ttl_seconds)
+    question_id = db.session.execute(
+        select(QATurn.question_id)
+        .where(
+            QATurn.report_id == report_id,
+            QATurn.parent_question_id == parent_question_id,
+            QATurn.state == "speculative",
+            QATurn.speculative_at >= cutoff
+        )
+        .order_by(QATurn.speculative_at.desc())
+        .limit(1)
+    ).scalar()
+    if question_id is None:
+        return None
+
+    result = db.session.execute(
+        update(QATurn)
+        .where(QATurn.question_id == question_id, QATurn.state == "speculative")
+        .values(state="active", position=_next_position(report_id), created_at=_utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return None
+    bump_report_sections(db.session, report_id, ("questions",))
+    turn = db.session.get(QATurn, question_id)
+    db.session.refresh(turn)
+    return turn.to_dict()
+
+
+def expire_speculative_turns(ttl_seconds):
+    """TTL이 지난 미사용 추측 질문을 'expired'로 바꿉니다. 반환: 만료 건수 (커밋 포함)"""
+    cutoff = _utcnow() - timedelta(seconds=ttl_seconds)
+    result = db.session.execute(
+        update(QATurn)
+        .where(QATurn.state == "speculative", QATurn.speculative_at < cutoff)
+        .values(state="expired")
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def get_speculation_metrics(window_hours=24):
+    """최근 window_hours 동안 추측 생성된 심화 질문의 적중(공개)/대기/만료 건수와 적중률"""
+    since = _utcnow() - timedelta(hours=window_hours)
+    counts = dict(
+        db.session.query(QATurn.state, func.count(QATurn.question_id))
+        .filter(QATurn.speculative_at.isnot(None), QATurn.speculative_at >= since)
+        .group_by(QATurn.state)
+        .all()
+    )
+    hits, expired = counts.get("active", 0), counts.get("expired", 0)
+    return {
+        "window_hours": window_hours,
+        "hits": hits,
+        "pending": counts.get("speculative", 0),
+        "expired": expired,
+        "hit_rate": round(hits / (hits + expired), 4) if hits + expired else None,
+        "in_flight": len(_in_flight)
+    }
@@ -0,0 +1,306 @@
+import sys
+import json
+import uuid
+
+from regression_support import (
+    check, run_tests, load_backend_app, create_user, drain_jobs, delete_jobs, override_attributes, wait_until,
+    fake_batch_comparison, FAKE_EMBEDDING, FAKE_LLM, SUMMARY
+)
+from extensions import db
+from models import AnalysisReport, AnalysisJob
+from services import analysis_service
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 분석 파이프라인 (app.py 단계 그래프, POST /api/student/analyze)
+# - 빠른 미리보기: 1단계 직후 임베딩 Top-K 후보(weighted_similarity + lexical_overlap)를 잠정 결과로 저장,
+#   LLM 비교가 끝나면 같은 필드를 최종 결과로 덮어씀. is_test + preview_only는 미리보기 단계에서 종료
+# - 질문 생성은 LLM 비교와 동시에 실행 (summary_only), 비교 후 고유사도 후보가 나오면 1회만 재생성 (with_similarity)
+# - 재개(POST /report/<id>/resume): 저장된 단계는 건너뛰고 첫 누락 단계부터 실행 (1단계 LLM 분석을 다시 하지 않음)
+# - 실행: backend 디렉터리에서 `python test_analysis_pipeline.py`
+# --------------------------------------------------------------------------------------
+
+backend = load_backend_app()
+app = backend.app
+client = app.test_client()
+
+CORPUS_SIZE = 4
+
+
+class CountingComparison:
+    """analysis_service의 비교 LLM 호출을 감싸 호출 수를 세고, 호출 시점에 on_call()을 실행"""
+
+    def __init__(self, name, on_call=None):
+        self.name = name
+        self.original = getattr(analysis_service, name)
+        self.on_call = on_call
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        if self.on_call:
+            self.on_call()
+        return self.original(*args, **kwargs)
+
+    def __enter__(self):
+        setattr(analysis_service, self.name, self)
+        return self
+
+    def __exit__(self, *exc):
+        setattr(analysis_service, self.name, self.original)
+
+
+def seed_corpus():
+    """비교 대조군: 임베딩이 있는 완료 리포트 (is_test=False). 처음 1회만 생성"""
+    with app.app_context():
+        existing = AnalysisReport.query.filter(
+            AnalysisReport.is_test == False, AnalysisReport.embedding_keyconcepts_claim.isnot(None)
+        ).count()
+        if existing >= CORPUS_SIZE:
+            return
+        user_id, _ = create_user()
+        for index in range(CORPUS_SIZE):
+            summary = dict(SUMMARY, Core_Thesis=f"대조군 {index}의 논지")
+            db.session.add(AnalysisReport(
+                user_id=user_id, status="completed", is_test=False,
+                original_filename=f"corpus-{index}.txt",
+                text_snippet=f"대조군 리포트 {index}",
+                summary=json.dumps(summary, ensure_ascii=False),
+                embedding_keyconcepts_corethesis=json.dumps(FAKE_EMBEDDING.vector(f"thesis-{index}").tolist()),
+                embedding_keyconcepts_claim=json.dumps(FAKE_EMBEDDING.vector(f"claim-{index}").tolist()),
+            ))
+        db.session.commit()
+
+
+def submission_text():
+    """제출마다 다른 본문 (중복 제출 재사용 방지)"""
+    return f"조기 전공 확정 제도는 학생들의 진로 탐색을 방해합니다. 정보 비대칭은 선택 후회를 낳습니다. ({uuid.uuid4()})"
+
+
+def submit(headers, **form):
+    response = client.post("/api/student/analyze", headers=headers, data={"text": submission_text(), **form})
+    check(f"제출 -> 202 ({response.status_code})", response.status_code == 202)
+    return response.get_json()["reportId"]
+
+
+def load_report(report_id):
+    with app.app_context():
+        report = db.session.get(AnalysisReport, report_id)
+        db.session.expunge(report)
+        return report
+
+
+def get_report(report_id, headers):
+    return client.get(f"/api/student/report/{report_id}", headers=headers).get_json()
+
+
+def test_preview_then_full_comparison():
+    seed_corpus()
+    delete_jobs()
+    _, headers = create_user()
+    seen_during_comparison = []
+
+    def snapshot():
+        # LLM 비교가 진행되는 동안 학생이 보는 화면: 잠정 후보가 이미 저장되어 있어야 함
+        seen_during_comparison.append(get_report(report_id, headers))
+
+    with CountingComparison("_llm_call_batch_comparison", on_call=snapshot) as batch:
+        report_id = submit(headers)
+        drain_jobs()
+
+    check("LLM 비교 중에도 조회 가능", len(seen_during_comparison) == 1)
+    during = seen_during_comparison[0]
+    preview = during["data"]["similarity_details"]
+    check("비교 중 상태 processing_comparison + 잠정 표시",
+          during["status"] == "processing_comparison" and during["data"]["similarity_provisional"] is True)
+    check(f"임베딩 Top-3 후보 미리보기 ({len(preview)}건)", len(preview) == 3 and all(item["provisional"] for item in preview))
+    check("미리보기 항목: weighted_similarity + lexical_overlap(0~1)",
+          all(isinstance(item["weighted_similarity"], float) and 0.0 <= item["lexical_overlap"] <= 1.0 for item in preview))
+    check("유사도 높은 순", [item["weighted_similarity"] for item in preview]
+          == sorted((item["weighted_similarity"] for item in preview), reverse=True))
+
+    final = get_report(report_id, headers)
+    details = final["data"]["similarity_details"]
+    check("완료 후 같은 필드가 LLM 비교 결과로 덮어써짐",
+          final["status"] == "completed" and final["data"]["similarity_provisional"] is False
+          and {item["candidate_id"] for item in details} == {item["candidate_id"] for item in preview}
+          and all(item.get("llm_comparison_report") and not item.get("provisional") for item in details))
+    check("전체 분석 tier", final["data"]["analysis_tier"] == "full" and batch.calls == 1)
+
+
+def test_preview_only_tier():
+    seed_corpus()
+    delete_jobs()
+    _, headers = create_user()
+    with CountingComparison("_llm_call_batch_comparison") as batch, CountingComparison("_llm_call_comparison") as single:
+        report_id = submit(headers, is_test="true", preview_only="true")
+        drain_jobs()
+    report = load_report(report_id)
+    details = json.loads(report.similarity_details)
+    check("is_test + preview_only -> analysis_tier='preview'", report.analysis_tier == "preview")
+    check("LLM 비교 호출 없음", batch.calls == 0 and single.calls == 0)
+    check("잠정 미리보기를 유지한 채 완료", report.status == "completed" and details and all(item["provisional"] for item in details))
+    check("고유사도 후보 없음 (비교 생략)", json.loads(report.high_similarity_candidates) == [])
+
+    body = get_report(report_id, headers)
+    check("조회 응답: 잠정 결과 + tier 표시",
+          body["data"]["similarity_provisional"] is True and body["data"]["analysis_tier"] == "preview")
+
+
+def test_preview_only_requires_is_test():
+    seed_corpus()
+    delete_jobs()
+    _, headers = create_user()
+    with CountingComparison("_llm_call_batch_comparison") as batch:
+        report_id = submit(headers, preview_only="true")
+        drain_jobs()
+    report = load_report(report_id)
+    check("is_test가 아니면 preview_only는 무시 (전체 비교)", report.analysis_tier == "full" and batch.calls == 1)
+
+
+def test_lexical_overlap():
+    same = json.dumps(SUMMARY, ensure_ascii=False)
+    check("같은 요약은 1.0", analysis_service.compute_lexical_overlap(same, same) == 1.0)
+    check("공통 문자 bigram이 없으면 0.0",
+          analysis_service.compute_lexical_overlap(json.dumps({"a": "가나다"}), json.dumps({"a": "라마바"})) == 0.0)
+    partial = analysis_service.compute_lexical_overlap(json.dumps({"a": "전공 선택 유연화"}), json.dumps({"b": "전공 선택 제도"}))
+    check(f"일부 겹치면 0~1 사이 ({partial})", 0.0 < partial < 1.0)
+    check("공백 차이는 무시", analysis_service.compute_lexical_overlap(json.dumps("전공선택"), json.dumps("전공 선택")) == 1.0)
+    check("빈 요약/JSON이 아닌 값도 처리",
+          analysis_service.compute_lexical_overlap(None, same) == 0.0
+          and analysis_service.compute_lexical_overlap("전공 선택", "전공 선택") == 1.0)
+
+
+def initial_prompts():
+    return [prompt for kind, prompt in FAKE_LLM.prompts if kind == "initial"]
+
+
+def test_questions_overlap_comparisons():
+    seed_corpus()
+    delete_jobs()
+    FAKE_LLM.reset()
+    _, headers = create_user()
+    overlapped = []
+
+    def wait_for_questions():
+        # 비교 LLM 호출이 끝나기 전에 질문 생성이 시작되어야 함 (순차 실행이면 여기서 시간 초과)
+        overlapped.append(wait_until(lambda: FAKE_LLM.count("initial") >= 1, timeout=5))
+
+    # (기본 가짜 비교 점수 9 -> 총점 63, 모든 후보가 고유사도)
+    with CountingComparison("_llm_call_batch_comparison", on_call=wait_for_questions):
+        report_id = submit(headers)
+        drain_jobs()
+
+    check("질문 생성이 LLM 비교와 동시에 실행", overlapped == [True])
+    prompts = initial_prompts()
+    check("고유사도 후보가 나오면 질문을 1회 재생성", len(prompts) == 2)
+    check("첫 생성은 비교 결과 없이 (요약/스니펫만)", "발견되지 않았습니다" in prompts[0])
+    check("재생성은 유사도 맥락 포함", "표절 의심" in prompts[1])
+
+    report = load_report(report_id)
+    body = get_report(report_id, headers)
+    check("최종 질문 맥락 with_similarity + 완료", report.qa_context == "with_similarity" and report.status == "completed")
+    check("재생성한 질문으로 교체 (초기 질문 3개)", len(body["data"]["initialQuestions"]) == 3
+          and all(item["question"].startswith("초기 질문 2-") for item in body["data"]["initialQuestions"]))
+
+
+def test_no_regeneration_without_high_similarity():
+    seed_corpus()
+    delete_jobs()
+    FAKE_LLM.reset()
+    _, headers = create_user()
+    with override_attributes(analysis_service, _llm_call_batch_comparison=fake_batch_comparison(scores=1)):
+        report_id = submit(headers)
+        drain_jobs()
+
+    report = load_report(report_id)
+    check("고유사도 후보 없음", json.loads(report.high_similarity_candidates) == [])
+    check("질문 생성 LLM 호출 1회 (재생성 없음)", FAKE_LLM.count("initial") == 1)
+    check("summary_only 질문 그대로 완료", report.qa_context == "summary_only" and report.status == "completed")
+
+
+def test_first_missing_stage():
+    embedded = {"summary": "{}", "embedding_keyconcepts_corethesis": "[]", "embedding_keyconcepts_claim": "[]"}
+    cases = [
+        ({}, "analyze"),
+        ({"summary": "{}"}, "analyze"),
+        (embedded, "comparisons"),
+        ({**embedded, "high_similarity_candidates": "[]"}, "questions"),
+        ({**embedded, "high_similarity_candidates": "[]", "qa_context": "failed"}, "questions"),
+        ({**embedded, "high_similarity_candidates": "[]", "qa_context": "summary_only"}, "finalize"),
+    ]
+    for fields, expected in cases:
+        check(f"저장된 필드 {sorted(fields)} (qa_context={fields.get('qa_context')}) -> {expected}", backend._first_missing_stage(AnalysisReport(**fields)) == expected)
+
+
+def test_resume_from_failed_comparison():
+    seed_corpus()
+    delete_jobs()
+    FAKE_LLM.reset()
+    _, headers = create_user()
+
+    def broken_comparison(*args, **kwargs):
+        raise RuntimeError("comparison service down")
+
+    with CountingComparison("_llm_call_analysis") as analysis:
+        with override_attributes(backend, perform_step2_comparison=broken_comparison):
+            report_id = submit(headers)
+            drain_jobs()
+        failed = load_report(report_id)
+        check("비교 단계 최종 실패 -> error", failed.status == "error" and "comparison service down" in failed.error_message)
+        check("1단계 결과(요약/임베딩)는 저장되어 있음", failed.summary and failed.embedding_keyconcepts_claim)
+        check("재시도에서도 1단계 LLM 분석은 1회", analysis.calls == 1)
+        questions_before = FAKE_LLM.count("initial")
+
+        other_headers = create_user()[1]
+        check("다른 사용자의 리포트는 재개 불가 (403)",
+              client.post(f"/api/student/report/{report_id}/resume", headers=other_headers).status_code == 403)
+
+        with override_attributes(analysis_service, _llm_call_batch_comparison=fake_batch_comparison(scores=1)):
+            response = client.post(f"/api/student/report/{report_id}/resume", headers=headers)
+            check(f"재개 -> 202, 비교 단계부터 ({response.get_json()})",
+                  response.status_code == 202 and response.get_json()["resume_from"] == "comparisons")
+            check("재개 중 리포트 상태", load_report(report_id).status == "processing_comparison")
+            check("작업이 대기 중이면 다시 재개하지 않음 (409)",
+                  client.post(f"/api/student/report/{report_id}/resume", headers=headers).status_code == 409)
+            drain_jobs()
+
+    report = load_report(report_id)
+    check("재개 후 완료 + 비교 결과 저장", report.status == "completed" and report.error_message is None
+          and json.loads(report.similarity_details)[0].get("llm_comparison_report"))
+    check("재개 시 1단계 LLM 분석을 다시 하지 않음", analysis.calls == 1)
+    check("저장된 질문은 다시 생성하지 않음", questions_before >= 1 and FAKE_LLM.count("initial") == questions_before)
+    with app.app_context():
+        check("재개 작업 완료 (대기 작업 없음)",
+              AnalysisJob.query.filter_by(report_id=report_id, status="queued").count() == 0)
+
+    response = client.post(f"/api/student/report/{report_id}/resume", headers=headers)
+    check("완료된 리포트 재개 -> 409 already_completed",
+          response.status_code == 409 and response.get_json()["reason"] == "already_completed")
+
+
+def test_sweep_resumes_interrupted_report():
+    seed_corpus()
+    delete_jobs()
+    _, headers = create_user()
+    with CountingComparison("_llm_call_analysis") as analysis:
+        report_id = submit(headers)
+        drain_jobs()
+        # (요약/비교까지 저장된 뒤 워커 크래시로 멈춘 상황: 질문이 없는 processing_questions)
+        with app.app_context():
+            report = db.session.get(AnalysisReport, report_id)
+            report.status, report.qa_context = "processing_questions", None
+            db.session.commit()
+            resumed = backend.sweep_interrupted_reports()
+        check("시작 스윕이 멈춘 리포트를 재개", report_id in resumed)
+        drain_jobs()
+    report = load_report(report_id)
+    check("질문 단계부터 다시 실행하여 완료", report.status == "completed" and report.qa_context == "with_similarity")
+    check("1단계 LLM 분석은 제출 시 1회뿐", analysis.calls == 1)
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Analysis Pipeline", [
+        test_preview_then_full_comparison, test_preview_only_tier, test_preview_only_requires_is_test, test_lexical_overlap,
+        test_questions_overlap_comparisons, test_no_regeneration_without_high_similarity,
+        test_first_missing_stage, test_resume_from_failed_comparison, test_sweep_resumes_interrupted_report,
+    ]))
@@ -0,0 +1,263 @@
+import sys
+import uuid
+from datetime import timedelta
+
+from regression_support import (
+    check, run_tests, load_backend_app, create_user, create_report, drain_jobs, delete_jobs, config_override,
+    override_attributes, FAKE_LLM
+)
+from extensions import db
+from models import AnalysisJob, AnalysisReport
+from services import analysis_service
+from services.job_queue_service import enqueue_job, claim_next_job, _utcnow
+from services.admission_service import check_admission, llm_jobs_in_flight
+from services.dedup_service import compute_content_hash
+from services.question_pool_service import load_pool
+from services.qa_history_service import load_history
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 분석 제출 (POST /api/student/analyze)
+# - 승인 제어: 대기 작업 + 진행 중인 LLM 작업이 한도에 도달하면 리포트를 만들지 않고 429 + Retry-After
+# - 승인된 제출은 202 + 대기열 순번/예상 시작 시각
+# - 중복 제거(정규화 본문 해시): 같은 사용자의 진행 중 제출은 기존 리포트 반환, 완료된 제출은 LLM 호출 없이 복사,
+#   DEDUP_SCOPE='global'이면 다른 사용자의 요약/임베딩만 재사용. force=true면 항상 새로 분석
+# - 실행: backend 디렉터리에서 `python test_analyze_submission.py`
+# --------------------------------------------------------------------------------------
+
+backend = load_backend_app()
+app = backend.app
+client = app.test_client()
+
+LIMITS = {"ANALYZE_MAX_QUEUE_DEPTH": 2, "ANALYZE_MAX_IN_FLIGHT": 1, "ANALYZE_MIN_RETRY_AFTER": 5, "JOB_WORKERS": 1}
+
+
+def submission_text():
+    """제출마다 다른 본문 (중복 제출 재사용 방지)"""
+    return f"조기 전공 확정 제도는 학생들의 진로 탐색을 방해합니다. 정보 비대칭은 선택 후회를 낳습니다. ({uuid.uuid4()})"
+
+
+def submit(headers, text=None, **form):
+    return client.post("/api/student/analyze", headers=headers, data={"text": text or submission_text(), **form})
+
+
+def report_count(user_id):
+    with app.app_context():
+        return AnalysisReport.query.filter_by(user_id=user_id).count()
+
+
+def test_queue_full_returns_429():
+    delete_jobs()
+    user_id, headers = create_user()
+    with config_override(app, **LIMITS):
+        statuses = [submit(headers).status_code for _ in range(3)]
+        check(f"한도(대기 2 + LLM 1)까지 승인 {statuses}", statuses == [202, 202, 202])
+
+        rejected = submit(headers)
+        body = rejected.get_json()
+        check("한도 초과 -> 429", rejected.status_code == 429 and body["error"])
+        check(f"Retry-After 헤더 = 본문 retry_after ({rejected.headers.get('Retry-After')})",
+              rejected.headers.get("Retry-After") == str(body["retry_after"]) and body["retry_after"] >= 5)
+        check("거절된 제출은 리포트를 만들지 않음", report_count(user_id) == 3)
+
+        drain_jobs()
+        check("대기열이 비면 다시 승인", submit(headers).status_code == 202)
+    delete_jobs()
+
+
+def test_in_flight_counts_only_valid_leases():
+    delete_jobs()
+    user_id, _ = create_user()
+    report_ids = [create_report(user_id, status="processing") for _ in range(2)]
+    with app.app_context():
+        for report_id in report_ids:
+            enqueue_job(report_id, "pipeline")
+        db.session.commit()
+        with config_override(app, ANALYZE_MAX_QUEUE_DEPTH=1, ANALYZE_MAX_IN_FLIGHT=1) as config:
+            check("대기 2건 = 한도(1 + 1) -> 거절", check_admission(config)[0] is False)
+
+            job = claim_next_job("worker-a", 60)
+            check("실행 중(선점 유효) 작업은 진행 중인 LLM 작업", llm_jobs_in_flight() == 1)
+            check("대기 1 + 실행 1 -> 여전히 거절", check_admission(config)[0] is False)
+
+            # (워커가 사라져 선점이 만료된 작업은 진행 중으로 세지 않음)
+            job.locked_until = _utcnow() - timedelta(seconds=1)
+            db.session.commit()
+            check("선점이 만료된 작업은 제외", llm_jobs_in_flight() == 0)
+            check("대기 1 + 진행 0 -> 승인", check_admission(config) == (True, 0))
+    delete_jobs(report_ids)
+
+
+def test_retry_after_uses_recent_job_time():
+    delete_jobs()
+    user_id, _ = create_user()
+    done_ids = [create_report(user_id) for _ in range(2)]
+    queued_ids = [create_report(user_id, status="processing") for _ in range(3)]
+    now = _utcnow()
+    with app.app_context():
+        # 최근 완료된 파이프라인 작업 평균 120초
+        for report_id, seconds in zip(done_ids, (100, 140)):
+            job = enqueue_job(report_id, "pipeline")
+            job.status, job.started_at, job.finished_at = "done", now - timedelta(seconds=seconds), now
+        for report_id in queued_ids:
+            enqueue_job(report_id, "pipeline")
+        db.session.commit()
+        with config_override(app, **LIMITS) as config:
+            # 대기 3 -> 한도(2 + 1)보다 1건 초과, 워커 1개 -> 120초
+            check("Retry-After = 초과분이 빠질 때까지 예상 시간", check_admission(config) == (False, 120))
+            with config_override(app, ANALYZE_MAX_QUEUE_DEPTH=1):
+                check("초과 2건 -> 240초", check_admission(config) == (False, 240))
+            with config_override(app, ANALYZE_MAX_QUEUE_DEPTH=10) as relaxed:
+                check("한도 안이면 승인", check_admission(relaxed) == (True, 0))
+    delete_jobs()
+
+
+def test_queue_position():
+    delete_jobs()
+    _, headers = create_user()
+    with config_override(app, **{**LIMITS, "ANALYZE_MAX_QUEUE_DEPTH": 10}):
+        first = submit(headers).get_json()
+        second = submit(headers).get_json()
+    check("빈 워커가 있으면 바로 시작", first["queued"] is False and first["queue_position"] == 0)
+    check("워커 1개가 앞 작업을 맡으면 대기열 2번째",
+          second["queued"] is True and second["queue_position"] == 2 and second["estimated_start_seconds"] > 0)
+    check("예상 시작 시각 포함", second["estimated_start_at"].endswith("Z"))
+    delete_jobs()
+
+
+class AnalysisCalls:
+    """1단계 LLM 분석 호출 수 기록"""
+
+    def __init__(self):
+        self.original = analysis_service._llm_call_analysis
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.original(*args, **kwargs)
+
+
+def pipeline_jobs(report_id):
+    with app.app_context():
+        return AnalysisJob.query.filter_by(report_id=report_id, stage="pipeline").count()
+
+
+def load_questions(report_id):
+    with app.app_context():
+        return load_history(report_id), load_pool(report_id)
+
+
+def test_content_hash():
+    base = compute_content_hash("전공 선택  유연화가\n\n필요하다")
+    check("연속 공백/줄바꿈 차이는 같은 해시", base == compute_content_hash(" 전공 선택 유연화가 필요하다 "))
+    check("유니코드 정규화(NFD/NFC) 차이는 같은 해시",
+          compute_content_hash("\u1100\u1161") == compute_content_hash("\uac00"))
+    check("내용이 다르면 다른 해시", base != compute_content_hash("전공 선택 유연화가 필요없다"))
+
+
+def test_in_progress_duplicate():
+    delete_jobs()
+    _, headers = create_user()
+    text = submission_text()
+    first = submit(headers, text)
+    again = submit(headers, text.replace(" ", "  "))
+    body = again.get_json()
+    report_id = first.get_json()["reportId"]
+    check("진행 중인 동일 제출 -> 200 + 기존 리포트", again.status_code == 200 and body["reportId"] == report_id)
+    check("중복 표시", body["deduplicated"] is True and body["duplicate_of"] == report_id and body["status"] == "processing")
+    check("작업은 1개만 등록", pipeline_jobs(report_id) == 1)
+    delete_jobs()
+
+
+def test_completed_duplicate_is_copied():
+    delete_jobs()
+    FAKE_LLM.reset()
+    _, headers = create_user()
+    text = submission_text()
+    analysis = AnalysisCalls()
+    with override_attributes(analysis_service, _llm_call_analysis=analysis):
+        source_id = submit(headers, text).get_json()["reportId"]
+        drain_jobs()
+        # 원본 학생이 풀에서 질문 2개를 꺼낸 상태
+        popped = [client.post(f"/api/student/report/{source_id}/question/next", headers=headers).get_json()["question"]
+                  for _ in range(2)]
+        source_history, source_pool = load_questions(source_id)
+        calls = (analysis.calls, len(FAKE_LLM.calls))
+
+        # 복사는 큐를 쓰지 않으므로 대기열이 가득 차도 승인
+        with config_override(app, ANALYZE_MAX_QUEUE_DEPTH=0, ANALYZE_MAX_IN_FLIGHT=0):
+            response = submit(headers, text)
+    body = response.get_json()
+    copy_id = body["reportId"]
+    check("완료된 동일 제출 -> 200 completed 복사본", response.status_code == 200 and body["status"] == "completed"
+          and copy_id != source_id and body["duplicate_of"] == source_id)
+    check("복사 시 LLM 호출 없음, 작업 없음", (analysis.calls, len(FAKE_LLM.calls)) == calls and pipeline_jobs(copy_id) == 0)
+
+    with app.app_context():
+        source, copy = db.session.get(AnalysisReport, source_id), db.session.get(AnalysisReport, copy_id)
+        check("분석 결과 복사", copy.summary == source.summary and copy.similarity_details == source.similarity_details
+              and copy.qa_context == source.qa_context and copy.duplicate_of == source_id)
+    history, pool = load_questions(copy_id)
+    source_ids = {item["question_id"] for item in source_history}
+    check("초기 질문 3개를 새 question_id, 답변 없이 복사",
+          len(history) == 3 and all(item["answer"] is None and item["question_id"] not in source_ids for item in history))
+    check("원본이 꺼낸 질문도 복사본 풀로 되돌림 (바로 리필하지 않음)",
+          len(pool) == len(source_pool) + 2 and all(question in [item["question"] for item in pool] for question in popped))
+    delete_jobs()
+
+
+def test_force_and_scope():
+    delete_jobs()
+    user_id, headers = create_user()
+    text = submission_text()
+    source_id = submit(headers, text).get_json()["reportId"]
+    drain_jobs()
+
+    forced = submit(headers, text, force="true")
+    check("force=true면 완료된 동일 제출이 있어도 새로 분석 (202)",
+          forced.status_code == 202 and not forced.get_json().get("deduplicated"))
+    delete_jobs()
+    with config_override(app, DEDUP_SCOPE="off"):
+        check("DEDUP_SCOPE=off면 중복 제거 안 함", submit(headers, text).status_code == 202)
+    delete_jobs()
+
+    _, other_headers = create_user()
+    check("기본 범위(user): 다른 사용자의 동일 제출은 새로 분석",
+          not submit(other_headers, text).get_json().get("deduplicated"))
+    delete_jobs()
+
+    analysis = AnalysisCalls()
+    with config_override(app, DEDUP_SCOPE="global"), override_attributes(analysis_service, _llm_call_analysis=analysis):
+        _, third_headers = create_user()
+        response = submit(third_headers, text)
+        body = response.get_json()
+        check("global: 다른 사용자 제출은 요약/임베딩만 재사용하고 비교/질문은 실행 (202)",
+              response.status_code == 202 and body["duplicate_of"] == source_id)
+        drain_jobs()
+    with app.app_context():
+        report = db.session.get(AnalysisReport, body["reportId"])
+        check("1단계 LLM 분석 없이 완료", analysis.calls == 0 and report.status == "completed"
+              and report.user_id != user_id and report.high_similarity_candidates is not None)
+    delete_jobs()
+
+
+def test_preview_does_not_cover_full():
+    delete_jobs()
+    _, headers = create_user()
+    text = submission_text()
+    preview_id = submit(headers, text, is_test="true", preview_only="true").get_json()["reportId"]
+    drain_jobs()
+    copied = submit(headers, text, is_test="true", preview_only="true")
+    check("같은 미리보기 재제출은 복사", copied.status_code == 200 and copied.get_json()["duplicate_of"] == preview_id)
+    full = submit(headers, text)
+    body = full.get_json()
+    check("미리보기 결과로 전체 분석 요청을 대신하지 않음 (최근 리포트의 요약만 재사용, 202)",
+          full.status_code == 202 and body["duplicate_of"] == copied.get_json()["reportId"])
+    delete_jobs()
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Analyze Submission", [
+        test_queue_full_returns_429, test_in_flight_counts_only_valid_leases, test_retry_after_uses_recent_job_time,
+        test_queue_position, test_content_hash, test_in_progress_duplicate, test_completed_duplicate_is_copied,
+        test_force_and_scope, test_preview_does_not_cover_full,
+    ]))
@@ -0,0 +1,286 @@
+import sys
+import json
+
+import sqlalchemy as sa
+from flask_migrate import upgrade, downgrade
+
+from regression_support import check, run_tests, load_backend_app, override_attributes, create_migration_app, SUMMARY
+from config import COMPARISON_SYSTEM_PROMPT, BATCH_COMPARISON_SYSTEM_PROMPT
+from services import analysis_service, analysis_ta_service
+from services.analysis_service import (
+    COMPARISON_SCORE_KEYS, HIGH_SIMILARITY_THRESHOLD, perform_step2_comparison, _validate_batch_comparison,
+    normalize_comparison_result, _filter_high_similarity_reports
+)
+from extensions import db
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 유사 문서 비교 (services/analysis_service.py, analysis_ta_service.py)
+# - 배치 비교: 후보 K개를 1회 호출로 채점, 검증 실패/누락 후보만 후보별 호출로 폴백
+# - 구조화 점수: 저장 시점에 scores_detail/plagiarism_score/is_high_similarity를 1회 기록, 읽을 때는 다시 파싱하지 않음
+#   (과거 데이터는 7c0e5d92a1f3 마이그레이션으로 백필)
+# - 실행: backend 디렉터리에서 `python test_comparison_scores.py`
+# --------------------------------------------------------------------------------------
+
+load_backend_app()  # (가짜 임베딩/LLM 설정)
+
+SUBMISSION = json.dumps(SUMMARY, ensure_ascii=False)
+
+
+def candidates(count):
+    return [
+        {
+            "candidate_id": f"cand-{index}",
+            "candidate_filename": f"cand-{index}.txt",
+            "weighted_similarity": 0.9 - index * 0.1,
+            "candidate_summary_json_str": json.dumps({"Core_Thesis": f"후보 {index}"}, ensure_ascii=False),
+        }
+        for index in range(count)
+    ]
+
+
+def entry(index, score=3, **overrides):
+    return {
+        "candidate_index": index,
+        "overall_comment": f"후보 {index} 비교",
+        "scores": {key_name: score for key_name in COMPARISON_SCORE_KEYS},
+        "reasons": {key_name: "근거" for key_name in COMPARISON_SCORE_KEYS},
+        **overrides,
+    }
+
+
+class FakeComparisons:
+    """배치/후보별 비교 호출을 기록하고, 배치 응답은 batch_response(후보 수)로 생성"""
+
+    def __init__(self, batch_response, single_score=5):
+        self.batch_response = batch_response
+        self.single_score = single_score
+        self.batch_calls = []
+        self.single_calls = []
+
+    def batch(self, submission_json_str, candidate_json_strs, system_prompt_template):
+        self.batch_calls.append(len(candidate_json_strs))
+        response = self.batch_response(len(candidate_json_strs))
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def single(self, submission_json_str, candidate_json_str, system_prompt_template):
+        self.single_calls.append(json.loads(candidate_json_str)["Core_Thesis"])
+        lines = ["- **Overall Comment:** 1:1 비교", "- **Detailed Scoring:**"]
+        lines += [f"  {n}. {key_name}: {self.single_score} – 근거" for n, key_name in enumerate(COMPARISON_SCORE_KEYS, start=1)]
+        return "\n".join(lines)
+
+    def run(self, candidate_docs, batch_mode=True):
+        with override_attributes(
+            analysis_service, _llm_call_batch_comparison=self.batch, _llm_call_comparison=self.single,
+            COMPARISON_BATCH_MODE=batch_mode
+        ):
+            results = perform_step2_comparison("cmp-test", [], [], SUBMISSION, COMPARISON_SYSTEM_PROMPT, candidate_docs=candidate_docs)
+        return {result["candidate_id"]: result for result in results}
+
+
+def test_batch_single_call():
+    fake = FakeComparisons(lambda count: json.dumps([entry(i, score=i + 1) for i in range(count)], ensure_ascii=False))
+    results = fake.run(candidates(3))
+    check("후보 3개 -> 배치 호출 1회, 후보별 호출 0회", fake.batch_calls == [3] and fake.single_calls == [])
+    check("후보마다 결과 1개", sorted(results) == ["cand-0", "cand-1", "cand-2"])
+    report = results["cand-1"]["llm_comparison_report"]
+    check("배치 결과를 1:1 비교와 같은 텍스트 포맷으로 저장",
+          "- **Detailed Scoring:**" in report and all(f"{key_name}: 2" in report for key_name in COMPARISON_SCORE_KEYS))
+    check("candidate_index에 맞는 후보에 점수 배정",
+          [results[f"cand-{i}"]["scores_detail"]["Claim Similarity"] for i in range(3)] == [1, 2, 3])
+    check("후보 정보 유지", results["cand-2"]["candidate_filename"] == "cand-2.txt" and results["cand-2"]["weighted_similarity"] == 0.7)
+
+
+def test_fallback_for_invalid_entries():
+    def response(count):
+        bad_score = entry(1, score=11)  # 범위 밖 점수
+        missing_key = entry(2)
+        del missing_key["scores"]["Reasoning Similarity"]
+        return "```json\n" + json.dumps([entry(0), bad_score, missing_key], ensure_ascii=False) + "\n```"
+
+    fake = FakeComparisons(response)
+    results = fake.run(candidates(4))
+    check("유효한 항목만 채택, 나머지 후보만 1:1 비교로 폴백",
+          fake.batch_calls == [4] and sorted(fake.single_calls) == ["후보 1", "후보 2", "후보 3"])
+    check("폴백 결과 포함 모든 후보 결과 유지", sorted(results) == [f"cand-{i}" for i in range(4)])
+    check("배치 점수 / 폴백 점수 구분",
+          results["cand-0"]["scores_detail"]["Claim Similarity"] == 3 and results["cand-3"]["scores_detail"]["Claim Similarity"] == 5)
+
+
+def test_fallback_when_batch_fails():
+    for label, response in [
+        ("배치 호출 예외", lambda count: RuntimeError("timeout")),
+        ("JSON이 아닌 응답", lambda count: "죄송합니다. 비교할 수 없습니다."),
+        ("리스트가 아닌 JSON", lambda count: json.dumps(entry(0))),
+    ]:
+        fake = FakeComparisons(response)
+        results = fake.run(candidates(3))
+        check(f"{label} -> 모든 후보 1:1 비교로 폴백", len(fake.single_calls) == 3 and len(results) == 3)
+
+
+def test_batch_mode_switch():
+    fake = FakeComparisons(lambda count: json.dumps([entry(i) for i in range(count)]))
+    fake.run(candidates(1))
+    check("후보 1개면 배치 호출 없이 1:1 비교", fake.batch_calls == [] and fake.single_calls == ["후보 0"])
+
+    fake = FakeComparisons(lambda count: json.dumps([entry(i) for i in range(count)]))
+    fake.run(candidates(3), batch_mode=False)
+    check("COMPARISON_BATCH_MODE=false면 기존처럼 후보별 호출", fake.batch_calls == [] and len(fake.single_calls) == 3)
+
+    check("후보가 없으면 호출 없음", FakeComparisons(lambda count: "[]").run([]) == {})
+
+
+def test_validate_batch_entries():
+    valid = _validate_batch_comparison([
+        entry(0),
+        entry(0, score=9),                    # 중복 index -> 첫 항목만
+        entry(5),                             # 범위 밖 index
+        entry("1"),                           # 문자열 index는 정수로 해석
+        entry(None),
+        {**entry(2), "scores": "9점"},         # scores가 dict가 아님
+        {**entry(2), "scores": {**entry(2)["scores"], "Claim Similarity": "높음"}},
+        "잘못된 항목",
+    ], candidate_count=3)
+    check("유효한 항목만 반환", sorted(valid) == [0, 1])
+    check("중복 index는 첫 항목 사용", valid[0]["scores"]["Claim Similarity"] == 3)
+    check("리스트가 아니면 빈 결과", _validate_batch_comparison({"candidate_index": 0}, 3) == {})
+    check("reasons가 없어도 점수만으로 유효", 0 in _validate_batch_comparison([{**entry(0), "reasons": None}], 1))
+
+
+class FakeGemini:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, contents, generation_config=None):
+        self.calls += 1
+        return type("Response", (), {"text": self.text})()
+
+
+def test_ta_batch_comparison():
+    service = analysis_ta_service.AnalysisTAService("{raw_text}", COMPARISON_SYSTEM_PROMPT, BATCH_COMPARISON_SYSTEM_PROMPT)
+    client = FakeGemini(json.dumps([entry(0, score=8), entry(1, score=12)]))
+    with override_attributes(analysis_ta_service, llm_client_comparison=client):
+        reports = service.compare_suspicious_content_batch(SUBMISSION, ['{"a": 1}', '{"b": 2}'])
+    check("TA 배치 비교: 1회 호출, 검증 통과 후보만 반환 (나머지는 호출 측에서 1:1 폴백)",
+          client.calls == 1 and sorted(reports) == [0] and reports[0]["scores"]["Claim Similarity"] == 8)
+
+
+class CountingParser:
+    """_parse_comparison_scores 호출 수 기록 (정규식 재파싱 여부 확인)"""
+
+    def __init__(self):
+        self.original = analysis_service._parse_comparison_scores
+        self.calls = 0
+
+    def __call__(self, report_text):
+        self.calls += 1
+        return self.original(report_text)
+
+
+def comparison_text(scores):
+    return "\n".join(["- **Detailed Scoring:**"] + [
+        f"  {n}. **{key_name}:** {scores[key_name]} – 근거" for n, key_name in enumerate(COMPARISON_SCORE_KEYS, start=1)
+    ])
+
+
+def test_structured_scores_written_once():
+    parser = CountingParser()
+    with override_attributes(analysis_service, _parse_comparison_scores=parser):
+        results = FakeComparisons(lambda count: json.dumps([entry(i, score=8) for i in range(count)])).run(candidates(2))
+        check("배치 결과는 JSON 점수를 그대로 사용 (정규식 파싱 없음)", parser.calls == 0)
+        result = results["cand-0"]
+        check("구조화 점수 레코드 기록",
+              result["scores_detail"] == {key_name: 8 for key_name in COMPARISON_SCORE_KEYS}
+              and result["plagiarism_score"] == 56 and result["is_high_similarity"] is True)
+
+        results = FakeComparisons(lambda count: "[]", single_score=2).run(candidates(2))
+        check("1:1 비교 리포트는 후보마다 정규식 1회", parser.calls == 2)
+        check("1:1 비교도 같은 레코드 (Reasoning 가중치 2배)",
+              results["cand-1"]["plagiarism_score"] == 14 and results["cand-1"]["is_high_similarity"] is False)
+
+        stored = json.loads(json.dumps(list(results.values())))  # similarity_details 저장/로드
+        calls = parser.calls
+        check("저장된 결과로 필터링 (다시 파싱하지 않음)",
+              _filter_high_similarity_reports(stored) == [] and parser.calls == calls)
+        normalize_comparison_result(stored[0])
+        check("이미 정규화된 결과는 다시 파싱하지 않음", parser.calls == calls and stored[0]["plagiarism_score"] == 14)
+
+
+def test_high_similarity_threshold():
+    def scores_with_total(total):
+        # Reasoning 가중치 2배: 나머지 5개 + Reasoning*2 = total
+        scores = {key_name: 0 for key_name in COMPARISON_SCORE_KEYS}
+        scores["Reasoning Similarity"] = min(total // 2, 10)
+        remaining = total - scores["Reasoning Similarity"] * 2
+        for key_name in COMPARISON_SCORE_KEYS:
+            if key_name != "Reasoning Similarity" and remaining:
+                scores[key_name] = min(remaining, 10)
+                remaining -= scores[key_name]
+        return scores
+
+    below = normalize_comparison_result({}, scores_with_total(HIGH_SIMILARITY_THRESHOLD - 1))
+    at = normalize_comparison_result({}, scores_with_total(HIGH_SIMILARITY_THRESHOLD))
+    check(f"총점 {HIGH_SIMILARITY_THRESHOLD - 1} -> 기준 미달", below["plagiarism_score"] == HIGH_SIMILARITY_THRESHOLD - 1
+          and below["is_high_similarity"] is False)
+    check(f"총점 {HIGH_SIMILARITY_THRESHOLD} -> 고유사도", at["plagiarism_score"] == HIGH_SIMILARITY_THRESHOLD
+          and at["is_high_similarity"] is True)
+
+    legacy = {"candidate_id": "old", "llm_comparison_report": comparison_text({key_name: 9 for key_name in COMPARISON_SCORE_KEYS})}
+    stored_flag = {"candidate_id": "flag", "llm_comparison_report": "", "plagiarism_score": 0,
+                   "scores_detail": {}, "is_high_similarity": True}
+    high = _filter_high_similarity_reports([legacy, stored_flag, dict(at), dict(below)])
+    check("필터는 저장된 판정을 따름 (리포트 텍스트를 다시 읽지 않음)", stored_flag in high)
+    check("구조화 필드가 없는 과거 결과만 파싱해서 판정",
+          legacy in high and legacy["plagiarism_score"] == 63 and len(high) == 3)
+
+
+def test_backfill_migration():
+    app = create_migration_app("3a61c2e8f4b7")
+    legacy_report = comparison_text({key_name: 9 for key_name in COMPARISON_SCORE_KEYS})
+    details = [
+        {"candidate_id": "legacy-high", "llm_comparison_report": legacy_report},
+        {"candidate_id": "legacy-low", "llm_comparison_report": comparison_text({key_name: 1 for key_name in COMPARISON_SCORE_KEYS})},
+        {"candidate_id": "preview", "weighted_similarity": 0.8, "provisional": True},
+        {"candidate_id": "done", "llm_comparison_report": legacy_report, "plagiarism_score": 7,
+         "scores_detail": {}, "is_high_similarity": False},
+    ]
+    with app.app_context():
+        db.session.execute(sa.text(
+            "INSERT INTO users (id, email, role, is_admin, is_verified) VALUES (1, 'm@snu.ac.kr', 'student', 0, 1)"))
+        for report_id, value in [("r-list", json.dumps(details)), ("r-broken", "not json"), ("r-empty", None)]:
+            db.session.execute(sa.text(
+                "INSERT INTO analysis_reports (id, user_id, status, is_test, similarity_details) "
+                "VALUES (:id, 1, 'completed', 0, :details)"), {"id": report_id, "details": value})
+        db.session.commit()
+
+        def stored(report_id):
+            return db.session.execute(sa.text("SELECT similarity_details FROM analysis_reports WHERE id = :id"),
+                                      {"id": report_id}).scalar()
+
+        upgrade(revision="7c0e5d92a1f3")
+        items = {item["candidate_id"]: item for item in json.loads(stored("r-list"))}
+        check("과거 비교 결과 백필 (정규식 파싱 결과 저장)",
+              items["legacy-high"]["plagiarism_score"] == 63 and items["legacy-high"]["is_high_similarity"] is True
+              and items["legacy-high"]["scores_detail"]["Reasoning Similarity"] == 9)
+        check("기준 미달 결과도 백필", items["legacy-low"]["plagiarism_score"] == 7 and items["legacy-low"]["is_high_similarity"] is False)
+        check("잠정 미리보기 항목은 그대로", "is_high_similarity" not in items["preview"])
+        check("이미 정규화된 항목은 덮어쓰지 않음", items["done"]["plagiarism_score"] == 7)
+        check("JSON이 아니거나 비어 있는 행은 건너뜀", stored("r-broken") == "not json" and stored("r-empty") is None)
+        check("백필 결과를 필터가 그대로 사용",
+              [item["candidate_id"] for item in _filter_high_similarity_reports(list(items.values())[:2])] == ["legacy-high"])
+
+        downgrade(revision="3a61c2e8f4b7")
+        items = json.loads(stored("r-list"))
+        check("downgrade: 구조화 필드만 제거, 원문 리포트 유지",
+              all("scores_detail" not in item and "is_high_similarity" not in item for item in items)
+              and items[0]["llm_comparison_report"] == legacy_report)
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Comparison Scores", [
+        test_batch_single_call, test_fallback_for_invalid_entries, test_fallback_when_batch_fails,
+        test_batch_mode_switch, test_validate_batch_entries, test_ta_batch_comparison,
+        test_structured_scores_written_once, test_high_similarity_threshold, test_backfill_migration,
+    ]))
@@ -0,0 +1,109 @@
+import re
+import sys
+import random
+
+from regression_support import check, run_tests
+import services.concept_matcher as concept_matcher_module
+from services.concept_matcher import ConceptMatcher, parse_key_concepts, get_concept_matcher
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] Aho-Corasick 개념 매처 (services/concept_matcher.py)
+# - 무작위 본문/개념 목록에서 기존 방식(문단: split('\n') + `in`, 문장: re.split + `in`)과 결과가 같은지 확인
+# - 겹치는 개념(접두/접미 관계), 중복 개념, 구간 경계를 넘는 등장을 일부러 많이 만들도록 작은 문자 집합 사용
+# - pyahocorasick이 설치되어 있으면 C 오토마톤과 순수 파이썬 오토마톤을 모두 확인
+# - 실행: backend 디렉터리에서 `python test_concept_matcher.py`
+# --------------------------------------------------------------------------------------
+
+CASES = 2000
+ALPHABET = "가나다라ab"
+SEPARATORS = ["\n", ". ", "? ", "!  ", " ", "\r\n", "."]
+
+
+# --- 기존 방식 (변경 전 deep_analysis_service 코드) ---
+def old_paragraph_hits(text, concepts, min_length):
+    paragraphs = [p for p in text.split('\n') if len(p) >= min_length]
+    return paragraphs, [{i for i, c in enumerate(concepts) if c in p} for p in paragraphs]
+
+
+def old_sentence_hits(text, concepts, min_length):
+    sentences = [s.strip() for s in re.split(r'[.?!]\s+', text) if len(s.strip()) >= min_length]
+    return sentences, [{i for i, c in enumerate(concepts) if c in s} for s in sentences]
+
+
+def brute_force_matches(text, concepts):
+    matches = []
+    for index, concept in enumerate(concepts):
+        start = text.find(concept)
+        while start != -1:
+            matches.append((start, start + len(concept), index))
+            start = text.find(concept, start + 1)
+    return sorted(matches)
+
+
+def random_case(rng):
+    words = ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 12))]
+    concepts = [rng.choice(words) for _ in range(rng.randint(1, 8))]
+    if rng.random() < 0.3:
+        concepts.append(concepts[0])  # 같은 개념이 두 번 나오는 경우
+    if rng.random() < 0.3:
+        concepts.append(concepts[0][:-1] or concepts[0])  # 다른 개념의 접두어
+    parts = []
+    for _ in range(rng.randint(0, 30)):
+        parts.append(rng.choice(words) if rng.random() < 0.7 else rng.choice(ALPHABET))
+        parts.append(rng.choice(SEPARATORS) if rng.random() < 0.4 else "")
+    return "".join(parts), concepts
+
+
+def check_equivalence(label):
+    rng = random.Random(48)
+    mismatches = {"paragraph": 0, "sentence": 0, "matches": 0}
+    for _ in range(CASES):
+        text, concepts = random_case(rng)
+        matcher = ConceptMatcher(concepts)
+        min_length = rng.choice([0, 1, 3, 11, 21])
+        if matcher.paragraph_hits(text, min_length) != old_paragraph_hits(text, concepts, min_length):
+            mismatches["paragraph"] += 1
+        if matcher.sentence_hits(text, min_length) != old_sentence_hits(text, concepts, min_length):
+            mismatches["sentence"] += 1
+        if sorted(matcher.find_all(text)) != brute_force_matches(text, concepts):
+            mismatches["matches"] += 1
+    if any(mismatches.values()):
+        print(f"   불일치: {mismatches}")
+    check(f"[{label}] 문단별 등장 개념 == split('\\n') + `in` ({CASES}건)", mismatches["paragraph"] == 0)
+    check(f"[{label}] 문장별 등장 개념 == re.split + `in` ({CASES}건)", mismatches["sentence"] == 0)
+    check(f"[{label}] 모든 등장 위치 == str.find 전수 탐색 (겹침 포함)", mismatches["matches"] == 0)
+
+
+def test_fixed_cases():
+    concepts = parse_key_concepts(" 진로 불안, 진로, , 불안 ,진로 ")
+    check("parse_key_concepts: 공백 제거, 빈 항목 제외, 순서/중복 유지", concepts == ["진로 불안", "진로", "불안", "진로"])
+    matcher = ConceptMatcher(concepts)
+    check("겹치는 등장과 중복 개념을 모두 반환", matcher.hits("청년의 진로 불안") == {0, 1, 2, 3})
+    _, hits = matcher.paragraph_hits("진로\n 불안")
+    check("문단 경계를 넘는 등장은 제외", hits == [{1, 3}, {2}])
+    check("빈 본문/None", matcher.hits("") == set() and matcher.find_all(None) == [])
+    check("개념이 없으면 빈 결과", ConceptMatcher([]).paragraph_hits("가나다") == (["가나다"], [set()]))
+    check("같은 개념 목록이면 매처 재사용", get_concept_matcher("가, 나") is get_concept_matcher(["가", "나"]))
+
+
+def test_equivalence_pyahocorasick():
+    if concept_matcher_module.ahocorasick is None:
+        print("(pyahocorasick 미설치: 건너뜀)")
+        return
+    check_equivalence("pyahocorasick")
+
+
+def test_equivalence_pure_python():
+    # 순수 파이썬 오토마톤 (선택 의존성이 없는 환경)
+    installed = concept_matcher_module.ahocorasick
+    concept_matcher_module.ahocorasick = None
+    try:
+        check_equivalence("pure-python")
+    finally:
+        concept_matcher_module.ahocorasick = installed
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("ConceptMatcher", [
+        test_fixed_cases, test_equivalence_pyahocorasick, test_equivalence_pure_python,
+    ]))
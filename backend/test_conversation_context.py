@@ -0,0 +1,150 @@
+import sys
+
+from regression_support import check, run_tests, load_backend_app, create_user, create_report, config_override, FAKE_LLM
+from extensions import db
+from models import ConversationSummary
+from services.qa_history_service import append_turn, save_answer
+from services.conversation_context_service import (
+    build_conversation_context, estimate_tokens, REPORT_CONTEXT, _turn_text
+)
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 대화 맥락 크기 제한 (services/conversation_context_service.py)
+# - 최근 질문은 원문, 밀려난 질문은 누적 요약 -> 대화가 길어져도 토큰 예산 이내
+# - 요약은 전달받은 turns 중 밀려난 질문만 대상 (다른 심화 질문 체인의 대화를 섞지 않음)
+# - 요약 캐시는 맥락(기록 전체 / 체인의 첫 질문)별, 새로 밀려난 질문만 증분 반영, 커밋은 호출 측
+# - 실행: backend 디렉터리에서 `python test_conversation_context.py`
+# --------------------------------------------------------------------------------------
+
+backend = load_backend_app()
+app = backend.app
+
+from api import student_api  # (load_backend_app 이후 임포트)
+
+CONFIG = {
+    "CONVERSATION_CONTEXT_TOKEN_BUDGET": 300,
+    "CONVERSATION_RECENT_TURNS": 2,
+    "CONVERSATION_SUMMARY_TOKEN_BUDGET": 100,
+    "CONVERSATION_SUMMARY_BATCH": 2,
+}
+
+
+def turns(prefix, count, answer="답변"):
+    return [
+        {"question_id": f"{prefix}-{i}", "question": f"{prefix} 질문 {i}", "answer": f"{prefix} {answer} {i}"}
+        for i in range(count)
+    ]
+
+
+def summary_prompts():
+    return [prompt for kind, prompt in FAKE_LLM.prompts if kind == "summary"]
+
+
+def test_short_conversation_is_verbatim():
+    FAKE_LLM.reset()
+    with app.app_context():
+        items = turns("s", 2) + [{"question_id": "s-x", "question": "미답변 질문", "answer": None}]
+        summary, recent = build_conversation_context("no-report", items, CONFIG)
+        check("예산 안이면 요약 없이 답변된 질문 전체", summary == "" and [t["question_id"] for t in recent] == ["s-0", "s-1"])
+        check("LLM 호출 없음", FAKE_LLM.calls == [])
+        check("빈 목록", build_conversation_context("no-report", [], CONFIG) == ("", []))
+
+
+def test_long_conversation_stays_in_budget():
+    FAKE_LLM.reset()
+    user_id, _ = create_user()
+    report_id = create_report(user_id)
+    with app.app_context():
+        items = turns("long", 30, answer="아주 긴 답변 " * 40)
+        summary, recent = build_conversation_context(report_id, items, CONFIG)
+        used = estimate_tokens(summary) + sum(estimate_tokens(_turn_text(turn)) for turn in recent)
+        check(f"대화 30개여도 토큰 예산 이내 ({used} <= 300)", used <= CONFIG["CONVERSATION_CONTEXT_TOKEN_BUDGET"])
+        check("가장 최근 질문은 원문(잘라서라도) 포함", recent and recent[-1]["question_id"] == "long-29")
+        check("밀려난 질문은 요약 1회로 압축", summary and FAKE_LLM.count("summary") == 1)
+        db.session.rollback()
+
+
+def test_summary_uses_only_passed_turns():
+    FAKE_LLM.reset()
+    user_id, _ = create_user()
+    report_id = create_report(user_id)
+    with app.app_context():
+        build_conversation_context(report_id, turns("A", 6), CONFIG, context_key="A-0")
+        build_conversation_context(report_id, turns("B", 6), CONFIG, context_key="B-0")
+        prompts = summary_prompts()
+        check("체인마다 요약 1회", len(prompts) == 2)
+        check("A 체인 요약에는 A의 밀려난 질문만",
+              "A 질문 0" in prompts[0] and "A 질문 3" in prompts[0] and "A 질문 4" not in prompts[0] and "B 질문" not in prompts[0])
+        check("B 체인 요약에는 B의 질문만 (A 체인 대화를 섞지 않음)", "B 질문 0" in prompts[1] and "A 질문" not in prompts[1])
+        db.session.rollback()
+
+
+def test_cache_is_per_context_and_incremental():
+    FAKE_LLM.reset()
+    user_id, _ = create_user()
+    report_id = create_report(user_id)
+    with app.app_context():
+        chain = turns("C", 6)
+        first, _ = build_conversation_context(report_id, chain, CONFIG, context_key="C-0")
+        check("helper는 커밋하지 않음 (세션에만 추가)",
+              any(isinstance(obj, ConversationSummary) for obj in db.session.new))
+        db.session.rollback()
+        check("호출 측이 롤백하면 캐시도 저장되지 않음", db.session.get(ConversationSummary, (report_id, "C-0")) is None)
+
+        build_conversation_context(report_id, chain, CONFIG, context_key="C-0")
+        db.session.commit()
+        calls = FAKE_LLM.count("summary")
+        again, _ = build_conversation_context(report_id, chain, CONFIG, context_key="C-0")
+        check("같은 맥락을 다시 요청하면 캐시 사용 (LLM 호출 없음)", FAKE_LLM.count("summary") == calls and again)
+
+        report_level, _ = build_conversation_context(report_id, turns("C", 6), CONFIG)
+        check("다른 맥락(기록 전체)은 별도 캐시", FAKE_LLM.count("summary") == calls + 1)
+        db.session.commit()
+        check("맥락별 캐시 행", {row.context_key for row in ConversationSummary.query.filter_by(report_id=report_id)}
+              == {"C-0", REPORT_CONTEXT})
+
+        # 새로 1개가 밀려나면 발췌만 덧붙이고(배치 미만), 2개 이상이면 새로 밀려난 질문만 요약에 반영
+        longer, _ = build_conversation_context(report_id, turns("C", 7), CONFIG, context_key="C-0")
+        check("배치 미만이면 LLM 호출 없이 발췌 추가", FAKE_LLM.count("summary") == calls + 1 and "C 질문 4" in longer)
+        build_conversation_context(report_id, turns("C", 8), CONFIG, context_key="C-0")
+        prompt = summary_prompts()[-1]
+        check("증분 요약 입력은 새로 밀려난 질문만",
+              "C 질문 4" in prompt and "C 질문 5" in prompt and "C 질문 3" not in prompt)
+        db.session.rollback()
+
+
+def test_deep_dive_prompt_excludes_other_chains():
+    """실제 심화 질문 경로: 체인 B의 프롬프트에 먼저 진행된 체인 A의 대화가 들어가지 않음"""
+    FAKE_LLM.reset()
+    user_id, _ = create_user()
+    report_id = create_report(user_id)
+    with app.app_context():
+        def answered_chain(prefix, length):
+            root_id = parent_id = None
+            for i in range(length):
+                turn = append_turn(report_id, f"{prefix} 질문 {i}", "deep_dive" if parent_id else "critical", parent_id)
+                save_answer(report_id, turn["question_id"], f"{prefix} 답변 {i}")
+                parent_id = turn["question_id"]
+                root_id = root_id or parent_id
+            db.session.commit()
+            return root_id, parent_id
+
+        answered_chain("A", 5)
+        root_b, last_b = answered_chain("B", 5)
+
+    with config_override(app, **CONFIG):
+        student_api._background_generate_deep_dive(app, report_id, last_b)
+
+    prompts = [prompt for kind, prompt in FAKE_LLM.prompts if kind in ("summary", "deep_dive")]
+    check("요약 + 심화 질문 LLM 호출", FAKE_LLM.count("summary") == 1 and FAKE_LLM.count("deep_dive") == 1)
+    check("체인 B의 요약/프롬프트에 체인 A 대화 없음", all("A 질문" not in prompt and "A 답변" not in prompt for prompt in prompts))
+    with app.app_context():
+        rows = ConversationSummary.query.filter_by(report_id=report_id).all()
+        check("체인 B 요약 캐시 저장 (첫 질문 ID 기준)", [row.context_key for row in rows] == [root_b])
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Conversation Context", [
+        test_short_conversation_is_verbatim, test_long_conversation_stays_in_budget, test_summary_uses_only_passed_turns,
+        test_cache_is_per_context_and_incremental, test_deep_dive_prompt_excludes_other_chains,
+    ]))
@@ -0,0 +1,160 @@
+import sys
+import json
+from time import time
+
+from regression_support import check, run_tests, load_backend_app, create_user, create_report
+from extensions import db
+from models import AnalysisReport
+from services import deep_analysis_service
+from services.deep_analysis_service import deep_analysis_key
+from services.revision_service import revision_basis
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 심층 분석 결과 재사용 (deep_analysis_key / POST /reports/<id>/deep-analysis)
+# - 키 = hash(요약, 본문, 프롬프트 버전, 수정본이면 원본 분석 기준)
+# - 같은 키의 완료 결과는 재사용(200), 진행 중이면 연결(202), 키가 바뀌면 새로 분석
+# - 수정본은 원본의 심층 분석이 완료/갱신되면 본문이 같아도 다시 분석
+# - 실행: backend 디렉터리에서 `python test_deep_analysis_cache.py`
+# --------------------------------------------------------------------------------------
+
+backend = load_backend_app()
+app = backend.app
+client = app.test_client()
+
+from api import student_api  # (load_backend_app 이후 임포트)
+
+COMPLETED = {"status": "completed", "neuron_map": {"nodes": []}, "integrity_issues": [], "flow_disconnects": []}
+
+
+class StartedRuns:
+    """_background_deep_analysis 대신 시작된 실행만 기록 (실제 분석은 이 테스트 범위 밖)"""
+
+    def __init__(self):
+        self.runs = []
+
+    def __call__(self, app, report_id, run_id=None):
+        self.runs.append((report_id, run_id))
+
+
+def request_analysis(report_id, **params):
+    return client.post(f"/api/student/reports/{report_id}/deep-analysis", query_string=params)
+
+
+def complete_run(report_id):
+    """진행 중인 실행을 완료 상태로 (같은 content_hash 유지)"""
+    with app.app_context():
+        report = db.session.get(AnalysisReport, report_id)
+        current = json.loads(report.deep_analysis_data)
+        report.deep_analysis_data = json.dumps({**COMPLETED, "content_hash": current["content_hash"], "run_id": current["run_id"]})
+        db.session.commit()
+
+
+def test_key_inputs():
+    summary, text = {"Claim": "주장"}, "본문"
+    base = deep_analysis_key(summary, text)
+    check("같은 입력이면 같은 키", base == deep_analysis_key({"Claim": "주장"}, "본문"))
+    check("요약이 바뀌면 다른 키", base != deep_analysis_key({"Claim": "다른 주장"}, text))
+    check("본문이 바뀌면 다른 키", base != deep_analysis_key(summary, "본문2"))
+    check("수정본 기준이 없으면 기존 키 그대로", base == deep_analysis_key(summary, text, None))
+
+    with_parent = deep_analysis_key(summary, text, {"parent_id": "p1", "parent_hash": "a"})
+    check("수정본 기준이 있으면 다른 키", with_parent != base)
+    check("원본 분석이 바뀌면 다른 키", with_parent != deep_analysis_key(summary, text, {"parent_id": "p1", "parent_hash": "b"}))
+    check("원본이 다르면 다른 키", with_parent != deep_analysis_key(summary, text, {"parent_id": "p2", "parent_hash": "a"}))
+
+    original = deep_analysis_service.DEEP_ANALYSIS_LOGIC_VERSION
+    try:
+        deep_analysis_service.DEEP_ANALYSIS_LOGIC_VERSION = original + 1
+        check("분석 로직 버전이 바뀌면 다른 키", base != deep_analysis_key(summary, text))
+    finally:
+        deep_analysis_service.DEEP_ANALYSIS_LOGIC_VERSION = original
+
+
+def test_revision_basis():
+    user_id, _ = create_user()
+    with app.app_context():
+        parent = AnalysisReport(id="basis-parent", user_id=user_id, summary="{}", deep_analysis_data=None)
+        check("원본이 없으면 None", revision_basis(None) is None)
+        check("원본 심층 분석이 없으면 None (수정본도 전체 분석)", revision_basis(parent) is None)
+        parent.deep_analysis_data = json.dumps({"status": "processing"})
+        check("원본 분석이 진행 중이면 None", revision_basis(parent) is None)
+        parent.deep_analysis_data = json.dumps(COMPLETED)
+        basis = revision_basis(parent)
+        check("원본 분석이 완료되면 원본 ID + 해시", basis["parent_id"] == "basis-parent" and basis["parent_hash"])
+        parent.deep_analysis_data = json.dumps({**COMPLETED, "neuron_map": {"nodes": [1]}})
+        check("원본 분석 결과가 바뀌면 다른 해시", revision_basis(parent)["parent_hash"] != basis["parent_hash"])
+
+
+def test_reuse_and_attach():
+    started = StartedRuns()
+    original = student_api._background_deep_analysis
+    student_api._background_deep_analysis = started
+    try:
+        user_id, _ = create_user()
+        report_id = create_report(user_id)
+        first = request_analysis(report_id)
+        check("첫 요청 -> 202 + 실행 1개 시작", first.status_code == 202 and len(started.runs) == 1)
+        attached = request_analysis(report_id)
+        check("진행 중이면 새 실행 없이 연결", attached.status_code == 202 and attached.get_json().get("attached") and len(started.runs) == 1)
+
+        complete_run(report_id)
+        cached = request_analysis(report_id)
+        check("완료 결과 재사용 -> 200 cached", cached.status_code == 200 and cached.get_json().get("cached") is True)
+        check("재사용 시 실행 없음", len(started.runs) == 1)
+
+        forced = request_analysis(report_id, force="true")
+        check("force=true면 새로 분석", forced.status_code == 202 and len(started.runs) == 2)
+
+        complete_run(report_id)
+        with app.app_context():
+            report = db.session.get(AnalysisReport, report_id)
+            report.text_snippet = report.text_snippet + "\n새 문단을 추가했습니다."
+            db.session.commit()
+        check("본문이 바뀌면 새로 분석", request_analysis(report_id).status_code == 202 and len(started.runs) == 3)
+
+        with app.app_context():
+            report = db.session.get(AnalysisReport, report_id)
+            report.deep_analysis_data = json.dumps({"status": "processing", "content_hash": "x", "run_id": "old", "started_at": time() - 10 ** 6})
+            db.session.commit()
+        check("끝나지 못한 오래된 실행은 새로 시작", request_analysis(report_id).status_code == 202 and len(started.runs) == 4)
+    finally:
+        student_api._background_deep_analysis = original
+
+
+def test_revision_parent_changes_key():
+    started = StartedRuns()
+    original = student_api._background_deep_analysis
+    student_api._background_deep_analysis = started
+    try:
+        user_id, _ = create_user()
+        parent_id = create_report(user_id)
+        child_id = create_report(user_id, revision_of=parent_id)
+
+        check("원본 분석 전 수정본 분석 시작", request_analysis(child_id).status_code == 202 and len(started.runs) == 1)
+        complete_run(child_id)
+        check("원본이 그대로면 수정본 결과 재사용", request_analysis(child_id).status_code == 200)
+
+        # 원본의 심층 분석이 완료되면, 수정본은 원본 결과를 재사용하는 분석으로 다시 실행
+        with app.app_context():
+            parent = db.session.get(AnalysisReport, parent_id)
+            parent.deep_analysis_data = json.dumps(COMPLETED)
+            db.session.commit()
+        response = request_analysis(child_id)
+        check("원본 분석이 완료되면 수정본 키가 바뀌어 다시 분석", response.status_code == 202 and len(started.runs) == 2)
+
+        complete_run(child_id)
+        check("다시 분석한 결과는 재사용", request_analysis(child_id).status_code == 200 and len(started.runs) == 2)
+
+        with app.app_context():
+            parent = db.session.get(AnalysisReport, parent_id)
+            parent.deep_analysis_data = json.dumps({**COMPLETED, "integrity_issues": [{"type": "gap"}]})
+            db.session.commit()
+        check("원본을 다시 분석하면 수정본도 다시 분석", request_analysis(child_id).status_code == 202 and len(started.runs) == 3)
+    finally:
+        student_api._background_deep_analysis = original
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Deep Analysis Cache", [
+        test_key_inputs, test_revision_basis, test_reuse_and_attach, test_revision_parent_changes_key,
+    ]))
@@ -0,0 +1,189 @@
+import re
+import sys
+import json
+import random
+import contextlib
+import io
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from regression_support import check, run_tests, HashEmbeddingModel
+import services.deep_analysis_service as deep_analysis_service
+from services import embedding_cache
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 흐름 단절 검사의 증거 문장 추출 (check_flow_disconnects_with_llm)
+# - 엣지마다 요약을 따로 인코딩/비교하던 기존 구현(아래 old_edge_context, 변경 전 코드 그대로)과
+#   LLM에 보내는 엣지/스니펫 문맥, 최종 결과(라벨 치환 포함)가 같은지 무작위 흐름 그래프로 확인
+# - 노드 요약은 중복 제거 후 1회 배치 인코딩 (본문 문장 1회 + 요약 1회)
+# - 실행: backend 디렉터리에서 `python test_flow_disconnects.py`
+# --------------------------------------------------------------------------------------
+
+CASES = 200
+
+
+class CountingEmbeddingModel(HashEmbeddingModel):
+    """encode 호출 수 기록 (인코딩 배치 수 확인용)"""
+
+    def __init__(self, dim=8):
+        super().__init__(dim)
+        self.encode_calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.encode_calls += 1
+        return super().encode(texts, **kwargs)
+
+
+class PromptRecorder:
+    """_call_llm_json 대체: 프롬프트의 엣지/스니펫 문맥을 기록하고, 엣지마다 판정 1개를 돌려줌"""
+
+    def __init__(self):
+        self.contexts = []
+
+    def __call__(self, prompt_text):
+        edges = json.loads(re.search(r"\[Structure Edges\] (.*)\n", prompt_text).group(1))
+        snippets = json.loads(re.search(r"\[Text Snippets\] (.*)\n", prompt_text).group(1))
+        self.contexts.append((edges, snippets))
+        return [
+            {"parent_id": ids[0], "child_id": ids[1], "issue_type": ["Weak", "Bridge Needed", "Strong"][i % 3]}
+            for i, ids in enumerate(re.findall(r"\((\w+)\) -> .*?\((\w+)\)$", edge)[0] for edge in edges)
+        ]
+
+
+# --- 기존 구현 (엣지마다 부모/자식 요약 인코딩 + cosine_similarity, 변경 전 코드) ---
+def old_edge_context(flow_pattern_json, raw_text, embedding_model):
+    nodes = flow_pattern_json['nodes']
+    edges = flow_pattern_json['edges']
+    raw_sentences = [s.strip() for s in re.split(r'[.?!]\s+', raw_text) if len(s.strip()) > 10]
+    edges_context = []
+    snippets_context = {}
+    node_label_map = {}
+    if embedding_model and raw_sentences:
+        doc_embeddings = embedding_model.encode(raw_sentences)
+    else:
+        doc_embeddings = None
+
+    for idx, edge in enumerate(edges):
+        parent_id, child_id = edge
+        parent_full_text = nodes.get(parent_id, "")
+        child_full_text = nodes.get(child_id, "")
+        p_match = re.search(r'\[(.*?)\]', parent_full_text)
+        c_match = re.search(r'\[(.*?)\]', child_full_text)
+        p_label_text = f"[{p_match.group(1)}]" if p_match else parent_id
+        c_label_text = f"[{c_match.group(1)}]" if c_match else child_id
+        node_label_map[parent_id] = p_label_text
+        node_label_map[child_id] = c_label_text
+        parent_summary = parent_full_text.split('\n')[-1].strip()
+        child_summary = child_full_text.split('\n')[-1].strip()
+        if not parent_summary or not child_summary: continue
+
+        p_rep = ""
+        c_rep = ""
+        if embedding_model and doc_embeddings is not None:
+            p_query_vec = embedding_model.encode(parent_summary)
+            p_sims = cosine_similarity([p_query_vec], doc_embeddings)[0]
+            p_idx = np.argmax(p_sims)
+            p_rep = raw_sentences[p_idx]
+            c_query_vec = embedding_model.encode(child_summary)
+            c_sims = cosine_similarity([c_query_vec], doc_embeddings)[0]
+            c_idx = np.argmax(c_sims)
+            c_rep = raw_sentences[c_idx]
+
+        edge_key = f"{p_label_text} ({parent_id}) -> {c_label_text} ({child_id})"
+        edges_context.append(edge_key)
+        snippets_context[edge_key] = {
+            "parent_summary": parent_summary,
+            "child_summary": child_summary,
+            "parent_snippet": p_rep,
+            "child_snippet": c_rep
+        }
+    return edges_context, snippets_context, node_label_map
+
+
+def expected_result(edges_context, node_label_map):
+    """PromptRecorder 판정에서 Weak / Bridge Needed만 남기고 ID를 라벨로 치환 (기존 필터링과 같은 규칙)"""
+    result = []
+    for i, edge in enumerate(edges_context):
+        issue_type = ["Weak", "Bridge Needed", "Strong"][i % 3]
+        if issue_type == "Strong":
+            continue
+        parent_id, child_id = re.findall(r"\((\w+)\) -> .*?\((\w+)\)$", edge)[0]
+        result.append({"parent_id": node_label_map.get(parent_id, parent_id),
+                       "child_id": node_label_map.get(child_id, child_id), "issue_type": issue_type})
+    return result
+
+
+def random_case(seed):
+    rng = random.Random(seed)
+    node_ids = [f"N{k}" for k in range(rng.randint(1, 12))]
+    summaries = [f"요약 문장 {k}번 내용" for k in range(max(1, len(node_ids) // 2))]  # (여러 노드가 같은 요약 공유)
+    nodes = {}
+    for node_id in node_ids:
+        roll = rng.random()
+        if roll < 0.1:
+            continue  # 엣지에만 나오고 노드 정의가 없는 경우
+        label = f"[{rng.choice(['문제', '주장', '근거', '결론'])}]\n" if roll < 0.8 else ""
+        nodes[node_id] = label + ("" if roll > 0.95 else rng.choice(summaries))
+    edges = [[rng.choice(node_ids), rng.choice(node_ids)] for _ in range(rng.randint(0, 15))]
+    sentences = [f"본문의 {k}번째 문장은 충분히 깁니다" for k in range(rng.randint(0, 20))]
+    sentences += rng.sample(sentences, min(2, len(sentences)))  # (중복 문장)
+    model = None if seed % 7 == 0 else CountingEmbeddingModel()
+    if model and seed % 5 == 0:
+        model.vectors[summaries[0]] = np.zeros(model.dim, dtype=np.float32)  # 영벡터 요약
+    return {"nodes": nodes, "edges": edges}, ". ".join(sentences) + ".", model
+
+
+def test_equivalence():
+    # (다른 테스트와 같은 프로세스에서 실행될 수 있으므로 끝나면 원래 모델/LLM 함수로 복원)
+    original = (deep_analysis_service._call_llm_json, deep_analysis_service.embedding_model)
+    mismatched, edge_count = [], 0
+    try:
+        for seed in range(CASES):
+            flow, text, model = random_case(seed)
+            recorder = PromptRecorder()
+            deep_analysis_service._call_llm_json = recorder
+            deep_analysis_service.embedding_model = model
+            embedding_cache._cache.clear()
+            edges_context, snippets_context, node_label_map = old_edge_context(flow, text, model)
+            edge_count += len(edges_context)
+            with contextlib.redirect_stdout(io.StringIO()):
+                actual = deep_analysis_service.check_flow_disconnects_with_llm(flow, text)
+            expected_contexts = [(edges_context, snippets_context)] if edges_context else []
+            if recorder.contexts != expected_contexts or actual != expected_result(edges_context, node_label_map):
+                mismatched.append(seed)
+    finally:
+        deep_analysis_service._call_llm_json, deep_analysis_service.embedding_model = original
+        embedding_cache._cache.clear()
+    if mismatched:
+        print(f"   불일치 seed: {mismatched[:10]}")
+    check(f"기존 엣지별 구현과 LLM 문맥/결과 동일 ({CASES}건, 엣지 {edge_count}개)", not mismatched)
+
+
+def test_batched_encoding():
+    nodes = {f"N{k}": f"[단계 {k}]\n{k}번 노드의 요약" for k in range(30)}
+    edges = [[f"N{k}", f"N{(k + step) % 30}"] for k in range(30) for step in (1, 2, 3)]
+    text = ". ".join(f"본문의 {k}번째 문장은 충분히 깁니다" for k in range(50)) + "."
+    model = CountingEmbeddingModel()
+    original = (deep_analysis_service._call_llm_json, deep_analysis_service.embedding_model)
+    deep_analysis_service._call_llm_json, deep_analysis_service.embedding_model = PromptRecorder(), model
+    try:
+        embedding_cache._cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            deep_analysis_service.check_flow_disconnects_with_llm({"nodes": nodes, "edges": edges}, text)
+    finally:
+        deep_analysis_service._call_llm_json, deep_analysis_service.embedding_model = original
+        embedding_cache._cache.clear()
+    check("본문 문장 1회 + 노드 요약 1회 배치 인코딩 (엣지 90개)", model.encode_calls == 2)
+    check("여러 엣지에 나오는 노드 요약도 1번만 인코딩 (문장 50 + 요약 30)", len(model.encoded) == 80)
+
+
+def test_empty_inputs():
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [deep_analysis_service.check_flow_disconnects_with_llm(value, "본문")
+                   for value in (None, {}, {"nodes": {}}, {"nodes": {"A": "[a]\n요약"}, "edges": [["A", "B"]]})]
+    check("흐름 구조가 없거나 유효한 엣지가 없으면 LLM 호출 없이 빈 결과", results == [[], [], [], []])
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Flow Disconnects", [test_empty_inputs, test_batched_encoding, test_equivalence]))
@@ -0,0 +1,150 @@
+import sys
+import gzip
+
+from flask import Flask, jsonify, request
+
+from regression_support import check, run_tests, load_backend_app, create_user, create_report
+
+from api.http_cache import report_etag, not_modified_response, with_etag, init_http_compression, brotli
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 조회 응답 ETag / 304 및 응답 압축 (api/http_cache.py)
+# - 압축된 응답은 ETag에 -gzip / -br 접미사가 붙으므로, 그 값을 If-None-Match로 다시 보내도 304가 나와야 함
+# - 실제 리포트 조회 라우트와 같은 순서(ETag 계산 -> 304 확인 -> 본문 생성 -> with_etag)의 작은 앱으로 확인
+# - 실행: backend 디렉터리에서 `python test_http_cache.py`
+# --------------------------------------------------------------------------------------
+
+REPORT = {"id": "r1", "version": 3, "body_calls": 0}
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['COMPRESS_MIN_SIZE'] = 256
+    init_http_compression(app)
+
+    @app.route("/report/<report_id>")
+    def get_report(report_id):
+        etag = report_etag("report", report_id, REPORT["version"], request.query_string)
+        cached = not_modified_response(etag)
+        if cached is not None:
+            return cached
+        REPORT["body_calls"] += 1
+        return with_etag(jsonify({"id": report_id, "text": "본문 " * 500}), etag)
+
+    @app.route("/small/<report_id>")
+    def get_small(report_id):
+        etag = report_etag("small", report_id, REPORT["version"])
+        return not_modified_response(etag) or with_etag(jsonify({"id": report_id}), etag)
+
+    @app.route("/processing/<report_id>")
+    def get_processing(report_id):
+        etag = report_etag("report", report_id, REPORT["version"])
+        return with_etag((jsonify({"status": "processing", "text": "x" * 1000}), 202), etag)
+
+    return app
+
+
+def test_report_etag():
+    base = report_etag("report", "r1", 3)
+    check("같은 입력이면 같은 ETag", base == report_etag("report", "r1", 3))
+    check("version이 바뀌면 다른 ETag", base != report_etag("report", "r1", 4))
+    check("요청 변형(쿼리 문자열)이 다르면 다른 ETag",
+          report_etag("report", "r1", 3, b"a=1") != report_etag("report", "r1", 3, "a=2"))
+    check("str/bytes 변형은 같은 값", report_etag("report", "r1", 3, "a=1") == report_etag("report", "r1", 3, b"a=1"))
+    check("ETag에 종류와 version 포함", base.startswith("report-3-"))
+
+
+def revalidate(client, path, etag, encoding):
+    return client.get(path, headers={"Accept-Encoding": encoding, "If-None-Match": f'"{etag}"'})
+
+
+def check_round_trip(client, encoding):
+    REPORT["version"], REPORT["body_calls"] = 3, 0
+    first = client.get("/report/r1", headers={"Accept-Encoding": encoding})
+    etag, weak = first.get_etag()
+    expected_suffix = "" if encoding == "identity" else f"-{encoding}"
+    check(f"[{encoding}] 200 응답 Content-Encoding", first.headers.get("Content-Encoding") == (None if encoding == "identity" else encoding))
+    check(f"[{encoding}] ETag = 기본 ETag + '{expected_suffix}' (강한 ETag 유지)",
+          etag == report_etag("report", "r1", 3) + expected_suffix and not weak)
+    if encoding == "gzip":
+        check("[gzip] 압축된 본문 복원", b'"id":"r1"' in gzip.decompress(first.data).replace(b" ", b""))
+    if encoding == "br":
+        check("[br] 압축된 본문 복원", b'"id":"r1"' in brotli.decompress(first.data).replace(b" ", b""))
+    check(f"[{encoding}] Vary: Accept-Encoding", "accept-encoding" in first.headers.get("Vary", "").lower())
+
+    second = revalidate(client, "/report/r1", etag, encoding)
+    check(f"[{encoding}] 받은 ETag로 재검증 -> 304", second.status_code == 304 and second.data == b"")
+    check(f"[{encoding}] 304는 본문을 다시 만들지 않음", REPORT["body_calls"] == 1)
+
+    # (304 응답의 ETag로 다시 재검증해도 304 - 브라우저는 304의 헤더로 캐시 항목을 갱신)
+    third = revalidate(client, "/report/r1", second.get_etag()[0], encoding)
+    check(f"[{encoding}] 304 응답의 ETag로 재검증 -> 304", third.status_code == 304)
+
+    # 다른 압축 방식으로 받은 ETag여도 같은 version이면 304
+    other = revalidate(client, "/report/r1", etag, "gzip" if encoding != "gzip" else "identity")
+    check(f"[{encoding}] 다른 Accept-Encoding으로 재검증해도 304", other.status_code == 304)
+
+    REPORT["version"] = 4
+    changed = revalidate(client, "/report/r1", etag, encoding)
+    check(f"[{encoding}] version이 바뀌면 200 + 새 ETag", changed.status_code == 200 and changed.get_etag()[0] != etag)
+
+
+def check_edge_cases(client):
+    REPORT["version"] = 3
+    etag = report_etag("report", "r1", 3)
+    check("다른 리포트의 ETag로는 304가 나오지 않음",
+          revalidate(client, "/report/r2", etag, "gzip").status_code == 200)
+    check("임의 접미사는 인정하지 않음",
+          revalidate(client, "/report/r1", etag + "-deflate", "gzip").status_code == 200)
+    check("If-None-Match: * 는 304", client.get("/report/r1", headers={"If-None-Match": "*"}).status_code == 304)
+    check("쿼리 문자열이 다르면 ETag도 다름",
+          client.get("/report/r1?a=1").get_etag()[0] != client.get("/report/r1?a=2").get_etag()[0])
+
+    small = client.get("/small/r1", headers={"Accept-Encoding": "gzip"})
+    check("COMPRESS_MIN_SIZE 미만은 압축하지 않음 (ETag 접미사 없음)",
+          "Content-Encoding" not in small.headers and not small.get_etag()[0].endswith("-gzip"))
+
+    processing = client.get("/processing/r1", headers={"Accept-Encoding": "gzip"})
+    check("200이 아닌 응답에는 ETag를 붙이지 않음", processing.status_code == 202 and processing.get_etag() == (None, None))
+
+
+def test_round_trips():
+    client = create_test_app().test_client()
+    for encoding in ["identity", "gzip"] + (["br"] if brotli is not None else []):
+        print(f"[Accept-Encoding: {encoding}]")
+        check_round_trip(client, encoding)
+
+
+def test_edge_cases():
+    check_edge_cases(create_test_app().test_client())
+
+
+def test_access_checks_before_304():
+    """실제 라우트: ETag가 일치해도 기존 권한 확인(소유자/TA 역할)을 먼저 통과해야 304"""
+    client = load_backend_app().app.test_client()
+    owner_id, owner = create_user()
+    _, stranger = create_user()
+    _, ta = create_user(role="ta")
+    report_id = create_report(owner_id)
+
+    first = client.get(f"/api/student/report/{report_id}", headers=owner)
+    etag = first.get_etag()[0]
+    check("소유자 조회 200 + ETag", first.status_code == 200 and etag)
+    revalidate_headers = {"If-None-Match": f'"{etag}"'}
+    check("소유자 재검증 -> 304",
+          client.get(f"/api/student/report/{report_id}", headers={**owner, **revalidate_headers}).status_code == 304)
+    check("다른 학생은 같은 ETag를 보내도 403 (304 아님)",
+          client.get(f"/api/student/report/{report_id}", headers={**stranger, **revalidate_headers}).status_code == 403)
+
+    ta_first = client.get(f"/api/ta/report/{report_id}", headers=ta)
+    ta_etag = ta_first.get_etag()[0]
+    check("TA 조회 200 + ETag", ta_first.status_code == 200 and ta_etag)
+    ta_revalidate = {"If-None-Match": f'"{ta_etag}"'}
+    check("TA 재검증 -> 304", client.get(f"/api/ta/report/{report_id}", headers={**ta, **ta_revalidate}).status_code == 304)
+    check("TA 역할이 아니면 같은 ETag여도 403",
+          client.get(f"/api/ta/report/{report_id}", headers={**owner, **ta_revalidate}).status_code == 403)
+    check("없는 리포트는 404", client.get("/api/ta/report/missing", headers={**ta, **ta_revalidate}).status_code == 404)
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("HTTP Cache", [test_report_etag, test_round_trips, test_edge_cases, test_access_checks_before_304]))
@@ -0,0 +1,402 @@
+import sys
+import time
+import uuid
+import threading
+from datetime import timedelta
+
+from regression_support import (
+    check, run_tests, load_backend_app, create_user, create_report, delete_jobs, override_attributes, wait_until
+)
+from extensions import db
+from models import AnalysisJob, AnalysisReport, Course, Assignment
+from services import job_queue_service
+from services.job_queue_service import (
+    register_stage, enqueue_job, claim_next_job, renew_lease, run_job, has_active_job, JobWorkerPool,
+    parse_class_weights, _utcnow
+)
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] DB 작업 큐 (services/job_queue_service.py) / 중단 리포트 재개 (app.py)
+# - 재개(resume)와 시작 스윕을 여러 스레드에서 동시에 실행해도 리포트당 pipeline 작업은 1개만 등록
+# - 선점(lease) 연장/상실, 가시성 타임아웃이 지난 작업 회수, 지연 등록(run_after)
+# - 실패 시 지수 백오프 재시도와 최종 실패 처리, 고정 크기 워커 풀이 작업을 1번씩만 실행
+# - 공정 분배: 클래스 가중치(interactive/batch) -> 과목 -> 사용자 순으로 덜 쓴 쪽 먼저, 사용자별 큐 사용량 조회
+# - 실행: backend 디렉터리에서 `python test_job_queue.py`
+# --------------------------------------------------------------------------------------
+
+THREADS = 8
+
+backend = load_backend_app()
+app = backend.app
+
+
+def run_threads(target, count):
+    """count개 스레드를 동시에 시작하여 target(index)를 실행하고 결과(또는 예외) 목록을 반환"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = target(index)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def active_pipeline_jobs(report_id):
+    with app.app_context():
+        return AnalysisJob.query.filter(
+            AnalysisJob.report_id == report_id,
+            AnalysisJob.stage == "pipeline",
+            AnalysisJob.status.in_(["queued", "running"])
+        ).count()
+
+
+def test_resume_race():
+    user_id, _ = create_user()
+    report_id = create_report(user_id, status="processing_comparison")
+
+    def resume(index):
+        with app.app_context():
+            return backend.resume_analysis_report(report_id)
+
+    results = run_threads(resume, THREADS)
+    errors = [result for result in results if isinstance(result, Exception)]
+    check(f"동시 재개 {THREADS}개 스레드: 예외 없음 {errors[:1]}", not errors)
+    check("1개 스레드만 재개 성공", [ok for ok, _ in results].count(True) == 1)
+    check("나머지는 already_running", sorted({detail for ok, detail in results if not ok}) == ["already_running"])
+    check("pipeline 작업은 1개만 등록", active_pipeline_jobs(report_id) == 1)
+
+    with app.app_context():
+        report = db.session.get(AnalysisReport, report_id)
+        check("재개 상태는 첫 누락 단계(analyze) 기준", report.status == "processing" and report.error_message is None)
+        check("재개 시 status 섹션 버전 갱신", '"status"' in (report.section_versions or ""))
+        check("작업이 있으면 다시 재개하지 않음", backend.resume_analysis_report(report_id) == (False, "already_running"))
+    delete_jobs([report_id])
+
+
+def test_concurrent_sweeps():
+    user_id, _ = create_user()
+    report_ids = [create_report(user_id, status=status) for status in ("processing", "processing_questions", "error")]
+
+    def sweep(index):
+        with app.app_context():
+            return backend.sweep_interrupted_reports()
+
+    results = run_threads(sweep, 4)
+    errors = [result for result in results if isinstance(result, Exception)]
+    check(f"프로세스 시작 스윕 4개 동시 실행: 예외 없음 {errors[:1]}", not errors)
+    resumed = [report_id for result in results for report_id in result if report_id in report_ids]
+    check("중단 리포트마다 정확히 1번 재개", sorted(resumed) == sorted(report_ids[:2]))
+    check("리포트마다 pipeline 작업 1개", [active_pipeline_jobs(report_id) for report_id in report_ids[:2]] == [1, 1])
+    check("error 리포트는 include_errors 없이는 재개하지 않음", active_pipeline_jobs(report_ids[2]) == 0)
+    delete_jobs()  # (스윕은 다른 테스트가 남긴 중단 리포트도 재개하므로 전체 정리)
+
+
+# --- 선점 / 재시도 ---
+CALLS = {"slow": 0, "failing": 0, "failed_reports": [], "quick": []}
+
+
+def slow_handler(report_id):
+    CALLS["slow"] += 1
+    time.sleep(0.6)
+
+
+def failing_handler(report_id):
+    CALLS["failing"] += 1
+    raise RuntimeError("LLM timeout")
+
+
+def quick_handler(report_id):
+    CALLS["quick"].append((report_id, threading.current_thread().name))
+
+
+register_stage("test_slow", slow_handler)
+register_stage("test_quick", quick_handler)
+register_stage("test_failing", failing_handler, on_failure=lambda report_id, error: CALLS["failed_reports"].append((report_id, error)))
+
+
+def enqueue_test_job(report_id, stage, max_attempts=3):
+    with app.app_context():
+        job = enqueue_job(report_id, stage, max_attempts=max_attempts)
+        db.session.commit()
+        return job.id
+
+
+def claim(job_id, worker_id, visibility_timeout=60):
+    """테스트 작업을 선점 (테스트 시작 시 남은 작업을 지우므로 대기 작업은 방금 등록한 것뿐)"""
+    job = claim_next_job(worker_id, visibility_timeout)
+    check(f"{worker_id}: 작업 선점", job is not None and job.id == job_id)
+    return job
+
+
+def test_lease_renewal():
+    delete_jobs()  # (앞선 테스트가 실패하며 남긴 작업 정리)
+    user_id, _ = create_user()
+    report_id = create_report(user_id)
+    job_id = enqueue_test_job(report_id, "test_slow")
+    CALLS["slow"] = 0
+    with app.app_context():
+        job = claim(job_id, "worker-a", visibility_timeout=1)
+        first_until = job.locked_until
+        check("다른 워커는 선점을 연장할 수 없음", renew_lease(job_id, "worker-b", 60) is False)
+        check("선점한 워커는 연장 가능", renew_lease(job_id, "worker-a", 60) is True)
+        db.session.expire_all()
+        check("연장하면 locked_until이 늘어남", db.session.get(AnalysisJob, job_id).locked_until > first_until)
+
+        # 가시성 타임아웃(1초)보다 오래 걸리는 작업도 하트비트가 연장하므로 회수되지 않음
+        job = db.session.get(AnalysisJob, job_id)
+        run_job(job, "worker-a", retry_base_delay=0, visibility_timeout=1, heartbeat_interval=0.1)
+        db.session.expire_all()
+        job = db.session.get(AnalysisJob, job_id)
+        check("하트비트로 연장하며 실행 -> done", job.status == "done" and job.locked_until is None and CALLS["slow"] == 1)
+    delete_jobs([report_id])
+
+
+def test_lease_lost():
+    delete_jobs()  # (앞선 테스트가 실패하며 남긴 작업 정리)
+    user_id, _ = create_user()
+    report_id = create_report(user_id)
+    job_id = enqueue_test_job(report_id, "test_slow")
+    CALLS["slow"] = 0
+    with app.app_context():
+        job = claim(job_id, "worker-a")
+
+        def steal():
+            # (가시성 타임아웃으로 다른 워커가 회수한 상황)
+            time.sleep(0.2)
+            with app.app_context():
+                AnalysisJob.query.filter_by(id=job_id).update({"locked_by": "worker-b"})
+                db.session.commit()
+
+        thief = threading.Thread(target=steal)
+        thief.start()
+        run_job(job, "worker-a", retry_base_delay=0, visibility_timeout=60, heartbeat_interval=0.1)
+        thief.join()
+        db.session.expire_all()
+        job = db.session.get(AnalysisJob, job_id)
+        check("선점을 잃은 워커는 완료/실패를 기록하지 않음", job.status == "running" and job.locked_by == "worker-b")
+        check("회수한 워커의 실행은 그대로 유지", job.finished_at is None and job.last_error is None)
+    delete_jobs([report_id])
+
+
+def test_retry_backoff():
+    delete_jobs()  # (앞선 테스트가 실패하며 남긴 작업 정리)
+    user_id, _ = create_user()
+    report_id = create_report(user_id)
+    job_id = enqueue_test_job(report_id, "test_failing", max_attempts=3)
+    CALLS["failing"], CALLS["failed_reports"] = 0, []
+    delays = []
+    with app.app_context():
+        for attempt in range(1, 4):
+            job = claim(job_id, "worker-a")
+            started = _utcnow()
+            run_job(job, "worker-a", retry_base_delay=10, visibility_timeout=60, heartbeat_interval=30)
+            db.session.expire_all()
+            job = db.session.get(AnalysisJob, job_id)
+            if job.status == "queued":
+                delays.append(round((job.run_after - started).total_seconds()))
+                # (다음 시도를 바로 실행하도록 대기 시간만 당김)
+                job.run_after = _utcnow() - timedelta(seconds=1)
+                db.session.commit()
+
+        check("재시도 대기: 10초 -> 20초 (지수 백오프)", delays == [10, 20])
+        check("최대 시도 후 failed + 마지막 오류 기록",
+              job.status == "failed" and job.attempts == 3 and job.last_error == "LLM timeout")
+        check("최종 실패 시에만 on_failure 1회 호출", CALLS["failed_reports"] == [(report_id, "LLM timeout")])
+        check("실패한 작업은 활성 작업이 아님", has_active_job(report_id) is False)
+    delete_jobs([report_id])
+
+
+def test_expired_lease_reclaimed():
+    delete_jobs()  # (앞선 테스트가 실패하며 남긴 작업 정리)
+    user_id, _ = create_user()
+    report_id = create_report(user_id)
+    job_id = enqueue_test_job(report_id, "test_quick")
+    with app.app_context():
+        claim(job_id, "worker-a")
+        check("선점이 유효한 동안 다른 워커는 선점 불가", claim_next_job("worker-b", 60) is None)
+
+        # (worker-a가 크래시하여 하트비트 없이 가시성 타임아웃이 지난 상황)
+        AnalysisJob.query.filter_by(id=job_id).update({"locked_until": _utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+        job = claim(job_id, "worker-b")
+        check("만료된 작업 회수: 새 워커가 선점, 시도 횟수 증가", job.locked_by == "worker-b" and job.attempts == 2)
+        check("이전 워커는 선점을 연장할 수 없음", renew_lease(job_id, "worker-a", 60) is False)
+        run_job(job, "worker-b", retry_base_delay=0, visibility_timeout=60, heartbeat_interval=30)
+        db.session.expire_all()
+        check("회수한 워커가 완료", db.session.get(AnalysisJob, job_id).status == "done")
+    delete_jobs([report_id])
+
+
+def test_delayed_job():
+    delete_jobs()  # (앞선 테스트가 실패하며 남긴 작업 정리)
+    user_id, _ = create_user()
+    report_id = create_report(user_id)
+    with app.app_context():
+        job = enqueue_job(report_id, "test_quick", delay_seconds=60)
+        db.session.commit()
+        check("run_after 전에는 선점하지 않음", claim_next_job("worker-a", 60) is None)
+        check("대기 중인 작업은 활성 작업", has_active_job(report_id, "test_quick") is True)
+        job.run_after = _utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        check("run_after가 지나면 선점", claim_next_job("worker-a", 60).id == job.id)
+    delete_jobs([report_id])
+
+
+def test_worker_pool():
+    delete_jobs()  # (앞선 테스트가 실패하며 남긴 작업 정리)
+    user_id, _ = create_user()
+    report_ids = [create_report(user_id) for _ in range(6)]
+    CALLS["quick"] = []
+    with app.app_context():
+        for report_id in report_ids:
+            enqueue_job(report_id, "test_quick")
+        db.session.commit()
+
+    # (주기 작업은 이 테스트 범위 밖이므로 비워 둠)
+    with override_attributes(job_queue_service, _PERIODIC_TASKS=[]):
+        pool = JobWorkerPool(app, size=3)
+        pool.poll_interval = 0.05
+        pool.start()
+        try:
+            finished = wait_until(lambda: len(CALLS["quick"]) >= len(report_ids), timeout=15)
+        finally:
+            pool.stop(timeout=5)
+
+    check("워커 풀이 대기 작업을 모두 실행", finished)
+    check("작업마다 정확히 1번 실행", sorted(report_id for report_id, _ in CALLS["quick"]) == sorted(report_ids))
+    with app.app_context():
+        statuses = {job.status for job in AnalysisJob.query.filter(AnalysisJob.report_id.in_(report_ids))}
+        check("모든 작업 done", statuses == {"done"})
+    check("풀 종료 후 워커 스레드 정지", not any(thread.is_alive() for thread in pool._threads))
+    delete_jobs(report_ids)
+
+
+# --- 공정 분배 ---
+def create_course_assignment():
+    with app.app_context():
+        course = Course(course_code=f"T{uuid.uuid4().hex[:8]}", course_name="공정 분배 테스트")
+        assignment = Assignment(course=course, assignment_name="과제")
+        db.session.add_all([course, assignment])
+        db.session.commit()
+        return assignment.id
+
+
+def enqueue_owned(jobs):
+    """jobs: [(user_id, priority_class, assignment_id)] 순서대로 등록. 반환: report_id 목록"""
+    report_ids = []
+    for user_id, priority_class, assignment_id in jobs:
+        report_ids.append(create_report(user_id, assignment_id=assignment_id))
+    with app.app_context():
+        for report_id, (user_id, priority_class, _) in zip(report_ids, jobs):
+            enqueue_job(report_id, "test_quick", priority_class=priority_class, user_id=user_id)
+        db.session.commit()
+    return report_ids
+
+
+def claim_order(count, class_weights=None):
+    """작업을 하나씩 선점 -> 실행하며 (사용자, 클래스, 과목) 순서를 기록"""
+    order = []
+    with app.app_context():
+        for _ in range(count):
+            job = claim_next_job("worker-a", 60, class_weights=class_weights)
+            if job is None:
+                break
+            order.append((job.user_id, job.priority_class, job.course_id))
+            run_job(job, "worker-a", retry_base_delay=0, visibility_timeout=60, heartbeat_interval=30)
+    return order
+
+
+def test_round_robin_users():
+    delete_jobs()
+    heavy, _ = create_user()
+    light, _ = create_user()
+    # 한 학생이 초안 4개를 먼저 연달아 제출한 뒤 다른 학생이 2개 제출
+    report_ids = enqueue_owned([(heavy, "interactive", None)] * 4 + [(light, "interactive", None)] * 2)
+    order = [user_id for user_id, _, _ in claim_order(6)]
+    check(f"제출 순서가 아니라 사용자 번갈아 처리 {order}",
+          order == [heavy, light, heavy, light, heavy, heavy])
+    delete_jobs(report_ids)
+
+
+def test_class_weights():
+    delete_jobs()
+    student, _ = create_user()
+    ta, _ = create_user(role="ta")
+    # TA 일괄 분석(batch)이 먼저 잔뜩 등록된 뒤 학생 제출(interactive)
+    report_ids = enqueue_owned([(ta, "batch", None)] * 4 + [(student, "interactive", None)] * 4)
+    order = [cls for _, cls, _ in claim_order(8)]
+    check(f"기본 가중치 3:1 -> interactive 우선, batch도 굶지 않음 {order[:5]}",
+          order[:5] == ["interactive", "batch", "interactive", "interactive", "interactive"])
+    check("결국 모두 처리", sorted(order) == ["batch"] * 4 + ["interactive"] * 4)
+    delete_jobs(report_ids)
+
+    report_ids = enqueue_owned([(ta, "batch", None)] * 2 + [(student, "interactive", None)] * 2)
+    order = [cls for _, cls, _ in claim_order(4, class_weights=parse_class_weights("interactive:1,batch:1"))]
+    check(f"가중치 1:1 -> 번갈아 처리 {order}", all(order[i] != order[i + 1] for i in range(3)))
+    delete_jobs(report_ids)
+
+    check("설정 파싱: 잘못된 항목은 기본값 유지",
+          parse_class_weights("interactive:5,batch:x,unknown:2,batch:-1") == {"interactive": 5.0, "batch": 1})
+
+
+def test_course_fairness():
+    delete_jobs()
+    crowded, quiet = create_course_assignment(), create_course_assignment()
+    students = [create_user()[0] for _ in range(3)]
+    # 수강생이 많은 과목(학생 2명 x 2건)이 먼저 등록, 다른 과목 학생 1명 2건
+    report_ids = enqueue_owned(
+        [(students[0], "interactive", crowded)] * 2 + [(students[1], "interactive", crowded)] * 2
+        + [(students[2], "interactive", quiet)] * 2
+    )
+    order = claim_order(6)
+    with app.app_context():
+        crowded_course, quiet_course = (db.session.get(Assignment, assignment_id).course_id for assignment_id in (crowded, quiet))
+    courses = ["crowded" if course_id == crowded_course else "quiet" for _, _, course_id in order]
+    check(f"과목 단위로 번갈아 처리 (수강생이 많은 과목이 독점하지 않음) {courses}",
+          courses == ["crowded", "quiet", "crowded", "quiet", "crowded", "crowded"])
+    crowded_users = [user_id for user_id, _, _ in order if user_id != students[2]]
+    check(f"같은 과목 안에서는 사용자 번갈아 {crowded_users}", crowded_users[0] != crowded_users[1])
+    delete_jobs(report_ids)
+
+
+def test_queue_metrics():
+    delete_jobs()
+    heavy, _ = create_user()
+    light, _ = create_user()
+    _, ta_headers = create_user(role="ta")
+    _, student_headers = create_user()
+    report_ids = enqueue_owned([(heavy, "interactive", None)] * 3 + [(light, "batch", None)])
+    with app.app_context():
+        # heavy의 작업 2건은 완료(각 30초), 1건은 대기 / light는 대기 1건
+        now = _utcnow()
+        for job in AnalysisJob.query.filter_by(user_id=heavy).order_by(AnalysisJob.id).limit(2):
+            job.status, job.started_at, job.finished_at = "done", now - timedelta(seconds=30), now
+        db.session.commit()
+
+    check("학생은 큐 사용량 조회 불가", app.test_client().get("/api/ta/queue/metrics", headers=student_headers).status_code == 403)
+    response = app.test_client().get("/api/ta/queue/metrics?hours=1", headers=ta_headers)
+    body = response.get_json()
+    users = {entry["user_id"]: entry for entry in body["users"]}
+    check("TA 조회 -> 200", response.status_code == 200 and body["window_hours"] == 1)
+    check("사용자별 대기/완료 수", users[heavy]["done"] == 2 and users[heavy]["queued"] == 1 and users[light]["queued"] == 1)
+    check("워커 점유 시간과 비중", users[heavy]["busy_seconds"] == 60.0 and users[heavy]["busy_share"] == 1.0)
+    check("점유 시간이 많은 사용자부터", body["users"][0]["user_id"] == heavy)
+    check("클래스별 대기 수", body["classes"]["interactive"]["queued"] >= 1 and body["classes"]["batch"]["queued"] >= 1)
+    delete_jobs(report_ids)
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Job Queue", [
+        test_resume_race, test_concurrent_sweeps, test_lease_renewal, test_lease_lost, test_retry_backoff,
+        test_expired_lease_reclaimed, test_delayed_job, test_worker_pool,
+        test_round_robin_users, test_class_weights, test_course_fairness, test_queue_metrics,
+    ]))
@@ -0,0 +1,234 @@
+import sys
+import threading
+
+from regression_support import check, run_tests
+from services.pipeline import Stage, StageGraph, PipelineContext, PipelineError
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 선언형 단계 그래프(services/pipeline.py)
+# - 그래프 검증 (출력 중복 / 미충족 입력 / 순환), 실행 순서, on_demand, restore 생략,
+#   실패 전파, guard 중단을 LLM/DB 없이 확인합니다.
+# - 실행: backend 디렉터리에서 `python test_pipeline_graph.py`
+# --------------------------------------------------------------------------------------
+
+def expect_error(name, error_type, func):
+    try:
+        func()
+    except error_type as e:
+        check(f"{name} ({e})", True)
+        return
+    except Exception as e:
+        check(f"{name} (다른 예외: {type(e).__name__}: {e})", False)
+    check(f"{name} (예외가 발생하지 않음)", False)
+
+
+class CallLog:
+    """단계 실행 기록 (스레드 안전)"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def stage(self, name, **outputs):
+        def func(ctx):
+            with self._lock:
+                self.calls.append(name)
+            return dict(outputs)
+        return func
+
+
+# --- 1. 그래프 검증 ---
+def test_validation():
+    noop = lambda ctx: None
+    expect_error(
+        "출력 중복이면 ValueError",
+        ValueError,
+        lambda: StageGraph("dup", [
+            Stage("a", noop, outputs=["summary"]),
+            Stage("b", noop, outputs=["summary"]),
+        ])
+    )
+    expect_error(
+        "생산 단계가 없는 입력이면 ValueError",
+        ValueError,
+        lambda: StageGraph("missing", [Stage("a", noop, inputs=["summary"], outputs=["questions"])])
+    )
+    # initial_inputs로 주어지면 통과
+    StageGraph("initial", [Stage("a", noop, inputs=["text"], outputs=["summary"])], initial_inputs=["text"])
+    check("initial_inputs로 선언한 입력은 허용", True)
+    expect_error(
+        "순환 의존이면 ValueError",
+        ValueError,
+        lambda: StageGraph("cycle", [
+            Stage("a", noop, inputs=["candidates"], outputs=["summary"]),
+            Stage("b", noop, inputs=["summary"], outputs=["embeddings"]),
+            Stage("c", noop, inputs=["embeddings"], outputs=["candidates"]),
+        ])
+    )
+
+
+# --- 2. 아티팩트 타입 검사 ---
+def test_context_types():
+    ctx = PipelineContext("r1", text="본문")
+    expect_error("선언된 타입이 아니면 TypeError", TypeError, lambda: ctx.set("summary", "문자열"))
+    expect_error("알 수 없는 아티팩트면 KeyError", KeyError, lambda: ctx.set("unknown", {}))
+    expect_error("없는 아티팩트 조회는 KeyError", KeyError, lambda: ctx.get("summary"))
+    check("기본값을 주면 없는 아티팩트도 조회 가능", ctx.get("summary", None) is None)
+
+
+# --- 3. 의존 순서대로 실행 ---
+def test_dependency_order():
+    log = CallLog()
+    graph = StageGraph("order", [
+        Stage("questions", log.stage("questions", questions={"pool": []}), inputs=["summary"], outputs=["questions"]),
+        Stage("summary", log.stage("summary", summary={"Core_Thesis": "t"}), inputs=["text"], outputs=["summary"]),
+        Stage("embeddings", log.stage("embeddings", embeddings={"thesis": []}), inputs=["summary"], outputs=["embeddings"]),
+    ], initial_inputs=["text"])
+    ctx = graph.run(PipelineContext("r1", text="본문"))
+    check("첫 단계는 summary", log.calls[0] == "summary")
+    check("모든 단계 실행", sorted(log.calls) == ["embeddings", "questions", "summary"])
+    check("출력이 컨텍스트에 저장", ctx.get("questions") == {"pool": []} and ctx.has("embeddings"))
+    check("단계별 소요 시간 기록", {"summary", "questions", "embeddings", "_total"} <= set(ctx.timings))
+
+
+# --- 4. restore / on_demand ---
+def build_on_demand_graph(log, restore_candidates):
+    return StageGraph("on_demand", [
+        Stage("summary", log.stage("summary", summary={"Core_Thesis": "t"}), inputs=["text"], outputs=["summary"],
+              restore=lambda ctx: {"summary": {"Core_Thesis": "restored"}}),
+        # (자체 저장 결과가 없는 중간 단계: candidates가 필요할 때만 실행)
+        Stage("embeddings", log.stage("embeddings", embeddings={"thesis": [0.1]}), inputs=["summary"],
+              outputs=["embeddings"], on_demand=True),
+        Stage("candidates", log.stage("candidates", candidates=[]), inputs=["embeddings"], outputs=["candidates"],
+              restore=(lambda ctx: {"candidates": [{"id": "old"}]}) if restore_candidates else None),
+    ], initial_inputs=["text"])
+
+
+def test_restore_and_on_demand():
+    log = CallLog()
+    ctx = build_on_demand_graph(log, restore_candidates=True).run(PipelineContext("r1", text="본문"))
+    check("복원된 단계는 실행하지 않음", "summary" not in log.calls and "candidates" not in log.calls)
+    check("필요한 단계가 없으면 on_demand 단계도 실행하지 않음", "embeddings" not in log.calls)
+    check("복원된 단계는 skipped에 기록", ctx.skipped == ["candidates", "summary"])
+    check("복원된 출력이 컨텍스트에 저장", ctx.get("summary") == {"Core_Thesis": "restored"})
+
+    log = CallLog()
+    ctx = build_on_demand_graph(log, restore_candidates=False).run(PipelineContext("r2", text="본문"))
+    check("하위 단계가 필요로 하면 on_demand 단계 실행", log.calls == ["embeddings", "candidates"])
+    check("on_demand 단계는 복원된 입력을 사용", ctx.get("embeddings") == {"thesis": [0.1]})
+
+
+# --- 5. 실패 전파 ---
+def test_failure_blocks_dependents():
+    log = CallLog()
+
+    def broken(ctx):
+        raise RuntimeError("LLM 호출 실패")
+
+    completed = []
+    graph = StageGraph("failure", [
+        Stage("summary", broken, inputs=["text"], outputs=["summary"]),
+        Stage("questions", log.stage("questions", questions={}), inputs=["summary"], outputs=["questions"]),
+        Stage("neuron_map", log.stage("neuron_map", neuron_map={}), inputs=["text"], outputs=["neuron_map"]),
+    ], initial_inputs=["text"])
+
+    ctx = PipelineContext("r1", text="본문")
+    expect_error(
+        "실패가 있으면 PipelineError",
+        PipelineError,
+        lambda: graph.run(ctx, on_stage_complete=lambda name, outputs, error: completed.append((name, error is None)))
+    )
+    check("실패한 단계의 하위 단계는 실행하지 않음", "questions" not in log.calls)
+    check("독립적인 단계는 계속 실행", "neuron_map" in log.calls)
+    check("on_stage_complete에 실패/성공 모두 전달", sorted(completed) == [("neuron_map", True), ("summary", False)])
+
+    ctx = graph.run(PipelineContext("r2", text="본문"), raise_on_error=False)
+    check("raise_on_error=False면 ctx.errors로만 보고", list(ctx.errors) == ["summary"])
+
+
+# --- 6. guard 중단 ---
+class LeaseLost(Exception):
+    pass
+
+
+def test_guard_aborts():
+    log = CallLog()
+    state = {"lost": False}
+
+    def guard():
+        if state["lost"]:
+            raise LeaseLost("작업 선점 상실")
+
+    def summary(ctx):
+        log.calls.append("summary")
+        state["lost"] = True  # 첫 단계가 끝날 때 작업 큐 선점을 잃었다고 가정
+        return {"summary": {}}
+
+    completed = []
+    graph = StageGraph("guard", [
+        Stage("summary", summary, inputs=["text"], outputs=["summary"]),
+        Stage("questions", log.stage("questions", questions={}), inputs=["summary"], outputs=["questions"]),
+    ], initial_inputs=["text"])
+    expect_error(
+        "guard 예외는 PipelineError로 감싸지 않고 그대로 전파",
+        LeaseLost,
+        lambda: graph.run(PipelineContext("r1", guard=guard, text="본문"),
+                          on_stage_complete=lambda name, outputs, error: completed.append(name))
+    )
+    check("guard 예외 이후 새 단계는 시작하지 않음", log.calls == ["summary"])
+    check("중단 전에 끝난 단계는 on_stage_complete로 보고", completed == ["summary"])
+
+
+def test_guard_fails_inside_stage():
+    """단계 안에서 선점 상실이 드러난 경우 (긴 단계가 직접 guard를 호출하거나, 선점 상실로 저장이 실패)"""
+    log = CallLog()
+    state = {"lost": False}
+
+    def guard():
+        if state["lost"]:
+            raise LeaseLost("작업 선점 상실")
+
+    def summary(ctx):
+        log.calls.append("summary")
+        state["lost"] = True
+        ctx.guard()  # (단계 도중 확인)
+        return {"summary": {}}
+
+    completed = []
+    graph = StageGraph("guard-inside", [
+        Stage("summary", summary, inputs=["text"], outputs=["summary"]),
+        Stage("questions", log.stage("questions", questions={}), inputs=["summary"], outputs=["questions"]),
+    ], initial_inputs=["text"])
+    ctx = PipelineContext("r1", guard=guard, text="본문")
+    expect_error(
+        "단계 안의 guard 예외도 PipelineError가 아니라 그대로 전파",
+        LeaseLost,
+        lambda: graph.run(ctx, on_stage_complete=lambda name, outputs, error: completed.append((name, error)))
+    )
+    check("선점 상실은 단계 실패(ctx.errors)로 기록하지 않음", ctx.errors == {})
+    check("선점 상실로 끝난 단계는 on_stage_complete로 보고하지 않음", all(name != "summary" for name, _ in completed))
+    check("하위 단계는 시작하지 않음", "questions" not in log.calls)
+
+    # 선점을 잃어 단계가 다른 예외(예: 저장 실패)로 끝나도 guard 예외로 중단
+    state["lost"] = False
+    log.calls.clear()
+
+    def failing_write(ctx):
+        state["lost"] = True
+        raise RuntimeError("UPDATE 0 rows")
+
+    graph = StageGraph("guard-write", [
+        Stage("summary", failing_write, inputs=["text"], outputs=["summary"]),
+        Stage("questions", log.stage("questions", questions={}), inputs=["summary"], outputs=["questions"]),
+    ], initial_inputs=["text"])
+    ctx = PipelineContext("r2", guard=guard, text="본문")
+    expect_error("선점 상실 후 단계 실패 -> guard 예외 전파", LeaseLost, lambda: graph.run(ctx))
+    check("이 경우에도 ctx.errors는 비어 있음", ctx.errors == {})
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("StageGraph", [
+        test_validation, test_context_types, test_dependency_order,
+        test_restore_and_on_demand, test_failure_blocks_dependents, test_guard_aborts,
+        test_guard_fails_inside_stage,
+    ]))
@@ -0,0 +1,161 @@
+import sys
+import json
+
+import sqlalchemy as sa
+from flask_migrate import upgrade, downgrade
+
+from regression_support import check, run_tests, create_test_app, create_migration_app
+from extensions import db
+from models import User, AnalysisReport, QATurn
+from services.report_versioning import load_section_versions
+from services.qa_history_service import load_history, replace_history, append_turn, save_answer, conversation_chain
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 질문/답변 기록 (qa_turns 테이블, services/qa_history_service.py)
+# - 기록 순서, 답변은 미답변 질문 1행에만 저장 (이미 저장된 답변을 덮어쓰지 않음), 심화 질문 부모 체인
+# - 쓰기마다 리포트의 questions 섹션 버전 갱신
+# - 마이그레이션: 기존 qa_history JSON -> 행 (ID 누락/중복 항목은 새 ID, 심화 질문 부모 연결 유지), downgrade 시 JSON 복원
+# - 실행: backend 디렉터리에서 `python test_qa_history.py`
+# --------------------------------------------------------------------------------------
+
+_APP = None
+
+
+def history_app():
+    """임시 SQLite 파일 DB를 쓰는 작은 앱 (테스트 함수들이 함께 사용)"""
+    global _APP
+    if _APP is None:
+        _APP = create_test_app()
+    return _APP
+
+
+def create_report(app, report_id):
+    with app.app_context():
+        user = db.session.get(User, 1)
+        if user is None:
+            user = User('qa-test@snu.ac.kr')
+            db.session.add(user)
+            db.session.flush()
+        db.session.add(AnalysisReport(id=report_id, user_id=user.id, status='completed'))
+        db.session.commit()
+
+
+def questions_version(report_id):
+    db.session.rollback()
+    report = db.session.get(AnalysisReport, report_id)
+    return report.version, load_section_versions(report).get("questions")
+
+
+def test_history_order_and_answers():
+    app = history_app()
+    create_report(app, "history")
+    with app.app_context():
+        replace_history("history", [
+            {"question_id": "q1", "type": "critical", "question": "첫 질문", "answer": "답1"},
+            {"type": "perspective", "question": "둘째 질문"},
+        ])
+        db.session.commit()
+        deep = append_turn("history", "심화 질문", "deep_dive", parent_question_id="q1")
+        db.session.commit()
+
+        history = load_history("history")
+        check("기록 순서 유지 + 심화 질문은 끝에 추가",
+              [item["question"] for item in history] == ["첫 질문", "둘째 질문", "심화 질문"])
+        check("ID가 없는 항목은 새 ID", history[1]["question_id"] and history[1]["question_id"] != "q1")
+        check("기존 항목 형태 유지", history[2] == {**deep, "answer": None}
+              and set(history[0]) >= {"question_id", "question", "type", "answer", "parent_question_id"})
+
+        check("미답변 질문에 답변 저장", save_answer("history", deep["question_id"], "심화 답"))
+        db.session.commit()
+        check("이미 답변된 질문은 덮어쓰지 않음", not save_answer("history", deep["question_id"], "늦게 온 답"))
+        check("다른 리포트의 질문 ID로는 저장 불가", not save_answer("other", history[1]["question_id"], "답"))
+        db.session.commit()
+        check("저장된 답변 유지", load_history("history")[2]["answer"] == "심화 답")
+
+        chain = conversation_chain("history", deep["question_id"])
+        check("부모를 따라 올라간 대화 맥락 (오래된 순)", [item["question_id"] for item in chain] == ["q1", deep["question_id"]])
+        check("미답변 질문에서 체인 중단", conversation_chain("history", history[1]["question_id"]) == [])
+
+        replace_history("history", [{"type": "critical", "question": "재생성 질문"}])
+        db.session.commit()
+        check("교체 시 기존 행 삭제", [item["question"] for item in load_history("history")] == ["재생성 질문"]
+              and QATurn.query.filter_by(report_id="history").count() == 1)
+
+
+def test_writes_bump_questions_section():
+    app = history_app()
+    create_report(app, "history-versioned")
+    with app.app_context():
+        start, _ = questions_version("history-versioned")
+        replace_history("history-versioned", [{"question_id": "hv1", "type": "critical", "question": "질문"}])
+        db.session.commit()
+        check("replace_history -> questions 섹션 갱신", questions_version("history-versioned") == (start + 1, start + 1))
+
+        save_answer("history-versioned", "hv1", "답")
+        db.session.commit()
+        check("save_answer -> questions 섹션 갱신", questions_version("history-versioned") == (start + 2, start + 2))
+
+        save_answer("history-versioned", "hv1", "다시")
+        db.session.commit()
+        check("저장되지 않은 답변은 version 유지", questions_version("history-versioned")[0] == start + 2)
+
+        append_turn("history-versioned", "심화", "deep_dive", parent_question_id="hv1")
+        db.session.commit()
+        check("append_turn -> questions 섹션 갱신", questions_version("history-versioned") == (start + 3, start + 3))
+
+
+def test_qa_history_migration():
+    app = create_migration_app("f3a8c5d1b7e2")
+    histories = {
+        "r-chain": [
+            {"question_id": "p1", "type": "critical", "question": "부모", "answer": "답"},
+            {"question_id": "c1", "type": "deep_dive", "question": "심화", "answer": None, "parent_question_id": "p1"},
+        ],
+        # 다른 리포트와 겹치는 ID + ID 없는 항목: 새 ID를 받아도 심화 질문의 부모 연결은 유지
+        "r-reused": [
+            {"question_id": "p1", "type": "critical", "question": "같은 ID 부모", "answer": "답"},
+            {"type": "perspective", "question": "ID 없음"},
+            {"question_id": "c2", "type": "deep_dive", "question": "같은 ID의 심화", "parent_question_id": "p1"},
+        ],
+    }
+    with app.app_context():
+        db.session.execute(sa.text(
+            "INSERT INTO users (id, email, role, is_admin, is_verified) VALUES (1, 'm@snu.ac.kr', 'student', 0, 1)"))
+        rows = [(report_id, json.dumps(history, ensure_ascii=False)) for report_id, history in histories.items()]
+        for report_id, value in rows + [("r-broken", "not json"), ("r-empty", None)]:
+            db.session.execute(sa.text(
+                "INSERT INTO analysis_reports (id, user_id, status, is_test, qa_history) "
+                "VALUES (:id, 1, 'completed', 0, :history)"), {"id": report_id, "history": value})
+        db.session.commit()
+
+        def turns(report_id):
+            return db.session.execute(sa.text(
+                "SELECT question_id, parent_question_id, position, question, answer FROM qa_turns "
+                "WHERE report_id = :id ORDER BY position"), {"id": report_id}).mappings().all()
+
+        upgrade(revision="2c9e4b7a5d16")
+        chain = turns("r-chain")
+        check("JSON 기록 -> 순서대로 행", [(row["position"], row["question"]) for row in chain] == [(0, "부모"), (1, "심화")])
+        check("ID/답변/부모 연결 보존", chain[0]["question_id"] == "p1" and chain[0]["answer"] == "답"
+              and chain[1]["parent_question_id"] == "p1" and chain[1]["answer"] is None)
+
+        reused = turns("r-reused")
+        check("이미 사용된 ID와 누락된 ID는 새 ID", len({row["question_id"] for row in reused}) == 3
+              and "p1" not in {row["question_id"] for row in reused} and all(row["question_id"] for row in reused))
+        check("새 ID를 받은 부모에 심화 질문 연결 유지", reused[2]["parent_question_id"] == reused[0]["question_id"])
+        check("JSON이 아니거나 비어 있는 기록은 건너뜀", turns("r-broken") == [] and turns("r-empty") == [])
+        columns = {column["name"] for column in sa.inspect(db.engine).get_columns("analysis_reports")}
+        check("qa_history 컬럼 제거", "qa_history" not in columns)
+
+        downgrade(revision="f3a8c5d1b7e2")
+        restored = json.loads(db.session.execute(sa.text(
+            "SELECT qa_history FROM analysis_reports WHERE id = 'r-chain'")).scalar())
+        check("downgrade: 행 -> JSON 기록 복원",
+              [(item["question_id"], item["question"], item["answer"], item["parent_question_id"]) for item in restored]
+              == [("p1", "부모", "답", None), ("c1", "심화", None, "p1")])
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("QA History", [
+        test_history_order_and_answers, test_writes_bump_questions_section, test_qa_history_migration,
+    ]))
@@ -0,0 +1,190 @@
+import sys
+import threading
+
+from regression_support import check, run_tests, create_test_app
+from extensions import db
+from models import User, AnalysisReport, QuestionPoolItem
+from services.report_versioning import load_section_versions
+from services.question_pool_service import (
+    load_pool, count_pool, replace_pool, append_pool, pop_question, try_acquire_refill_lock
+)
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 리포트별 대기 질문 풀 (services/question_pool_service.py)
+# - 꺼내기 순서, 리필 후 위치, 동시 꺼내기(같은 질문을 두 번 주지 않음), 리필 잠금(동시에 1명만 획득)을
+#   임시 SQLite 파일 DB로 확인 (PostgreSQL의 SKIP LOCKED 경로는 운영 DB에서만 실행됨)
+# - 실행: backend 디렉터리에서 `python test_question_pool.py`
+# --------------------------------------------------------------------------------------
+
+THREADS = 8
+
+_APP = None
+
+
+def pool_app():
+    """임시 SQLite 파일 DB를 쓰는 작은 앱 (테스트 함수들이 함께 사용)"""
+    global _APP
+    if _APP is None:
+        _APP = create_test_app()
+    return _APP
+
+
+def create_report(app, report_id):
+    with app.app_context():
+        user = db.session.get(User, 1)
+        if user is None:
+            user = User('pool-test@snu.ac.kr')
+            db.session.add(user)
+            db.session.flush()
+        db.session.add(AnalysisReport(id=report_id, user_id=user.id, status='completed'))
+        db.session.commit()
+
+
+def questions(prefix, count):
+    return [{"type": "critical", "question": f"{prefix}-{i}"} for i in range(count)]
+
+
+def run_threads(target, count):
+    """count개 스레드를 동시에 시작하여 target(index)를 실행하고 결과 목록을 반환"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        barrier.wait()
+        results[index] = target(index)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_pop_order():
+    app = pool_app()
+    create_report(app, "order")
+    create_report(app, "other")
+    with app.app_context():
+        replace_pool("order", questions("q", 3) + [{"type": "x"}, "잘못된 항목"])
+        replace_pool("other", questions("o", 2))
+        db.session.commit()
+        check("질문이 없는 항목은 풀에 넣지 않음", count_pool("order") == 3)
+
+        popped = [pop_question("order")["question"] for _ in range(2)]
+        db.session.commit()
+        check("position 순서대로 꺼냄", popped == ["q-0", "q-1"])
+
+        size = append_pool("order", questions("r", 2))
+        db.session.commit()
+        positions = [item.position for item in QuestionPoolItem.query.filter_by(report_id="order").order_by(QuestionPoolItem.position)]
+        check("리필 질문은 남은 질문 뒤에 이어 붙음", size == 3 and positions == [2, 3, 4])
+        check("load_pool 순서 유지", [item["question"] for item in load_pool("order")] == ["q-2", "r-0", "r-1"])
+
+        while pop_question("order"):
+            pass
+        db.session.commit()
+        check("비어 있으면 None", pop_question("order") is None)
+        check("다른 리포트의 풀은 그대로", count_pool("other") == 2)
+
+        append_pool("order", questions("s", 1))
+        db.session.commit()
+        check("빈 풀에 리필하면 position 0부터", [item.position for item in QuestionPoolItem.query.filter_by(report_id="order")] == [0])
+
+
+def test_concurrent_pops():
+    app = pool_app()
+    create_report(app, "concurrent")
+    total = THREADS * 3
+    with app.app_context():
+        replace_pool("concurrent", questions("c", total))
+        db.session.commit()
+
+    def pop_all(index):
+        taken = []
+        with app.app_context():
+            while True:
+                item = pop_question("concurrent")
+                db.session.commit()
+                if item is None:
+                    return taken
+                taken.append(item["question"])
+
+    results = run_threads(pop_all, THREADS)
+    popped = [question for taken in results for question in taken]
+    check(f"동시 꺼내기 {THREADS}개 스레드: 같은 질문을 두 번 주지 않음", len(popped) == len(set(popped)))
+    check("동시 꺼내기: 모든 질문을 정확히 한 번씩 꺼냄", sorted(popped) == sorted(q["question"] for q in questions("c", total)))
+    with app.app_context():
+        check("동시 꺼내기 후 풀은 비어 있음", count_pool("concurrent") == 0)
+
+
+def test_refill_lock():
+    app = pool_app()
+    create_report(app, "refill")
+
+    def acquire(index):
+        with app.app_context():
+            acquired = try_acquire_refill_lock("refill")
+            db.session.commit()
+            return acquired
+
+    results = run_threads(acquire, THREADS)
+    check(f"리필 잠금 {THREADS}개 스레드 동시 요청: 1개만 획득", results.count(True) == 1)
+
+    with app.app_context():
+        check("잠금 중에는 다시 획득 불가", try_acquire_refill_lock("refill") is False)
+        db.session.rollback()
+        report = db.session.get(AnalysisReport, "refill")
+        check("잠금 획득 시 is_refilling=True 저장", report.is_refilling is True)
+        report.is_refilling = None  # (컬럼 추가 전 리포트)
+        db.session.commit()
+        check("is_refilling이 NULL이어도 획득 가능", try_acquire_refill_lock("refill") is True)
+        db.session.commit()
+        check("없는 리포트는 획득 불가", try_acquire_refill_lock("missing") is False)
+        db.session.rollback()
+
+
+def test_pool_changes_bump_questions_section():
+    app = pool_app()
+    create_report(app, "versioned")
+
+    def versions():
+        db.session.rollback()
+        report = db.session.get(AnalysisReport, "versioned")
+        return report.version, load_section_versions(report).get("questions")
+
+    with app.app_context():
+        start, _ = versions()
+        replace_pool("versioned", questions("v", 2))
+        db.session.commit()
+        check("replace_pool -> version +1, questions 섹션 = 새 version", versions() == (start + 1, start + 1))
+
+        append_pool("versioned", questions("w", 1))
+        db.session.commit()
+        check("append_pool -> questions 섹션 갱신", versions() == (start + 2, start + 2))
+
+        append_pool("versioned", [])
+        db.session.commit()
+        check("추가된 질문이 없으면 version 유지", versions() == (start + 2, start + 2))
+
+        pop_question("versioned")
+        db.session.commit()
+        check("pop_question -> questions 섹션 갱신", versions() == (start + 3, start + 3))
+
+        while pop_question("versioned"):
+            pass
+        db.session.commit()
+        bumped, _ = versions()
+        pop_question("versioned")
+        db.session.commit()
+        check("빈 풀에서 꺼내기는 version 유지", versions()[0] == bumped)
+
+        replace_pool("versioned", questions("x", 1))
+        db.session.rollback()
+        check("호출 측이 롤백하면 version도 함께 롤백 (같은 트랜잭션)", versions()[0] == bumped)
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Question Pool", [
+        test_pop_order, test_concurrent_pops, test_refill_lock, test_pool_changes_bump_questions_section,
+    ]))
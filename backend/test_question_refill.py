@@ -0,0 +1,215 @@
+import sys
+from datetime import timedelta
+
+import numpy as np
+
+from regression_support import (
+    check, run_tests, load_backend_app, create_user, create_report, drain_jobs, delete_jobs, config_override,
+    override_attributes, wait_until, FAKE_LLM, FAKE_EMBEDDING
+)
+from extensions import db
+from models import AnalysisReport, AnalysisJob, QATurn
+from services import job_queue_service, analysis_service
+from services.job_queue_service import JobWorkerPool, register_periodic_task
+from services.qa_history_service import append_turn
+from services.question_pool_service import replace_pool, count_pool, load_pool
+from services.question_dedup_service import filter_duplicate_questions
+from services.pool_maintenance_service import maintain_question_pools, _utcnow
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 질문 풀 선제 리필 (QUESTION_POOL_LOW_WATERMARK / QUESTION_POOL_HIGH_WATERMARK)
+# - '다음 질문'으로 풀이 LOW 미만이 되면 리필 작업 등록 (리포트당 1개), 리필은 HIGH까지 최대 REFILL_MAX_ROUNDS회
+# - 주기 점검: 최근 활동이 있는 완료 리포트 중 풀이 LOW 미만인 리포트만 최근 활동 순으로 등록
+# - 워커 풀의 주기 작업 스케줄러
+# - 리필 질문 중복 제거: 기존 질문(기록 + 풀)/같은 배치와 문자열 일치 또는 임베딩 유사도 QUESTION_DEDUP_THRESHOLD 이상이면 버림
+# - 실행: backend 디렉터리에서 `python test_question_refill.py`
+# --------------------------------------------------------------------------------------
+
+backend = load_backend_app()
+app = backend.app
+client = app.test_client()
+
+
+def create_pooled_report(user_id, pool_size, **fields):
+    report_id = create_report(user_id, **fields)
+    with app.app_context():
+        replace_pool(report_id, [{"type": "critical", "question": f"풀 질문 {i}"} for i in range(pool_size)])
+        db.session.commit()
+    return report_id
+
+
+def refill_state(report_id):
+    with app.app_context():
+        report = db.session.get(AnalysisReport, report_id)
+        jobs = AnalysisJob.query.filter_by(report_id=report_id, stage="refill").count()
+        return count_pool(report_id), bool(report.is_refilling), jobs
+
+
+def next_question(report_id, headers):
+    return client.post(f"/api/student/report/{report_id}/question/next", headers=headers)
+
+
+def test_low_watermark_triggers_refill():
+    delete_jobs()  # (앞선 테스트가 남긴 작업 정리)
+    FAKE_LLM.reset()
+    user_id, headers = create_user()
+    report_id = create_pooled_report(user_id, 5)
+    with config_override(app, QUESTION_POOL_LOW_WATERMARK=4, QUESTION_POOL_HIGH_WATERMARK=9):
+        next_question(report_id, headers)
+        check("LOW 이상 남으면 리필 안 함", refill_state(report_id) == (4, False, 0))
+        next_question(report_id, headers)
+        check("LOW 미만이 되면 리필 작업 등록 + 잠금", refill_state(report_id) == (3, True, 1))
+        check("리필 중에는 질문을 계속 꺼낼 수 있음", next_question(report_id, headers).status_code == 200)
+        check("리포트당 리필 작업 1개", refill_state(report_id) == (2, True, 1))
+
+        drain_jobs()
+        check("HIGH 이상이 될 때까지 라운드 반복 (2 + 6 + 6)", FAKE_LLM.count("refill") == 2 and refill_state(report_id)[:2] == (14, False))
+    delete_jobs([report_id])
+
+
+def test_refill_round_limit():
+    delete_jobs()
+    user_id, headers = create_user()
+    report_id = create_pooled_report(user_id, 1)
+    with config_override(app, QUESTION_POOL_LOW_WATERMARK=4, QUESTION_POOL_HIGH_WATERMARK=100):
+        next_question(report_id, headers)
+        FAKE_LLM.reset()
+        drain_jobs()
+        check("HIGH에 못 미쳐도 최대 REFILL_MAX_ROUNDS회까지만",
+              FAKE_LLM.count("refill") == backend.REFILL_MAX_ROUNDS and refill_state(report_id)[:2] == (6 * backend.REFILL_MAX_ROUNDS, False))
+
+        failing_report = create_pooled_report(user_id, 1)
+        next_question(failing_report, headers)
+        FAKE_LLM.reset()
+        FAKE_LLM.overrides["refill"] = lambda prompt_text: []
+        drain_jobs()
+        FAKE_LLM.reset()
+        check("생성 실패 시 중단하고 잠금 해제", refill_state(failing_report)[:2] == (0, False))
+    delete_jobs([report_id, failing_report])
+
+
+def test_maintenance_picks_active_reports():
+    delete_jobs()
+    user_id, _ = create_user()
+    now = _utcnow()
+    reports = {
+        "recent": (create_pooled_report(user_id, 0), now),
+        "active": (create_pooled_report(user_id, 1), now - timedelta(seconds=30)),
+        "idle": (create_pooled_report(user_id, 0), now - timedelta(hours=2)),
+        "full": (create_pooled_report(user_id, 4), now),
+        "refilling": (create_pooled_report(user_id, 0, is_refilling=True), now),
+        "processing": (create_pooled_report(user_id, 0, status="processing_questions"), now),
+    }
+    with app.app_context():
+        for report_id, activity in reports.values():
+            turn = append_turn(report_id, "질문", "critical")
+            db.session.get(QATurn, turn["question_id"]).created_at = activity
+        db.session.commit()
+
+    config = {"QUESTION_POOL_LOW_WATERMARK": 4, "QUESTION_POOL_ACTIVE_WINDOW": 900, "QUESTION_POOL_MAINTENANCE_BATCH": 1000}
+    ours = {report_id: name for name, (report_id, _) in reports.items()}
+    with app.app_context():
+        scheduled = maintain_question_pools(config)
+        again = maintain_question_pools(config)
+    check("최근 활동 + 풀 LOW 미만 리포트만, 최근 활동 순", [ours[r] for r in scheduled if r in ours] == ["recent", "active"])
+    check("등록된 리포트는 리필 작업 + 잠금",
+          all(refill_state(reports[name][0])[1:] == (True, 1) for name in ("recent", "active")))
+    check("이미 잠긴 리포트는 다시 등록하지 않음", not any(r in ours for r in again))
+
+    # (다른 테스트의 리포트가 함께 등록되었을 수 있으므로 모두 정리)
+    delete_jobs(scheduled + again)
+    with app.app_context():
+        AnalysisReport.query.filter(AnalysisReport.id.in_(scheduled + again)).update(
+            {"is_refilling": False}, synchronize_session=False)
+        db.session.commit()
+
+
+def test_periodic_scheduler():
+    calls = []
+    with override_attributes(job_queue_service, _PERIODIC_TASKS=[]):
+        register_periodic_task(lambda: calls.append("disabled"), 0)
+        check("간격 0 이하면 등록 안 함", job_queue_service._PERIODIC_TASKS == [])
+        register_periodic_task(lambda: calls.append("tick"), 0.05)
+        pool = JobWorkerPool(app, size=1)
+        pool.poll_interval = 0.05
+        pool.start()
+        try:
+            ticked = wait_until(lambda: calls.count("tick") >= 3, timeout=5)
+        finally:
+            pool.stop(timeout=5)
+    check("워커 풀 실행 중 주기 작업 반복 실행", ticked and "disabled" not in calls)
+    check("앱이 선제 리필 점검을 주기 작업으로 등록",
+          any(task is backend.prefetch_question_pools for task, _ in job_queue_service._PERIODIC_TASKS))
+
+
+def unit(*weights):
+    """앞쪽 축 가중치로 만든 단위 벡터 (가짜 임베딩 지정용)"""
+    vector = np.zeros(FAKE_EMBEDDING.dim, dtype=np.float32)
+    vector[:len(weights)] = weights
+    return vector / np.linalg.norm(vector)
+
+
+def question_items(*texts):
+    return [{"type": "critical", "question": text} for text in texts]
+
+
+def test_filter_duplicate_questions():
+    FAKE_EMBEDDING.vectors.update({
+        "중복 기준: 정보 비대칭은 왜 생기나요?": unit(1, 0, 0),
+        "중복 기준: 비대칭 정보의 원인은 무엇인가요?": unit(0.95, 0.31, 0),  # (기존 질문과 코사인 약 0.95)
+        "중복 기준: 전공 탐색 기간은 얼마가 적당한가요?": unit(0, 1, 0),
+        "중복 기준: 탐색 기간은 몇 학기가 적당할까요?": unit(0, 0.95, 0.31),  # (앞선 후보와 약 0.95)
+        "중복 기준: 다른 대학의 사례는 어떤가요?": unit(0, 0, 1),
+    })
+    existing = ["중복 기준: 정보 비대칭은 왜 생기나요?"]
+    candidates = question_items(
+        "중복 기준 - 정보 비대칭은 왜 생기나요",
+        "중복 기준: 비대칭 정보의 원인은 무엇인가요?",
+        "중복 기준: 전공 탐색 기간은 얼마가 적당한가요?",
+        "중복 기준: 탐색 기간은 몇 학기가 적당할까요?",
+        "중복 기준: 다른 대학의 사례는 어떤가요?",
+    )
+    kept = [item["question"] for item in filter_duplicate_questions("dedup", candidates, 0.88, existing)]
+    check("문자열 일치(공백/문장부호 무시) + 의미 유사 질문 제거, 순서 유지",
+          kept == ["중복 기준: 전공 탐색 기간은 얼마가 적당한가요?", "중복 기준: 다른 대학의 사례는 어떤가요?"])
+    check("기준을 높이면 의미 유사 질문 유지",
+          len(filter_duplicate_questions("dedup", candidates, 0.99, existing)) == 4)
+    check("기준 0이면 문자열 일치만", len(filter_duplicate_questions("dedup", candidates, 0, existing)) == 4)
+    with override_attributes(analysis_service, embedding_model=None):
+        check("임베딩 모델이 없으면 문자열 일치만", len(filter_duplicate_questions("dedup", candidates, 0.88, existing)) == 4)
+    check("질문이 없는 항목은 버림", filter_duplicate_questions("dedup", [{"type": "critical"}, "문장"], 0.88, []) == [])
+
+    user_id, _ = create_user()
+    report_id = create_pooled_report(user_id, 1)
+    with app.app_context():
+        append_turn(report_id, "기록에 있는 질문", "critical")
+        db.session.commit()
+        kept = filter_duplicate_questions(report_id, question_items("풀 질문 0", "기록에 있는 질문!", "새 질문"), 0.88)
+    check("existing 생략 시 DB의 기록 + 풀과 비교", [item["question"] for item in kept] == ["새 질문"])
+
+
+def test_refill_drops_repeated_questions():
+    delete_jobs()
+    user_id, headers = create_user()
+    report_id = create_pooled_report(user_id, 2)
+    FAKE_LLM.reset()
+    # 첫 라운드: 기록/풀에 이미 있는 질문의 반복뿐 -> 모두 버리고 다음 라운드에서 다시 요청
+    rounds = iter([question_items(*[f"풀 질문 {i % 2}." for i in range(6)])])
+    FAKE_LLM.overrides["refill"] = lambda prompt_text: next(rounds, None) or question_items(
+        *[f"새 리필 질문 {i}" for i in range(6)])
+    with config_override(app, QUESTION_POOL_LOW_WATERMARK=4, QUESTION_POOL_HIGH_WATERMARK=6):
+        next_question(report_id, headers)
+        drain_jobs()
+    refill_calls = FAKE_LLM.count("refill")
+    FAKE_LLM.reset()
+    with app.app_context():
+        pool = [item["question"] for item in load_pool(report_id)]
+    check("반복 질문만 온 라운드는 건너뛰고 다시 요청", refill_calls == 2)
+    check("풀에는 새 질문만 추가", pool == ["풀 질문 1"] + [f"새 리필 질문 {i}" for i in range(6)])
+    delete_jobs([report_id])
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Question Refill", [
+        test_low_watermark_triggers_refill, test_refill_round_limit, test_maintenance_picks_active_reports,
+        test_periodic_scheduler, test_filter_duplicate_questions, test_refill_drops_repeated_questions,
+    ]))
@@ -0,0 +1,199 @@
+import sys
+import json
+
+from sqlalchemy import update
+
+from regression_support import check, run_tests, load_backend_app, create_user, create_report, override_attributes, SUMMARY
+from extensions import db
+from models import AnalysisReport
+from services import report_view_cache
+from services.question_pool_service import replace_pool
+from services.report_view_cache import get_report_view, put_report_view, invalidate_report_view, report_view_cache_stats
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 리포트 부분 조회 (GET /api/student/report/<id>?fields= / ?since=)
+# - ?fields=summary,meta : 지정한 섹션만, 알 수 없는 섹션은 400 + 사용 가능한 섹션 목록
+# - ?since=<version>     : 그 버전 이후 바뀐 섹션만 (리포트 컬럼 변경과 질문 풀/기록 변경 모두 섹션 버전으로 추적)
+# - 전체 조회 응답 캐시: (리포트 ID, version)별 직렬화된 본문 재사용, 같은 프로세스의 쓰기는 즉시 무효화,
+#   다른 프로세스의 쓰기는 version이 바뀌어 자연히 새로 조립
+# - 실행: backend 디렉터리에서 `python test_report_delta.py`
+# --------------------------------------------------------------------------------------
+
+backend = load_backend_app()
+app = backend.app
+client = app.test_client()
+
+
+def get_report(report_id, headers, **params):
+    return client.get(f"/api/student/report/{report_id}", headers=headers, query_string=params)
+
+
+def report_version(report_id):
+    with app.app_context():
+        return db.session.get(AnalysisReport, report_id).version
+
+
+def update_report(report_id, **values):
+    with app.app_context():
+        report = db.session.get(AnalysisReport, report_id)
+        for name, value in values.items():
+            setattr(report, name, value)
+        db.session.commit()
+        return report.version
+
+
+def test_sparse_fields():
+    user_id, headers = create_user()
+    report_id = create_report(user_id, report_title="제목")
+    response = get_report(report_id, headers, fields="summary,meta")
+    body = response.get_json()
+    check("지정한 섹션만 반환", response.status_code == 200 and body["changed"] == ["summary", "meta"]
+          and set(body["data"]) == {"summary", "report_title", "assignment_id", "user_rating", "is_test", "analysis_tier"})
+    check("섹션 내용", body["data"]["summary"] == SUMMARY and body["data"]["report_title"] == "제목")
+    check("상태/버전 포함", body["status"] == "completed" and body["version"] == report_version(report_id))
+    check("공백/빈 항목 무시", get_report(report_id, headers, fields=" text , ").get_json()["changed"] == ["text"])
+
+    unknown = get_report(report_id, headers, fields="summary,secret")
+    check("알 수 없는 섹션 -> 400 + 사용 가능한 섹션",
+          unknown.status_code == 400 and "secret" in unknown.get_json()["error"] and "summary" in unknown.get_json()["available"])
+    check("deep_analysis는 GET /report 섹션이 아님", get_report(report_id, headers, fields="deep_analysis").status_code == 400)
+    check("since가 정수가 아니면 400", get_report(report_id, headers, since="abc").status_code == 400)
+
+    _, stranger_headers = create_user()
+    check("다른 사용자는 부분 조회도 불가 (403)", get_report(report_id, stranger_headers, fields="summary").status_code == 403)
+
+
+def test_since_returns_changed_sections():
+    user_id, headers = create_user()
+    report_id = create_report(user_id)
+    base = report_version(report_id)
+    unchanged = get_report(report_id, headers, since=base).get_json()
+    check("바뀐 것이 없으면 빈 응답", unchanged["changed"] == [] and unchanged["data"] == {} and unchanged["version"] == base)
+
+    summary_version = update_report(report_id, summary=json.dumps({"Claim": "새 주장"}, ensure_ascii=False))
+    body = get_report(report_id, headers, since=base).get_json()
+    check("요약만 바뀌면 summary 섹션만", body["changed"] == ["summary"] and body["data"] == {"summary": {"Claim": "새 주장"}})
+    check("응답 version으로 다음 since 요청", body["version"] == summary_version > base)
+
+    update_report(report_id, ta_feedback="좋습니다")
+    check("누적 변경: base 이후 summary + grading",
+          get_report(report_id, headers, since=base).get_json()["changed"] == ["summary", "grading"])
+    body = get_report(report_id, headers, since=summary_version).get_json()
+    check("마지막으로 받은 version 이후 변경만", body["changed"] == ["grading"] and body["data"]["ta_feedback"] == "좋습니다")
+    check("fields + since: 지정한 섹션 중 바뀐 것만",
+          get_report(report_id, headers, since=summary_version, fields="summary,meta").get_json()["changed"] == [])
+
+    update_report(report_id, status="processing_questions")
+    body = get_report(report_id, headers, since=summary_version, fields="summary").get_json()
+    check("상태 변경은 섹션 목록과 별개로 status 필드로 전달", body["status"] == "processing_questions" and body["changed"] == [])
+
+
+def test_since_tracks_question_tables():
+    user_id, headers = create_user()
+    report_id = create_report(user_id)
+    with app.app_context():
+        replace_pool(report_id, [{"type": "critical", "question": f"풀 질문 {i}"} for i in range(3)])
+        db.session.commit()
+    base = report_version(report_id)
+
+    popped = client.post(f"/api/student/report/{report_id}/question/next", headers=headers)
+    check("질문 꺼내기", popped.status_code == 200)
+    body = get_report(report_id, headers, since=base).get_json()
+    check("질문 풀/기록 테이블 변경도 questions 섹션 변경으로 추적", body["changed"] == ["questions"])
+    check("questions 섹션 내용", body["data"]["questions_pool_count"] == 2
+          and [item["question"] for item in body["data"]["qa_history"]] == [popped.get_json()["question"]])
+
+
+def test_sparse_etag():
+    user_id, headers = create_user()
+    report_id = create_report(user_id)
+    first = get_report(report_id, headers, fields="summary")
+    etag = first.headers.get("ETag")
+    again = client.get(f"/api/student/report/{report_id}?fields=summary", headers={**headers, "If-None-Match": etag})
+    check("같은 부분 조회 + 같은 버전 -> 304", etag and again.status_code == 304)
+    other = client.get(f"/api/student/report/{report_id}?fields=meta", headers={**headers, "If-None-Match": etag})
+    check("다른 fields는 다른 ETag (200)", other.status_code == 200)
+    update_report(report_id, report_title="새 제목")
+    changed = client.get(f"/api/student/report/{report_id}?fields=summary", headers={**headers, "If-None-Match": etag})
+    check("버전이 바뀌면 다시 200", changed.status_code == 200)
+
+
+class CountingSections:
+    """student_api._build_report_sections 호출 수 기록 (응답 조립 = JSON 컬럼 파싱 여부)"""
+
+    def __init__(self, student_api):
+        self.original = student_api._build_report_sections
+        self.calls = 0
+
+    def __call__(self, report, sections):
+        self.calls += 1
+        return self.original(report, sections)
+
+
+def test_view_cache_entries():
+    with override_attributes(report_view_cache, REPORT_VIEW_CACHE_SIZE=2):
+        put_report_view("cache-a", 1, "a1")
+        check("같은 버전 조회 -> 캐시 본문", get_report_view("cache-a", 1) == "a1")
+        check("다른 버전 -> 없음", get_report_view("cache-a", 2) is None)
+        put_report_view("cache-a", 2, "a2")
+        check("새 버전을 저장하면 이전 버전 항목 제거", get_report_view("cache-a", 1) is None and get_report_view("cache-a", 2) == "a2")
+
+        put_report_view("cache-b", 1, "b1")
+        get_report_view("cache-a", 2)  # (a가 최근 사용)
+        put_report_view("cache-c", 1, "c1")
+        check("용량 초과 시 가장 오래 안 쓴 항목부터 제거",
+              get_report_view("cache-b", 1) is None and get_report_view("cache-a", 2) == "a2")
+
+        invalidate_report_view("cache-a")
+        check("리포트 단위 무효화", get_report_view("cache-a", 2) is None and get_report_view("cache-c", 1) == "c1")
+        invalidate_report_view("cache-c")
+
+    with override_attributes(report_view_cache, REPORT_VIEW_CACHE_SIZE=0):
+        put_report_view("cache-d", 1, "d1")
+        check("REPORT_VIEW_CACHE_SIZE=0이면 저장 안 함", get_report_view("cache-d", 1) is None)
+
+
+def test_report_view_cached_per_version():
+    from api import student_api
+
+    user_id, headers = create_user()
+    report_id = create_report(user_id)
+    counter = CountingSections(student_api)
+    with override_attributes(student_api, _build_report_sections=counter):
+        first = get_report(report_id, headers).get_json()
+        hits = report_view_cache_stats()["hits"]
+        second = get_report(report_id, headers).get_json()
+        check("같은 버전 재조회 -> 캐시 적중, 응답 재조립 없음",
+              counter.calls == 1 and report_view_cache_stats()["hits"] == hits + 1 and second == first)
+
+        update_report(report_id, summary=json.dumps({"Claim": "수정"}, ensure_ascii=False))
+        check("같은 프로세스의 쓰기 -> 해당 리포트 항목 즉시 제거", get_report_view(report_id, first["version"]) is None)
+        body = get_report(report_id, headers).get_json()
+        check("새 버전 조회 -> 새로 조립", counter.calls == 2 and body["data"]["summary"] == {"Claim": "수정"})
+
+        # 다른 프로세스의 쓰기 (이 프로세스의 flush 무효화를 거치지 않음): version이 바뀌어 캐시 키 불일치
+        with app.app_context():
+            db.session.execute(update(AnalysisReport).where(AnalysisReport.id == report_id).values(
+                summary=json.dumps({"Claim": "다른 워커"}, ensure_ascii=False), version=AnalysisReport.version + 1))
+            db.session.commit()
+        body = get_report(report_id, headers).get_json()
+        check("다른 프로세스의 쓰기도 새 버전으로 조립", counter.calls == 3 and body["data"]["summary"] == {"Claim": "다른 워커"})
+
+        check("진행 중(processing) 응답은 캐시하지 않음",
+              update_report(report_id, status="processing") and get_report(report_id, headers).get_json()["data"] is None
+              and get_report_view(report_id, report_version(report_id)) is None)
+
+
+def test_cache_metrics():
+    _, ta_headers = create_user(role="ta")
+    _, student_headers = create_user()
+    check("학생은 캐시 지표 조회 불가", client.get("/api/ta/cache/metrics", headers=student_headers).status_code == 403)
+    body = client.get("/api/ta/cache/metrics", headers=ta_headers).get_json()
+    check("리포트 응답 캐시 적중률", {"size", "capacity", "hits", "misses", "hit_rate"} <= set(body["report_view"]))
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Report Delta", [
+        test_sparse_fields, test_since_returns_changed_sections, test_since_tracks_question_tables, test_sparse_etag,
+        test_view_cache_entries, test_report_view_cached_per_version, test_cache_metrics,
+    ]))
@@ -0,0 +1,166 @@
+import sys
+import json
+
+from sqlalchemy import update
+
+from regression_support import check, run_tests, load_backend_app, create_user, create_report, config_override
+from extensions import db
+from models import AnalysisReport
+from services.report_events import queue_event
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 리포트 진행 이벤트 스트림 (GET /api/student/report/<id>/events, SSE)
+# - SSE_ENABLED가 꺼져 있으면 토큰/스트림 모두 204 (클라이언트는 폴링)
+# - 스트림 토큰: 리포트 1개 + 사용자 전용, 다른 리포트/만료/접근 토큰(JWT)으로는 연결 불가
+# - 이벤트 id = 리포트 version: 커밋된 변경만 전달, Last-Event-ID 재연결 시 놓친 이벤트 재전송 또는 'sync'
+# - 실행: backend 디렉터리에서 `python test_report_events.py`
+# --------------------------------------------------------------------------------------
+
+backend = load_backend_app()
+app = backend.app
+client = app.test_client()
+
+STREAM = {"SSE_ENABLED": True, "SSE_STREAM_SECONDS": 1, "SSE_HEARTBEAT_SECONDS": 0.1}
+
+
+def parse_events(chunks):
+    """SSE 청크 -> [(id, event, data)] (retry/keep-alive 제외)"""
+    events = []
+    for chunk in chunks:
+        fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if not line.startswith(":") and ": " in line)
+        if "event" in fields:
+            events.append((int(fields["id"]) if "id" in fields else None, fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def issue_token(report_id, headers):
+    return client.post(f"/api/student/report/{report_id}/events/token", headers=headers)
+
+
+def open_stream(report_id, token, last_event_id=None):
+    headers = {"Last-Event-ID": str(last_event_id)} if last_event_id is not None else {}
+    return client.get(f"/api/student/report/{report_id}/events", query_string={"token": token}, headers=headers,
+                      buffered=False)
+
+
+def next_event(stream):
+    """keep-alive를 건너뛰고 다음 이벤트 1개"""
+    for chunk in stream:
+        events = parse_events([chunk.decode() if isinstance(chunk, bytes) else chunk])
+        if events:
+            return events[0]
+    return None
+
+
+def commit_status(report_id, status, extra_event=None):
+    with app.app_context():
+        report = db.session.get(AnalysisReport, report_id)
+        report.status = status
+        if extra_event:
+            queue_event(report_id, *extra_event)
+        db.session.commit()
+        return report.version
+
+
+def test_disabled_by_default():
+    user_id, headers = create_user()
+    report_id = create_report(user_id)
+    with config_override(app, SSE_ENABLED=False):
+        check("꺼져 있으면 토큰 발급 204", issue_token(report_id, headers).status_code == 204)
+        check("꺼져 있으면 스트림 204 (EventSource 재연결 중단)",
+              client.get(f"/api/student/report/{report_id}/events?token=x").status_code == 204)
+
+
+def test_stream_token_scope():
+    user_id, headers = create_user()
+    report_id, other_report = create_report(user_id), create_report(user_id)
+    _, stranger_headers = create_user()
+    with config_override(app, **STREAM):
+        response = issue_token(report_id, headers)
+        token = response.get_json()["token"]
+        check("토큰 발급 + 유효 시간", response.status_code == 200 and response.get_json()["expires_in"] == 300)
+        check("다른 사용자의 리포트 토큰 발급 불가 (403)", issue_token(report_id, stranger_headers).status_code == 403)
+        check("다른 리포트에는 사용 불가 (403)", open_stream(other_report, token).status_code == 403)
+        check("위조 토큰 (401)", open_stream(report_id, token + "x").status_code == 401)
+        access_token = headers["Authorization"].split(" ", 1)[1]
+        check("접근 토큰(JWT)은 스트림 토큰으로 받지 않음 (401)", open_stream(report_id, access_token).status_code == 401)
+        with config_override(app, SSE_TOKEN_SECONDS=-1):
+            check("만료된 토큰 (401)", open_stream(report_id, token).status_code == 401)
+        stream = open_stream(report_id, token)
+        check("유효한 토큰 -> text/event-stream", stream.status_code == 200 and stream.mimetype == "text/event-stream")
+        stream.close()
+
+
+def test_committed_events_are_streamed():
+    user_id, headers = create_user()
+    report_id = create_report(user_id, status="processing_analysis")
+    with config_override(app, **STREAM):
+        token = issue_token(report_id, headers).get_json()["token"]
+        response = open_stream(report_id, token)
+        stream = response.response
+        first = next_event(stream)
+        with app.app_context():
+            version = db.session.get(AnalysisReport, report_id).version
+        check("첫 연결: 현재 상태 + version 기준점", first == (version, "status", {"status": "processing_analysis", "version": version}))
+
+        with app.app_context():
+            report = db.session.get(AnalysisReport, report_id)
+            report.status = "error"
+            queue_event(report_id, "candidates", {"similarity_details": []})
+            db.session.flush()
+            db.session.rollback()
+        new_version = commit_status(report_id, "processing_comparison", ("summary", {"summary": {"Claim": "주장"}}))
+        received = [next_event(stream), next_event(stream)]
+        check("롤백된 변경은 전달하지 않고, 커밋된 변경만 전달",
+              sorted((name, data) for _, name, data in received)
+              == [("status", {"status": "processing_comparison"}), ("summary", {"summary": {"Claim": "주장"}})])
+        check("같은 트랜잭션의 이벤트는 같은 id (커밋된 version)",
+              [event_id for event_id, _, _ in received] == [new_version, new_version] and new_version > version)
+        response.close()
+
+
+def test_reconnect_replays_missed_events():
+    user_id, headers = create_user()
+    report_id = create_report(user_id, status="processing_analysis")
+    with config_override(app, **STREAM):
+        token = issue_token(report_id, headers).get_json()["token"]
+        seen = commit_status(report_id, "processing_comparison")
+        missed = commit_status(report_id, "processing_questions", ("questions", {"questions_pool_count": 6}))
+
+        response = open_stream(report_id, token, last_event_id=seen)
+        stream = response.response
+        events = [next_event(stream) for _ in range(3)]
+        response.close()
+        check("재연결: 현재 상태(id 없음) 후 놓친 이벤트만 재전송",
+              events[0] == (None, "status", {"status": "processing_questions"})
+              and sorted((event_id, name) for event_id, name, _ in events[1:]) == [(missed, "questions"), (missed, "status")])
+
+        # 다른 프로세스가 커밋한 변경(이 프로세스에 보관된 이벤트 없음)은 sync로 알림
+        with app.app_context():
+            db.session.execute(update(AnalysisReport).where(AnalysisReport.id == report_id)
+                               .values(version=AnalysisReport.version + 1))
+            db.session.commit()
+        response = open_stream(report_id, token, last_event_id=missed)
+        stream = response.response
+        next_event(stream)
+        sync = next_event(stream)
+        response.close()
+        check("DB version보다 뒤처지면 sync (GET /report?since=로 보충)",
+              sync == (missed + 1, "sync", {"version": missed + 1, "since": missed, "status": "processing_questions"}))
+
+
+def test_stream_ends_after_stream_seconds():
+    user_id, headers = create_user()
+    report_id = create_report(user_id)
+    with config_override(app, **{**STREAM, "SSE_STREAM_SECONDS": 0.3}):
+        token = issue_token(report_id, headers).get_json()["token"]
+        body = open_stream(report_id, token).get_data(as_text=True)
+    check("SSE_STREAM_SECONDS 후 스트림 종료 (브라우저 재연결 간격 안내)", body.startswith("retry: 1000"))
+    check("유휴 시 keep-alive", ": keep-alive" in body)
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Report Events", [
+        test_disabled_by_default, test_stream_token_scope, test_committed_events_are_streamed,
+        test_reconnect_replays_missed_events, test_stream_ends_after_stream_seconds,
+    ]))
@@ -0,0 +1,150 @@
+import sys
+import json
+import random
+import unicodedata
+from types import SimpleNamespace
+
+from regression_support import check, run_tests
+
+from services.revision_service import (
+    split_paragraphs, compute_paragraph_hashes, diff_paragraphs,
+    build_revision_diff, build_revision_context, in_unchanged_region
+)
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 수정본 문단 단위 비교 (services/revision_service.py)
+# - 문단 해시 정규화, 변경 요약(수정/추가/삭제, changed_indices), 저장된 해시 사용,
+#   심층 분석 재사용 범위(build_revision_context / in_unchanged_region)를 DB 없이 확인
+# - 실행: backend 디렉터리에서 `python test_revision_diff.py`
+# --------------------------------------------------------------------------------------
+
+PARAGRAPHS = [
+    "조기 전공 확정 시스템은 학생들의 진로 탐색을 방해합니다.",
+    "정보 비대칭성은 '선택 후회'를 낳습니다.",
+    "경직된 시스템은 자기 효능감을 저해합니다.",
+    "따라서 전공 선택 유연화가 필요합니다.",
+]
+
+
+def fake_report(text, report_id="parent", stored_hashes=None, deep_analysis=None, summary=None):
+    return SimpleNamespace(
+        id=report_id,
+        text_snippet=text,
+        paragraph_hashes=json.dumps(stored_hashes) if stored_hashes is not None else None,
+        deep_analysis_data=json.dumps(deep_analysis) if deep_analysis is not None else None,
+        summary=json.dumps(summary) if summary is not None else None,
+    )
+
+
+def diff_texts(old_paragraphs, new_paragraphs):
+    return diff_paragraphs(compute_paragraph_hashes("\n".join(old_paragraphs)), compute_paragraph_hashes("\n".join(new_paragraphs)))
+
+
+def test_paragraph_hashes():
+    check("빈 줄/앞뒤 공백 제외하고 문단 분리", split_paragraphs("  가 \n\n\t\n 나\r\n") == ["가", "나"])
+    base = compute_paragraph_hashes("\n".join(PARAGRAPHS))
+    spaced = compute_paragraph_hashes("\n\n".join("  " + p.replace(" ", "   ") + " " for p in PARAGRAPHS))
+    check("공백 차이는 같은 문단으로 취급", base == spaced)
+    # (NFD로 분해된 한글도 NFC로 정규화)
+    check("유니코드 정규화 차이는 같은 문단으로 취급",
+          base == compute_paragraph_hashes(unicodedata.normalize("NFD", "\n".join(PARAGRAPHS))))
+    check("내용이 바뀌면 해시도 다름", compute_paragraph_hashes(PARAGRAPHS[0] + "!") != base[:1])
+
+
+def test_diff_summary():
+    same = diff_texts(PARAGRAPHS, PARAGRAPHS)
+    check("변경 없음", same["unchanged"] == 4 and same["changed_indices"] == [] and same["change_ratio"] == 0.0)
+
+    edited = PARAGRAPHS[:1] + ["정보 비대칭성은 심각한 '선택 후회'를 낳습니다."] + PARAGRAPHS[2:]
+    diff = diff_texts(PARAGRAPHS, edited)
+    check("문단 1개 수정 -> modified 1, changed_indices [1]",
+          (diff["modified"], diff["added"], diff["removed"], diff["changed_indices"]) == (1, 0, 0, [1]))
+    check("change_ratio = 바뀐 문단 / 새 글 문단 수", diff["change_ratio"] == 0.25 and diff["total"] == 4)
+
+    inserted = PARAGRAPHS[:2] + ["새로운 근거 문단입니다."] + PARAGRAPHS[2:]
+    diff = diff_texts(PARAGRAPHS, inserted)
+    check("문단 삽입 -> added 1, 뒤 문단 위치는 변경 아님",
+          (diff["unchanged"], diff["added"], diff["changed_indices"]) == (4, 1, [2]))
+
+    removed = PARAGRAPHS[:1] + PARAGRAPHS[2:]
+    diff = diff_texts(PARAGRAPHS, removed)
+    check("문단 삭제 -> removed 1, changed_indices 없음",
+          (diff["removed"], diff["changed_indices"], diff["unchanged"]) == (1, [], 3))
+
+    merged = PARAGRAPHS[:1] + [PARAGRAPHS[1] + " " + PARAGRAPHS[2]] + PARAGRAPHS[3:]
+    diff = diff_texts(PARAGRAPHS, merged)
+    check("문단 2개를 1개로 합침 -> modified 1 + removed 1",
+          (diff["modified"], diff["removed"], diff["added"], diff["changed_indices"]) == (1, 1, 0, [1]))
+
+    check("새 글이 비어 있으면 change_ratio 0", diff_texts(PARAGRAPHS, [])["change_ratio"] == 0.0)
+
+
+def test_diff_invariants():
+    """무작위 편집: 개수 합계와 changed_indices 밖의 문단이 원본에 있는지 확인"""
+    rng = random.Random(36)
+    pool = [f"문단 {k} 내용입니다." for k in range(12)]
+    broken = 0
+    for _ in range(500):
+        old = rng.sample(pool, rng.randint(0, 8))
+        new = list(old)
+        for _ in range(rng.randint(0, 4)):
+            action = rng.choice(["insert", "delete", "replace"])
+            if action == "insert" or not new:
+                new.insert(rng.randint(0, len(new)), rng.choice(pool))
+            elif action == "delete":
+                new.pop(rng.randrange(len(new)))
+            else:
+                new[rng.randrange(len(new))] = rng.choice(pool)
+        old_hashes = compute_paragraph_hashes("\n".join(old))
+        new_hashes = compute_paragraph_hashes("\n".join(new))
+        diff = diff_paragraphs(old_hashes, new_hashes)
+        ok = (
+            diff["unchanged"] + diff["modified"] + diff["removed"] == len(old_hashes)
+            and diff["unchanged"] + diff["modified"] + diff["added"] == len(new_hashes)
+            and len(diff["changed_indices"]) == diff["modified"] + diff["added"]
+            and all(new_hashes[i] in old_hashes for i in range(len(new_hashes)) if i not in diff["changed_indices"])
+        )
+        broken += not ok
+    check("무작위 편집 500건: 개수 합계 / 변경 위치 일관성", broken == 0)
+
+
+def test_build_revision_diff():
+    text = "\n".join(PARAGRAPHS)
+    parent = fake_report(text)
+    diff = build_revision_diff(parent, text)
+    check("저장된 해시가 없으면 원본 본문에서 계산", diff["unchanged"] == 4 and diff["parent_id"] == "parent")
+
+    stored = fake_report("다른 본문", stored_hashes=compute_paragraph_hashes("\n".join(PARAGRAPHS[:2])))
+    diff = build_revision_diff(stored, text)
+    check("저장된 해시(paragraph_hashes)가 있으면 그것을 사용", (diff["unchanged"], diff["added"]) == (2, 2))
+
+
+def test_revision_context():
+    previous = {"status": "completed", "neuron_map": {"nodes": []}}
+    parent = fake_report("\n".join(PARAGRAPHS), deep_analysis=previous, summary={"Core_Thesis": "논지"})
+    revised = fake_report("\n".join(PARAGRAPHS[:3] + ["결론을 새로 썼습니다. 전공 선택 유연화와 진로 지도가 필요합니다."]), report_id="child")
+
+    context = build_revision_context(revised, parent)
+    check("원본 심층 분석 재사용 맥락 생성",
+          context["parent_id"] == "parent" and context["previous"] == previous and context["previous_core_thesis"] == "논지")
+    check("바뀐 문단 / 그대로인 문단 분리",
+          context["unchanged_paragraphs"] == PARAGRAPHS[:3] and len(context["changed_paragraphs"]) == 1)
+
+    check("원본 심층 분석이 없으면 None", build_revision_context(revised, fake_report("\n".join(PARAGRAPHS))) is None)
+    check("원본 심층 분석이 완료되지 않았으면 None",
+          build_revision_context(revised, fake_report("x", deep_analysis={"status": "processing"})) is None)
+    check("원본이 없으면 None", build_revision_context(revised, None) is None)
+
+    # in_unchanged_region: 인용 문장이 바뀌지 않은 문단 안에 있을 때만 원본 판정 재사용
+    check("그대로인 문단 안의 인용 -> True", in_unchanged_region("정보 비대칭성은", context))
+    check("공백/따옴표 차이는 무시", in_unchanged_region("\"경직된   시스템은\n자기 효능감을\"", context))
+    check("바뀐 문단 안의 인용 -> False", not in_unchanged_region("진로 지도가 필요합니다", context))
+    check("두 문단에 걸친 인용 -> False", not in_unchanged_region("방해합니다. 정보 비대칭성은", context))
+    check("빈 인용 -> False", not in_unchanged_region(" '' ", context))
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Revision Diff", [
+        test_paragraph_hashes, test_diff_summary, test_diff_invariants,
+        test_build_revision_diff, test_revision_context,
+    ]))
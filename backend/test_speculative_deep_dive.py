@@ -0,0 +1,201 @@
+import sys
+import threading
+from datetime import timedelta
+
+from regression_support import (
+    check, run_tests, load_backend_app, create_user, create_report, config_override, wait_until, FAKE_LLM
+)
+from extensions import db
+from models import QATurn
+from services.question_pool_service import replace_pool
+from services.qa_history_service import load_history
+from services import speculative_deep_dive_service
+from services.speculative_deep_dive_service import expire_speculative_turns, get_speculation_metrics, _utcnow
+
+# --------------------------------------------------------------------------------------
+# [회귀 테스트] 심화 질문 추측 생성 (SPECULATIVE_DEEP_DIVE, services/speculative_deep_dive_service.py)
+# - 답변 직후 미리 생성한 질문을 /question/deep-dive가 바로 공개 (적중, LLM 1회)
+# - 생성 중에 요청하면 그 결과를 채택하고, 채택한 생성이 실패하면 일반 경로로 다시 생성
+#   (질문이 저장되지 않은 채 클라이언트가 끝없이 폴링하지 않음)
+# - 꺼져 있으면(기본값) 추측 생성 없음, SPECULATIVE_DEEP_DIVE_TTL이 지난 질문은 공개하지 않고 'expired'로 집계
+# - 실행: backend 디렉터리에서 `python test_speculative_deep_dive.py`
+# --------------------------------------------------------------------------------------
+
+backend = load_backend_app()
+app = backend.app
+client = app.test_client()
+
+
+class ControlledDeepDive:
+    """심화 질문 LLM 응답을 차례로 돌려주는 가짜 함수. block=True면 첫 호출은 release될 때까지 대기"""
+
+    def __init__(self, responses, block=False):
+        self.responses = list(responses)
+        self.block = block
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, prompt_text):
+        self.calls += 1
+        response = self.responses[min(self.calls, len(self.responses)) - 1]
+        if self.calls == 1:
+            self.started.set()
+            if self.block:
+                self.release.wait(10)
+        return response
+
+
+def answered_question():
+    """질문 1개를 꺼내 답변까지 저장한 리포트. 반환: (report_id, question_id, headers)"""
+    user_id, headers = create_user()
+    report_id = create_report(user_id)
+    with app.app_context():
+        replace_pool(report_id, [{"type": "critical", "question": f"질문 {i}"} for i in range(6)])
+        db.session.commit()
+    question = client.post(f"/api/student/report/{report_id}/question/next", headers=headers).get_json()
+    response = client.post(f"/api/student/report/{report_id}/answer", headers=headers,
+                           json={"question_id": question["question_id"], "user_answer": "제 답변입니다."})
+    check("답변 저장", response.status_code == 200)
+    return report_id, question["question_id"], headers
+
+
+def deep_dives(report_id, parent_question_id, state="active"):
+    with app.app_context():
+        return [
+            turn.question for turn in
+            QATurn.query.filter_by(report_id=report_id, parent_question_id=parent_question_id,
+                                   type="deep_dive", state=state)
+        ]
+
+
+def request_deep_dive(report_id, parent_question_id, headers):
+    return client.post(f"/api/student/report/{report_id}/question/deep-dive", headers=headers,
+                       json={"parent_question_id": parent_question_id})
+
+
+def no_in_flight(report_id, parent_question_id):
+    return (report_id, parent_question_id) not in speculative_deep_dive_service._in_flight
+
+
+def test_speculative_hit():
+    llm = ControlledDeepDive([{"question": "미리 만든 심화 질문"}])
+    FAKE_LLM.overrides["deep_dive"] = llm
+    try:
+        with config_override(app, SPECULATIVE_DEEP_DIVE=True):
+            report_id, question_id, headers = answered_question()
+            check("답변 직후 추측 생성 -> speculative 저장",
+                  wait_until(lambda: deep_dives(report_id, question_id, "speculative") == ["미리 만든 심화 질문"]))
+            with app.app_context():
+                check("공개 전에는 qa_history에 보이지 않음",
+                      all(item["type"] != "deep_dive" for item in load_history(report_id)))
+            response = request_deep_dive(report_id, question_id, headers)
+            check("요청 즉시 200 + 미리 만든 질문", response.status_code == 200
+                  and response.get_json()["question"]["question"] == "미리 만든 심화 질문")
+            check("공개 후 active 1개, LLM 1회", deep_dives(report_id, question_id) == ["미리 만든 심화 질문"] and llm.calls == 1)
+    finally:
+        FAKE_LLM.overrides.pop("deep_dive", None)
+
+
+def test_adopted_in_flight():
+    llm = ControlledDeepDive([{"question": "생성 중이던 심화 질문"}], block=True)
+    FAKE_LLM.overrides["deep_dive"] = llm
+    try:
+        with config_override(app, SPECULATIVE_DEEP_DIVE=True):
+            report_id, question_id, headers = answered_question()
+            check("추측 생성 LLM 호출 시작", llm.started.wait(5))
+            response = request_deep_dive(report_id, question_id, headers)
+            check("생성 중이면 채택하고 202", response.status_code == 202)
+            llm.release.set()
+            check("채택한 결과가 바로 active로 저장",
+                  wait_until(lambda: deep_dives(report_id, question_id) == ["생성 중이던 심화 질문"]))
+            check("LLM은 1번만 호출", wait_until(lambda: no_in_flight(report_id, question_id)) and llm.calls == 1)
+    finally:
+        llm.release.set()
+        FAKE_LLM.overrides.pop("deep_dive", None)
+
+
+def test_adopted_then_llm_fails():
+    # 첫 호출(추측 생성)은 요청이 채택된 뒤 실패, 두 번째 호출(일반 경로)은 성공
+    llm = ControlledDeepDive([None, {"question": "다시 만든 심화 질문"}], block=True)
+    FAKE_LLM.overrides["deep_dive"] = llm
+    try:
+        with config_override(app, SPECULATIVE_DEEP_DIVE=True):
+            report_id, question_id, headers = answered_question()
+            check("추측 생성 LLM 호출 시작", llm.started.wait(5))
+            check("생성 중이면 채택하고 202", request_deep_dive(report_id, question_id, headers).status_code == 202)
+            llm.release.set()
+            check("채택한 생성이 실패하면 일반 경로로 다시 생성하여 저장",
+                  wait_until(lambda: deep_dives(report_id, question_id) == ["다시 만든 심화 질문"]))
+            check("LLM 2회 (추측 실패 + 일반 경로), 생성 중 표시 해제",
+                  llm.calls == 2 and no_in_flight(report_id, question_id))
+            with app.app_context():
+                history = load_history(report_id)
+            check("qa_history에 심화 질문 1개 공개",
+                  [item["question"] for item in history if item["type"] == "deep_dive"] == ["다시 만든 심화 질문"])
+    finally:
+        llm.release.set()
+        FAKE_LLM.overrides.pop("deep_dive", None)
+
+
+def test_unadopted_failure_is_silent():
+    llm = ControlledDeepDive([None])
+    FAKE_LLM.overrides["deep_dive"] = llm
+    try:
+        with config_override(app, SPECULATIVE_DEEP_DIVE=True):
+            report_id, question_id, _ = answered_question()
+            check("추측 생성이 끝나면 생성 중 표시 해제",
+                  wait_until(lambda: llm.calls == 1 and no_in_flight(report_id, question_id)))
+            check("요청이 없었으면 실패해도 다시 생성하지 않음",
+                  llm.calls == 1 and deep_dives(report_id, question_id) == []
+                  and deep_dives(report_id, question_id, "speculative") == [])
+    finally:
+        FAKE_LLM.overrides.pop("deep_dive", None)
+
+
+def test_disabled_by_default():
+    llm = ControlledDeepDive([{"question": "요청 후 만든 심화 질문"}])
+    FAKE_LLM.overrides["deep_dive"] = llm
+    try:
+        with config_override(app, SPECULATIVE_DEEP_DIVE=False):
+            report_id, question_id, headers = answered_question()
+            check("요청 시 일반 경로로 생성 (202)", request_deep_dive(report_id, question_id, headers).status_code == 202)
+            check("생성 결과 active 저장", wait_until(lambda: deep_dives(report_id, question_id) == ["요청 후 만든 심화 질문"]))
+            check("답변 시 추측 생성 없음 (LLM 1회, speculative 행 없음)",
+                  llm.calls == 1 and deep_dives(report_id, question_id, "speculative") == [])
+    finally:
+        FAKE_LLM.overrides.pop("deep_dive", None)
+
+
+def test_expired_speculation():
+    llm = ControlledDeepDive([{"question": "오래된 추측 질문"}, {"question": "새로 만든 심화 질문"}])
+    FAKE_LLM.overrides["deep_dive"] = llm
+    try:
+        with config_override(app, SPECULATIVE_DEEP_DIVE=True, SPECULATIVE_DEEP_DIVE_TTL=1800):
+            report_id, question_id, headers = answered_question()
+            check("추측 질문 저장", wait_until(lambda: deep_dives(report_id, question_id, "speculative") == ["오래된 추측 질문"]
+                                            and no_in_flight(report_id, question_id)))
+            with app.app_context():
+                QATurn.query.filter_by(report_id=report_id, state="speculative").update(
+                    {"speculative_at": _utcnow() - timedelta(hours=1)}, synchronize_session=False)
+                db.session.commit()
+
+            check("TTL이 지난 추측 질문은 공개하지 않고 새로 생성 (202)",
+                  request_deep_dive(report_id, question_id, headers).status_code == 202)
+            check("새로 만든 질문만 active", wait_until(lambda: deep_dives(report_id, question_id) == ["새로 만든 심화 질문"]))
+
+            with app.app_context():
+                expired_before = get_speculation_metrics()["expired"]
+                check("주기 만료 처리 -> expired", expire_speculative_turns(1800) >= 1
+                      and deep_dives(report_id, question_id, "expired") == ["오래된 추측 질문"])
+                metrics = get_speculation_metrics()
+            check("적중률 집계에 만료 건 포함", metrics["expired"] == expired_before + 1 and metrics["hit_rate"] is not None)
+    finally:
+        FAKE_LLM.overrides.pop("deep_dive", None)
+
+
+if __name__ == "__main__":
+    sys.exit(run_tests("Speculative Deep-dive", [
+        test_speculative_hit, test_adopted_in_flight, test_adopted_then_llm_fails, test_unadopted_failure_is_silent,
+        test_disabled_by_default, test_expired_speculation,
+    ]))